@@ -0,0 +1,33 @@
+''' This script benchmarks the clustering of hits.
+The clustering rate (hits/s) is printed for events with few scattered hits, for noisy events with many hits and for events of the FE stop mode read out (256 BCIDs).
+'''
+
+import logging
+from time import time
+
+from pybar.analysis.RawDataConverter.data_clusterizer import PyDataClusterizer
+
+from benchmark_utils import create_hits
+
+
+def cluster(hits):
+    clusterizer = PyDataClusterizer()
+    clusterizer.set_warning_output(False)
+    clusterizer.create_cluster_hit_info_array(True)
+    clusterizer.set_cluster_hit_info_array_size(hits.shape[0])
+    clusterizer.set_cluster_info_array_size(hits.shape[0])
+    start_time = time()
+    clusterizer.add_hits(hits)
+    return time() - start_time, clusterizer.get_n_clusters()
+
+
+def benchmark_clusterizer(n_hits=1000000, n_repeat=3):
+    for name, n_hits_per_event, n_bcids in (('scattered', 3, 16), ('noisy', 100, 16), ('stop mode', 10, 256)):
+        hits = create_hits(n_hits / n_hits_per_event, n_hits_per_event, n_bcids)
+        results = [cluster(hits) for _ in range(n_repeat)]
+        print '%-10s %4d hits/event %4d BCIDs %12.0f hits/s, %d cluster' % (name, n_hits_per_event, n_bcids, hits.shape[0] / min(result[0] for result in results), results[0][1])
+
+
+if __name__ == "__main__":
+    logging.getLogger().setLevel(logging.WARNING)
+    benchmark_clusterizer()
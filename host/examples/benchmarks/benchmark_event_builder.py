@@ -0,0 +1,41 @@
+''' This script benchmarks the raw data interpretation with the event builder strategies of the interpreter (BCID window, trigger number, TDC word, stop mode).
+The interpretation rate (words/s) and the number of built events are printed for each strategy and raw data file.
+'''
+
+import os
+import sys
+import glob
+import logging
+from time import time
+import tables as tb
+
+from pybar.analysis.RawDataConverter.data_interpreter import PyDataInterpreter, event_builders
+
+
+def interpret(raw_data, event_builder, chunk_size):
+    interpreter = PyDataInterpreter()
+    interpreter.set_warning_output(False)
+    interpreter.set_info_output(False)
+    interpreter.set_event_builder(event_builder)
+    start_time = time()
+    for index in range(0, raw_data.shape[0], chunk_size):
+        interpreter.interpret_raw_data(raw_data[index:index + chunk_size])
+    interpreter.store_event()
+    return time() - start_time, interpreter.get_n_events()
+
+
+def benchmark_event_builder(raw_data_files, chunk_size=1000000, n_repeat=3):
+    for raw_data_file in raw_data_files:
+        with tb.open_file(raw_data_file, mode="r") as in_file_h5:
+            if 'raw_data' not in in_file_h5.root:
+                continue
+            raw_data = in_file_h5.root.raw_data[:]
+        print 'Input file %s: %d words' % (raw_data_file, raw_data.shape[0])
+        for event_builder in event_builders:
+            results = [interpret(raw_data, event_builder, chunk_size) for _ in range(n_repeat)]
+            print '%-15s %12.0f words/s %10d events' % (event_builder, raw_data.shape[0] / min(result[0] for result in results), results[0][1])
+
+
+if __name__ == "__main__":
+    logging.getLogger().setLevel(logging.WARNING)
+    benchmark_event_builder(sys.argv[1:] if len(sys.argv) > 1 else sorted(glob.glob(os.path.join(os.path.dirname(__file__), '../../tests/test_analysis/*.h5'))))
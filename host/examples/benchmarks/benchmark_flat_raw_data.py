@@ -0,0 +1,53 @@
+''' This script benchmarks the raw data interpretation of the HDF5 raw data file and of the uncompressed flat raw data format (memory mapped).
+The interpretation rate (words/s) for both formats is printed.
+'''
+
+import os
+import sys
+import shutil
+import logging
+import tempfile
+from time import time
+import numpy as np
+import tables as tb
+
+from pybar.analysis.analyze_raw_data import AnalyzeRawData
+from pybar.daq.flat_raw_data import convert_raw_data_file_to_flat
+
+
+def interpret(raw_data_file, analyzed_data_file, chunk_size):
+    with AnalyzeRawData(raw_data_file=raw_data_file, analyzed_data_file=analyzed_data_file) as analyze_raw_data:
+        analyze_raw_data.chunk_size = chunk_size
+        analyze_raw_data.create_hit_table = True if analyzed_data_file else False
+        analyze_raw_data.interpreter.set_warning_output(False)
+        analyze_raw_data.histograming.set_warning_output(False)
+        start_time = time()
+        analyze_raw_data.interpret_word_table(use_settings_from_file=False, fei4b=False)
+        return time() - start_time
+
+
+def benchmark_flat_raw_data(raw_data_file, chunk_size=3000000, n_repeat=3):
+    folder = tempfile.mkdtemp()
+    try:
+        hdf5_file = os.path.join(folder, 'hdf5.h5')
+        flat_file = os.path.join(folder, 'flat.h5')
+        shutil.copy(raw_data_file, hdf5_file)
+        shutil.copy(raw_data_file, flat_file)
+        convert_raw_data_file_to_flat(flat_file)
+        with tb.open_file(hdf5_file, mode="r") as in_file_h5:
+            n_words = in_file_h5.root.raw_data.shape[0]
+        print 'Input file %s: %d words' % (raw_data_file, n_words)
+        for name, filename in (('hdf5', hdf5_file), ('flat', flat_file)):
+            interpretation_time = min(interpret(filename, None, chunk_size) for _ in range(n_repeat))  # no output file, measure reading and interpretation only
+            print '%-6s %12.0f words/s' % (name, n_words / interpretation_time)
+            interpret(filename, os.path.join(folder, name + '_interpreted.h5'), chunk_size)
+        with tb.open_file(os.path.join(folder, 'hdf5_interpreted.h5'), mode="r") as hdf5_h5:
+            with tb.open_file(os.path.join(folder, 'flat_interpreted.h5'), mode="r") as flat_h5:
+                print 'Identical hits:', np.array_equal(hdf5_h5.root.Hits[:], flat_h5.root.Hits[:])
+    finally:
+        shutil.rmtree(folder)
+
+
+if __name__ == "__main__":
+    logging.getLogger().setLevel(logging.WARNING)
+    benchmark_flat_raw_data(sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(__file__), '../../tests/test_analysis/unit_test_data_1.h5'))
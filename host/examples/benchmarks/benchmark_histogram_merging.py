@@ -0,0 +1,81 @@
+''' This script benchmarks the hit histogramming of hit chunks in parallel threads and processes with the partial histograms added to one result.
+The histogramming time is printed for one histogram filled with all hits (serial) and for the added histograms of the parallel workers.
+'''
+
+import logging
+from time import time
+from threading import Thread
+from multiprocessing import Pool
+import numpy as np
+
+from pybar.analysis.RawDataConverter.data_histograming import PyDataHistograming
+
+from benchmark_utils import create_hits
+
+
+n_events = 2000000
+n_readouts = 20000
+meta_event_index = np.ascontiguousarray(np.arange(n_readouts, dtype=np.uint64) * (n_events / n_readouts))  # first event number of each read out
+parameter_index = np.ascontiguousarray(np.arange(n_readouts, dtype=np.uint32) * 100 / n_readouts)  # 100 scan parameter steps
+
+
+def create_histograming():
+    histograming = PyDataHistograming()
+    histograming.set_warning_output(False)
+    histograming.create_occupancy_hist(True)
+    histograming.create_tot_hist(True)
+    histograming.create_rel_bcid_hist(True)
+    histograming.add_meta_event_index(meta_event_index, array_length=meta_event_index.shape[0])
+    histograming.add_scan_parameter(parameter_index)
+    return histograming
+
+
+def histogram(hits):
+    histograming = create_histograming()
+    histograming.add_hits(hits)
+    return histograming  # pickled to return the histograms from a worker process
+
+
+def histogram_threads(hits, n_workers):
+    histogramings = [create_histograming() for _ in range(n_workers)]
+    threads = [Thread(target=histograming.add_hits, args=(hits_chunk, )) for histograming, hits_chunk in zip(histogramings, np.array_split(hits, n_workers))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for histograming in histogramings[1:]:
+        histogramings[0].add(histograming)
+    return histogramings[0]
+
+
+def histogram_processes(hits, pool, n_workers):
+    histogramings = pool.map(histogram, np.array_split(hits, n_workers))
+    for histograming in histogramings[1:]:
+        histogramings[0].add(histograming)
+    return histogramings[0]
+
+
+def benchmark_histogram_merging(n_workers=(2, 4)):
+    hits = create_hits(n_events, n_hits_per_event=10)
+    print 'Histogramming %d hits of %d events' % (hits.shape[0], n_events)
+    start_time = time()
+    histograming_serial = histogram(hits)
+    occupancy = histograming_serial.get_occupancy()
+    print '%-10s %2d workers %8.3f s' % ('serial', 1, time() - start_time)
+    for n_worker in n_workers:
+        start_time = time()
+        histograming = histogram_threads(hits, n_worker)
+        print '%-10s %2d workers %8.3f s, identical occupancy: %s' % ('threads', n_worker, time() - start_time, np.array_equal(histograming.get_occupancy(), occupancy))
+        pool = Pool(n_worker)
+        try:
+            start_time = time()
+            histograming = histogram_processes(hits, pool, n_worker)
+            print '%-10s %2d workers %8.3f s, identical occupancy: %s' % ('processes', n_worker, time() - start_time, np.array_equal(histograming.get_occupancy(), occupancy))
+        finally:
+            pool.close()
+            pool.join()
+
+
+if __name__ == "__main__":
+    logging.getLogger().setLevel(logging.WARNING)
+    benchmark_histogram_merging()
@@ -0,0 +1,40 @@
+''' This script benchmarks the hit histogramming with scan parameters (e.g. PlsrDAC steps of a threshold scan).
+The histogramming rate (hits/s) is printed for different numbers of scan parameter steps. The hits are given in event number order and shuffled.
+'''
+
+import logging
+from time import time
+import numpy as np
+
+from pybar.analysis.RawDataConverter.data_histograming import PyDataHistograming
+
+from benchmark_utils import create_hits
+
+
+def histogram(hits, meta_event_index, parameter_index):
+    histograming = PyDataHistograming()
+    histograming.set_warning_output(False)
+    histograming.create_occupancy_hist(True)
+    histograming.add_meta_event_index(meta_event_index, array_length=meta_event_index.shape[0])
+    histograming.add_scan_parameter(parameter_index)
+    start_time = time()
+    histograming.add_hits(hits)
+    return time() - start_time, histograming.get_occupancy().sum(axis=(0, 1))
+
+
+def benchmark_scan_parameter_histograming(n_events=200000, n_hits_per_event=10, n_readouts=20000, n_steps=(1, 10, 100, 1000), n_repeat=3):
+    hits = create_hits(n_events, n_hits_per_event)
+    shuffled_hits = hits[np.random.permutation(hits.shape[0])]
+    meta_event_index = np.ascontiguousarray(np.arange(n_readouts, dtype=np.uint64) * (n_events / n_readouts))  # first event number of each read out
+    print 'Histogramming %d hits of %d events in %d read outs' % (hits.shape[0], n_events, n_readouts)
+    for n_step in n_steps:
+        parameter_index = np.ascontiguousarray(np.arange(n_readouts, dtype=np.uint32) * n_step / n_readouts)  # scan parameter index of each read out
+        expected = np.bincount(parameter_index[np.searchsorted(meta_event_index, hits['event_number'][hits['tot'] <= 13], side='right') - 1], minlength=n_step)
+        for name, hit_array in (('sorted', hits), ('shuffled', shuffled_hits)):
+            results = [histogram(hit_array, meta_event_index, parameter_index) for _ in range(n_repeat)]
+            print '%5d steps %-8s %12.0f hits/s, correct occupancy: %s' % (n_step, name, hit_array.shape[0] / min(result[0] for result in results), np.array_equal(results[0][1], expected))
+
+
+if __name__ == "__main__":
+    logging.getLogger().setLevel(logging.WARNING)
+    benchmark_scan_parameter_histograming()
@@ -0,0 +1,43 @@
+''' This script benchmarks the storage profiles of the raw data file.
+The readouts of a recorded raw data file are written again with every storage profile. The ingest rate (MB/s) and the file size are printed.
+'''
+
+import os
+import sys
+import shutil
+import tempfile
+from time import time
+import tables as tb
+
+from pybar.daq.fei4_raw_data import RawDataFile, storage_profiles
+
+
+def benchmark_storage_profiles(raw_data_file, profiles=None, words_per_readout=None, n_repeat=3):
+    with tb.open_file(raw_data_file, mode="r") as in_file_h5:
+        meta_data = in_file_h5.root.meta_data[:]
+        raw_data = in_file_h5.root.raw_data[:]
+    readouts = [(raw_data[index_start:index_stop], timestamp_start, timestamp_stop, error) for index_start, index_stop, timestamp_start, timestamp_stop, error in zip(meta_data['index_start'], meta_data['index_stop'], meta_data['timestamp_start'], meta_data['timestamp_stop'], meta_data['error'])]
+    if not words_per_readout:
+        words_per_readout = raw_data.shape[0] / meta_data.shape[0]
+    mega_bytes = raw_data.nbytes / 1024.0 / 1024.0
+    print 'Input file %s: %d readouts, %.1f MB raw data' % (raw_data_file, len(readouts), mega_bytes)
+    print '%-12s %12s %12s %10s' % ('profile', 'ingest MB/s', 'size MB', 'ratio')
+    folder = tempfile.mkdtemp()
+    try:
+        for profile in (profiles if profiles else sorted(storage_profiles.iterkeys())):
+            filename = os.path.join(folder, 'raw_data_%s.h5' % profile)
+            times = []
+            for _ in range(n_repeat):
+                start_time = time()
+                with RawDataFile(filename, mode='w', storage_profile=profile, words_per_readout=words_per_readout, expected_words=raw_data.shape[0]) as raw_data_file_out:
+                    for readout in readouts:
+                        raw_data_file_out.append_item(readout, flush=False)
+                times.append(time() - start_time)
+            file_size = os.path.getsize(filename) / 1024.0 / 1024.0
+            print '%-12s %12.1f %12.2f %10.2f' % (profile, mega_bytes / min(times), file_size, mega_bytes / file_size)
+    finally:
+        shutil.rmtree(folder)
+
+
+if __name__ == "__main__":
+    benchmark_storage_profiles(sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(__file__), '../../tests/test_analysis/unit_test_data_1.h5'))
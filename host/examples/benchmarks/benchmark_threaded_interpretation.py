@@ -0,0 +1,68 @@
+''' This script benchmarks the interpretation of independent raw data streams in several Python threads.
+The raw data interpretation, histogramming and clustering release the GIL, thus the total interpretation rate (words/s) scales with the number of threads (up to the number of CPU cores).
+Each thread uses its own interpreter, histogrammer and clusterizer on its own copy of the raw data.
+'''
+
+import os
+import sys
+import logging
+import threading
+from time import time
+import numpy as np
+import tables as tb
+
+from pybar.analysis.RawDataConverter.data_interpreter import PyDataInterpreter
+from pybar.analysis.RawDataConverter.data_histograming import PyDataHistograming
+from pybar.analysis.RawDataConverter.data_clusterizer import PyDataClusterizer
+
+
+def interpret(raw_data, chunk_size):
+    interpreter = PyDataInterpreter()
+    histograming = PyDataHistograming()
+    clusterizer = PyDataClusterizer()
+    interpreter.set_warning_output(False)
+    histograming.set_warning_output(False)
+    clusterizer.set_warning_output(False)
+    histograming.set_no_scan_parameter()
+    histograming.create_occupancy_hist(True)
+    histograming.create_tot_hist(True)
+    for index in range(0, raw_data.shape[0], chunk_size):
+        interpreter.interpret_raw_data(raw_data[index:index + chunk_size])
+        hits = interpreter.get_hits()
+        histograming.add_hits(hits)
+        clusterizer.add_hits(hits)
+    interpreter.store_event()
+    hits = interpreter.get_hits()
+    histograming.add_hits(hits)
+    clusterizer.add_hits(hits)
+    return histograming.get_occupancy()
+
+
+def benchmark_threaded_interpretation(raw_data_file, chunk_size=1000000, n_threads=(1, 2, 4)):
+    with tb.open_file(raw_data_file, mode="r") as in_file_h5:
+        raw_data = in_file_h5.root.raw_data[:]
+    print 'Input file %s: %d words' % (raw_data_file, raw_data.shape[0])
+    reference = interpret(raw_data, chunk_size)
+    single_thread_rate = None
+    for n_thread in n_threads:
+        streams = [raw_data.copy() for _ in range(n_thread)]  # independent raw data streams
+        results = [None] * n_thread
+
+        def worker(index):
+            results[index] = interpret(streams[index], chunk_size)
+
+        threads = [threading.Thread(target=worker, args=(index, )) for index in range(n_thread)]
+        start_time = time()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        rate = n_thread * raw_data.shape[0] / (time() - start_time)
+        if single_thread_rate is None:
+            single_thread_rate = rate
+        print '%d thread(s) %12.0f words/s, speedup %.2f, identical occupancy: %s' % (n_thread, rate, rate / single_thread_rate, all(np.array_equal(reference, result) for result in results))
+
+
+if __name__ == "__main__":
+    logging.getLogger().setLevel(logging.WARNING)
+    benchmark_threaded_interpretation(sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(__file__), '../../tests/test_analysis/unit_test_data_1.h5'))
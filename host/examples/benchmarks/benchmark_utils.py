@@ -0,0 +1,17 @@
+''' Helper functions shared by the benchmark scripts.
+'''
+
+import numpy as np
+import tables as tb
+
+from pybar.analysis.RawDataConverter import data_struct
+
+
+def create_hits(n_events, n_hits_per_event, n_bcids=16):
+    hits = np.zeros(shape=(n_events * n_hits_per_event, ), dtype=tb.dtype_from_descr(data_struct.HitInfoTable))
+    hits['event_number'] = np.repeat(np.arange(n_events, dtype=np.int64), n_hits_per_event)
+    hits['column'] = np.random.randint(1, 81, size=hits.shape[0])
+    hits['row'] = np.random.randint(1, 337, size=hits.shape[0])
+    hits['relative_BCID'] = np.random.randint(0, n_bcids, size=hits.shape[0])
+    hits['tot'] = np.random.randint(0, 14, size=hits.shape[0])
+    return hits[np.lexsort((hits['relative_BCID'], hits['event_number']))]  # the hits of one event are sorted by relative BCID
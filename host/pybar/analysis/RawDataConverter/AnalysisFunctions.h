@@ -236,5 +236,115 @@ void mapCluster(int64_t*& rEventArray, const unsigned int& rEventArraySize, Clus
 	}
 }
 
+// word types of the raw data word classifier, same values as in pybar.daq.readout_utils
+#define WORD_TYPE_UNKNOWN 0
+#define WORD_TYPE_TRIGGER 1
+#define WORD_TYPE_TDC 2
+#define WORD_TYPE_DATA_HEADER 3
+#define WORD_TYPE_DATA_RECORD 4
+#define WORD_TYPE_ADDRESS_RECORD 5
+#define WORD_TYPE_VALUE_RECORD 6
+#define WORD_TYPE_SERVICE_RECORD 7
+
+// labels every raw data word with the word type and the channel (FE number) in one pass, the channel of trigger and TDC words is 0
+void classifyRawData(uint32_t*& rData, const unsigned int& rSize, uint8_t*& rWordType, uint8_t*& rChannel)
+{
+	// local copies, uint8_t can alias the references and would force reloading them in every iteration
+	const uint32_t* tData = rData;
+	const unsigned int tSize = rSize;
+	uint8_t* tWordType = rWordType;
+	uint8_t* tChannel = rChannel;
+	for (unsigned int i = 0; i < tSize; ++i){
+		const uint32_t tWord = tData[i];
+		if ((tWord & TRIGGER_WORD_HEADER_MASK_NEW) == TRIGGER_WORD_HEADER_MASK_NEW){
+			tWordType[i] = WORD_TYPE_TRIGGER;
+			tChannel[i] = 0;
+			continue;
+		}
+		if ((tWord & 0xC0000000) == TDC_HEADER){
+			tWordType[i] = WORD_TYPE_TDC;
+			tChannel[i] = 0;
+			continue;
+		}
+		tChannel[i] = (uint8_t) ((tWord & 0x7F000000) >> 24);
+		switch (tWord & 0x00FF0000){
+			case DATA_HEADER:
+				tWordType[i] = WORD_TYPE_DATA_HEADER;
+				break;
+			case ADDRESS_RECORD:
+				tWordType[i] = WORD_TYPE_ADDRESS_RECORD;
+				break;
+			case VALUE_RECORD:
+				tWordType[i] = WORD_TYPE_VALUE_RECORD;
+				break;
+			case SERVICE_RECORD:
+				tWordType[i] = WORD_TYPE_SERVICE_RECORD;
+				break;
+			default:  // same selection as readout_utils.is_data_record()
+				if ((tWord & DATA_RECORD_COLUMN_MASK) != 0 && (tWord & DATA_RECORD_COLUMN_MASK) <= 0x00A00000 && (tWord & DATA_RECORD_ROW_MASK) != 0 && (tWord & DATA_RECORD_ROW_MASK) <= 0x00015000)
+					tWordType[i] = WORD_TYPE_DATA_RECORD;
+				else
+					tWordType[i] = WORD_TYPE_UNKNOWN;
+		}
+	}
+}
+
+// decodes the hits (column, row, ToT code) of the data records in one pass, words that are not data records are ignored
+// the output arrays need space for two hits per word, hits with a ToT code above rMaxTot are omitted (15: no hit, 14: late hit (FE-I4A) / small hit (FE-I4B)); returns the number of hits
+unsigned int decodeDataRecords(uint32_t*& rData, const unsigned int& rSize, uint32_t*& rColumn, uint32_t*& rRow, uint32_t*& rTot, const unsigned int& rMaxTot)
+{
+	const uint32_t* tData = rData;
+	const unsigned int tSize = rSize;
+	const unsigned int tMaxTot = rMaxTot;
+	uint32_t* tColumn = rColumn;
+	uint32_t* tRow = rRow;
+	uint32_t* tTot = rTot;
+	unsigned int tNhits = 0;
+	for (unsigned int i = 0; i < tSize; ++i){
+		const uint32_t tWord = tData[i];
+		const uint32_t tCol = DATA_RECORD_COLUMN1_MACRO(tWord);
+		const uint32_t tRow1 = DATA_RECORD_ROW1_MACRO(tWord);
+		if ((tWord & 0xC0000000) != 0 || tCol < RAW_DATA_MIN_COLUMN || tCol > RAW_DATA_MAX_COLUMN || tRow1 < RAW_DATA_MIN_ROW || tRow1 > RAW_DATA_MAX_ROW)  // no data record
+			continue;
+		const uint32_t tTot1 = DATA_RECORD_TOT1_MACRO(tWord);
+		const uint32_t tTot2 = DATA_RECORD_TOT2_MACRO(tWord);
+		if (tTot1 <= tMaxTot){
+			tColumn[tNhits] = tCol;
+			tRow[tNhits] = tRow1;
+			tTot[tNhits] = tTot1;
+			++tNhits;
+		}
+		if (tTot2 <= tMaxTot && tRow1 < RAW_DATA_MAX_ROW){  // second hit is in the next row
+			tColumn[tNhits] = tCol;
+			tRow[tNhits] = tRow1 + 1;
+			tTot[tNhits] = tTot2;
+			++tNhits;
+		}
+	}
+	return tNhits;
+}
+
+// adds the hits of the data records to the occupancy histogram (80 x 336, column index first) without storing the hits, words that are not data records are ignored
+// the occupancy is signed, the tuning scans subtract the number of injections from it
+void histogramDataRecords(uint32_t*& rData, const unsigned int& rSize, int32_t*& rOccupancy, const unsigned int& rMaxTot)
+{
+	const uint32_t* tData = rData;
+	const unsigned int tSize = rSize;
+	const unsigned int tMaxTot = rMaxTot;
+	int32_t* tOccupancy = rOccupancy;
+	for (unsigned int i = 0; i < tSize; ++i){
+		const uint32_t tWord = tData[i];
+		const uint32_t tCol = DATA_RECORD_COLUMN1_MACRO(tWord);
+		const uint32_t tRow1 = DATA_RECORD_ROW1_MACRO(tWord);
+		if ((tWord & 0xC0000000) != 0 || tCol < RAW_DATA_MIN_COLUMN || tCol > RAW_DATA_MAX_COLUMN || tRow1 < RAW_DATA_MIN_ROW || tRow1 > RAW_DATA_MAX_ROW)  // no data record
+			continue;
+		const unsigned int tIndex = (tCol - 1) * RAW_DATA_MAX_ROW + tRow1 - 1;
+		if (DATA_RECORD_TOT1_MACRO(tWord) <= tMaxTot)
+			++tOccupancy[tIndex];
+		if (DATA_RECORD_TOT2_MACRO(tWord) <= tMaxTot && tRow1 < RAW_DATA_MAX_ROW)
+			++tOccupancy[tIndex + 1];
+	}
+}
+
 
 
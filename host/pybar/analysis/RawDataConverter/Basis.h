@@ -69,6 +69,10 @@ protected:
 	void warning(std::string pText, int pLine = -1);	//writes the pText to the console, also reports the line pLine and the file where this function was called
 	void error(std::string pText, int pLine = -1);		//writes the pText to the console, also reports the line pLine and the file where this function was called
 
+	//helper functions for binary state data (e.g. Interpret::getState())
+	template<class T> void writeState(std::string& rState, const T* pValues, const unsigned int& pNvalues = 1);
+	template<class T> void readState(const std::string& rState, size_t& rPosition, T* pValues, const unsigned int& pNvalues = 1);
+
 private:
 	std::string _sourceFileName;						//the file name of the cxx file
 	bool _error;										//toggle error output on/off
@@ -79,3 +83,15 @@ private:
 	std::string _bugReportFileName;				  		//set bug report file name
 };
 
+template<class T> void Basis::writeState(std::string& rState, const T* pValues, const unsigned int& pNvalues)
+{
+	rState.append(reinterpret_cast<const char*>(pValues), pNvalues * sizeof(T));
+}
+
+template<class T> void Basis::readState(const std::string& rState, size_t& rPosition, T* pValues, const unsigned int& pNvalues)
+{
+	if (rPosition + pNvalues * sizeof(T) > rState.size())
+		throw std::invalid_argument("State data is too short.");
+	std::copy(rState.data() + rPosition, rState.data() + rPosition + pNvalues * sizeof(T), reinterpret_cast<char*>(pValues));
+	rPosition += pNvalues * sizeof(T);
+}
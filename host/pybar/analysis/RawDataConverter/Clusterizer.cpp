@@ -6,8 +6,6 @@ Clusterizer::Clusterizer(void)
 	setStandardSettings();
 	allocateClusterHitArray();
 	allocateClusterInfoArray();
-	allocateHitMap();
-	allocateHitIndexMap();
 	allocateChargeMap();
 	allocateResultHistograms();
 	initChargeCalibMap();
@@ -19,8 +17,6 @@ Clusterizer::~Clusterizer(void)
 	debug("~Clusterizer(void): destructor called");
 	deleteClusterHitArray();
 	deleteClusterInfoArray();
-	deleteHitMap();
-	deleteHitIndexMap();
 	deleteChargeMap();
 	deleteResultHistograms();
 }
@@ -32,8 +28,10 @@ void Clusterizer::setStandardSettings()
 	_clusterInfo = 0;
 	_clusterHitInfoSize = 6e6;
 	_clusterInfoSize = 6e6;
-	_hitMap = 0;
-	_hitIndexMap = 0;
+	_clusterHitInfoOwned = false;
+	_clusterInfoOwned = false;
+	_growClusterArrays = true;
+	_streamingMode = false;
 	_chargeMap = 0;
 	_clusterTots = 0;
 	_clusterCharges = 0;
@@ -75,6 +73,38 @@ void Clusterizer::setClusterInfoArraySize(const unsigned int& rSize)
 	allocateClusterInfoArray();
 }
 
+void Clusterizer::setClusterHitInfoArray(ClusterHitInfo*& rClusterHitInfo, const unsigned int& rSize)
+{
+	info("setClusterHitInfoArray(...) with size "+IntToStr(rSize));
+	deleteClusterHitArray();
+	_clusterHitInfo = rClusterHitInfo;
+	_clusterHitInfoSize = rSize;
+	_clusterHitInfoOwned = false;
+	_NclustersHits = 0;
+}
+
+void Clusterizer::setClusterInfoArray(ClusterInfo*& rClusterInfo, const unsigned int& rSize)
+{
+	info("setClusterInfoArray(...) with size "+IntToStr(rSize));
+	deleteClusterInfoArray();
+	_clusterInfo = rClusterInfo;
+	_clusterInfoSize = rSize;
+	_clusterInfoOwned = false;
+	_Nclusters = 0;
+}
+
+void Clusterizer::setClusterArraysGrowth(const bool& rGrowClusterArrays)
+{
+	info("setClusterArraysGrowth()");
+	_growClusterArrays = rGrowClusterArrays;
+}
+
+void Clusterizer::setStreamingMode(const bool& rStreamingMode)
+{
+	info("setStreamingMode()");
+	_streamingMode = rStreamingMode;
+}
+
 void Clusterizer::getClusterSizeHist(unsigned int& rNparameterValues, unsigned int*& rClusterSize, bool copy)
 {
   info("getClusterSizeHist(...)");
@@ -179,7 +209,7 @@ unsigned int Clusterizer::getNclusters()
 void Clusterizer::reset()
 {
 	info("reset()");
-	initHitMap();
+	initHits();
 	clearResultHistograms();
 	clearActualClusterData();
 	clearActualEventVariables();
@@ -189,26 +219,36 @@ void Clusterizer::addHits(HitInfo*& rHitInfo, const unsigned int& rNhits)
 {
   if(Basis::debugSet())
 	  debug("addHits(...,rNhits="+IntToStr(rNhits)+")");
+  startAddHits(rNhits, rNhits > 0 ? rHitInfo[0].eventNumber : 0);
+  for(unsigned int i = 0; i<rNhits; i++)
+	  addEventHit(rHitInfo[i]);
+  finishAddHits();
+}
 
-  _hitInfo = rHitInfo;
-  _Nclusters = 0;
-  _NclustersHits = 0;
-
-  if(rNhits>0 && _actualEventNumber != 0 && rHitInfo[0].eventNumber == _actualEventNumber)
-	  warning("addHits: Hit chunks not aligned at events. Clusterizer will not work properly");
-
-  for(unsigned int i = 0; i<rNhits; i++){
-	  if(_actualEventNumber != rHitInfo[i].eventNumber){
-		  clusterize();
-		  addHitClusterInfo(i);
-		  clearActualEventVariables();
-	  }
-	  _actualEventNumber = rHitInfo[i].eventNumber;
-	  addHit(i);
-  }
-  //manually add remaining hit data
-  clusterize();
-  addHitClusterInfo(rNhits);
+void Clusterizer::storeEvent()
+{
+	debug("storeEvent()");
+	clusterize();
+	addHitClusterInfo();
+	clearActualEventVariables();
+}
+
+void Clusterizer::addHitsColumns(int64_t*& rEventNumber, unsigned char*& rRelativeBCID, unsigned char*& rColumn, unsigned short*& rRow, unsigned char*& rTot, unsigned short*& rEventStatus, const unsigned int& rNhits)
+{
+	if(Basis::debugSet())
+		debug("addHitsColumns(...,rNhits="+IntToStr(rNhits)+")");
+	startAddHits(rNhits, rNhits > 0 ? rEventNumber[0] : 0);
+	HitInfo tHit = HitInfo();	//one hit is filled from the columns at a time, the hit fields that are not in the columns are 0
+	for(unsigned int i = 0; i<rNhits; i++){
+		tHit.eventNumber = rEventNumber[i];
+		tHit.relativeBCID = rRelativeBCID[i];
+		tHit.column = rColumn[i];
+		tHit.row = rRow[i];
+		tHit.tot = rTot[i];
+		tHit.eventStatus = rEventStatus[i];
+		addEventHit(tHit);
+	}
+	finishAddHits();
 }
 
 void Clusterizer::getHitCluster(ClusterHitInfo*& rClusterHitInfo, unsigned int& rSize, bool copy)
@@ -231,12 +271,11 @@ void Clusterizer::getCluster(ClusterInfo*& rClusterInfo, unsigned int& rSize, bo
     rSize = _Nclusters;
 }
 
-bool Clusterizer::clusterize()
+void Clusterizer::clusterize()
 {
 	if(Basis::debugSet()){
 		std::cout<<"Clusterizer::clusterize(): Status:\n";
 		std::cout<<"  _nHits "<<_nHits<<std::endl;
-		std::cout<<"  _bCIDfirstHit "<<_bCIDfirstHit<<"\n";
 		std::cout<<"  _bCIDlastHit "<<_bCIDlastHit<<"\n";
 		std::cout<<"  _minColHitPos "<<_minColHitPos<<"\n";
 		std::cout<<"  _maxColHitPos "<<_maxColHitPos<<"\n";
@@ -246,32 +285,28 @@ bool Clusterizer::clusterize()
 
 	_runTime = 0;
 
-	for(int iBCID = _bCIDfirstHit; iBCID <= _bCIDlastHit; ++iBCID){			//loop over the hit array starting from the first hit BCID to the last hit BCID
-		for(int iCol = _minColHitPos; iCol <= _maxColHitPos; ++iCol){		//loop over the hit array from the minimum to the maximum column with a hit
-			for(int iRow = _minRowHitPos; iRow <= _maxRowHitPos; ++iRow){	//loop over the hit array from the minimum to the maximum row with a hit
-				if(hitExists(iCol,iRow,iBCID)){								//if a hit in iCol,iRow,iBCID exists take this as a first hit of a cluster and do:
-					clearActualClusterData();								//  clear the last cluster data
-					_actualRelativeClusterBCID = iBCID;						//  set the minimum relative BCID [0:15] for the new cluster
-					searchNextHits(iCol, iRow, iBCID);						//  find hits next to the actual one and update the actual cluster values, here the clustering takes place
-					if (_actualClusterSize >= (int) _minClusterHits){		//  only add cluster if it has at least _minClusterHits hits
-						addCluster();										//  add cluster to output cluster array
-						addClusterToResults();								//  add the actual cluster values to the histograms
-						_actualClusterID++;									//  increase the cluster id for this event
-					}
-					else
-						warning("clusterize: cluster size too small");
-				}
-				if (_nHits == 0)											//saves a lot of average run time, the loop is aborted if every hit is in a cluster (_nHits == 0)
-					return true;
+	std::sort(_eventHits.begin(), _eventHits.end());							//loop over the hits sorted by relative BCID, column, row
+	removeDuplicateHits();
+	for(std::vector<EventHit>::iterator iHit = _eventHits.begin(); iHit != _eventHits.end(); ++iHit){
+		if(iHit->tot != -1){													//if the hit is not in a cluster yet take this as a first hit of a cluster and do:
+			int iBCID = iHit->position / (RAW_DATA_MAX_COLUMN * RAW_DATA_MAX_ROW);
+			int iCol = iHit->position / RAW_DATA_MAX_ROW % RAW_DATA_MAX_COLUMN;
+			int iRow = iHit->position % RAW_DATA_MAX_ROW;
+			clearActualClusterData();											//  clear the last cluster data
+			_actualRelativeClusterBCID = iBCID;									//  set the minimum relative BCID for the new cluster
+			searchNextHits(*iHit, iCol, iRow, iBCID);							//  find hits next to the actual one and update the actual cluster values, here the clustering takes place
+			if (_actualClusterSize >= (int) _minClusterHits){					//  only add cluster if it has at least _minClusterHits hits
+				addCluster();													//  add cluster to output cluster array
+				addClusterToResults();											//  add the actual cluster values to the histograms
+				_actualClusterID++;												//  increase the cluster id for this event
 			}
+			else
+				warning("clusterize: cluster size too small");
 		}
+		if (_nHits == 0)														//the loop is aborted if every hit is in a cluster (_nHits == 0)
+			break;
 	}
-	if (_nHits == 0)
-		return true;
-
-	warning("Clusterizer::clusterize: NOT ALL HITS CLUSTERED!");
-	showHits();
-	return false;
+	_eventHits.clear();
 }
 
 void Clusterizer::test()
@@ -305,26 +340,53 @@ void Clusterizer::test()
 }
 
 //private
-void Clusterizer::addHit(const unsigned int& pHitIndex)
+const int Clusterizer::_searchColumnSteps[8] = {0, 1, 1, 1, 0, -1, -1, -1};
+const int Clusterizer::_searchRowSteps[8] = {1, 1, 0, -1, -1, -1, 0, 1};
+
+void Clusterizer::startAddHits(const unsigned int& rNhits, const int64_t& rFirstEventNumber)
+{
+	_Nclusters = 0;
+	_NclustersHits = 0;
+	if(!_streamingMode && rNhits>0 && _actualEventNumber != 0 && rFirstEventNumber == _actualEventNumber)
+		warning("addHits: Hit chunks not aligned at events. Clusterizer will not work properly");
+}
+
+void Clusterizer::addEventHit(const HitInfo& rHit)
+{
+	if(_actualEventNumber != rHit.eventNumber){
+		clusterize();
+		addHitClusterInfo();
+		clearActualEventVariables();
+	}
+	_actualEventNumber = rHit.eventNumber;
+	addHit(rHit);
+}
+
+void Clusterizer::finishAddHits()
+{
+	//manually add remaining hit data, in the streaming mode the last event can continue in the next hits
+	if(!_streamingMode){
+		clusterize();
+		addHitClusterInfo();
+	}
+}
+
+void Clusterizer::addHit(const HitInfo& rHit)
 {
 	debug("addHit");
-	uint64_t tEvent = _hitInfo[pHitIndex].eventNumber;
-	unsigned short tCol = _hitInfo[pHitIndex].column-1;
-	unsigned short tRow = _hitInfo[pHitIndex].row-1;
-	unsigned short tRelBcid = _hitInfo[pHitIndex].relativeBCID;
-	unsigned short tTot = _hitInfo[pHitIndex].tot;
+	unsigned short tCol = rHit.column-1;
+	unsigned short tRow = rHit.row-1;
+	unsigned short tRelBcid = rHit.relativeBCID;
+	unsigned short tTot = rHit.tot;
 	float tCharge = -1;
 
-	_actualEventStatus = _hitInfo[pHitIndex].eventStatus | _actualEventStatus;
+	_actualEventStatus = rHit.eventStatus | _actualEventStatus;
 
 	_nEventHits++;
 
 	if(tTot>_maxHitTot)	// ommit hits with a tot that is too high
 		return;
 
-	if(_nHits == 0)
-		_bCIDfirstHit = tRelBcid;
-
 	if(tRelBcid > _bCIDlastHit)
 		_bCIDlastHit = tRelBcid;
 
@@ -337,44 +399,79 @@ void Clusterizer::addHit(const unsigned int& pHitIndex)
 	if(tRow > _maxRowHitPos)
 		_maxRowHitPos = tRow;
 		
-	if ((tCol > RAW_DATA_MAX_COLUMN) || (tRow > RAW_DATA_MAX_ROW))
+	if ((tCol >= RAW_DATA_MAX_COLUMN) || (tRow >= RAW_DATA_MAX_ROW))
 		throw std::out_of_range("The column/row value is out of range. They have to start at 1!");
 
-	if(_hitMap[(long)tCol + (long)tRow * (long)RAW_DATA_MAX_COLUMN + (long)tRelBcid * (long)RAW_DATA_MAX_COLUMN * (long)RAW_DATA_MAX_ROW] == -1){
-		_hitMap[(long)tCol + (long)tRow * (long)RAW_DATA_MAX_COLUMN + (long)tRelBcid * (long)RAW_DATA_MAX_COLUMN * (long)RAW_DATA_MAX_ROW] = tTot;
-		_hitIndexMap[(long)tCol + (long)tRow * (long)RAW_DATA_MAX_COLUMN + (long)tRelBcid * (long)RAW_DATA_MAX_COLUMN * (long)RAW_DATA_MAX_ROW] = pHitIndex;
-		_nHits++;
-	}
-	else
-		warning("addHit: event "+LongIntToStr(tEvent)+", attempt to add the same hit col/row/rel.bcid="+IntToStr(tCol)+"/"+IntToStr(tRow)+"/"+IntToStr(tRelBcid)+" again, ignored!");
+	EventHit tHit = {(unsigned int)tRelBcid * RAW_DATA_MAX_COLUMN * RAW_DATA_MAX_ROW + (unsigned int)tCol * RAW_DATA_MAX_ROW + tRow, (short) tTot, (unsigned int) _eventHits.size()};
+	_eventHits.push_back(tHit);		//hits with the same position are removed in clusterize()
+	_nHits++;
 
 	if (tCharge >= 0)
 		_chargeMap[(long)tCol + (long)tRow * (long)RAW_DATA_MAX_COLUMN + (long)tTot * (long)RAW_DATA_MAX_COLUMN * (long)RAW_DATA_MAX_ROW] = tCharge;
 
-	if(_createClusterHitInfoArray){
-		if (_clusterHitInfo == 0)
-			throw std::runtime_error("Cluster hit array is not defined and cannot be filled");
-		_NclustersHits++;
-		_clusterHitInfo[pHitIndex].eventNumber = _hitInfo[pHitIndex].eventNumber;
-		_clusterHitInfo[pHitIndex].triggerNumber = _hitInfo[pHitIndex].triggerNumber;
-		_clusterHitInfo[pHitIndex].relativeBCID = _hitInfo[pHitIndex].relativeBCID;
-		_clusterHitInfo[pHitIndex].LVLID = _hitInfo[pHitIndex].LVLID;
-		_clusterHitInfo[pHitIndex].column = _hitInfo[pHitIndex].column;
-		_clusterHitInfo[pHitIndex].row = _hitInfo[pHitIndex].row;
-		_clusterHitInfo[pHitIndex].tot = _hitInfo[pHitIndex].tot;
-		_clusterHitInfo[pHitIndex].TDC = _hitInfo[pHitIndex].TDC;
-		_clusterHitInfo[pHitIndex].TDCtimeStamp = _hitInfo[pHitIndex].TDCtimeStamp;
-		_clusterHitInfo[pHitIndex].BCID = _hitInfo[pHitIndex].BCID;
-		_clusterHitInfo[pHitIndex].triggerStatus = _hitInfo[pHitIndex].triggerStatus;
-		_clusterHitInfo[pHitIndex].serviceRecord = _hitInfo[pHitIndex].serviceRecord;
-		_clusterHitInfo[pHitIndex].eventStatus = _hitInfo[pHitIndex].eventStatus;
-		_clusterHitInfo[pHitIndex].isSeed = 0;
-		_clusterHitInfo[pHitIndex].clusterSize = 666;
-		_clusterHitInfo[pHitIndex].nCluster = 666;
-	}
-}
-
-void Clusterizer::searchNextHits(const unsigned short& pCol, const unsigned short& pRow, const unsigned short& pRelBcid)
+	if(_createClusterHitInfoArray){	//the cluster hits of the event are copied, the input hit array does not have to exist when the event is clustered
+		ClusterHitInfo tClusterHit;
+		tClusterHit.eventNumber = rHit.eventNumber;
+		tClusterHit.triggerNumber = rHit.triggerNumber;
+		tClusterHit.relativeBCID = rHit.relativeBCID;
+		tClusterHit.LVLID = rHit.LVLID;
+		tClusterHit.column = rHit.column;
+		tClusterHit.row = rHit.row;
+		tClusterHit.tot = rHit.tot;
+		tClusterHit.TDC = rHit.TDC;
+		tClusterHit.TDCtimeStamp = rHit.TDCtimeStamp;
+		tClusterHit.BCID = rHit.BCID;
+		tClusterHit.triggerStatus = rHit.triggerStatus;
+		tClusterHit.serviceRecord = rHit.serviceRecord;
+		tClusterHit.eventStatus = rHit.eventStatus;
+		tClusterHit.clusterID = 0;
+		tClusterHit.isSeed = 0;
+		tClusterHit.clusterSize = 666;
+		tClusterHit.nCluster = 666;
+		_eventClusterHits.push_back(tClusterHit);
+	}
+}
+
+void Clusterizer::removeDuplicateHits()
+{
+	std::vector<EventHit>::iterator iHit = _eventHits.begin();	//the hits are sorted by position and input order, fast check for hits with the same position first
+	if(iHit == _eventHits.end())
+		return;
+	for(++iHit; iHit != _eventHits.end(); ++iHit){
+		if(iHit->position == (iHit-1)->position)
+			break;
+	}
+	if(iHit == _eventHits.end())
+		return;
+
+	std::vector<bool> tDuplicateHits(_eventHits.size(), false);
+	std::vector<EventHit>::iterator iUniqueHit = iHit;
+	for(; iHit != _eventHits.end(); ++iHit){
+		if(iHit->position == (iUniqueHit-1)->position){
+			warning("removeDuplicateHits: event "+LongIntToStr(_actualEventNumber)+", attempt to add the same hit col/row/rel.bcid="+IntToStr(iHit->position / RAW_DATA_MAX_ROW % RAW_DATA_MAX_COLUMN)+"/"+IntToStr(iHit->position % RAW_DATA_MAX_ROW)+"/"+IntToStr(iHit->position / (RAW_DATA_MAX_COLUMN * RAW_DATA_MAX_ROW))+" again, ignored!");
+			tDuplicateHits[iHit->index] = true;
+			_nHits--;
+		}
+		else
+			*iUniqueHit++ = *iHit;
+	}
+	_eventHits.erase(iUniqueHit, _eventHits.end());
+
+	if(_createClusterHitInfoArray){	//delete the cluster hits of the duplicate hits and update the cluster hit indices
+		std::vector<unsigned int> tNewIndices(tDuplicateHits.size());
+		unsigned int tNclusterHits = 0;
+		for(unsigned int i = 0; i < tDuplicateHits.size(); ++i){
+			tNewIndices[i] = tNclusterHits;
+			if(!tDuplicateHits[i])
+				_eventClusterHits[tNclusterHits++] = _eventClusterHits[i];
+		}
+		_eventClusterHits.resize(tNclusterHits);
+		for(iHit = _eventHits.begin(); iHit != _eventHits.end(); ++iHit)
+			iHit->index = tNewIndices[iHit->index];
+	}
+}
+
+void Clusterizer::searchNextHits(EventHit& rHit, const unsigned short& pCol, const unsigned short& pRow, const unsigned short& pRelBcid)
 {
 	if(Basis::debugSet()){
 		std::cout<<"Clusterizer::searchNextHits(...): status: "<<std::endl;
@@ -387,28 +484,60 @@ void Clusterizer::searchNextHits(const unsigned short& pCol, const unsigned shor
 		showHits();
 	}
 
+	if (addClusterHit(rHit, pCol, pRow))	//add the first hit, return if no hit is in the list anymore
+		return;
+
+	SearchStep tSearchStep = {pCol, pRow, _actualRelativeClusterBCID, 1, 1, 0, 0};
+	_searchSteps.assign(1, tSearchStep);
+
+	//search around the pixel in time and space, the search continues around a hit found first (depth first) and then around the pixel again
+	while(!_searchSteps.empty()){
+		SearchStep& rStep = _searchSteps.back();
+		for(; rStep.relBcid <= _actualRelativeClusterBCID +_DbCID && rStep.relBcid <= (unsigned int) _bCIDlastHit; ++rStep.relBcid, rStep.dx = 1){	//loop over the BCID window width starting from the actual cluster BCID
+			for(; rStep.dx <= _dx; ++rStep.dx, rStep.dy = 1){										//loop over the the x range
+				for(; rStep.dy <= _dy; ++rStep.dy, rStep.direction = 0){							//loop over the the y range
+					for(; rStep.direction < 8; ++rStep.direction){									//loop over the directions up, up right, right, ..., up left
+						if((rStep.foundDirections & (1 << rStep.direction)) != 0)					//only the first hit found in one direction is searched around
+							continue;
+						_runTime++;
+						unsigned short tCol = rStep.column + _searchColumnSteps[rStep.direction] * rStep.dx;
+						unsigned short tRow = rStep.row + _searchRowSteps[rStep.direction] * rStep.dy;
+						EventHit* tHit = findHit(tCol, tRow, rStep.relBcid);
+						if(tHit != 0){
+							rStep.foundDirections |= 1 << rStep.direction;
+							rStep.direction++;
+							if (addClusterHit(*tHit, tCol, tRow))		//add hit and return if no hit is in the list anymore
+								return;
+							tSearchStep.column = tCol;
+							tSearchStep.row = tRow;
+							_searchSteps.push_back(tSearchStep);	//search around the hit found next, rStep is invalid now
+							goto nextSearchStep;
+						}
+					}
+				}
+			}
+		}
+		_searchSteps.pop_back();	//every hit around the pixel is searched
+		nextSearchStep:;
+	}
+}
+
+bool Clusterizer::addClusterHit(EventHit& rHit, const unsigned short& pCol, const unsigned short& pRow)
+{
 	_actualClusterSize++;	//increase the total hits for this cluster value
 
-	short unsigned int tTot = _hitMap[(long)pCol + (long)pRow * (long)RAW_DATA_MAX_COLUMN + (long)pRelBcid * (long)RAW_DATA_MAX_COLUMN * (long)RAW_DATA_MAX_ROW];
+	short unsigned int tTot = rHit.tot;
 
 	if (tTot >= _actualClusterMaxTot && tTot <= _maxHitTot){	//seed finding
 		_actualClusterSeed_column = pCol;
 		_actualClusterSeed_row = pRow;
-		_actualClusterSeed_relbcid = pRelBcid;
+		_actualClusterSeed_relbcid = rHit.position / (RAW_DATA_MAX_COLUMN * RAW_DATA_MAX_ROW);
+		_actualClusterSeed_index = rHit.index;
 		_actualClusterMaxTot = tTot;
 	}
 
-	if(_createClusterHitInfoArray){
-		if (_clusterHitInfo == 0)
-			throw std::runtime_error("Cluster hit array is not defined and cannot be filled");
-		if( _hitIndexMap[(long)pCol + (long)pRow * (long)RAW_DATA_MAX_COLUMN + (long)pRelBcid * (long)RAW_DATA_MAX_COLUMN * (long)RAW_DATA_MAX_ROW] < _clusterHitInfoSize)
-			_clusterHitInfo[_hitIndexMap[(long)pCol + (long)pRow * (long)RAW_DATA_MAX_COLUMN + (long)pRelBcid * (long)RAW_DATA_MAX_COLUMN * (long)RAW_DATA_MAX_ROW]].clusterID = _actualClusterID;
-		else{
-			std::stringstream tInfo;
-			tInfo<<"Clusterizer: searchNextHits(...): hit index "<<_hitIndexMap[(long)pCol + (long)pRow * (long)RAW_DATA_MAX_COLUMN + (long)pRelBcid * (long)RAW_DATA_MAX_COLUMN * (long)RAW_DATA_MAX_ROW]<<" is out of range (0.."<<_clusterHitInfoSize<<")";
-			throw std::out_of_range(tInfo.str());
-		}
-	}
+	if(_createClusterHitInfoArray)
+		_eventClusterHits[rHit.index].clusterID = _actualClusterID;
 
 	if(tTot > (short int) _maxClusterHitTot)	//omit cluster with a hit tot higher than _maxClusterHitTot, clustering is not aborted to delete all hits from this cluster from the hit array
 		_abortCluster = true;
@@ -430,83 +559,33 @@ void Clusterizer::searchNextHits(const unsigned short& pCol, const unsigned shor
 //		std::cout<<"  _actualClusterY "<<_actualClusterY<<std::endl;
 	}
 
-	if (deleteHit(pCol, pRow, pRelBcid))	//delete hit and return if no hit is in the array anymore
-		return;
-
-	//values set to true to avoid double searches in one direction with different step sizes
-	bool tHitUp = false;
-	bool tHitUpRight = false;
-	bool tHitRight = false;
-	bool tHitDownRight = false;
-	bool tHitDown = false;
-	bool tHitDownLeft = false;
-	bool tHitLeft = false;
-	bool tHitUpLeft = false;
-
-	//search around the pixel in time and space
-	for(unsigned int iDbCID = _actualRelativeClusterBCID; iDbCID <= _actualRelativeClusterBCID +_DbCID && iDbCID <= (unsigned int) _bCIDlastHit; ++iDbCID){	//loop over the BCID window width starting from the actual cluster BCID
-		for(int iDx = 1; iDx <= (int) _dx; ++iDx){									//loop over the the x range
-			for(int iDy = 1; iDy <= (int) _dy; ++iDy){								//loop over the the y range
-				_runTime++;
-				if(hitExists(pCol,pRow+iDy,iDbCID) && !tHitUp){					//search up
-					tHitUp = true;
-					searchNextHits(pCol, pRow+iDy, iDbCID);
-				}
-				if(hitExists(pCol+iDx,pRow+iDy,iDbCID) && !tHitUpRight){		//search up, right
-					tHitUpRight = true;
-					searchNextHits(pCol+iDx, pRow+iDy, iDbCID);
-				}
-				if(hitExists(pCol+iDx, pRow,iDbCID) && !tHitRight){				//search right
-					tHitRight = true;
-					searchNextHits(pCol+iDx, pRow, iDbCID);
-				}
-				if(hitExists(pCol+iDx, pRow-iDy,iDbCID) && !tHitDownRight){		//search down, right
-					tHitDownRight = true;
-					searchNextHits(pCol+iDx, pRow-iDy, iDbCID);
-				}
-				if(hitExists(pCol, pRow-iDy,iDbCID) && !tHitDown){				//search down
-					tHitDown = true;
-					searchNextHits(pCol, pRow-iDy, iDbCID);
-				}
-				if(hitExists(pCol-iDx, pRow-iDy,iDbCID) && !tHitDownLeft){		//search down, left
-					tHitDownLeft = true;
-					searchNextHits(pCol-iDx, pRow-iDy, iDbCID);
-				}
-				if(hitExists(pCol-iDx, pRow,iDbCID) && !tHitLeft){				//search left
-					tHitLeft = true;
-					searchNextHits(pCol-iDx, pRow, iDbCID);
-				}
-				if(hitExists(pCol-iDx, pRow+iDy,iDbCID) && !tHitUpLeft){		//search up, left
-					tHitUpLeft = true;
-					searchNextHits(pCol-iDx, pRow+iDy, iDbCID);
-				}
-			}
-		}
-	}
+	return deleteHit(rHit);	//delete hit and return true if no hit is in the list anymore
 }
 
-bool Clusterizer::deleteHit(const unsigned short& pCol, const unsigned short& pRow, const unsigned short& pRelBcid)
+bool Clusterizer::deleteHit(EventHit& rHit)
 {
-	_hitMap[(long)pCol + (long)pRow * (long)RAW_DATA_MAX_COLUMN + (long)pRelBcid * (long)RAW_DATA_MAX_COLUMN * (long)RAW_DATA_MAX_ROW] = -1;
+	rHit.tot = -1;
 	_nHits--;
 	if(_nHits == 0){
 		_minColHitPos = RAW_DATA_MAX_COLUMN-1;
 		_maxColHitPos = 0;
 		_minRowHitPos = RAW_DATA_MAX_ROW-1;
 		_maxRowHitPos = 0;
-		_bCIDfirstHit = -1;
 		_bCIDlastHit = -1;
 		return true;
 	}
 	return false;
 }
 
-bool Clusterizer::hitExists(const unsigned short& pCol, const unsigned short& pRow, const unsigned short& pRelBcid)
+Clusterizer::EventHit* Clusterizer::findHit(const unsigned short& pCol, const unsigned short& pRow, const unsigned short& pRelBcid)
 {
-	if(pCol>= 0 && pCol < RAW_DATA_MAX_COLUMN && pRow >= 0 && pRow < RAW_DATA_MAX_ROW && pRelBcid >= 0 && pRelBcid < __MAXBCID)
-		if(_hitMap[(long)pCol + (long)pRow * (long)RAW_DATA_MAX_COLUMN + (long)pRelBcid * (long)RAW_DATA_MAX_COLUMN * (long)RAW_DATA_MAX_ROW] != -1)
-			return true;
-	return false;
+	if(pCol < RAW_DATA_MAX_COLUMN && pRow < RAW_DATA_MAX_ROW && pRelBcid < __MAXBCID){
+		EventHit tHit = {(unsigned int)pRelBcid * RAW_DATA_MAX_COLUMN * RAW_DATA_MAX_ROW + (unsigned int)pCol * RAW_DATA_MAX_ROW + pRow, 0, 0};
+		std::vector<EventHit>::iterator iHit = std::lower_bound(_eventHits.begin(), _eventHits.end(), tHit);	//binary search in the hits sorted by position
+		if(iHit != _eventHits.end() && iHit->position == tHit.position && iHit->tot != -1)
+			return &(*iHit);
+	}
+	return 0;
 }
 
 void Clusterizer::initChargeCalibMap()
@@ -521,22 +600,17 @@ void Clusterizer::initChargeCalibMap()
 	}
 }
 
-void Clusterizer::initHitMap()
+void Clusterizer::initHits()
 {
-	info("initHitMap");
+	info("initHits");
 
-	for(int iCol = 0; iCol < RAW_DATA_MAX_COLUMN; ++iCol){
-		for(int iRow = 0; iRow < RAW_DATA_MAX_ROW; ++iRow){
-			for(int iRbCID = 0; iRbCID < __MAXBCID; ++iRbCID)
-				_hitMap[(long)iCol + (long)iRow * (long)RAW_DATA_MAX_COLUMN + (long)iRbCID * (long)RAW_DATA_MAX_COLUMN * (long)RAW_DATA_MAX_ROW] = -1;
-		}
-	}
+	_eventHits.clear();
+	_eventClusterHits.clear();
 
 	_minColHitPos = RAW_DATA_MAX_COLUMN-1;
 	_maxColHitPos = 0;
 	_minRowHitPos = RAW_DATA_MAX_ROW-1;
 	_maxRowHitPos = 0;
-	_bCIDfirstHit = -1;
 	_bCIDlastHit = -1;
 	_nHits = 0;
 }
@@ -577,6 +651,7 @@ void Clusterizer::allocateClusterHitArray()
 	debug(std::string("allocateClusterHitArray()"));
 	try{
 		_clusterHitInfo = new ClusterHitInfo[_clusterHitInfoSize];
+		_clusterHitInfoOwned = true;
 	}
 	catch(std::bad_alloc& exception){
 		error(std::string("allocateClusterHitArray(): ")+std::string(exception.what()));
@@ -589,7 +664,8 @@ void Clusterizer::deleteClusterHitArray()
 	debug(std::string("deleteClusterHitArray()"));
 	if (_clusterHitInfo == 0)
 		return;
-	delete[] _clusterHitInfo;
+	if (_clusterHitInfoOwned)
+		delete[] _clusterHitInfo;
 	_clusterHitInfo = 0;
 }
 
@@ -598,6 +674,7 @@ void Clusterizer::allocateClusterInfoArray()
 	debug(std::string("allocateClusterInfoArray()"));
 	try{
 		_clusterInfo = new ClusterInfo[_clusterInfoSize];
+		_clusterInfoOwned = true;
 	}
 	catch(std::bad_alloc& exception){
 		error(std::string("allocateClusterInfoArray(): ")+std::string(exception.what()));
@@ -610,77 +687,53 @@ void Clusterizer::deleteClusterInfoArray()
 	debug(std::string("deleteClusterInfoArray()"));
 	if (_clusterInfo == 0)
 		return;
-	delete[] _clusterInfo;
+	if (_clusterInfoOwned)
+		delete[] _clusterInfo;
 	_clusterInfo = 0;
 }
 
-void Clusterizer::allocateHitMap()
+void Clusterizer::growClusterHitArray(const unsigned int& rMinSize)
 {
-	info("allocateHitMap()");
-	deleteHitMap();
+	unsigned int tNewSize = _clusterHitInfoSize < std::numeric_limits<unsigned int>::max() / 2 ? 2 * _clusterHitInfoSize : std::numeric_limits<unsigned int>::max();
+	if (tNewSize < rMinSize)
+		tNewSize = rMinSize;
+	info("growClusterHitArray(...) with new size "+IntToStr(tNewSize));
+	ClusterHitInfo* tClusterHitInfo = 0;
 	try{
-		_hitMap = new short[(long)(RAW_DATA_MAX_COLUMN-1) + ((long)RAW_DATA_MAX_ROW-1)*(long)RAW_DATA_MAX_COLUMN + ((long)__MAXBCID-1) * (long)RAW_DATA_MAX_COLUMN * (long)RAW_DATA_MAX_ROW +1];
+		tClusterHitInfo = new ClusterHitInfo[tNewSize];
 	}
 	catch(std::bad_alloc& exception){
-		error(std::string("allocateHitMap: ")+std::string(exception.what()));
-	}
-}
-
-void Clusterizer::clearHitMap()
-{
-	debug("Clusterizer::clearHitMap\n");
-
-	if(_nHits != 0){
-		for(int iCol = 0; iCol < RAW_DATA_MAX_COLUMN; ++iCol){
-			for(int iRow = 0; iRow < RAW_DATA_MAX_ROW; ++iRow){
-				for(int iRbCID = 0; iRbCID < __MAXBCID; ++iRbCID){
-					if(_hitMap[(long)iCol + (long)iRow * (long)RAW_DATA_MAX_COLUMN + (long)iRbCID * (long)RAW_DATA_MAX_COLUMN * (long)RAW_DATA_MAX_ROW] != -1){
-						_hitMap[(long)iCol + (long)iRow * (long)RAW_DATA_MAX_COLUMN + (long)iRbCID * (long)RAW_DATA_MAX_COLUMN * (long)RAW_DATA_MAX_ROW] = -1;
-						_nHits--;
-					if(_nHits == 0)
-						goto exitLoop;	//the fastest way to exit a nested loop
-					}
-				}
-			}
-		}
+		error(std::string("growClusterHitArray(): ")+std::string(exception.what()));
+		throw;
 	}
-
-	exitLoop:
-	_minColHitPos = RAW_DATA_MAX_COLUMN-1;
-	_maxColHitPos = 0;
-	_minRowHitPos = RAW_DATA_MAX_ROW-1;
-	_maxRowHitPos = 0;
-	_bCIDfirstHit = -1;
-	_bCIDlastHit = -1;
-	_nHits = 0;
-}
-
-void Clusterizer::deleteHitMap()
-{
-	info("deleteHitMap()");
-	if (_hitMap != 0)
-		delete _hitMap;
-	_hitMap = 0;
+	if (_clusterHitInfo != 0)
+		std::copy(_clusterHitInfo, _clusterHitInfo + _NclustersHits, tClusterHitInfo);
+	deleteClusterHitArray();
+	_clusterHitInfo = tClusterHitInfo;
+	_clusterHitInfoSize = tNewSize;
+	_clusterHitInfoOwned = true;
 }
 
-void Clusterizer::allocateHitIndexMap()
+void Clusterizer::growClusterInfoArray(const unsigned int& rMinSize)
 {
-	info("allocateHitIndexMap()");
-	deleteHitIndexMap();
+	unsigned int tNewSize = _clusterInfoSize < std::numeric_limits<unsigned int>::max() / 2 ? 2 * _clusterInfoSize : std::numeric_limits<unsigned int>::max();
+	if (tNewSize < rMinSize)
+		tNewSize = rMinSize;
+	info("growClusterInfoArray(...) with new size "+IntToStr(tNewSize));
+	ClusterInfo* tClusterInfo = 0;
 	try{
-		_hitIndexMap = new unsigned int[(long)(RAW_DATA_MAX_COLUMN-1) + ((long)RAW_DATA_MAX_ROW-1)*(long)RAW_DATA_MAX_COLUMN + ((long)__MAXBCID-1) * (long)RAW_DATA_MAX_COLUMN * (long)RAW_DATA_MAX_ROW +1];
+		tClusterInfo = new ClusterInfo[tNewSize];
 	}
 	catch(std::bad_alloc& exception){
-		error(std::string("allocateHitIndexMap: ")+std::string(exception.what()));
+		error(std::string("growClusterInfoArray(): ")+std::string(exception.what()));
+		throw;
 	}
-}
-
-void Clusterizer::deleteHitIndexMap()
-{
-	info(std::string("deleteHitIndexMap()"));
-	if (_hitIndexMap != 0)
-		delete _hitIndexMap;
-	_hitIndexMap = 0;
+	if (_clusterInfo != 0)
+		std::copy(_clusterInfo, _clusterInfo + _Nclusters, tClusterInfo);
+	deleteClusterInfoArray();
+	_clusterInfo = tClusterInfo;
+	_clusterInfoSize = tNewSize;
+	_clusterInfoOwned = true;
 }
 
 void Clusterizer::allocateChargeMap()
@@ -763,6 +816,7 @@ void Clusterizer::clearActualClusterData()
 	_actualClusterSeed_column = 0;
 	_actualClusterSeed_row = 0;
 	_actualClusterSeed_relbcid = 0;
+	_actualClusterSeed_index = 0;
 	_abortCluster = false;					//reset abort flag for the new cluster
 }
 
@@ -778,13 +832,9 @@ void Clusterizer::showHits()
 {
 	info("ShowHits");
 	if(_nHits < 100){
-		for(int iCol = 0; iCol < RAW_DATA_MAX_COLUMN; ++iCol){
-			for(int iRow = 0; iRow < RAW_DATA_MAX_ROW; ++iRow){
-				for(int iRbCID = 0; iRbCID < __MAXBCID; ++iRbCID){
-					if (_hitMap[(long)iCol + (long)iRow * (long)RAW_DATA_MAX_COLUMN + (long)iRbCID * (long)RAW_DATA_MAX_COLUMN * (long)RAW_DATA_MAX_ROW] != -1)
-						std::cout<<"x/y/BCID/Tot = "<<iCol<<"/"<<iRow<<"/"<<iRbCID<<"/"<<_hitMap[(long)iCol + (long)iRow * (long)RAW_DATA_MAX_COLUMN + (long)iRbCID * (long)RAW_DATA_MAX_COLUMN * (long)RAW_DATA_MAX_ROW]<<std::endl;
-				}
-			}
+		for(std::vector<EventHit>::iterator iHit = _eventHits.begin(); iHit != _eventHits.end(); ++iHit){
+			if (iHit->tot != -1)
+				std::cout<<"x/y/BCID/Tot = "<<iHit->position / RAW_DATA_MAX_ROW % RAW_DATA_MAX_COLUMN<<"/"<<iHit->position % RAW_DATA_MAX_ROW<<"/"<<iHit->position / (RAW_DATA_MAX_COLUMN * RAW_DATA_MAX_ROW)<<"/"<<iHit->tot<<std::endl;
 		}
 	}
 	else
@@ -798,45 +848,51 @@ void Clusterizer::addCluster()
 	if(_createClusterInfoArray){
 		if (_clusterInfo == 0)
 			throw std::runtime_error("Cluster info array is not defined and cannot be filled");
-		if(_Nclusters < _clusterInfoSize){
-			_clusterInfo[_Nclusters].eventNumber = _actualEventNumber;
-			_clusterInfo[_Nclusters].ID = _actualClusterID;
-			_clusterInfo[_Nclusters].size = _actualClusterSize;
-			_clusterInfo[_Nclusters].Tot = _actualClusterTot;
-			_clusterInfo[_Nclusters].charge = _actualClusterCharge;
-			_clusterInfo[_Nclusters].seed_column = _actualClusterSeed_column+1;
-			_clusterInfo[_Nclusters].seed_row = _actualClusterSeed_row+1;
-			_clusterInfo[_Nclusters].mean_column = (float) (_actualClusterX+1.);
-			_clusterInfo[_Nclusters].mean_row = (float) (_actualClusterY+1.);
-			_clusterInfo[_Nclusters].eventStatus = _actualEventStatus;
+		if(_Nclusters >= _clusterInfoSize){
+			if (_growClusterArrays)
+				growClusterInfoArray(_Nclusters + 1);
+			else
+				throw std::out_of_range("Too many clusters attempt to be stored in cluster array");
 		}
-		else
-			throw std::out_of_range("Too many clusters attempt to be stored in cluster array");
+		_clusterInfo[_Nclusters].eventNumber = _actualEventNumber;
+		_clusterInfo[_Nclusters].ID = _actualClusterID;
+		_clusterInfo[_Nclusters].size = _actualClusterSize;
+		_clusterInfo[_Nclusters].Tot = _actualClusterTot;
+		_clusterInfo[_Nclusters].charge = _actualClusterCharge;
+		_clusterInfo[_Nclusters].seed_column = _actualClusterSeed_column+1;
+		_clusterInfo[_Nclusters].seed_row = _actualClusterSeed_row+1;
+		_clusterInfo[_Nclusters].mean_column = (float) (_actualClusterX+1.);
+		_clusterInfo[_Nclusters].mean_row = (float) (_actualClusterY+1.);
+		_clusterInfo[_Nclusters].eventStatus = _actualEventStatus;
 	}
 
 	_Nclusters++;
 
 	//set cluster seed infos
-	if(_createClusterHitInfoArray){
-		if(_hitIndexMap[(long)_actualClusterSeed_column + (long)_actualClusterSeed_row * (long)RAW_DATA_MAX_COLUMN + (long)_actualClusterSeed_relbcid * (long)RAW_DATA_MAX_COLUMN * (long)RAW_DATA_MAX_ROW] < _clusterHitInfoSize)
-			_clusterHitInfo[_hitIndexMap[(long)_actualClusterSeed_column + (long)_actualClusterSeed_row * (long)RAW_DATA_MAX_COLUMN + (long)_actualClusterSeed_relbcid * (long)RAW_DATA_MAX_COLUMN * (long)RAW_DATA_MAX_ROW]].isSeed = 1;
-		else
-			throw std::out_of_range("Clusterizer: addCluster(): hit index is out of range");
-	}
+	if(_createClusterHitInfoArray)
+		_eventClusterHits[_actualClusterSeed_index].isSeed = 1;
 }
 
-void Clusterizer::addHitClusterInfo(const unsigned int& pHitIndex)
+void Clusterizer::addHitClusterInfo()
 {
 	if(_createClusterHitInfoArray){
 		if (_clusterInfo == 0)
 			throw std::runtime_error("Cluster info array is not defined but needed");
 		if (_clusterHitInfo == 0)
 			throw std::runtime_error("Cluster hit array is not defined and cannot be filled");
-		for(unsigned int iHitIndex = pHitIndex - _nEventHits; iHitIndex < pHitIndex; ++iHitIndex){   // loop over cluster hits of actual event
-			unsigned int clusterIndex = _Nclusters - _actualClusterID + _clusterHitInfo[iHitIndex].clusterID;
-			_clusterHitInfo[iHitIndex].clusterSize = _clusterInfo[clusterIndex].size;
-			_clusterHitInfo[iHitIndex].nCluster = _actualClusterID;
+		if(_NclustersHits + _eventClusterHits.size() > _clusterHitInfoSize){
+			if (_growClusterArrays)
+				growClusterHitArray(_NclustersHits + _eventClusterHits.size());
+			else
+				throw std::out_of_range("Too many cluster hits attempt to be stored in cluster hit array");
+		}
+		for(std::vector<ClusterHitInfo>::iterator iClusterHit = _eventClusterHits.begin(); iClusterHit != _eventClusterHits.end(); ++iClusterHit){   // loop over cluster hits of actual event
+			unsigned int clusterIndex = _Nclusters - _actualClusterID + iClusterHit->clusterID;
+			iClusterHit->clusterSize = _clusterInfo[clusterIndex].size;
+			iClusterHit->nCluster = _actualClusterID;
+			_clusterHitInfo[_NclustersHits++] = *iClusterHit;
 		}
+		_eventClusterHits.clear();
 	}
 }
 
@@ -9,18 +9,19 @@
  *   number of hits per trigger/event is usually <10
  *
  * The basic idea is:
- * - use an array that is looped over only if hits are inside. Per trigger you have usually < 10 hits.
- *   Methods: Clusterize() for looping over the array
+ * - use a list of the hits of the actual event sorted by rel. BCID, column, row to loop over the hits and to find hits next to a hit with a binary search. Per trigger you have usually < 10 hits.
+ *   Methods: Clusterize() for looping over the hit list, the run time and the memory do not depend on the area or BCID window of the event hits
  * - start at one hit position and search around it with a distance of _dx,_dy (8 directions: up, up right, right ...) and _DbCID
- * 	Methods: Clusterize() for looping over the hit array and calling SearchNextHits() for finding next hits belonging to the clusters
+ * 	Methods: Clusterize() for looping over the hit list and calling SearchNextHits() for finding next hits belonging to the clusters
  * - only increase the search distance in a certain direction (until _dx, _dy, _DbCID) if no hit was found in this direction already
  *   Method: SearchNextHits() does this
- * - do this iteratively and delete hits from the map if they are added to a cluster
- *   Method: SearchNextHits() deletes hits from the hit map if they are assigned to a cluster
- * - if the hit map is empty all hits are assigned to cluster, abort then
+ * - do this iteratively for every hit found (depth first with a search stack, no recursion) and mark hits in the list if they are added to a cluster
+ *   Method: SearchNextHits() deletes hits from the hit list if they are assigned to a cluster with AddClusterHit()
+ * - if every hit is marked all hits are assigned to cluster, abort then
  * 	Method: Clusterize() does this
  *
- * 	The clusterizer can be filled externally with hits (addHit method)
+ * 	The clusterizer can be filled externally with hits (addHits method). In the streaming mode the hit arrays do not have to be aligned at events,
+ * 	the hits of the last event are kept until the next hits or storeEvent() are given. The cluster (hit) arrays grow if they are full.
  */
 
 #pragma once
@@ -40,9 +41,11 @@ public:
 	Clusterizer(void);
 	~Clusterizer(void);
 	//main functions
-	void addHits(HitInfo*& rHitInfo, const unsigned int& rNhits);		//add hits to cluster, starts clustering, warning hits have to be aligned at events
+	void addHits(HitInfo*& rHitInfo, const unsigned int& rNhits);		//add hits to cluster, starts clustering, warning hits have to be aligned at events if the streaming mode is off
+	void addHitsColumns(int64_t*& rEventNumber, unsigned char*& rRelativeBCID, unsigned char*& rColumn, unsigned short*& rRow, unsigned char*& rTot, unsigned short*& rEventStatus, const unsigned int& rNhits);	//add hits given as separate columns (see Interpret::getHitColumns()), the other hit fields of the cluster hits are 0
 	void getHitCluster(ClusterHitInfo*& rClusterHitInfo, unsigned int& rSize, bool copy=false);
 	void getCluster(ClusterInfo*& rClusterHitInfo, unsigned int& rSize, bool copy=false);
+	void storeEvent();													//clusters the hits of the last event kept in the streaming mode, the clusters are added to the cluster (hit) arrays of the last addHits() call
 	void reset();														//resets all data but keeps the settings and the charge calibration
 	// get result histograms
 	void getClusterSizeHist(unsigned int& rNparameterValues, unsigned int*& rClusterSize, bool copy = false);
@@ -55,6 +58,12 @@ public:
 	void createClusterInfoArray(bool toggle = true){_createClusterInfoArray = toggle;};
 	void setClusterHitInfoArraySize(const unsigned int& rSize);	//set the cluster hit array size
 	void setClusterInfoArraySize(const unsigned int& rSize);	//set the cluster array size
+	void setClusterHitInfoArray(ClusterHitInfo*& rClusterHitInfo, const unsigned int& rSize);	//set the cluster hit array to be filled, the array is not owned by the clusterizer
+	void setClusterInfoArray(ClusterInfo*& rClusterInfo, const unsigned int& rSize);	//set the cluster array to be filled, the array is not owned by the clusterizer
+	void setClusterArraysGrowth(const bool& rGrowClusterArrays = true);	//true: the cluster (hit) arrays are replaced by larger arrays if they are full, false: exception if they are full
+	void setStreamingMode(const bool& rStreamingMode = true);			//true: the hits of the last event are clustered together with the hits of the next addHits() call or with storeEvent()
+	unsigned int getClusterHitInfoArraySize(){return _clusterHitInfoSize;};
+	unsigned int getClusterInfoArraySize(){return _clusterInfoSize;};
 	void setXclusterDistance(const unsigned int& pDx);					//sets the x distance between two hits that they belong to one cluster
 	void setYclusterDistance(const unsigned int& pDy);					//sets the x distance between two hits that they belong to one cluster
 	void setBCIDclusterDistance(const unsigned int& pDbCID);			//sets the BCID depth between two hits that they belong to one cluster
@@ -67,13 +76,19 @@ public:
 	void test();
 
 private:
-	void addHit(const unsigned int& pHitIndex);	//add hit with index pHitIndex of the input hit array
-	inline void searchNextHits(const unsigned short& pCol, const unsigned short& pRow, const unsigned short& pRelBcid);			//search for a hit next to the actual one in time (BCIDs) and space (col, row)
-	inline bool deleteHit(const unsigned short& pCol, const unsigned short& pRow, const unsigned short& pRelBcid);				//delete hit at position pCol,pRow from hit map, returns true if hit array is empty
-	inline bool hitExists(const unsigned short& pCol, const unsigned short& pRow, const unsigned short& pRelBcid);				//check if the hit exists
+	struct EventHit;
+	void startAddHits(const unsigned int& rNhits, const int64_t& rFirstEventNumber);	//resets the cluster (hit) arrays for the hits of an addHits() call
+	void addEventHit(const HitInfo& rHit);								//clusters the actual event if the hit belongs to a new event and adds the hit
+	void finishAddHits();												//clusters the last event if the streaming mode is off
+	void addHit(const HitInfo& rHit);									//add the hit to the hit list of the actual event
+	void searchNextHits(EventHit& rHit, const unsigned short& pCol, const unsigned short& pRow, const unsigned short& pRelBcid);	//search for hits next to the actual one in time (BCIDs) and space (col, row) and for hits next to the hits found
+	inline bool addClusterHit(EventHit& rHit, const unsigned short& pCol, const unsigned short& pRow);		//add the hit to the actual cluster and delete it from the hit list, returns true if hit list is empty
+	inline bool deleteHit(EventHit& rHit);								//delete hit from the hit list, returns true if hit list is empty
+	inline EventHit* findHit(const unsigned short& pCol, const unsigned short& pRow, const unsigned short& pRelBcid);	//returns the hit at the position if it exists and is not in a cluster yet, otherwise 0
+	void removeDuplicateHits();											//removes hits with the same position from the sorted hit list, the first hit is kept
 	void initChargeCalibMap();											//sets the calibration map to all entries = 0
 	void addClusterToResults();											//adds the actual cluster data to the result arrays
-	bool clusterize();
+	void clusterize();
 
 	void setStandardSettings();
 
@@ -81,18 +96,14 @@ private:
 	void allocateClusterInfoArray();
 	void deleteClusterHitArray();
 	void deleteClusterInfoArray();
+	void growClusterHitArray(const unsigned int& rMinSize);				//replaces the cluster hit array by an array with at least rMinSize entries and copies the cluster hits
+	void growClusterInfoArray(const unsigned int& rMinSize);			//replaces the cluster array by an array with at least rMinSize entries and copies the clusters
 
 	void clearActualClusterData();
 	void clearActualEventVariables();
-	void showHits();													//shows the hit in the hit map for debugging
+	void showHits();													//shows the hits not in a cluster yet for debugging
 
-	void allocateHitMap();
-	void initHitMap();													//sets the hit map to no hit = all entries = -1
-	void clearHitMap();
-	void deleteHitMap();
-
-	void allocateHitIndexMap();
-	void deleteHitIndexMap();
+	void initHits();													//deletes the hits of the actual event
 
 	void allocateChargeMap();
 	void deleteChargeMap();
@@ -102,18 +113,19 @@ private:
 	void deleteResultHistograms();
 
 	void addCluster();													//adds the actual cluster to the _clusterInfo array
-	void addHitClusterInfo(const unsigned int& pHitIndex);				//adds the cluster info to the actual cluster hits in the cluster hit table
-
-	//input data structure
-	HitInfo* _hitInfo;
+	void addHitClusterInfo();											//adds the cluster info to the actual event cluster hits and adds them to the cluster hit array
 
 	//output data structures
 	ClusterHitInfo* _clusterHitInfo;
 	unsigned int _clusterHitInfoSize;
 	unsigned int _NclustersHits;
+	bool _clusterHitInfoOwned;				//true if _clusterHitInfo was allocated by the clusterizer
 	ClusterInfo* _clusterInfo;
 	unsigned int _clusterInfoSize;
 	unsigned int _Nclusters;
+	bool _clusterInfoOwned;					//true if _clusterInfo was allocated by the clusterizer
+	bool _growClusterArrays;				//true if the cluster (hit) arrays are replaced by larger arrays if they are full
+	bool _streamingMode;					//true if the hits of the last event are kept for the next addHits() call
 
 	//cluster results
 	unsigned int* _clusterTots;		//array [__MAXTOTBINS][__MAXCLUSTERHITSBINS] containing the cluster tots/cluster size for histogramming
@@ -122,8 +134,14 @@ private:
 	unsigned int* _clusterPosition;	//array [__MAXPOSXBINS][__MAXPOSYBINS] containing the cluster positions for histogramming
 
 	//data arrays for one event
-	short int* _hitMap;       											//2d hit histogram for each relative BCID (in total 3d, linearly sorted via col, row, rel. BCID)
-	unsigned int* _hitIndexMap;
+	struct EventHit{
+		unsigned int position;	//position of the hit (linearly sorted via rel. BCID, col, row)
+		short tot;				//tot of the hit, -1 if the hit is in a cluster already
+		unsigned int index;		//index of the hit in the actual event, index of the cluster hit in _eventClusterHits
+		bool operator<(const EventHit& rOther) const {return position < rOther.position || (position == rOther.position && index < rOther.index);};
+	};
+	std::vector<EventHit> _eventHits;									//hits of the actual event, sorted by position in clusterize() to loop over the hits and to find hits next to a hit
+	std::vector<ClusterHitInfo> _eventClusterHits;						//cluster hits of the actual event in the order of the input hits
 	float* _chargeMap;													//array containing the lookup charge values for each pixel and TOT
 
 	//cluster settings
@@ -144,7 +162,6 @@ private:
 	unsigned short _maxColHitPos;										//maximum column with a hit for the actual event data
 	unsigned short _minRowHitPos;										//minimum row with a hit for the actual event data
 	unsigned short _maxRowHitPos;										//maximum row with a hit for the actual event data
-	short _bCIDfirstHit;										        //relative start BCID value of the first hit [0:15]
 	short _bCIDlastHit;										            //relative stop BCID value of the last hit [0:15]
 	unsigned int _actualClusterTot;										//temporary value holding the total tot value of the actual cluster
 	unsigned int _actualClusterMaxTot;									//temporary value holding the maximum tot value of the actual cluster
@@ -154,6 +171,7 @@ private:
 	unsigned short _actualClusterSeed_column;							//temporary value holding the column number of the seed pixel of the actual cluster
 	unsigned short _actualClusterSeed_row;								//temporary value holding the row number of the seed pixel of the actual cluster
 	unsigned short _actualClusterSeed_relbcid;							//temporary value holding the relative BCID number of the seed pixel of the actual cluster
+	unsigned int _actualClusterSeed_index;								//temporary value holding the index of the seed pixel hit in the actual event
 	float _actualClusterX;												//temporary value holding the x position of the actual cluster
 	float _actualClusterY;												//temporary value holding the y position of the actual cluster
 	float _actualClusterCharge;											//temporary value holding the total charge value of the actual cluster
@@ -164,5 +182,19 @@ private:
 	unsigned int _nEventHits;											//number of hits of actual event
 
 	bool _abortCluster;													//set to true if one cluster TOT hit exeeds _maxClusterHitTot, cluster is not added to the result array
+
+	//search stack of searchNextHits(), one entry for each hit of the actual cluster with hits around that are not searched yet
+	struct SearchStep{
+		unsigned short column;			//column of the hit to search around
+		unsigned short row;				//row of the hit to search around
+		unsigned int relBcid;			//rel. BCID to search next
+		unsigned short dx;				//x distance to search next
+		unsigned short dy;				//y distance to search next
+		unsigned short direction;		//direction to search next (0..7: up, up right, right, down right, down, down left, left, up left)
+		unsigned short foundDirections;	//bit mask of the directions with a hit found already
+	};
+	std::vector<SearchStep> _searchSteps;
+	static const int _searchColumnSteps[8];	//column step of each search direction
+	static const int _searchRowSteps[8];	//row step of each search direction
 };
 
@@ -0,0 +1,39 @@
+#pragma once
+
+//Event builder strategies of the raw data interpreter, selected with Interpret::setEventBuilder().
+//The strategy is the template parameter of the raw data loop (Interpret::buildEvents()), thus the event building decisions are compile time constants
+//and there is no event building branch per raw data word.
+
+#include "defines.h"
+
+struct BcidWindowEventBuilder   //events are built from the BCID window (_NbCID data headers) of one trigger, a BCID jump with a new LVL1ID starts a new event
+{
+	static const bool triggerWordStartsEvent = false;  //true: a trigger word closes the actual event, false: only if the event window is complete
+	static const bool tdcWordStartsEvent = false;      //true: a TDC word closes the actual event if the event window is complete or the event has no TDC word
+	static const bool bcidJumpStartsEvent = true;      //true: a BCID jump with a new LVL1ID closes the actual event as incomplete, false: the BCID jump is flagged only
+	static const bool truncateEvent = false;           //true: events with more data headers than the event window (_NbCID) are flagged as truncated
+};
+
+struct TriggerNumberEventBuilder   //events start with the trigger word
+{
+	static const bool triggerWordStartsEvent = true;
+	static const bool tdcWordStartsEvent = false;
+	static const bool bcidJumpStartsEvent = false;
+	static const bool truncateEvent = true;
+};
+
+struct TdcWordEventBuilder   //events start with the TDC word if the event before is complete
+{
+	static const bool triggerWordStartsEvent = false;
+	static const bool tdcWordStartsEvent = true;
+	static const bool bcidJumpStartsEvent = false;
+	static const bool truncateEvent = false;
+};
+
+struct StopModeEventBuilder   //events start with the trigger word, the FE stop mode read out gives one data header per read time slice, the event window _NbCID is the number of time slices (up to __MAXBCID)
+{
+	static const bool triggerWordStartsEvent = true;
+	static const bool tdcWordStartsEvent = false;
+	static const bool bcidJumpStartsEvent = false;
+	static const bool truncateEvent = true;
+};
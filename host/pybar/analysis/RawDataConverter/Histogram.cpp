@@ -21,11 +21,13 @@ Histogram::~Histogram(void)
 void Histogram::setStandardSettings()
 {
 	info("setStandardSettings()");
-    _metaEventIndex = 0;
-	_parInfo = 0;
-	_lastMetaEventIndex = 0;
 	_metaEventIndex = 0;
-	_occupancy = 0;
+	_nMetaEventIndexLength = 0;
+	_parInfo = 0;
+	_nParInfoLength = 0;
+	_parTableIndex = 0;
+	_parIndexTableSet = false;
+	_nOccupancyBlocks = 0;
 	_relBcid = 0;
 	_tot = 0;
 	_tdc = 0;
@@ -109,62 +111,70 @@ void Histogram::setMaxTot(const unsigned int& rMaxTot)
 void Histogram::addHits(HitInfo*& rHitInfo, const unsigned int& rNhits)
 {
 	debug("addHits()");
-	for(unsigned int i = 0; i<rNhits; ++i){
-		unsigned short tColumnIndex = rHitInfo[i].column-1;
-		if(tColumnIndex > RAW_DATA_MAX_COLUMN-1)
-			throw std::out_of_range("Column index out of range.");
-		unsigned int tRowIndex = rHitInfo[i].row-1;
-		if(tRowIndex > RAW_DATA_MAX_ROW-1)
-			throw std::out_of_range("Row index out of range.");
-		unsigned int tTot = rHitInfo[i].tot;
-		if(tTot > 15)
-			throw std::out_of_range("Tot index out of range.");
-		unsigned int tTdc = rHitInfo[i].TDC;
-		if(tTdc >= __N_TDC_VALUES)
-			throw std::out_of_range("TDC counter " + IntToStr(tTdc) + " index out of range.");
-		unsigned int tRelBcid = rHitInfo[i].relativeBCID;
-		if(tRelBcid >= __MAXBCID)
-			throw std::out_of_range("Relative BCID index out of range.");
-
-		unsigned int tParIndex = getParIndex(rHitInfo[i].eventNumber);
-//		std::cout<<i<<" tParIndex "<<tParIndex<<" rHitInfo[i].eventNumber "<<rHitInfo[i].eventNumber<<"\n";
-
-		if(tParIndex < 0 || tParIndex > getNparameters()-1){
-			error("addHits: tParIndex "+IntToStr(tParIndex)+"\t> "+IntToStr(_NparameterValues));
-			throw std::out_of_range("Parameter index out of range.");
-		}
-		if(_createOccHist)
-			if(tTot <= _maxTot){
-				if(_occupancy!=0)
-					_occupancy[(long)tColumnIndex + (long)tRowIndex * (long)RAW_DATA_MAX_COLUMN + (long)tParIndex * (long)RAW_DATA_MAX_COLUMN * (long)RAW_DATA_MAX_ROW] += 1;
-				else
-					throw std::runtime_error("Occupancy array not intitialized. Set scan parameter first!.");
-			}
-		if(_createRelBCIDhist)
-			if(tTot <= _maxTot)
-				_relBcid[tRelBcid] += 1;
-		if(_createTotHist)
-			if(tTot <= _maxTot) //not sure if cut on ToT histogram is unwanted here
-				_tot[tTot] += 1;
-		if(_createTdcHist)
-			_tdc[tTdc] += 1;
-		if(_createTdcPixelHist){
-			if (_tdcPixel != 0){
-				 if(tTdc >= __N_TDC_PIXEL_VALUES){
-					info("TDC value out of range:" + IntToStr(tTdc) + ">" + IntToStr(__N_TDC_PIXEL_VALUES));
-					tTdc = 0;
-				}
-				_tdcPixel[(long)tColumnIndex + (long)tRowIndex * (long)RAW_DATA_MAX_COLUMN + (long)tTdc * (long)RAW_DATA_MAX_COLUMN * (long)RAW_DATA_MAX_ROW] += 1;
+	for(unsigned int i = 0; i<rNhits; ++i)
+		addHit(rHitInfo[i].eventNumber, rHitInfo[i].relativeBCID, rHitInfo[i].column, rHitInfo[i].row, rHitInfo[i].tot, rHitInfo[i].TDC);
+}
+
+void Histogram::addHitsColumns(int64_t*& rEventNumber, unsigned char*& rRelativeBCID, unsigned char*& rColumn, unsigned short*& rRow, unsigned char*& rTot, const unsigned int& rNhits)
+{
+	debug("addHitsColumns()");
+	if(_createTdcHist || _createTdcPixelHist)
+		throw std::runtime_error("The TDC histograms need the TDC values of the hit array.");
+	for(unsigned int i = 0; i<rNhits; ++i)
+		addHit(rEventNumber[i], rRelativeBCID[i], rColumn[i], rRow[i], rTot[i], 0);
+}
+
+//private
+inline void Histogram::addHit(int64_t& rEventNumber, const unsigned char& rRelativeBCID, const unsigned char& rColumn, const unsigned short& rRow, const unsigned char& rTot, const unsigned short& rTdc)
+{
+	unsigned short tColumnIndex = rColumn-1;
+	if(tColumnIndex > RAW_DATA_MAX_COLUMN-1)
+		throw std::out_of_range("Column index out of range.");
+	unsigned int tRowIndex = rRow-1;
+	if(tRowIndex > RAW_DATA_MAX_ROW-1)
+		throw std::out_of_range("Row index out of range.");
+	unsigned int tTot = rTot;
+	if(tTot > 15)
+		throw std::out_of_range("Tot index out of range.");
+	unsigned int tTdc = rTdc;
+	if(tTdc >= __N_TDC_VALUES)
+		throw std::out_of_range("TDC counter " + IntToStr(tTdc) + " index out of range.");
+	unsigned int tRelBcid = rRelativeBCID;
+	if(tRelBcid >= __MAXBCID)
+		throw std::out_of_range("Relative BCID index out of range.");
+
+	unsigned int tParIndex = getParIndex(rEventNumber);
+
+	if(tParIndex < 0 || tParIndex > getNparameters()-1){
+		error("addHits: tParIndex "+IntToStr(tParIndex)+"\t> "+IntToStr(_NparameterValues));
+		throw std::out_of_range("Parameter index out of range.");
+	}
+	if(_createOccHist)
+		if(tTot <= _maxTot)
+			addOccupancy(tColumnIndex, tRowIndex, tParIndex);
+	if(_createRelBCIDhist)
+		if(tTot <= _maxTot)
+			_relBcid[tRelBcid] += 1;
+	if(_createTotHist)
+		if(tTot <= _maxTot) //not sure if cut on ToT histogram is unwanted here
+			_tot[tTot] += 1;
+	if(_createTdcHist)
+		_tdc[tTdc] += 1;
+	if(_createTdcPixelHist){
+		if (_tdcPixel != 0){
+			 if(tTdc >= __N_TDC_PIXEL_VALUES){
+				info("TDC value out of range:" + IntToStr(tTdc) + ">" + IntToStr(__N_TDC_PIXEL_VALUES));
+				tTdc = 0;
 			}
-			else
-				throw std::runtime_error("Output TDC pixel array array not set.");
-		}
-		if(_createTotPixelHist){
-			if (tTot <= _maxTot)
-				_totPixel[(long)tColumnIndex + (long)tRowIndex * (long)RAW_DATA_MAX_COLUMN + (long)tTot * (long)RAW_DATA_MAX_COLUMN * (long)RAW_DATA_MAX_ROW] += 1;
+			_tdcPixel[(long)tColumnIndex + (long)tRowIndex * (long)RAW_DATA_MAX_COLUMN + (long)tTdc * (long)RAW_DATA_MAX_COLUMN * (long)RAW_DATA_MAX_ROW] += 1;
 		}
+		else
+			throw std::runtime_error("Output TDC pixel array array not set.");
+	}
+	if(_createTotPixelHist){
+		if (tTot <= _maxTot)
+			_totPixel[(long)tColumnIndex + (long)tRowIndex * (long)RAW_DATA_MAX_COLUMN + (long)tTot * (long)RAW_DATA_MAX_COLUMN * (long)RAW_DATA_MAX_ROW] += 1;
 	}
-	//std::cout<<"addHits done"<<std::endl;
 }
 
 void Histogram::addClusterSeedHits(ClusterInfo*& rClusterInfo, const unsigned int& rNcluster)
@@ -185,35 +195,72 @@ void Histogram::addClusterSeedHits(ClusterInfo*& rClusterInfo, const unsigned in
 			error("addHits: tParIndex "+IntToStr(tParIndex)+"\t> "+IntToStr(_NparameterValues));
 			throw std::out_of_range("Parameter index out of range.");
 		}
-		if(_createOccHist){
-			if(_occupancy!=0)
-				_occupancy[(long)tColumnIndex + (long)tRowIndex * (long)RAW_DATA_MAX_COLUMN + (long)tParIndex * (long)RAW_DATA_MAX_COLUMN * (long)RAW_DATA_MAX_ROW] += 1;
-			else
-				throw std::runtime_error("Occupancy array not intitialized. Set scan parameter first!.");
-		}
+		if(_createOccHist)
+			addOccupancy(tColumnIndex, tRowIndex, tParIndex);
+	}
+}
+
+inline void Histogram::addOccupancy(const unsigned int& rColumnIndex, const unsigned int& rRowIndex, const unsigned int& rParIndex)
+{
+	if(_occupancyBlocks.size() == 0)
+		throw std::runtime_error("Occupancy array not intitialized. Set scan parameter first!.");
+	long tIndex = (long)rColumnIndex + (long)rRowIndex * (long)RAW_DATA_MAX_COLUMN + (long)rParIndex * (long)RAW_DATA_MAX_COLUMN * (long)RAW_DATA_MAX_ROW;
+	unsigned int*& rBlock = _occupancyBlocks[tIndex / __OCCUPANCYBLOCKSIZE];
+	if(rBlock == 0){  //first hit in this block
+		rBlock = new unsigned int[__OCCUPANCYBLOCKSIZE]();
+		_nOccupancyBlocks++;
 	}
+	rBlock[tIndex % __OCCUPANCYBLOCKSIZE] += 1;
+}
+
+inline unsigned int Histogram::getOccupancyBin(const long& rIndex)
+{
+	unsigned int* tBlock = _occupancyBlocks[rIndex / __OCCUPANCYBLOCKSIZE];
+	if(tBlock == 0)
+		return 0;
+	return tBlock[rIndex % __OCCUPANCYBLOCKSIZE];
 }
 
 unsigned int Histogram::getParIndex(int64_t& rEventNumber)
 {
   if(_parInfo == 0)
     return 0;
-  for(uint64_t i=_lastMetaEventIndex; i<_nMetaEventIndexLength-1; ++i){
-    if(_metaEventIndex[i+1] > rEventNumber || _metaEventIndex[i+1] < _metaEventIndex[i]){ // second case: meta event data not set yet (std value = 0), event number has to increase
-      _lastMetaEventIndex = i;
-      if (i < _nParInfoLength)
-      	return _parInfo[i];
-      else{
-    	  error("Scan parameter index " + LongIntToStr(i) + " out of range");
-    	  throw std::out_of_range("Scan parameter index out of range.");
-      }
+  if(!_parIndexTableSet)
+    buildParIndexTable();
+  if(_parEventNumbers.size() == 0){
+    error("getScanParameter: Correlation issues at event "+LongIntToStr(rEventNumber)+", no meta event index set");
+    throw std::logic_error("Event parameter correlation issues.");
+  }
+  //the hits are mostly sorted by event number, thus the table is only searched if the event is not in the scan parameter step of the last event
+  if((_parTableIndex > 0 && rEventNumber < _parEventNumbers[_parTableIndex]) || (_parTableIndex + 1 < _parEventNumbers.size() && rEventNumber >= _parEventNumbers[_parTableIndex + 1])){
+    std::vector<int64_t>::iterator tIt = std::upper_bound(_parEventNumbers.begin(), _parEventNumbers.end(), rEventNumber);
+    _parTableIndex = tIt == _parEventNumbers.begin() ? 0 : (unsigned int) (tIt - _parEventNumbers.begin()) - 1;
+  }
+  if(_parIndices[_parTableIndex] == std::numeric_limits<unsigned int>::max()){
+    error("Scan parameter index at event " + LongIntToStr(rEventNumber) + " out of range");
+    throw std::out_of_range("Scan parameter index out of range.");
+  }
+  return _parIndices[_parTableIndex];
+}
+
+void Histogram::buildParIndexTable()
+{
+  debug("buildParIndexTable()");
+  _parEventNumbers.clear();
+  _parIndices.clear();
+  _parTableIndex = 0;
+  _parIndexTableSet = true;
+  if(_parInfo == 0 || _metaEventIndex == 0)
+    return;
+  for(unsigned int i = 0; i < _nMetaEventIndexLength; ++i){
+    if(i > 0 && _metaEventIndex[i] < _metaEventIndex[i-1])  //meta event data not set yet (std value = 0), event number has to increase
+      break;
+    unsigned int tParIndex = i < _nParInfoLength ? _parInfo[i] : std::numeric_limits<unsigned int>::max();  //read outs without parameter info are out of range
+    if(_parIndices.size() == 0 || _parIndices.back() != tParIndex){  //only the read outs with a new parameter index start a new table entry
+      _parEventNumbers.push_back((int64_t) _metaEventIndex[i]);
+      _parIndices.push_back(tParIndex);
     }
   }
-  if(_metaEventIndex[_nMetaEventIndexLength-1] <= rEventNumber) //last read outs
-    return _parInfo[_nMetaEventIndexLength-1];
-  error("getScanParameter: Correlation issues at event "+LongIntToStr(rEventNumber)+"\n_metaEventIndex[_nMetaEventIndexLength-1] "+LongIntToStr(_metaEventIndex[_nMetaEventIndexLength-1])+"\n_lastMetaEventIndex "+LongIntToStr(_lastMetaEventIndex));
-  throw std::logic_error("Event parameter correlation issues.");
-  return 0;
 }
 
 void Histogram::addScanParameter(unsigned int*& rParInfo, const unsigned int& rNparInfoLength)
@@ -221,6 +268,7 @@ void Histogram::addScanParameter(unsigned int*& rParInfo, const unsigned int& rN
 	debug("addScanParameter");
 	_nParInfoLength = rNparInfoLength;
 	_parInfo = rParInfo;
+	_parIndexTableSet = false;
 
 	std::vector<unsigned int> tParameterValues;
 
@@ -228,12 +276,6 @@ void Histogram::addScanParameter(unsigned int*& rParInfo, const unsigned int& rN
 	  tParameterValues.push_back(_parInfo[i]);
 
 	std::sort(tParameterValues.begin(), tParameterValues.end());  //sort from lowest to highest value
-	std::set<unsigned int> tSet(tParameterValues.begin(), tParameterValues.end());
-	tParameterValues.assign(tSet.begin(), tSet.end() );
-
-	for(unsigned int i = 0; i < tParameterValues.size(); ++i)
-		_parameterValues[tParameterValues[i]] = i;
-
 	_NparameterValues = std::unique(tParameterValues.begin(), tParameterValues.end()) - tParameterValues.begin();
 
 	if (_createOccHist){
@@ -251,6 +293,7 @@ void Histogram::addMetaEventIndex(uint64_t*& rMetaEventIndex, const unsigned int
   debug("addMetaEventIndex()");
   _nMetaEventIndexLength = rNmetaEventIndexLength;
   _metaEventIndex = rMetaEventIndex;
+  _parIndexTableSet = false;
   if (Basis::debugSet())
 	  for(unsigned int i=0; i<_nMetaEventIndexLength; ++i)
 		 std::cout<<"index "<<i<<"\t event number "<<_metaEventIndex[i]<<"\n";
@@ -260,8 +303,8 @@ void Histogram::allocateOccupancyArray()
 {
   debug("allocateOccupancyArray() with "+IntToStr(getNparameters())+" parameters");
   deleteOccupancyArray();
-  try{
-    _occupancy = new unsigned int[(long)(RAW_DATA_MAX_COLUMN-1) + ((long)RAW_DATA_MAX_ROW-1)*(long)RAW_DATA_MAX_COLUMN + ((long)getNparameters()-1) * (long)RAW_DATA_MAX_COLUMN * (long)RAW_DATA_MAX_ROW +1];
+  try{  //only the block table is allocated, the blocks are allocated with the first hit
+    _occupancyBlocks.assign((long)getNparameters() * (long)RAW_DATA_MAX_COLUMN * (long)RAW_DATA_MAX_ROW / __OCCUPANCYBLOCKSIZE, (unsigned int*) 0);
   }
   catch(std::bad_alloc& exception){
     error(std::string("allocateOccupancyArray: ")+std::string(exception.what()));
@@ -271,20 +314,19 @@ void Histogram::allocateOccupancyArray()
 void Histogram::deleteOccupancyArray()
 {
   debug("deleteOccupancyArray()");
-  if (_occupancy != 0)
-    delete _occupancy;
-  _occupancy = 0;
+  resetOccupancyArray();
+  _occupancyBlocks.clear();
 }
 
 void Histogram::resetOccupancyArray()
 {
   info("resetOccupancyArray()");
-  if (_occupancy != 0){
-	  for (unsigned int i = 0; i < RAW_DATA_MAX_COLUMN; i++)
-		for (unsigned int j = 0; j < RAW_DATA_MAX_ROW; j++)
-		  for(unsigned int k = 0; k < getNparameters();k++)
-			  _occupancy[(long)i + (long)j * (long)RAW_DATA_MAX_COLUMN + (long)k * (long)RAW_DATA_MAX_COLUMN * (long)RAW_DATA_MAX_ROW] = 0;
+  for (unsigned int i = 0; i < _occupancyBlocks.size(); ++i){
+	  if (_occupancyBlocks[i] != 0)
+		  delete[] _occupancyBlocks[i];
+	  _occupancyBlocks[i] = 0;
   }
+  _nOccupancyBlocks = 0;
 }
 
 void Histogram::resetTdcPixelArray()
@@ -472,17 +514,44 @@ unsigned int Histogram::getNparameters()
  return _NparameterValues;
 }
 
-void Histogram::getOccupancy(unsigned int& rNparameterValues, unsigned int*& rOccupancy, bool copy)
+bool Histogram::getOccupancy(unsigned int*& rOccupancy)
 {
   debug("getOccupancy(...)");
-  if(copy){
-	  unsigned int tArrayLength = (long)(RAW_DATA_MAX_COLUMN-1) + (long)(RAW_DATA_MAX_ROW-1) * (long)RAW_DATA_MAX_COLUMN + (long)(_NparameterValues-1) * (long)RAW_DATA_MAX_COLUMN * (long)RAW_DATA_MAX_ROW+1;
-	  std::copy(_occupancy, _occupancy+tArrayLength, rOccupancy);
+  if(_occupancyBlocks.size() == 0)  //the dense histogram is not kept, the caller owns the array
+	  return false;
+  for(unsigned int i = 0; i < _occupancyBlocks.size(); ++i){
+	  if(_occupancyBlocks[i] != 0)
+		  std::copy(_occupancyBlocks[i], _occupancyBlocks[i] + __OCCUPANCYBLOCKSIZE, rOccupancy + (long)i * __OCCUPANCYBLOCKSIZE);
+	  else
+		  std::fill(rOccupancy + (long)i * __OCCUPANCYBLOCKSIZE, rOccupancy + (long)(i + 1) * __OCCUPANCYBLOCKSIZE, 0);
   }
-  else
-	  rOccupancy = _occupancy;
+  return true;
+}
+
+bool Histogram::getOccupancyParameter(const unsigned int& rParameterIndex, unsigned int*& rOccupancy)
+{
+  debug("getOccupancyParameter(...)");
+  if(rParameterIndex >= _NparameterValues || _occupancyBlocks.size() == 0)
+	  throw std::out_of_range("Parameter index out of range.");
+  const unsigned int tNblocks = RAW_DATA_MAX_COLUMN * RAW_DATA_MAX_ROW / __OCCUPANCYBLOCKSIZE;  //blocks per parameter
+  bool tHasHits = false;
+  for(unsigned int i = 0; i < tNblocks; ++i){
+	  unsigned int* tBlock = _occupancyBlocks[(long)rParameterIndex * tNblocks + i];
+	  if(tBlock != 0){
+		  std::copy(tBlock, tBlock + __OCCUPANCYBLOCKSIZE, rOccupancy + (long)i * __OCCUPANCYBLOCKSIZE);
+		  tHasHits = true;
+	  }
+	  else
+		  std::fill(rOccupancy + (long)i * __OCCUPANCYBLOCKSIZE, rOccupancy + (long)(i + 1) * __OCCUPANCYBLOCKSIZE, 0);
+  }
+  return tHasHits;
+}
 
-  rNparameterValues = _NparameterValues;
+double Histogram::getOccupancyFillRatio()
+{
+  if(_occupancyBlocks.size() == 0)
+	  return 0;
+  return (double) _nOccupancyBlocks / (double) _occupancyBlocks.size();
 }
 
 void Histogram::getTotHist(unsigned int*& rTotHist, bool copy)
@@ -535,7 +604,7 @@ void Histogram::calculateThresholdScanArrays(double rMuArray[], double rSigmaArr
   debug("calculateThresholdScanArrays(...)");
   //quick algorithm from M. Mertens, phd thesis, Juelich 2010
 
-  if(_occupancy==0)
+  if(_occupancyBlocks.size() == 0)
 	  throw std::runtime_error("Occupancy array not intitialized. Set scan parameter first!.");
 
   if (_NparameterValues<2)  //a minimum number of different scans is needed
@@ -552,7 +621,7 @@ void Histogram::calculateThresholdScanArrays(double rMuArray[], double rSigmaArr
       unsigned int M = 0;
         
       for(unsigned int k=0; k<getNparameters(); ++k){
-        M += _occupancy[(long)i + (long)j * (long)RAW_DATA_MAX_COLUMN  + (long)k * (long)RAW_DATA_MAX_COLUMN * (long)RAW_DATA_MAX_ROW]; 
+        M += getOccupancyBin((long)i + (long)j * (long)RAW_DATA_MAX_COLUMN  + (long)k * (long)RAW_DATA_MAX_COLUMN * (long)RAW_DATA_MAX_ROW);
       }
       double threshold = (double) q_max - d*(double)M/(double)A;
       rMuArray[i+j*RAW_DATA_MAX_COLUMN] = threshold;
@@ -561,9 +630,9 @@ void Histogram::calculateThresholdScanArrays(double rMuArray[], double rSigmaArr
       unsigned int mu2 = 0;
       for(unsigned int k=0; k<getNparameters(); ++k){
         if((double) k*d < threshold)
-          mu1 += _occupancy[(long)i + (long)j * (long)RAW_DATA_MAX_COLUMN  + (long)k * (long)RAW_DATA_MAX_COLUMN * (long)RAW_DATA_MAX_ROW];
+          mu1 += getOccupancyBin((long)i + (long)j * (long)RAW_DATA_MAX_COLUMN  + (long)k * (long)RAW_DATA_MAX_COLUMN * (long)RAW_DATA_MAX_ROW);
         else
-          mu2 += (A-_occupancy[(long)i + (long)j * (long)RAW_DATA_MAX_COLUMN  + (long)k * (long)RAW_DATA_MAX_COLUMN * (long)RAW_DATA_MAX_ROW]);
+          mu2 += (A-getOccupancyBin((long)i + (long)j * (long)RAW_DATA_MAX_COLUMN  + (long)k * (long)RAW_DATA_MAX_COLUMN * (long)RAW_DATA_MAX_ROW));
       }
       double noise = (double)d*(double)(mu1+mu2)/(double)A*sqrt(3.141592653589893238462643383/2);
       rSigmaArray[i+j*RAW_DATA_MAX_COLUMN] = noise;
@@ -580,6 +649,154 @@ void Histogram::setNoScanParameter()
   resetOccupancyArray();
 }
 
+void Histogram::add(const Histogram& rHistogram)
+{
+	debug("add()");
+	if(&rHistogram == this)
+		throw std::invalid_argument("A histogram cannot be added to itself.");
+	if(_createOccHist != rHistogram._createOccHist || _createRelBCIDhist != rHistogram._createRelBCIDhist || _createTotHist != rHistogram._createTotHist || _createTdcHist != rHistogram._createTdcHist || _createTdcPixelHist != rHistogram._createTdcPixelHist || _createTotPixelHist != rHistogram._createTotPixelHist)
+		throw std::invalid_argument("The histograms to add have different settings.");
+	if(_occupancyBlocks.size() != rHistogram._occupancyBlocks.size())
+		throw std::invalid_argument("The histograms to add have a different number of parameters.");
+
+	for(unsigned int i = 0; i < _occupancyBlocks.size(); ++i){  //only the blocks with hits are added
+		if(rHistogram._occupancyBlocks[i] == 0)
+			continue;
+		if(_occupancyBlocks[i] == 0){
+			_occupancyBlocks[i] = new unsigned int[__OCCUPANCYBLOCKSIZE]();
+			_nOccupancyBlocks++;
+		}
+		addArray(_occupancyBlocks[i], rHistogram._occupancyBlocks[i], __OCCUPANCYBLOCKSIZE);
+	}
+	if(_createRelBCIDhist)
+		addArray(_relBcid, rHistogram._relBcid, __MAXBCID);
+	if(_createTotHist)
+		addArray(_tot, rHistogram._tot, 16);
+	if(_createTdcHist)
+		addArray(_tdc, rHistogram._tdc, __N_TDC_VALUES);
+	if(_createTotPixelHist)
+		addArray(_totPixel, rHistogram._totPixel, (long)RAW_DATA_MAX_COLUMN * (long)RAW_DATA_MAX_ROW * 16);
+	if(_createTdcPixelHist)
+		addArray(_tdcPixel, rHistogram._tdcPixel, (long)RAW_DATA_MAX_COLUMN * (long)RAW_DATA_MAX_ROW * (long)__N_TDC_PIXEL_VALUES);
+}
+
+void Histogram::getState(std::string& rState)
+{
+	debug("getState()");
+	rState.clear();
+	unsigned int tVersion = __HISTOGRAMSTATEVERSION;
+	unsigned int tBlockSize = __OCCUPANCYBLOCKSIZE;
+	writeState(rState, &tVersion);
+	writeState(rState, &tBlockSize);
+
+	//settings
+	writeState(rState, &_createOccHist);
+	writeState(rState, &_createRelBCIDhist);
+	writeState(rState, &_createTotHist);
+	writeState(rState, &_createTdcHist);
+	writeState(rState, &_createTdcPixelHist);
+	writeState(rState, &_createTotPixelHist);
+	writeState(rState, &_maxTot);
+	writeState(rState, &_NparameterValues);
+
+	//occupancy histogram, only the blocks with hits are stored
+	unsigned int tNblocks = _occupancyBlocks.size();
+	writeState(rState, &tNblocks);
+	writeState(rState, &_nOccupancyBlocks);
+	for(unsigned int i = 0; i < tNblocks; ++i){
+		if(_occupancyBlocks[i] == 0)
+			continue;
+		writeState(rState, &i);
+		writeState(rState, _occupancyBlocks[i], __OCCUPANCYBLOCKSIZE);
+	}
+
+	//other histograms
+	if(_createRelBCIDhist)
+		writeState(rState, _relBcid, __MAXBCID);
+	if(_createTotHist)
+		writeState(rState, _tot, 16);
+	if(_createTdcHist)
+		writeState(rState, _tdc, __N_TDC_VALUES);
+	if(_createTotPixelHist)
+		writeState(rState, _totPixel, RAW_DATA_MAX_COLUMN * RAW_DATA_MAX_ROW * 16);
+	if(_createTdcPixelHist)
+		writeState(rState, _tdcPixel, RAW_DATA_MAX_COLUMN * RAW_DATA_MAX_ROW * __N_TDC_PIXEL_VALUES);
+}
+
+void Histogram::setState(const std::string& rState)
+{
+	debug("setState()");
+	size_t tPosition = 0;
+	unsigned int tVersion = 0;
+	unsigned int tBlockSize = 0;
+	readState(rState, tPosition, &tVersion);
+	readState(rState, tPosition, &tBlockSize);
+	if (tVersion != __HISTOGRAMSTATEVERSION || tBlockSize != __OCCUPANCYBLOCKSIZE)
+		throw std::invalid_argument("Histogram state data has an unknown format.");
+
+	bool tCreateOccHist, tCreateRelBCIDhist, tCreateTotHist, tCreateTdcHist, tCreateTdcPixelHist, tCreateTotPixelHist;
+	readState(rState, tPosition, &tCreateOccHist);
+	readState(rState, tPosition, &tCreateRelBCIDhist);
+	readState(rState, tPosition, &tCreateTotHist);
+	readState(rState, tPosition, &tCreateTdcHist);
+	readState(rState, tPosition, &tCreateTdcPixelHist);
+	readState(rState, tPosition, &tCreateTotPixelHist);
+	unsigned int tMaxTot = 0;
+	unsigned int tNparameterValues = 0;
+	unsigned int tNblocks = 0;
+	unsigned int tNoccupancyBlocks = 0;
+	readState(rState, tPosition, &tMaxTot);
+	readState(rState, tPosition, &tNparameterValues);
+	readState(rState, tPosition, &tNblocks);
+	readState(rState, tPosition, &tNoccupancyBlocks);
+	if (tNparameterValues == 0 || (tNblocks != 0 && (long)tNblocks != (long)tNparameterValues * (long)RAW_DATA_MAX_COLUMN * (long)RAW_DATA_MAX_ROW / __OCCUPANCYBLOCKSIZE) || tNoccupancyBlocks > tNblocks)
+		throw std::invalid_argument("Histogram state data has an unknown format.");
+
+	_maxTot = tMaxTot;
+	_NparameterValues = tNparameterValues;
+	createOccupancyHist(tCreateOccHist);
+	createRelBCIDHist(tCreateRelBCIDhist);
+	createTotHist(tCreateTotHist);
+	createTdcHist(tCreateTdcHist);
+	createTdcPixelHist(tCreateTdcPixelHist);
+	createTotPixelHist(tCreateTotPixelHist);
+
+	if (tNblocks != 0)  //the occupancy block table exists if the scan parameters were set
+		allocateOccupancyArray();
+	else
+		deleteOccupancyArray();
+	for(unsigned int i = 0; i < tNoccupancyBlocks; ++i){
+		unsigned int tBlockIndex = 0;
+		readState(rState, tPosition, &tBlockIndex);
+		if (tBlockIndex >= tNblocks || _occupancyBlocks[tBlockIndex] != 0)
+			throw std::invalid_argument("Histogram state data has an unknown format.");
+		_occupancyBlocks[tBlockIndex] = new unsigned int[__OCCUPANCYBLOCKSIZE];
+		_nOccupancyBlocks++;
+		readState(rState, tPosition, _occupancyBlocks[tBlockIndex], __OCCUPANCYBLOCKSIZE);
+	}
+
+	if(_createRelBCIDhist)
+		readState(rState, tPosition, _relBcid, __MAXBCID);
+	if(_createTotHist)
+		readState(rState, tPosition, _tot, 16);
+	if(_createTdcHist)
+		readState(rState, tPosition, _tdc, __N_TDC_VALUES);
+	if(_createTotPixelHist)
+		readState(rState, tPosition, _totPixel, RAW_DATA_MAX_COLUMN * RAW_DATA_MAX_ROW * 16);
+	if(_createTdcPixelHist)
+		readState(rState, tPosition, _tdcPixel, RAW_DATA_MAX_COLUMN * RAW_DATA_MAX_ROW * __N_TDC_PIXEL_VALUES);
+	if (tPosition != rState.size())
+		throw std::invalid_argument("Histogram state data has an unknown format.");
+	_parIndexTableSet = false;
+}
+
+//private
+template<class T> void Histogram::addArray(T* pArray, const T* pOtherArray, const long& rNvalues)
+{
+	for(long i = 0; i < rNvalues; ++i)
+		pArray[i] += pOtherArray[i];
+}
+
 void Histogram::reset()
 {
 	info("reset()");
@@ -590,5 +807,6 @@ void Histogram::reset()
 	resetTdcPixelArray();
 	resetRelBcidArray();
 	_parInfo = 0;
+	_parIndexTableSet = false;
 }
 
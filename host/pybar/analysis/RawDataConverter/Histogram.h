@@ -4,7 +4,7 @@
 #include <cmath>
 #include <algorithm>
 #include <iterator>
-#include <set>
+#include <limits>
 
 #include "defines.h"
 #include "Basis.h"
@@ -16,7 +16,9 @@ public:
   ~Histogram(void);
 
   //get histograms
-  void getOccupancy(unsigned int& rNparameterValues, unsigned int*& rOccupancy, bool copy = false);  //returns the occupancy histogram for all hits
+  bool getOccupancy(unsigned int*& rOccupancy);                                                      //copies the occupancy histogram of all parameters (RAW_DATA_MAX_COLUMN * RAW_DATA_MAX_ROW * getNparameters() values) from the occupancy blocks, returns false if the occupancy histogram is not allocated
+  bool getOccupancyParameter(const unsigned int& rParameterIndex, unsigned int*& rOccupancy);        //copies the occupancy histogram of one parameter (RAW_DATA_MAX_COLUMN * RAW_DATA_MAX_ROW values), returns false if there are no hits for this parameter
+  double getOccupancyFillRatio();                                        //returns the fraction of allocated occupancy histogram blocks
   void getTotHist(unsigned int*& rTotHist, bool copy = false);           //returns the tot histogram for all hits
   void getTdcHist(unsigned int*& rTdcHist, bool copy = false);           //returns the tdc histogram for all hits
   void getRelBcidHist(unsigned int*& rRelBcidHist, bool copy = false);   //returns the relative BCID histogram for all hits
@@ -33,6 +35,7 @@ public:
   void setMaxTot(const unsigned int& rMaxTot);
 
   void addHits(HitInfo*& rHitInfo, const unsigned int& rNhits);
+  void addHitsColumns(int64_t*& rEventNumber, unsigned char*& rRelativeBCID, unsigned char*& rColumn, unsigned short*& rRow, unsigned char*& rTot, const unsigned int& rNhits);  //adds the hits given as separate columns (see Interpret::getHitColumns()), the TDC histograms cannot be filled
   void addClusterSeedHits(ClusterInfo*& rClusterInfo, const unsigned int& rNcluster);
   void addScanParameter(unsigned int*& rParInfo, const unsigned int& rNparInfoLength);
   void setNoScanParameter();
@@ -51,6 +54,11 @@ public:
 
   void reset();  // resets the histograms and keeps the settings
 
+  //merging of histograms filled in parallel
+  void add(const Histogram& rHistogram);     //adds the histograms of rHistogram, the same histograms have to be created and the number of parameters has to be the same
+  void getState(std::string& rState);        //returns the settings and the histograms as binary data, the scan parameter and meta event index arrays are not part of the state
+  void setState(const std::string& rState);  //restores the settings and the histograms from getState()
+
   void test();
 
 private:
@@ -67,8 +75,10 @@ private:
   void allocateTdcPixelArray();
   void deleteTotPixelArray();
   void deleteTdcPixelArray();
+  template<class T> void addArray(T* pArray, const T* pOtherArray, const long& rNvalues);  //adds the values of pOtherArray to pArray
   
-  unsigned int* _occupancy;       //2d hit histogram for each parameter (in total 3d, linearly sorted via col, row, parameter)
+  std::vector<unsigned int*> _occupancyBlocks;  //2d hit histogram for each parameter (in total 3d, linearly sorted via col, row, parameter) in blocks of __OCCUPANCYBLOCKSIZE pixels, blocks without hits are not allocated (0)
+  unsigned int _nOccupancyBlocks; //number of allocated occupancy histogram blocks
   unsigned int* _tot;             //tot histogram
   unsigned int* _tdc;             //tdc histogram
   unsigned short* _tdcPixel;      //3d pixel tdc histogram  (in total 3d, linearly sorted via col, row, tdc value)
@@ -76,15 +86,21 @@ private:
   unsigned int* _relBcid;         //realative BCID histogram
 
   unsigned int getParIndex(int64_t& rEventNumber);      //returns the parameter index for the given event number
+  inline void addOccupancy(const unsigned int& rColumnIndex, const unsigned int& rRowIndex, const unsigned int& rParIndex);  //increases the occupancy bin, allocates the block of the bin if needed
+  inline unsigned int getOccupancyBin(const long& rIndex);  //returns the occupancy bin with the given dense histogram index
+  void buildParIndexTable();                             //builds the event number to parameter index table from the meta event index and the parameter info
+  inline void addHit(int64_t& rEventNumber, const unsigned char& rRelativeBCID, const unsigned char& rColumn, const unsigned short& rRow, const unsigned char& rTot, const unsigned short& rTdc);  //fills the histograms with one hit
 
   unsigned int _nMetaEventIndexLength;//length of the meta data event index array
   uint64_t* _metaEventIndex;      	  //event index of meta data array
   unsigned int _nParInfoLength;       //length of the parInfo array
-  uint64_t _lastMetaEventIndex;   	  //for loop speed up
 
-  unsigned int _NparameterValues;     //needed for _occupancy histogram allocation
+  std::vector<int64_t> _parEventNumbers;  //first event number of each scan parameter step, sorted (event number to parameter index table)
+  std::vector<unsigned int> _parIndices;  //parameter index of each scan parameter step
+  unsigned int _parTableIndex;            //table index of the last looked up event, the hits are mostly sorted by event number
+  bool _parIndexTableSet;                 //false if the table has to be rebuilt because the meta event index or the parameter info changed
 
-  std::map<unsigned int, unsigned int> _parameterValues; //different parameter values used in ParInfo, key = parameter value, value = index
+  unsigned int _NparameterValues;     //needed for the occupancy block table allocation
 
   //config variables
   bool _createOccHist;
@@ -22,14 +22,19 @@ Interpret::~Interpret(void)
 	deleteErrorCounterArray();
 	deleteTdcCounterArray();
 	deleteServiceRecordCounterArray();
+	for (unsigned int i = 0; i < _pieceInterpreters.size(); ++i)
+		delete _pieceInterpreters[i];
 }
 
 void Interpret::setStandardSettings()
 {
 	info("setStandardSettings()");
-	_hitInfoSize = 6e6;
+	_hitInfoSize = 1e6;
 	_hitInfo = 0;
+	_hitInfoOwned = true;
+	_growHitsArray = true;
 	_hitIndex = 0;
+	_createHitColumns = false;
 	_NbCID = 16;
 	_maxTot = 14;
 	_fEI4B = false;
@@ -42,11 +47,12 @@ void Interpret::setStandardSettings()
 	_startWordIndex = 0;
 	_createMetaDataWordIndex = false;
 	_isMetaTableV2 = false;
-	_useTriggerNumber = false;
+	_eventBuilder = __EVENT_BUILDER_BCID_WINDOW;
 	_useTriggerTimeStamp = false;
 	_useTdcTriggerTimeStamp = false;
-	_useTdcWord=false;
 	_dataWordIndex = 0;
+	_nThreads = 1;
+	_pieceInterpreted = false;
 }
 
 bool Interpret::interpretRawData(unsigned int* pDataWords, const unsigned int& pNdataWords)
@@ -57,14 +63,24 @@ bool Interpret::interpretRawData(unsigned int* pDataWords, const unsigned int& p
 		debug(tDebug.str());
 	}
 	_hitIndex = 0;
+	clearHitColumns();
 	_actualMetaWordIndex = 0;
+	if (_nThreads > 1 && _eventBuilder != __EVENT_BUILDER_TDC_WORD && !_debugEvents && pNdataWords >= 2 * __MINPARALLELWORDS)  //the TDC word event building and the event debug output need the serial interpretation
+		interpretRawDataParallel(pDataWords, pNdataWords);
+	else
+		interpretWords(pDataWords, pNdataWords);
+	return true;
+}
 
+template<class TEventBuilder> void Interpret::buildEvents(unsigned int* pDataWords, const unsigned int& pNdataWords)
+{
 	int tActualCol1 = 0;				//column position of the first hit in the actual data record
 	int tActualRow1 = 0;				//row position of the first hit in the actual data record
 	int tActualTot1 = -1;				//tot value of the first hit in the actual data record
 	int tActualCol2 = 0;				//column position of the second hit in the actual data record
 	int tActualRow2 = 0;				//row position of the second hit in the actual data record
 	int tActualTot2 = -1;				//tot value of the second hit in the actual data record
+	const unsigned int tEventWindow = _NbCID;	//maximum number of data headers per event
 
 	for (unsigned int iWord = 0; iWord < pNdataWords; ++iWord){	//loop over the SRAM words
 		if(_debugEvents){
@@ -85,8 +101,8 @@ bool Interpret::interpretRawData(unsigned int* pDataWords, const unsigned int& p
 		tActualTot2 = -1;												          //TOT2 value stays negative if it can not be set properly in getHitsfromDataRecord()
 		if (getTimefromDataHeader(tActualWord, tActualLVL1ID, tActualBCID)){	//data word is data header if true is returned
 			_nDataHeaders++;
-			if (tNdataHeader > _NbCID-1){	                //maximum event window is reached (tNdataHeader > BCIDs, mostly tNdataHeader > 15), so create new event
-				if (_useTriggerNumber){
+			if (tNdataHeader > tEventWindow-1){	                //maximum event window is reached (tNdataHeader > BCIDs, mostly tNdataHeader > 15), so create new event
+				if (TEventBuilder::truncateEvent){
 					addEventErrorCode(__TRUNC_EVENT); //too many data header in the event, abort this event, add truncated flac
 					if(Basis::warningSet())
 						warning(std::string("addHit: Hit buffer overflow prevented by splitting events at event "+LongIntToStr(_nEvents)), __LINE__);
@@ -111,7 +127,7 @@ bool Interpret::interpretRawData(unsigned int* pDataWords, const unsigned int& p
 				if(tStartBCID+tDbCID != tActualBCID){  //check if BCID is increasing by 1s in the event window, if not close actual event and create new event with actual data header
 					if(tActualLVL1ID == tStartLVL1ID) //happens sometimes, non inc. BCID, FE feature, only abort the LVL1ID is not constant (if no external trigger is used or)
 						addEventErrorCode(__BCID_JUMP);
-					else if(_useTriggerNumber || _useTdcWord)  //rely here on the trigger number or TDC word and do not start a new event
+					else if(!TEventBuilder::bcidJumpStartsEvent)  //rely here on the trigger number or TDC word and do not start a new event
 						addEventErrorCode(__BCID_JUMP);
 					else{
 						tBCIDerror = true;					       //BCID number wrong, abort event and take actual data header for the first hit of the new event
@@ -129,8 +145,8 @@ bool Interpret::interpretRawData(unsigned int* pDataWords, const unsigned int& p
 		}
 		else if (isTriggerWord(tActualWord)){ //data word is trigger word, is first word of the event data if external trigger is present
 			_nTriggers++;						//increase the total trigger number counter
-			if (!_useTriggerNumber){
-				if (tNdataHeader > _NbCID-1)	//special case: first word is trigger word
+			if (!TEventBuilder::triggerWordStartsEvent){
+				if (tNdataHeader > tEventWindow-1)	//special case: first word is trigger word
 					addEvent();
 			}
 			else if (_firstTriggerNrSet){		// if a trigger word but not the first occurs create an event
@@ -184,7 +200,7 @@ bool Interpret::interpretRawData(unsigned int* pDataWords, const unsigned int& p
 			addTdcValue(TDC_COUNT_MACRO(tActualWord));
 			_nTDCWords++;
 			//create new event if the option to align at TDC words is active AND the previous event has seen already all needed data headers OR the previous event was not aligned at a TDC word
-			if (_useTdcWord && _firstTdcSet && ((tNdataHeader > _NbCID-1) || (tErrorCode & __TDC_WORD) != __TDC_WORD)){
+			if (TEventBuilder::tdcWordStartsEvent && _firstTdcSet && ((tNdataHeader > tEventWindow-1) || (tErrorCode & __TDC_WORD) != __TDC_WORD)){
 				addEvent();
 			}
 
@@ -262,7 +278,7 @@ bool Interpret::interpretRawData(unsigned int* pDataWords, const unsigned int& p
 			}
 		}
 
-		if (tBCIDerror){	//tBCIDerror is raised if BCID is not increasing by 1, most likely due to incomplete data transmission, so start new event, actual word is data header here
+		if (TEventBuilder::bcidJumpStartsEvent && tBCIDerror){	//tBCIDerror is raised if BCID is not increasing by 1, most likely due to incomplete data transmission, so start new event, actual word is data header here
 			if(Basis::warningSet())
 				warning("interpretRawData "+IntToStr(_nDataWords)+" BCID ERROR at event "+LongIntToStr(_nEvents));
 			addEvent();
@@ -273,7 +289,28 @@ bool Interpret::interpretRawData(unsigned int* pDataWords, const unsigned int& p
 			tStartLVL1ID = tActualLVL1ID;
 		}
 	}
-	return true;
+}
+
+void Interpret::interpretWords(unsigned int* pDataWords, const unsigned int& pNdataWords)
+{
+	switch (_eventBuilder){  //the event builder is selected once per call and not per raw data word
+		case __EVENT_BUILDER_TRIGGER_NUMBER:
+			buildEvents<TriggerNumberEventBuilder>(pDataWords, pNdataWords);
+			break;
+		case __EVENT_BUILDER_TDC_WORD:
+			buildEvents<TdcWordEventBuilder>(pDataWords, pNdataWords);
+			break;
+		case __EVENT_BUILDER_STOP_MODE:
+			buildEvents<StopModeEventBuilder>(pDataWords, pNdataWords);
+			break;
+		default:
+			buildEvents<BcidWindowEventBuilder>(pDataWords, pNdataWords);
+	}
+}
+
+bool Interpret::triggerWordStartsEvent()
+{
+	return _eventBuilder == __EVENT_BUILDER_TRIGGER_NUMBER || _eventBuilder == __EVENT_BUILDER_STOP_MODE;
 }
 
 bool Interpret::setMetaData(MetaInfo* &rMetaInfo, const unsigned int& tLength)
@@ -336,6 +373,27 @@ void Interpret::getHits(HitInfo*& rHitInfo, unsigned int& rSize, bool copy)
     rSize = _hitIndex;
 }
 
+void Interpret::getHitColumns(int64_t*& rEventNumber, unsigned char*& rRelativeBCID, unsigned char*& rColumn, unsigned short*& rRow, unsigned char*& rTot, unsigned short*& rEventStatus, unsigned int& rSize)
+{
+	debug("getHitColumns(...)");
+	rSize = (unsigned int) _hitEventNumbers.size();
+	if (rSize == 0){
+		rEventNumber = 0;
+		rRelativeBCID = 0;
+		rColumn = 0;
+		rRow = 0;
+		rTot = 0;
+		rEventStatus = 0;
+		return;
+	}
+	rEventNumber = &_hitEventNumbers[0];
+	rRelativeBCID = &_hitRelativeBCIDs[0];
+	rColumn = &_hitColumns[0];
+	rRow = &_hitRows[0];
+	rTot = &_hitTots[0];
+	rEventStatus = &_hitEventStatus[0];
+}
+
 void Interpret::setHitsArraySize(const unsigned int &rSize)
 {
 	info("setHitsArraySize(...) with size "+IntToStr(rSize));
@@ -344,6 +402,31 @@ void Interpret::setHitsArraySize(const unsigned int &rSize)
 	allocateHitArray();
 }
 
+void Interpret::setHitsArray(HitInfo*& rHitInfo, const unsigned int& rSize)
+{
+	info("setHitsArray(...) with size "+IntToStr(rSize));
+	deleteHitArray();
+	_hitInfo = rHitInfo;
+	_hitInfoSize = rSize;
+	_hitInfoOwned = false;
+}
+
+void Interpret::setHitsArrayGrowth(const bool& rGrowHitsArray)
+{
+	info("setHitsArrayGrowth()");
+	_growHitsArray = rGrowHitsArray;
+}
+
+void Interpret::setNthreads(const unsigned int& rNthreads)
+{
+	info("setNthreads(...) with "+IntToStr(rNthreads)+" threads");
+#ifndef _OPENMP
+	if(rNthreads > 1 && Basis::warningSet())
+		warning("setNthreads: compiled without OpenMP support, the raw data pieces are interpreted one after another");
+#endif
+	_nThreads = rNthreads > 0 ? rNthreads : 1;
+}
+
 void Interpret::setMetaDataEventIndex(uint64_t*& rEventNumber, const unsigned int& rSize)
 {
 	info("setMetaDataEventIndex(...) with length "+IntToStr(rSize));
@@ -384,6 +467,149 @@ void Interpret::resetCounters()
 	resetServiceRecordCounterArray();
 }
 
+void Interpret::getState(std::string& rState)
+{
+	debug("getState()");
+	rState.clear();
+	unsigned int tVersion = __INTERPRETERSTATEVERSION;
+	unsigned int tHitInfoSize = sizeof(HitInfo);
+	writeState(rState, &tVersion);
+	writeState(rState, &tHitInfoSize);
+
+	//settings
+	writeState(rState, &_NbCID);
+	writeState(rState, &_maxTot);
+	writeState(rState, &_fEI4B);
+	writeState(rState, &_eventBuilder);
+	writeState(rState, &_useTdcTriggerTimeStamp);
+	writeState(rState, &_useTriggerTimeStamp);
+
+	//event in progress
+	writeState(rState, &tNdataHeader);
+	writeState(rState, &tNdataRecord);
+	writeState(rState, &tStartBCID);
+	writeState(rState, &tStartLVL1ID);
+	writeState(rState, &tDbCID);
+	writeState(rState, &tTriggerError);
+	writeState(rState, &tErrorCode);
+	writeState(rState, &tServiceRecord);
+	writeState(rState, &tTriggerNumber);
+	writeState(rState, &tTotalHits);
+	writeState(rState, &tLVL1IDisConst);
+	writeState(rState, &tBCIDerror);
+	writeState(rState, &tTriggerWord);
+	writeState(rState, &tTdcCount);
+	writeState(rState, &tTdcTimeStamp);
+	writeState(rState, &tActualLVL1ID);
+	writeState(rState, &tActualBCID);
+	writeState(rState, &tActualSRcode);
+	writeState(rState, &tActualSRcounter);
+	writeState(rState, &tHitBufferIndex);
+	writeState(rState, _hitBuffer, tHitBufferIndex);
+
+	//counters
+	writeState(rState, &_nTriggers);
+	writeState(rState, &_nEvents);
+	writeState(rState, &_nMaxHitsPerEvent);
+	writeState(rState, &_nEmptyEvents);
+	writeState(rState, &_nIncompleteEvents);
+	writeState(rState, &_nTDCWords);
+	writeState(rState, &_nUnknownWords);
+	writeState(rState, &_nOtherWords);
+	writeState(rState, &_nServiceRecords);
+	writeState(rState, &_nDataRecords);
+	writeState(rState, &_nDataHeaders);
+	writeState(rState, &_nHits);
+	writeState(rState, &_nDataWords);
+	writeState(rState, &_firstTriggerNrSet);
+	writeState(rState, &_firstTdcSet);
+	writeState(rState, &_lastTriggerNumber);
+	writeState(rState, _triggerErrorCounter, __TRG_N_ERROR_CODES);
+	writeState(rState, _errorCounter, __N_ERROR_CODES);
+	writeState(rState, _tdcCounter, __N_TDC_VALUES);
+	writeState(rState, _serviceRecordCounter, __NSERVICERECORDS);
+
+	//meta data correlation
+	writeState(rState, &_startWordIndex);
+	writeState(rState, &_dataWordIndex);
+	writeState(rState, &_lastMetaIndexNotSet);
+	writeState(rState, &_lastWordIndexSet);
+}
+
+void Interpret::setState(const std::string& rState)
+{
+	debug("setState()");
+	size_t tPosition = 0;
+	unsigned int tVersion = 0;
+	unsigned int tHitInfoSize = 0;
+	readState(rState, tPosition, &tVersion);
+	readState(rState, tPosition, &tHitInfoSize);
+	if (tVersion != __INTERPRETERSTATEVERSION || tHitInfoSize != sizeof(HitInfo))
+		throw std::invalid_argument("Interpreter state data has an unknown format.");
+
+	readState(rState, tPosition, &_NbCID);
+	readState(rState, tPosition, &_maxTot);
+	readState(rState, tPosition, &_fEI4B);
+	readState(rState, tPosition, &_eventBuilder);
+	readState(rState, tPosition, &_useTdcTriggerTimeStamp);
+	readState(rState, tPosition, &_useTriggerTimeStamp);
+
+	readState(rState, tPosition, &tNdataHeader);
+	readState(rState, tPosition, &tNdataRecord);
+	readState(rState, tPosition, &tStartBCID);
+	readState(rState, tPosition, &tStartLVL1ID);
+	readState(rState, tPosition, &tDbCID);
+	readState(rState, tPosition, &tTriggerError);
+	readState(rState, tPosition, &tErrorCode);
+	readState(rState, tPosition, &tServiceRecord);
+	readState(rState, tPosition, &tTriggerNumber);
+	readState(rState, tPosition, &tTotalHits);
+	readState(rState, tPosition, &tLVL1IDisConst);
+	readState(rState, tPosition, &tBCIDerror);
+	readState(rState, tPosition, &tTriggerWord);
+	readState(rState, tPosition, &tTdcCount);
+	readState(rState, tPosition, &tTdcTimeStamp);
+	readState(rState, tPosition, &tActualLVL1ID);
+	readState(rState, tPosition, &tActualBCID);
+	readState(rState, tPosition, &tActualSRcode);
+	readState(rState, tPosition, &tActualSRcounter);
+	readState(rState, tPosition, &tHitBufferIndex);
+	if (tHitBufferIndex > __MAXHITBUFFERSIZE)
+		throw std::invalid_argument("Interpreter state data has too many event hits.");
+	readState(rState, tPosition, _hitBuffer, tHitBufferIndex);
+
+	readState(rState, tPosition, &_nTriggers);
+	readState(rState, tPosition, &_nEvents);
+	readState(rState, tPosition, &_nMaxHitsPerEvent);
+	readState(rState, tPosition, &_nEmptyEvents);
+	readState(rState, tPosition, &_nIncompleteEvents);
+	readState(rState, tPosition, &_nTDCWords);
+	readState(rState, tPosition, &_nUnknownWords);
+	readState(rState, tPosition, &_nOtherWords);
+	readState(rState, tPosition, &_nServiceRecords);
+	readState(rState, tPosition, &_nDataRecords);
+	readState(rState, tPosition, &_nDataHeaders);
+	readState(rState, tPosition, &_nHits);
+	readState(rState, tPosition, &_nDataWords);
+	readState(rState, tPosition, &_firstTriggerNrSet);
+	readState(rState, tPosition, &_firstTdcSet);
+	readState(rState, tPosition, &_lastTriggerNumber);
+	readState(rState, tPosition, _triggerErrorCounter, __TRG_N_ERROR_CODES);
+	readState(rState, tPosition, _errorCounter, __N_ERROR_CODES);
+	readState(rState, tPosition, _tdcCounter, __N_TDC_VALUES);
+	readState(rState, tPosition, _serviceRecordCounter, __NSERVICERECORDS);
+
+	readState(rState, tPosition, &_startWordIndex);
+	readState(rState, tPosition, &_dataWordIndex);
+	readState(rState, tPosition, &_lastMetaIndexNotSet);
+	readState(rState, tPosition, &_lastWordIndexSet);
+	if (tPosition != rState.size())
+		throw std::invalid_argument("Interpreter state data has an unknown format.");
+	_hitIndex = 0;
+	clearHitColumns();
+	_actualMetaWordIndex = 0;
+}
+
 void Interpret::resetEventVariables()
 {
 	tNdataHeader = 0;
@@ -410,8 +636,18 @@ void Interpret::createMetaDataWordIndex(bool CreateMetaDataWordIndex)
 	_createMetaDataWordIndex = CreateMetaDataWordIndex;
 }
 
+void Interpret::createHitColumns(bool CreateHitColumns)
+{
+	debug("createHitColumns");
+	_createHitColumns = CreateHitColumns;
+	_hitIndex = 0;
+	clearHitColumns();
+}
+
 void Interpret::setNbCIDs(const unsigned int& NbCIDs)
 {
+	if (NbCIDs == 0 || NbCIDs > __MAXBCID)
+		throw std::invalid_argument("The number of BCIDs has to be between 1 and "+IntToStr(__MAXBCID));
 	_NbCID = NbCIDs;
 }
 
@@ -420,16 +656,30 @@ void Interpret::setMaxTot(const unsigned int& rMaxTot)
 	_maxTot = rMaxTot;
 }
 
+void Interpret::setEventBuilder(const unsigned int& rEventBuilder)
+{
+	info("setEventBuilder()");
+	if (rEventBuilder >= __N_EVENT_BUILDERS)
+		throw std::invalid_argument("Unknown event builder "+IntToStr(rEventBuilder));
+	_eventBuilder = rEventBuilder;
+}
+
 void Interpret::useTriggerNumber(bool useTriggerNumber)
 {
 	info("useTriggerNumber()");
-	_useTriggerNumber = useTriggerNumber;
+	if (useTriggerNumber && _eventBuilder != __EVENT_BUILDER_STOP_MODE)
+		_eventBuilder = __EVENT_BUILDER_TRIGGER_NUMBER;
+	else if (!useTriggerNumber && _eventBuilder == __EVENT_BUILDER_TRIGGER_NUMBER)
+		_eventBuilder = __EVENT_BUILDER_BCID_WINDOW;
 }
 
 void Interpret::useTdcWord(bool useTdcWord)
 {
 	info("useTdcWord()");
-	_useTdcWord = useTdcWord;
+	if (useTdcWord)
+		_eventBuilder = __EVENT_BUILDER_TDC_WORD;
+	else if (_eventBuilder == __EVENT_BUILDER_TDC_WORD)
+		_eventBuilder = __EVENT_BUILDER_BCID_WINDOW;
 }
 
 void Interpret::useTriggerTimeStamp(bool useTriggerTimeStamp)
@@ -540,10 +790,9 @@ void Interpret::printStatus() {
 	std::cout << "_debugEvents "<<_debugEvents<<"\n";
 	std::cout << "_startDebugEvent "<<_startDebugEvent<<"\n";
 	std::cout << "_stopDebugEvent "<<_stopDebugEvent<<"\n";
-	std::cout << "_useTriggerNumber "<<_useTriggerNumber<<"\n";
+	std::cout << "_eventBuilder "<<_eventBuilder<<"\n";
 	std::cout << "_useTriggerTimeStamp "<<_useTriggerTimeStamp<<"\n";
 	std::cout << "_useTdcTriggerTimeStamp "<<_useTdcTriggerTimeStamp<<"\n";
-	std::cout << "_useTdcWord "<<_useTdcWord<<"\n";
 
 	std::cout << "\none event variables\n";
 	std::cout << "tNdataHeader "<<tNdataHeader<<"\n";
@@ -652,6 +901,17 @@ void Interpret::addHit(const unsigned char& pRelBCID, const unsigned short int&
 void Interpret::storeHit(HitInfo& rHit)
 {
 	_nHits++;
+	if(_createHitColumns){
+		_hitEventNumbers.push_back(rHit.eventNumber);
+		_hitRelativeBCIDs.push_back(rHit.relativeBCID);
+		_hitColumns.push_back(rHit.column);
+		_hitRows.push_back(rHit.row);
+		_hitTots.push_back(rHit.tot);
+		_hitEventStatus.push_back(rHit.eventStatus);
+		return;
+	}
+	if(_hitIndex >= _hitInfoSize && _growHitsArray)
+		growHitArray(_hitIndex + 1);
 	if(_hitIndex < _hitInfoSize){
 		if (_hitInfo != 0){
 			_hitInfo[_hitIndex] = rHit;
@@ -721,6 +981,16 @@ void Interpret::storeEventHits()
 	}
 }
 
+void Interpret::clearHitColumns()
+{
+	_hitEventNumbers.clear();
+	_hitRelativeBCIDs.clear();
+	_hitColumns.clear();
+	_hitRows.clear();
+	_hitTots.clear();
+	_hitEventStatus.clear();
+}
+
 void Interpret::correlateMetaWordIndex(const uint64_t& pEventNumer, const unsigned int& pDataWordIndex)
 {
 	if(_metaDataSet && pDataWordIndex == _lastWordIndexSet){ // this check is to speed up the _metaEventIndex access by using the fact that the index has to increase for consecutive events
@@ -755,6 +1025,340 @@ void Interpret::correlateMetaWordIndex(const uint64_t& pEventNumer, const unsign
 	}
 }
 
+void Interpret::getMetaWordIndexState(const unsigned int& pStartDataWordIndex, const unsigned int& pStopDataWordIndex, unsigned int& rLastMetaIndexNotSet, unsigned int& rLastWordIndexSet)
+{
+	if(!_metaDataSet)
+		return;
+	unsigned int tDataWordIndex = pStartDataWordIndex;
+	while(rLastWordIndexSet >= tDataWordIndex && rLastWordIndexSet < pStopDataWordIndex){  // same steps as correlateMetaWordIndex() for every data word index
+		tDataWordIndex = rLastWordIndexSet + 1;
+		if(_isMetaTableV2 == true){
+			rLastWordIndexSet = _metaInfoV2[rLastMetaIndexNotSet].stopIndex;
+			rLastMetaIndexNotSet++;
+			while(_metaInfoV2[rLastMetaIndexNotSet-1].length == 0 && rLastMetaIndexNotSet < _metaEventIndexLength){
+				rLastWordIndexSet = _metaInfoV2[rLastMetaIndexNotSet].stopIndex;
+				rLastMetaIndexNotSet++;
+			}
+		}
+		else{
+			rLastWordIndexSet = _metaInfo[rLastMetaIndexNotSet].stopIndex;
+			rLastMetaIndexNotSet++;
+			while(_metaInfo[rLastMetaIndexNotSet-1].length == 0 && rLastMetaIndexNotSet < _metaEventIndexLength){
+				rLastWordIndexSet = _metaInfo[rLastMetaIndexNotSet].stopIndex;
+				rLastMetaIndexNotSet++;
+			}
+		}
+	}
+}
+
+void Interpret::interpretRawDataParallel(unsigned int* pDataWords, const unsigned int& pNdataWords)
+{
+	//split the raw data at words that most likely start a new event, the read outs of the meta data are not aligned with the events
+	std::vector<unsigned int> tPieceStart(1, 0);
+	unsigned int tNpieces = std::min(_nThreads, pNdataWords / __MINPARALLELWORDS);
+	for (unsigned int i = 1; i < tNpieces; ++i){
+		unsigned int tStartWordIndex = getEventStartWordIndex(pDataWords, pNdataWords, std::max((unsigned int) ((uint64_t) i * pNdataWords / tNpieces), tPieceStart.back() + 1));
+		if (tStartWordIndex >= pNdataWords)
+			break;
+		tPieceStart.push_back(tStartWordIndex);
+	}
+	tPieceStart.push_back(pNdataWords);
+	tNpieces = (unsigned int) tPieceStart.size() - 1;
+	if (tNpieces < 2){
+		interpretWords(pDataWords, pNdataWords);
+		return;
+	}
+
+	while (_pieceInterpreters.size() < tNpieces - 1)
+		_pieceInterpreters.push_back(new Interpret());
+	for (unsigned int i = 1; i < tNpieces; ++i)
+		setPieceInterpreter(*_pieceInterpreters[i-1], tPieceStart[i+1] - tPieceStart[i]);
+
+	//the first piece is interpreted by this interpreter, the other pieces by the piece interpreters starting with a new event
+	bool tException = false;
+	bool tOutOfRange = false;
+	std::string tExceptionText;
+	#pragma omp parallel for schedule(static, 1) num_threads((int) tNpieces)
+	for (int i = 0; i < (int) tNpieces; ++i){
+		if (i == 0){
+			try{
+				interpretWords(pDataWords, tPieceStart[1]);
+			}
+			catch(std::out_of_range& exception){
+				tException = true;
+				tOutOfRange = true;
+				tExceptionText = exception.what();
+			}
+			catch(std::exception& exception){
+				tException = true;
+				tExceptionText = exception.what();
+			}
+		}
+		else{
+			Interpret& tInterpreter = *_pieceInterpreters[i-1];
+			try{
+				tInterpreter.seedPieceInterpreter(pDataWords, tPieceStart[i]);
+				tInterpreter.interpretWords(pDataWords + tPieceStart[i], tPieceStart[i+1] - tPieceStart[i]);
+				tInterpreter._pieceInterpreted = true;
+			}
+			catch(std::exception&){  //the piece is interpreted again serially
+				tInterpreter._pieceInterpreted = false;
+			}
+		}
+	}
+	if (tException){
+		if (tOutOfRange)
+			throw std::out_of_range(tExceptionText);
+		throw std::runtime_error(tExceptionText);
+	}
+
+	//stitch the pieces in order, a piece is interpreted again if the event boundary or the seed does not match the actual state
+	for (unsigned int i = 1; i < tNpieces; ++i){
+		Interpret& tInterpreter = *_pieceInterpreters[i-1];
+		if (canStitchPiece(tInterpreter, pDataWords[tPieceStart[i]]))
+			stitchPiece(tInterpreter);
+		else{
+			if(Basis::infoSet())
+				info("interpretRawDataParallel: no event boundary at word "+IntToStr(_nDataWords)+", interpreting raw data piece serially");
+			interpretWords(pDataWords + tPieceStart[i], tPieceStart[i+1] - tPieceStart[i]);
+		}
+	}
+}
+
+unsigned int Interpret::getEventStartWordIndex(unsigned int* pDataWords, const unsigned int& pNdataWords, const unsigned int& pStartWordIndex)
+{
+	bool tDataHeaderFound = false;
+	unsigned int tLastLVL1ID = 0;
+	unsigned int tLVL1ID = 0;
+	unsigned int tBCID = 0;
+	const bool tTriggerWordStartsEvent = triggerWordStartsEvent();
+	for (unsigned int i = pStartWordIndex; i < pNdataWords; ++i){
+		if (getTimefromDataHeader(pDataWords[i], tLVL1ID, tBCID)){
+			if (!tTriggerWordStartsEvent && tDataHeaderFound && tLVL1ID != tLastLVL1ID)  //new LVL1ID: first data header of a new trigger, the BCID can jump within one event
+				return i;
+			tDataHeaderFound = true;
+			tLastLVL1ID = tLVL1ID;
+		}
+		else if (isTriggerWord(pDataWords[i]))
+			return i;
+	}
+	return pNdataWords;
+}
+
+void Interpret::setPieceInterpreter(Interpret& rInterpreter, const unsigned int& pNdataWords)
+{
+	rInterpreter.setWarningOutput(warningSet());
+	rInterpreter.setErrorOutput(errorSet());
+	rInterpreter._NbCID = _NbCID;
+	rInterpreter._maxTot = _maxTot;
+	rInterpreter._fEI4B = _fEI4B;
+	rInterpreter._eventBuilder = _eventBuilder;
+	rInterpreter._useTdcTriggerTimeStamp = _useTdcTriggerTimeStamp;
+	rInterpreter._useTriggerTimeStamp = _useTriggerTimeStamp;
+	rInterpreter._createMetaDataWordIndex = _createMetaDataWordIndex;
+	rInterpreter._createHitColumns = _createHitColumns;
+	rInterpreter._metaDataSet = _metaDataSet;
+	rInterpreter._isMetaTableV2 = _isMetaTableV2;
+	rInterpreter._metaInfo = _metaInfo;
+	rInterpreter._metaInfoV2 = _metaInfoV2;
+	rInterpreter._metaEventIndexLength = _metaEventIndexLength;
+	rInterpreter.resetCounters();
+	rInterpreter.resetEventVariables();
+
+	//state at the start of the raw data, the state at the start of the piece is set in seedPieceInterpreter()
+	rInterpreter._lastTriggerNumber = _lastTriggerNumber;
+	rInterpreter._firstTriggerNrSet = _firstTriggerNrSet;
+	rInterpreter.tActualLVL1ID = tActualLVL1ID;
+	rInterpreter.tActualBCID = tActualBCID;
+	rInterpreter._lastMetaIndexNotSet = _lastMetaIndexNotSet;
+	rInterpreter._lastWordIndexSet = _lastWordIndexSet;
+	rInterpreter._nDataWords = _nDataWords;
+	rInterpreter._dataWordIndex = _dataWordIndex;
+
+	//output arrays of the piece, the hit array grows with the hits of the piece
+	rInterpreter._growHitsArray = true;
+	rInterpreter._hitIndex = 0;
+	rInterpreter.clearHitColumns();
+	rInterpreter._actualMetaWordIndex = 0;
+	if (_metaDataSet && _metaEventIndexLength > 0){
+		rInterpreter._pieceMetaEventIndex.resize(_metaEventIndexLength);
+		rInterpreter._metaEventIndex = &rInterpreter._pieceMetaEventIndex[0];
+	}
+	if (_createMetaDataWordIndex){
+		rInterpreter._pieceMetaWordIndex.resize(pNdataWords + 1);
+		rInterpreter._metaWordIndex = &rInterpreter._pieceMetaWordIndex[0];
+		rInterpreter._metaWordIndexLength = pNdataWords + 1;
+	}
+	rInterpreter._pieceInterpreted = false;
+}
+
+void Interpret::seedPieceInterpreter(unsigned int* pDataWords, const unsigned int& pStartWordIndex)
+{
+	//the last trigger word and data header before the piece define the trigger number and LVL1ID/BCID
+	bool tTriggerFound = false;
+	bool tDataHeaderFound = false;
+	unsigned int tLVL1ID = 0;
+	unsigned int tBCID = 0;
+	for (unsigned int i = pStartWordIndex; i > 0 && !(tTriggerFound && tDataHeaderFound); --i){
+		if (getTimefromDataHeader(pDataWords[i-1], tLVL1ID, tBCID)){
+			if (!tDataHeaderFound){
+				tActualLVL1ID = tLVL1ID;
+				tActualBCID = tBCID;
+				tDataHeaderFound = true;
+			}
+		}
+		else if (!tTriggerFound && isTriggerWord(pDataWords[i-1])){
+			if (!_useTriggerTimeStamp)
+				_lastTriggerNumber = TRIGGER_NUMBER_MACRO_NEW(pDataWords[i-1]);
+			else
+				_lastTriggerNumber = TRIGGER_TIME_STAMP_MACRO(pDataWords[i-1]);
+			_firstTriggerNrSet = true;
+			tTriggerFound = true;
+		}
+	}
+	_seedLastTriggerNumber = _lastTriggerNumber;
+	_seedFirstTriggerNrSet = _firstTriggerNrSet;
+	_seedLVL1ID = tActualLVL1ID;
+	_seedBCID = tActualBCID;
+
+	//word counters and meta data correlation, the first word of the piece is correlated when the piece is stitched
+	_nDataWords += pStartWordIndex;
+	_startWordIndex = _nDataWords;
+	_seedDataWordIndex = _dataWordIndex + pStartWordIndex;
+	getMetaWordIndexState(_dataWordIndex, _seedDataWordIndex, _lastMetaIndexNotSet, _lastWordIndexSet);
+	_seedLastMetaIndexNotSet = _lastMetaIndexNotSet;
+	_seedLastWordIndexSet = _lastWordIndexSet;
+	getMetaWordIndexState(_seedDataWordIndex, _seedDataWordIndex + 1, _lastMetaIndexNotSet, _lastWordIndexSet);
+	_seedMetaIndexNotSet = _lastMetaIndexNotSet;
+	_dataWordIndex = _seedDataWordIndex;
+
+	//a first trigger word starts the event without closing the previous event, the trigger number check is done here
+	unsigned int tActualWord = pDataWords[pStartWordIndex];
+	if (!DATA_HEADER_MACRO(tActualWord) && isTriggerWord(tActualWord)){
+		_firstTriggerNrSet = false;
+		unsigned int tTriggerNumber = TRIGGER_NUMBER_MACRO_NEW(tActualWord);
+		if(_seedFirstTriggerNrSet && !_useTriggerTimeStamp && _seedLastTriggerNumber + 1 != tTriggerNumber && !(_seedLastTriggerNumber == __MAXTLUTRGNUMBER && tTriggerNumber == 0))
+			addTriggerErrorCode(__TRG_NUMBER_INC_ERROR);
+	}
+}
+
+bool Interpret::canStitchPiece(Interpret& rInterpreter, const unsigned int& pSRAMWORD)
+{
+	if (!rInterpreter._pieceInterpreted)
+		return false;
+	if (_dataWordIndex != rInterpreter._seedDataWordIndex || _lastTriggerNumber != rInterpreter._seedLastTriggerNumber || _firstTriggerNrSet != rInterpreter._seedFirstTriggerNrSet)
+		return false;
+	if (tActualLVL1ID != rInterpreter._seedLVL1ID || tActualBCID != rInterpreter._seedBCID)
+		return false;
+	if (_lastMetaIndexNotSet != rInterpreter._seedLastMetaIndexNotSet || _lastWordIndexSet != rInterpreter._seedLastWordIndexSet)
+		return false;
+	if (DATA_HEADER_MACRO(pSRAMWORD))  //the data header closes the event only if the event window is complete
+		return !triggerWordStartsEvent() && tNdataHeader > _NbCID-1;
+	if (triggerWordStartsEvent())
+		return _firstTriggerNrSet;
+	return tNdataHeader > _NbCID-1;
+}
+
+void Interpret::stitchPiece(Interpret& rInterpreter)
+{
+	//the first word of the piece closes the actual event
+	correlateMetaWordIndex(_nEvents, _dataWordIndex);
+	_nDataWords++;
+	addEvent();
+	uint64_t tEventOffset = _nEvents;
+
+	//append the output of the piece with shifted event numbers
+	if(_hitIndex + rInterpreter._hitIndex > _hitInfoSize && _growHitsArray)
+		growHitArray(_hitIndex + rInterpreter._hitIndex);
+	if(_hitIndex + rInterpreter._hitIndex > _hitInfoSize){
+		if(Basis::errorSet())
+			error("stitchPiece: _hitIndex = "+IntToStr(_hitIndex + rInterpreter._hitIndex), __LINE__);
+		throw std::out_of_range("Hit index out of range.");
+	}
+	for (unsigned int i = 0; i < rInterpreter._hitIndex; ++i){
+		_hitInfo[_hitIndex] = rInterpreter._hitInfo[i];
+		_hitInfo[_hitIndex].eventNumber += tEventOffset;
+		_hitIndex++;
+	}
+	for (unsigned int i = 0; i < rInterpreter._hitEventNumbers.size(); ++i)
+		_hitEventNumbers.push_back(rInterpreter._hitEventNumbers[i] + tEventOffset);
+	_hitRelativeBCIDs.insert(_hitRelativeBCIDs.end(), rInterpreter._hitRelativeBCIDs.begin(), rInterpreter._hitRelativeBCIDs.end());
+	_hitColumns.insert(_hitColumns.end(), rInterpreter._hitColumns.begin(), rInterpreter._hitColumns.end());
+	_hitRows.insert(_hitRows.end(), rInterpreter._hitRows.begin(), rInterpreter._hitRows.end());
+	_hitTots.insert(_hitTots.end(), rInterpreter._hitTots.begin(), rInterpreter._hitTots.end());
+	_hitEventStatus.insert(_hitEventStatus.end(), rInterpreter._hitEventStatus.begin(), rInterpreter._hitEventStatus.end());
+	for (unsigned int i = rInterpreter._seedMetaIndexNotSet; i < rInterpreter._lastMetaIndexNotSet; ++i)
+		_metaEventIndex[i] = rInterpreter._metaEventIndex[i] + tEventOffset;
+	if(_createMetaDataWordIndex){
+		if(_actualMetaWordIndex + rInterpreter._actualMetaWordIndex > _metaWordIndexLength){
+			std::stringstream tInfo;
+			tInfo<<"Interpret::stitchPiece(): meta word index array is too small "<<_actualMetaWordIndex + rInterpreter._actualMetaWordIndex<<">"<<_metaWordIndexLength;
+			throw std::out_of_range(tInfo.str());
+		}
+		for (unsigned int i = 0; i < rInterpreter._actualMetaWordIndex; ++i){
+			_metaWordIndex[_actualMetaWordIndex] = rInterpreter._metaWordIndex[i];
+			_metaWordIndex[_actualMetaWordIndex].eventIndex += tEventOffset;
+			_actualMetaWordIndex++;
+		}
+	}
+
+	//add the counters of the piece
+	_nEvents += rInterpreter._nEvents;
+	_nTriggers += rInterpreter._nTriggers;
+	_nIncompleteEvents += rInterpreter._nIncompleteEvents;
+	_nDataRecords += rInterpreter._nDataRecords;
+	_nDataHeaders += rInterpreter._nDataHeaders;
+	_nServiceRecords += rInterpreter._nServiceRecords;
+	_nUnknownWords += rInterpreter._nUnknownWords;
+	_nTDCWords += rInterpreter._nTDCWords;
+	_nOtherWords += rInterpreter._nOtherWords;
+	_nHits += rInterpreter._nHits;
+	_nEmptyEvents += rInterpreter._nEmptyEvents;
+	if(rInterpreter._nMaxHitsPerEvent > _nMaxHitsPerEvent)
+		_nMaxHitsPerEvent = rInterpreter._nMaxHitsPerEvent;
+	for(unsigned int i = 0; i<__TRG_N_ERROR_CODES; ++i)
+		_triggerErrorCounter[i] += rInterpreter._triggerErrorCounter[i];
+	for(unsigned int i = 0; i<__N_ERROR_CODES; ++i)
+		_errorCounter[i] += rInterpreter._errorCounter[i];
+	for(unsigned int i = 0; i<__N_TDC_VALUES; ++i)
+		_tdcCounter[i] += rInterpreter._tdcCounter[i];
+	for(unsigned int i = 0; i<__NSERVICERECORDS; ++i)
+		_serviceRecordCounter[i] += rInterpreter._serviceRecordCounter[i];
+
+	//take the state at the end of the piece
+	_nDataWords = rInterpreter._nDataWords;
+	_dataWordIndex = rInterpreter._dataWordIndex;
+	_startWordIndex = rInterpreter._startWordIndex;
+	_lastTriggerNumber = rInterpreter._lastTriggerNumber;
+	_firstTriggerNrSet = rInterpreter._firstTriggerNrSet;
+	_firstTdcSet = _firstTdcSet || rInterpreter._firstTdcSet;
+	_lastMetaIndexNotSet = rInterpreter._lastMetaIndexNotSet;
+	_lastWordIndexSet = rInterpreter._lastWordIndexSet;
+	tActualLVL1ID = rInterpreter.tActualLVL1ID;
+	tActualBCID = rInterpreter.tActualBCID;
+
+	//the last event of the piece is the actual event
+	tNdataHeader = rInterpreter.tNdataHeader;
+	tNdataRecord = rInterpreter.tNdataRecord;
+	tStartBCID = rInterpreter.tStartBCID;
+	tStartLVL1ID = rInterpreter.tStartLVL1ID;
+	tDbCID = rInterpreter.tDbCID;
+	tTriggerError = rInterpreter.tTriggerError;
+	tErrorCode = rInterpreter.tErrorCode;
+	tServiceRecord = rInterpreter.tServiceRecord;
+	tTriggerNumber = rInterpreter.tTriggerNumber;
+	tTotalHits = rInterpreter.tTotalHits;
+	tBCIDerror = rInterpreter.tBCIDerror;
+	tTriggerWord = rInterpreter.tTriggerWord;
+	tTdcCount = rInterpreter.tTdcCount;
+	tTdcTimeStamp = rInterpreter.tTdcTimeStamp;
+	tHitBufferIndex = rInterpreter.tHitBufferIndex;
+	for (unsigned int i = 0; i < tHitBufferIndex; ++i){
+		_hitBuffer[i] = rInterpreter._hitBuffer[i];
+		_hitBuffer[i].eventNumber += tEventOffset;
+	}
+}
+
 bool Interpret::getTimefromDataHeader(const unsigned int& pSRAMWORD, unsigned int& pLVL1ID, unsigned int& pBCID)
 {
 	if (DATA_HEADER_MACRO(pSRAMWORD)){
@@ -982,6 +1586,7 @@ void Interpret::allocateHitArray()
 	debug(std::string("allocateHitArray()"));
 	try{
 		_hitInfo = new HitInfo[_hitInfoSize];
+		_hitInfoOwned = true;
 	}
 	catch(std::bad_alloc& exception){
 		error(std::string("allocateHitArray(): ")+std::string(exception.what()));
@@ -994,10 +1599,33 @@ void Interpret::deleteHitArray()
 	debug(std::string("deleteHitArray()"));
 	if (_hitInfo == 0)
 		return;
-	delete[] _hitInfo;
+	if (_hitInfoOwned)
+		delete[] _hitInfo;
 	_hitInfo = 0;
 }
 
+void Interpret::growHitArray(const unsigned int& rMinSize)
+{
+	unsigned int tNewSize = _hitInfoSize < std::numeric_limits<unsigned int>::max() / 2 ? 2 * _hitInfoSize : std::numeric_limits<unsigned int>::max();
+	if (tNewSize < rMinSize)
+		tNewSize = rMinSize;
+	info("growHitArray(...) with new size "+IntToStr(tNewSize));
+	HitInfo* tHitInfo = 0;
+	try{
+		tHitInfo = new HitInfo[tNewSize];
+	}
+	catch(std::bad_alloc& exception){
+		error(std::string("growHitArray(): ")+std::string(exception.what()));
+		throw;
+	}
+	if (_hitInfo != 0)
+		std::copy(_hitInfo, _hitInfo + _hitIndex, tHitInfo);
+	deleteHitArray();
+	_hitInfo = tHitInfo;
+	_hitInfoSize = tNewSize;
+	_hitInfoOwned = true;
+}
+
 void Interpret::allocateHitBufferArray()
 {
 	debug(std::string("allocateHitBufferArray()"));
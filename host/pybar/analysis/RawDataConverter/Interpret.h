@@ -7,6 +7,7 @@
 
 #include "Basis.h"
 #include "defines.h"
+#include "EventBuilder.h"
 
 #define __DEBUG false
 #define __DEBUG2 false
@@ -22,30 +23,44 @@ public:
 	bool setMetaData(MetaInfo* &rMetaInfo, const unsigned int& tLength);         	  //sets the meta words for word number/event correlation
 	bool setMetaDataV2(MetaInfoV2* &rMetaInfo, const unsigned int& tLength);       	  //sets the meta words for word number/event correlation
 	void getHits(HitInfo*& rHitInfo, unsigned int& rSize, bool copy = false);    //returns the hit histogram
+	void getHitColumns(int64_t*& rEventNumber, unsigned char*& rRelativeBCID, unsigned char*& rColumn, unsigned short*& rRow, unsigned char*& rTot, unsigned short*& rEventStatus, unsigned int& rSize);  //returns the hit columns, filled instead of the hit array if createHitColumns() is set
 
 	//set arrays to be filled
 	void setMetaDataEventIndex(uint64_t*& rEventNumber, const unsigned int& rSize);  //set the meta event index array to be filled
 	void setMetaDataWordIndex(MetaWordInfoOut*& rWordNumber, const unsigned int& rSize);  //set the meta word index array to be filled
 
 	//array info get funnctions
-	unsigned int getNarrayHits(){return _hitIndex;};								  // the number of hits of the actual interpreted raw data
+	unsigned int getNarrayHits(){return _createHitColumns ? (unsigned int) _hitEventNumbers.size() : _hitIndex;};	  // the number of hits of the actual interpreted raw data
 	unsigned int getNmetaDataEvent(){return _lastMetaIndexNotSet;};				  	  // the filled length of the array storing the event number per read out
 	unsigned int getNmetaDataWord(){return _actualMetaWordIndex;};
 
+	//checkpoint/resume of the interpretation
+	void getState(std::string& rState);								  //returns the interpretation state (settings, event in progress, counters, meta data correlation) as binary data
+	void setState(const std::string& rState);						  //restores the interpretation state from getState(), the meta data arrays have to be set again before
+	unsigned int getDataWordIndex(){return _dataWordIndex;};		  //returns the index of the next raw data word in the actual raw data file, the interpretation resumes with this word
+
 	//initializers, should be called before first call of interpretRawData() with new data file
 	void resetCounters();                                     						  //reset summary counters
 	void resetEventVariables();											              //resets event variables before starting new event
 
 	//options set/get
 	void setHitsArraySize(const unsigned int &rSize);   			  //set the siye of the hit array, has to be able to hold hits of one event
+	void setHitsArray(HitInfo*& rHitInfo, const unsigned int& rSize);  //set a hit array provided by the caller to be filled, the array is not deleted by the interpreter
+	void setHitsArrayGrowth(const bool& rGrowHitsArray = true);  //allow to replace a full hit array by a larger one (default), otherwise an exception is thrown
+	unsigned int getHitsArraySize(){return _hitInfoSize;};	  //returns the actual size of the hit array
+	void setNthreads(const unsigned int& rNthreads);		  //set the number of threads used to interpret the raw data, 1: serial interpretation
+	unsigned int getNthreads(){return _nThreads;};			  //returns the number of threads used to interpret the raw data
 	void createMetaDataWordIndex(bool CreateMetaDataWordIndex = true);
-	void setNbCIDs(const unsigned int& NbCIDs);				  //set the number of BCIDs with hits for the actual trigger
+	void createHitColumns(bool CreateHitColumns = true);	  //store the event number, relative BCID, column, row, tot and event status of the hits in separate arrays instead of the hit array
+	void setNbCIDs(const unsigned int& NbCIDs);				  //set the number of BCIDs with hits for the actual trigger (event window of the event builders, up to __MAXBCID)
 	void setMaxTot(const unsigned int& rMaxTot);			  //sets the maximum tot code that is considered to be a hit
 	void setFEI4B(bool pIsFEI4B = true){_fEI4B = pIsFEI4B;};  //set the FE flavor to be able to read the raw data correctly
 	bool getFEI4B(){return _fEI4B;};                          //returns the FE flavor set
 	bool getMetaTableV2(){return _isMetaTableV2;};            //returns the MetaTable flavor (V1 or V2)
-	void useTriggerNumber(bool useTriggerNumber = true);      //new events are created if trigger number occurs
-	void useTdcWord(bool useTdcWord = true);      			  //new events are created if tdc word occurs and event structure of event before is complete
+	void setEventBuilder(const unsigned int& rEventBuilder);  //selects the event builder strategy (__EVENT_BUILDER_BCID_WINDOW, __EVENT_BUILDER_TRIGGER_NUMBER, __EVENT_BUILDER_TDC_WORD, __EVENT_BUILDER_STOP_MODE)
+	unsigned int getEventBuilder(){return _eventBuilder;};	  //returns the event builder strategy
+	void useTriggerNumber(bool useTriggerNumber = true);      //new events are created if trigger number occurs, sets the trigger number event builder (the stop mode event builder uses the trigger number already)
+	void useTdcWord(bool useTdcWord = true);      			  //new events are created if tdc word occurs and event structure of event before is complete, sets the TDC word event builder
 	void useTdcTriggerTimeStamp(bool useTdcTriggerTimeStamp = true);//true: tdc time stamp is the delay between trigger/TDC leading edge, False: time stamp counter
 	void useTriggerTimeStamp(bool useTriggerTimeStamp = true);//trigger number is giving you a clock count and not a total count
 
@@ -76,9 +91,23 @@ public:
 	unsigned int getHitSize();								  //return the size of one hit entry in the hit array, needed to check data in memory alignment
 
 private:
+	void interpretWords(unsigned int* pDataWords, const unsigned int& pNdataWords); //interprets the raw data words with the selected event builder and appends the result to the actual output arrays
+	template<class TEventBuilder> void buildEvents(unsigned int* pDataWords, const unsigned int& pNdataWords); //raw data loop of the event builder strategy TEventBuilder (see EventBuilder.h)
+	bool triggerWordStartsEvent();							//returns true if the selected event builder starts the events with the trigger word
+
+	//parallel raw data interpretation
+	void interpretRawDataParallel(unsigned int* pDataWords, const unsigned int& pNdataWords); //splits the raw data at event boundaries, interprets the pieces in threads and stitches the results
+	unsigned int getEventStartWordIndex(unsigned int* pDataWords, const unsigned int& pNdataWords, const unsigned int& pStartWordIndex); //returns the index of the next word that most likely starts a new event (trigger word or data header with new LVL1ID)
+	void setPieceInterpreter(Interpret& rInterpreter, const unsigned int& pNdataWords); //copies the settings and the actual state to the interpreter of a raw data piece
+	void seedPieceInterpreter(unsigned int* pDataWords, const unsigned int& pStartWordIndex); //sets the state at the start word of the raw data piece from the preceding raw data words
+	bool canStitchPiece(Interpret& rInterpreter, const unsigned int& pSRAMWORD); //returns true if the actual event is closed by the first data word of the piece and the actual state matches the seed of the piece interpreter
+	void stitchPiece(Interpret& rInterpreter);				//closes the actual event and appends the result of the piece interpreter
+	void getMetaWordIndexState(const unsigned int& pStartDataWordIndex, const unsigned int& pStopDataWordIndex, unsigned int& rLastMetaIndexNotSet, unsigned int& rLastWordIndexSet); //returns the meta data correlation state after the given data words without writing the event numbers
+
 	void addHit(const unsigned char& pRelBCID, const unsigned short int& pLVLID, const unsigned char& pColumn, const unsigned short int& pRow, const unsigned char& pTot, const unsigned short int& pBCID); //adds the hit to the event hits array _hitBuffer
 	void storeHit(HitInfo& rHit);	//stores the hit into the output hit array _hitInfo
 	void storeEventHits();          //adds the hits of the actual event to _hitInfo
+	void clearHitColumns();         //removes the hits from the hit columns
 	void correlateMetaWordIndex(const uint64_t& pEventNumer, const unsigned int& pDataWordIndex);  //writes the event number for the meta data
 
 	//SRAM word check and interpreting methods
@@ -104,6 +133,7 @@ private:
 	void setStandardSettings();
 	void allocateHitArray();
 	void deleteHitArray();
+	void growHitArray(const unsigned int& rMinSize);		  //replaces the hit array by a larger one with at least rMinSize hits, the stored hits are kept
 	void allocateHitBufferArray();
 	void deleteHitBufferArray();
 	void allocateTriggerErrorCounterArray();
@@ -126,6 +156,17 @@ private:
 	unsigned int _hitInfoSize;				  //size of the _hitInfo array
 	unsigned int _hitIndex;                   //max index of _hitInfo filled
 	HitInfo* _hitInfo;                        //holds the actual interpreted hits
+	bool _hitInfoOwned;                       //true if _hitInfo was allocated by the interpreter
+	bool _growHitsArray;                      //true if _hitInfo is replaced by a larger array when full
+
+	//hit columns, filled instead of _hitInfo if _createHitColumns is set
+	bool _createHitColumns;                   //true if the hits are stored in the hit columns
+	std::vector<int64_t> _hitEventNumbers;
+	std::vector<unsigned char> _hitRelativeBCIDs;
+	std::vector<unsigned char> _hitColumns;
+	std::vector<unsigned short> _hitRows;
+	std::vector<unsigned char> _hitTots;
+	std::vector<unsigned short> _hitEventStatus;
 
 	//array variables for the hit events buffer
 	unsigned int tHitBufferIndex;             //index for the buffer hit info array
@@ -138,8 +179,7 @@ private:
 	bool _debugEvents;                          //true if some events have to have debug output
 	unsigned int _startDebugEvent;              //start event number to have debug output
 	unsigned int _stopDebugEvent;               //stop event number to have debug output
-	bool _useTriggerNumber;						//set to true to force event recognision by trigger number
-	bool _useTdcWord;							//set to true to force event recognision by tdc word if event before is complete
+	unsigned int _eventBuilder;					//event builder strategy, defines the event recognition (trigger number, tdc word, BCID window, stop mode)
 	bool _useTdcTriggerTimeStamp;				//set to true to use the TDC trigger distance to fill the TDC time stamp otherwise use counter
 	bool _useTriggerTimeStamp;					//set to true to use the trigger value as a clock count
 
@@ -208,5 +248,20 @@ private:
 
 	//counter variables for the actual raw data file
 	unsigned int _dataWordIndex;			//the word index of the actual raw data file, needed for event number calculation
+
+	//parallel raw data interpretation
+	unsigned int _nThreads;							//number of threads used to interpret the raw data
+	std::vector<Interpret*> _pieceInterpreters;		//interpreters for the raw data pieces, the first piece is interpreted by this interpreter
+	std::vector<uint64_t> _pieceMetaEventIndex;		//meta event index filled by the piece interpreter
+	std::vector<MetaWordInfoOut> _pieceMetaWordIndex;	//meta word index filled by the piece interpreter
+	bool _pieceInterpreted;							//true if the raw data piece was interpreted without exception
+	unsigned int _seedLastMetaIndexNotSet;			//meta data correlation state before the first word of the piece
+	unsigned int _seedLastWordIndexSet;				//meta data correlation state before the first word of the piece
+	unsigned int _seedMetaIndexNotSet;				//meta data correlation state after the first word of the piece
+	unsigned int _seedLastTriggerNumber;			//trigger number of the last trigger word before the piece
+	bool _seedFirstTriggerNrSet;					//true if a trigger word occurred before the piece
+	unsigned int _seedLVL1ID;						//LVL1ID of the last data header before the piece
+	unsigned int _seedBCID;							//BCID of the last data header before the piece
+	unsigned int _seedDataWordIndex;				//the word index of the first word of the piece
 };
 
@@ -7,7 +7,7 @@ cimport numpy as cnp
 from numpy cimport ndarray
 #from libcpp cimport bool  # to be able to use bool variables
 from tables import dtype_from_descr
-from libc.stdint cimport uint8_t, uint16_t, uint32_t, uint64_t, int64_t
+from libc.stdint cimport uint8_t, uint16_t, uint32_t, uint64_t, int32_t, int64_t
 
 from data_struct cimport numpy_cluster_info
 from pybar.analysis.RawDataConverter.data_struct cimport numpy_hit_info, numpy_meta_data, numpy_meta_data_v2, numpy_meta_word_data
@@ -15,7 +15,7 @@ from pybar.analysis.RawDataConverter.data_struct import MetaTable, MetaTableV2
 
 cnp.import_array()  # if array is used it has to be imported, otherwise possible runtime error
 
-cdef extern from "AnalysisFunctions.h":
+cdef extern from "AnalysisFunctions.h" nogil:
     cdef cppclass ClusterInfo:
         ClusterInfo()
     unsigned int getNclusterInEvents(int64_t*& rEventNumber, const unsigned int& rSize, int64_t*& rResultEventNumber, unsigned int*& rResultCount)
@@ -26,33 +26,63 @@ cdef extern from "AnalysisFunctions.h":
     void histogram_2d(int*& x, int*& y, const unsigned int& rSize, const unsigned int& rNbinsX, const unsigned int& rNbinsY, uint32_t*& rResult) except +
     void histogram_3d(int*& x, int*& y, int*& z, const unsigned int& rSize, const unsigned int& rNbinsX, const unsigned int& rNbinsY, const unsigned int& rNbinsZ, uint16_t*& rResult) except +
     void mapCluster(int64_t*& rEventArray, const unsigned int& rEventArraySize, ClusterInfo*& rClusterInfo, const unsigned int& rClusterInfoSize, ClusterInfo*& rMappedClusterInfo, const unsigned int& rMappedClusterInfoSize) except +
+    void classifyRawData(uint32_t*& rData, const unsigned int& rSize, uint8_t*& rWordType, uint8_t*& rChannel)
+    unsigned int decodeDataRecords(uint32_t*& rData, const unsigned int& rSize, uint32_t*& rColumn, uint32_t*& rRow, uint32_t*& rTot, const unsigned int& rMaxTot)
+    void histogramDataRecords(uint32_t*& rData, const unsigned int& rSize, int32_t*& rOccupancy, const unsigned int& rMaxTot)
 
-def get_n_cluster_in_events(cnp.ndarray[cnp.int64_t, ndim=1] event_numbers, cnp.ndarray[cnp.int64_t, ndim=1] result_event_numbers, cnp.ndarray[cnp.uint32_t, ndim=1] result_cluster_count):
-    return getNclusterInEvents(<int64_t*&> event_numbers.data, <const unsigned int&> event_numbers.shape[0], <int64_t*&> result_event_numbers.data, <unsigned int*&> result_cluster_count.data)
+def get_n_cluster_in_events(cnp.ndarray[cnp.int64_t, ndim=1, mode="c"] event_numbers, cnp.ndarray[cnp.int64_t, ndim=1, mode="c"] result_event_numbers, cnp.ndarray[cnp.uint32_t, ndim=1, mode="c"] result_cluster_count):
+    cdef unsigned int result_size
+    with nogil:
+        result_size = getNclusterInEvents(<int64_t*&> event_numbers.data, <const unsigned int&> event_numbers.shape[0], <int64_t*&> result_event_numbers.data, <unsigned int*&> result_cluster_count.data)
+    return result_size
 
-def get_events_in_both_arrays(cnp.ndarray[cnp.int64_t, ndim=1] array_one, cnp.ndarray[cnp.int64_t, ndim=1] array_two, cnp.ndarray[cnp.int64_t, ndim=1] array_result):
-    return getEventsInBothArrays(<int64_t*&> array_one.data, <const unsigned int&> array_one.shape[0], <int64_t*&> array_two.data, <const unsigned int&> array_two.shape[0], <int64_t*&> array_result.data)
+def get_events_in_both_arrays(cnp.ndarray[cnp.int64_t, ndim=1, mode="c"] array_one, cnp.ndarray[cnp.int64_t, ndim=1, mode="c"] array_two, cnp.ndarray[cnp.int64_t, ndim=1, mode="c"] array_result):
+    cdef unsigned int result_size
+    with nogil:
+        result_size = getEventsInBothArrays(<int64_t*&> array_one.data, <const unsigned int&> array_one.shape[0], <int64_t*&> array_two.data, <const unsigned int&> array_two.shape[0], <int64_t*&> array_result.data)
+    return result_size
 
-def get_max_events_in_both_arrays(cnp.ndarray[cnp.int64_t, ndim=1] array_one, cnp.ndarray[cnp.int64_t, ndim=1] array_two, cnp.ndarray[cnp.int64_t, ndim=1] array_result):
-    return getMaxEventsInBothArrays(<int64_t*&> array_one.data, <const unsigned int&> array_one.shape[0], <int64_t*&> array_two.data, <const unsigned int&> array_two.shape[0], <int64_t*&> array_result.data, <const unsigned int&> array_result.shape[0])
+def get_max_events_in_both_arrays(cnp.ndarray[cnp.int64_t, ndim=1, mode="c"] array_one, cnp.ndarray[cnp.int64_t, ndim=1, mode="c"] array_two, cnp.ndarray[cnp.int64_t, ndim=1, mode="c"] array_result):
+    cdef unsigned int result_size
+    with nogil:
+        result_size = getMaxEventsInBothArrays(<int64_t*&> array_one.data, <const unsigned int&> array_one.shape[0], <int64_t*&> array_two.data, <const unsigned int&> array_two.shape[0], <int64_t*&> array_result.data, <const unsigned int&> array_result.shape[0])
+    return result_size
 
-def get_in1d_sorted(cnp.ndarray[cnp.int64_t, ndim=1] array_one, cnp.ndarray[cnp.int64_t, ndim=1] array_two, cnp.ndarray[cnp.uint8_t, ndim=1] array_result):
-    in1d_sorted(<int64_t*&> array_one.data, <const unsigned int&> array_one.shape[0], <int64_t*&> array_two.data, <const unsigned int&> array_two.shape[0], <uint8_t*&> array_result.data)
+def get_in1d_sorted(cnp.ndarray[cnp.int64_t, ndim=1, mode="c"] array_one, cnp.ndarray[cnp.int64_t, ndim=1, mode="c"] array_two, cnp.ndarray[cnp.uint8_t, ndim=1, mode="c"] array_result):
+    with nogil:
+        in1d_sorted(<int64_t*&> array_one.data, <const unsigned int&> array_one.shape[0], <int64_t*&> array_two.data, <const unsigned int&> array_two.shape[0], <uint8_t*&> array_result.data)
     return (array_result == 1)
 
-def hist_1d(cnp.ndarray[cnp.int32_t, ndim=1] x, const unsigned int& n_x, cnp.ndarray[cnp.uint32_t, ndim=1] array_result):
-    histogram_1d(<int*&> x.data, <const unsigned int&> x.shape[0], <const unsigned int&> n_x, <uint32_t*&> array_result.data) 
+def hist_1d(cnp.ndarray[cnp.int32_t, ndim=1, mode="c"] x, const unsigned int& n_x, cnp.ndarray[cnp.uint32_t, ndim=1, mode="c"] array_result):
+    with nogil:
+        histogram_1d(<int*&> x.data, <const unsigned int&> x.shape[0], <const unsigned int&> n_x, <uint32_t*&> array_result.data)
 
-def hist_2d(cnp.ndarray[cnp.int32_t, ndim=1] x, cnp.ndarray[cnp.int32_t, ndim=1] y, const unsigned int& n_x, const unsigned int& n_y, cnp.ndarray[cnp.uint32_t, ndim=1] array_result):
-    histogram_2d(<int*&> x.data, <int*&> y.data, <const unsigned int&> x.shape[0], <const unsigned int&> n_x, <const unsigned int&> n_y, <uint32_t*&> array_result.data)
+def hist_2d(cnp.ndarray[cnp.int32_t, ndim=1, mode="c"] x, cnp.ndarray[cnp.int32_t, ndim=1, mode="c"] y, const unsigned int& n_x, const unsigned int& n_y, cnp.ndarray[cnp.uint32_t, ndim=1, mode="c"] array_result):
+    with nogil:
+        histogram_2d(<int*&> x.data, <int*&> y.data, <const unsigned int&> x.shape[0], <const unsigned int&> n_x, <const unsigned int&> n_y, <uint32_t*&> array_result.data)
     
-def hist_3d(cnp.ndarray[cnp.int32_t, ndim=1] x, cnp.ndarray[cnp.int32_t, ndim=1] y, cnp.ndarray[cnp.int32_t, ndim=1] z, const unsigned int& n_x, const unsigned int& n_y, const unsigned int& n_z, cnp.ndarray[cnp.uint16_t, ndim=1] array_result, throw_exception = True):
-    histogram_3d(<int*&> x.data, <int*&> y.data, <int*&> z.data, <const unsigned int&> x.shape[0], <const unsigned int&> n_x, <const unsigned int&> n_y, <const unsigned int&> n_z, <uint16_t*&> array_result.data)
+def hist_3d(cnp.ndarray[cnp.int32_t, ndim=1, mode="c"] x, cnp.ndarray[cnp.int32_t, ndim=1, mode="c"] y, cnp.ndarray[cnp.int32_t, ndim=1, mode="c"] z, const unsigned int& n_x, const unsigned int& n_y, const unsigned int& n_z, cnp.ndarray[cnp.uint16_t, ndim=1, mode="c"] array_result, throw_exception = True):
+    with nogil:
+        histogram_3d(<int*&> x.data, <int*&> y.data, <int*&> z.data, <const unsigned int&> x.shape[0], <const unsigned int&> n_x, <const unsigned int&> n_y, <const unsigned int&> n_z, <uint16_t*&> array_result.data)
     
-def map_cluster(cnp.ndarray[cnp.int64_t, ndim=1] event_array, cnp.ndarray[numpy_cluster_info, ndim=1] cluster_hit_info, cnp.ndarray[numpy_cluster_info, ndim=1] mapped_cluster_hit_info):    
-    mapCluster(<int64_t*&> event_array.data, <const unsigned int&> event_array.shape[0], <ClusterInfo *&> cluster_hit_info.data, <const unsigned int &> cluster_hit_info.shape[0], <ClusterInfo *&> mapped_cluster_hit_info.data, <const unsigned int &> mapped_cluster_hit_info.shape[0])
-    
-    
-    
-    
-    
\ No newline at end of file
+def map_cluster(cnp.ndarray[cnp.int64_t, ndim=1, mode="c"] event_array, cnp.ndarray[numpy_cluster_info, ndim=1, mode="c"] cluster_hit_info, cnp.ndarray[numpy_cluster_info, ndim=1, mode="c"] mapped_cluster_hit_info):    
+    with nogil:
+        mapCluster(<int64_t*&> event_array.data, <const unsigned int&> event_array.shape[0], <ClusterInfo *&> cluster_hit_info.data, <const unsigned int &> cluster_hit_info.shape[0], <ClusterInfo *&> mapped_cluster_hit_info.data, <const unsigned int &> mapped_cluster_hit_info.shape[0])
+
+def classify_raw_data(cnp.ndarray[cnp.uint32_t, ndim=1, mode="c"] data, cnp.ndarray[cnp.uint8_t, ndim=1, mode="c"] word_type, cnp.ndarray[cnp.uint8_t, ndim=1, mode="c"] channel):
+    with nogil:
+        classifyRawData(<uint32_t*&> data.data, <const unsigned int&> data.shape[0], <uint8_t*&> word_type.data, <uint8_t*&> channel.data)
+
+def decode_data_records(cnp.ndarray[cnp.uint32_t, ndim=1, mode="c"] data, cnp.ndarray[cnp.uint32_t, ndim=1, mode="c"] column, cnp.ndarray[cnp.uint32_t, ndim=1, mode="c"] row, cnp.ndarray[cnp.uint32_t, ndim=1, mode="c"] tot, const unsigned int& max_tot):
+    if column.shape[0] < 2 * data.shape[0] or row.shape[0] < 2 * data.shape[0] or tot.shape[0] < 2 * data.shape[0]:
+        raise ValueError('The result arrays have to have twice the size of the data array')
+    cdef unsigned int n_hits
+    with nogil:
+        n_hits = decodeDataRecords(<uint32_t*&> data.data, <const unsigned int&> data.shape[0], <uint32_t*&> column.data, <uint32_t*&> row.data, <uint32_t*&> tot.data, <const unsigned int&> max_tot)
+    return n_hits
+
+def hist_data_records(cnp.ndarray[cnp.uint32_t, ndim=1, mode="c"] data, cnp.ndarray[cnp.int32_t, ndim=1, mode="c"] occupancy, const unsigned int& max_tot):
+    if occupancy.shape[0] != 80 * 336:
+        raise ValueError('The occupancy array has to have 80 * 336 entries')
+    with nogil:
+        histogramDataRecords(<uint32_t*&> data.data, <const unsigned int&> data.shape[0], <int32_t*&> occupancy.data, <const unsigned int&> max_tot)
@@ -5,14 +5,15 @@ import numpy as np
 cimport numpy as cnp
 from libcpp cimport bool as cpp_bool  # to be able to use bool variables, as cpp_bool according to http://code.google.com/p/cefpython/source/browse/cefpython/cefpython.pyx?spec=svne037c69837fa39ae220806c2faa1bbb6ae4500b9&r=e037c69837fa39ae220806c2faa1bbb6ae4500b9
 from data_struct cimport numpy_hit_info, numpy_cluster_hit_info, numpy_cluster_info
+from libc.stdint cimport int64_t
 
 cnp.import_array()  # if array is used it has to be imported, otherwise possible runtime error
 
-cdef extern from "Basis.h":
+cdef extern from "Basis.h" nogil:
     cdef cppclass Basis:
         Basis()
 
-cdef extern from "Clusterizer.h":
+cdef extern from "Clusterizer.h" nogil:
     cdef cppclass HitInfo:
         HitInfo()
     cdef cppclass ClusterHitInfo:
@@ -27,6 +28,7 @@ cdef extern from "Clusterizer.h":
         void setDebugOutput(cpp_bool pToggle)
 
         void addHits(HitInfo *& rHitInfo, const unsigned int & rNhits) except +
+        void addHitsColumns(int64_t *& rEventNumber, unsigned char *& rRelativeBCID, unsigned char *& rColumn, unsigned short *& rRow, unsigned char *& rTot, unsigned short *& rEventStatus, const unsigned int & rNhits) except +
         void getHitCluster(ClusterHitInfo*& rClusterHitInfo, unsigned int& rSize, cpp_bool copy)
         void getCluster(ClusterInfo*& rClusterHitInfo, unsigned int& rSize, cpp_bool copy)
 
@@ -35,6 +37,12 @@ cdef extern from "Clusterizer.h":
 
         void setClusterHitInfoArraySize(const unsigned int& rSize)
         void setClusterInfoArraySize(const unsigned int& rSize)
+        void setClusterHitInfoArray(ClusterHitInfo*& rClusterHitInfo, const unsigned int& rSize)
+        void setClusterInfoArray(ClusterInfo*& rClusterInfo, const unsigned int& rSize)
+        void setClusterArraysGrowth(const cpp_bool& rGrowClusterArrays)
+        void setStreamingMode(const cpp_bool& rStreamingMode)
+        unsigned int getClusterHitInfoArraySize()
+        unsigned int getClusterInfoArraySize()
         
         void setXclusterDistance(const unsigned int & pDx)
         void setYclusterDistance(const unsigned int & pDy)
@@ -52,6 +60,7 @@ cdef extern from "Clusterizer.h":
 
         unsigned int getNclusters()
 
+        void storeEvent() except +
         void reset()
         void test()
 
@@ -79,6 +88,8 @@ cdef cluster_info_data_to_numpy_array(void* ptr, cnp.npy_intp N):
 
 cdef class PyDataClusterizer:
     cdef Clusterizer * thisptr  # hold a C++ instance which we're wrapping
+    cdef object cluster_hit_info_array  # the cluster hit array provided by the caller, referenced as long as it is filled
+    cdef object cluster_info_array  # the cluster array provided by the caller, referenced as long as it is filled
     def __cinit__(self):
         self.thisptr = new Clusterizer()
     def __dealloc__(self):
@@ -91,8 +102,16 @@ cdef class PyDataClusterizer:
         self.thisptr.setWarningOutput(< cpp_bool > toggle)
     def set_error_output(self, toggle):
         self.thisptr.setErrorOutput(< cpp_bool > toggle)
-    def add_hits(self, cnp.ndarray[numpy_hit_info, ndim=1] hit_info):
-        self.thisptr.addHits(< HitInfo *&> hit_info.data, < unsigned int > hit_info.shape[0])
+    def add_hits(self, cnp.ndarray[numpy_hit_info, ndim=1, mode="c"] hit_info):
+        cdef unsigned int n_hits = hit_info.shape[0]
+        with nogil:
+            self.thisptr.addHits(< HitInfo *&> hit_info.data, n_hits)
+    def add_hits_columns(self, cnp.ndarray[cnp.int64_t, ndim=1, mode="c"] event_number, cnp.ndarray[cnp.uint8_t, ndim=1, mode="c"] relative_BCID, cnp.ndarray[cnp.uint8_t, ndim=1, mode="c"] column, cnp.ndarray[cnp.uint16_t, ndim=1, mode="c"] row, cnp.ndarray[cnp.uint8_t, ndim=1, mode="c"] tot, cnp.ndarray[cnp.uint16_t, ndim=1, mode="c"] event_status):  # hit columns as returned by PyDataInterpreter.get_hit_columns()
+        cdef unsigned int n_hits = event_number.shape[0]
+        if relative_BCID.shape[0] != n_hits or column.shape[0] != n_hits or row.shape[0] != n_hits or tot.shape[0] != n_hits or event_status.shape[0] != n_hits:
+            raise ValueError('Hit columns have different lengths')
+        with nogil:
+            self.thisptr.addHitsColumns(< int64_t *&> event_number.data, < unsigned char *&> relative_BCID.data, < unsigned char *&> column.data, < unsigned short *&> row.data, < unsigned char *&> tot.data, < unsigned short *&> event_status.data, n_hits)
     def get_hit_cluster(self):
         self.thisptr.getHitCluster(<ClusterHitInfo*&> cluster_hits, <unsigned int&> size, <cpp_bool> False)
         if cluster_hits != NULL:
@@ -109,8 +128,26 @@ cdef class PyDataClusterizer:
         self.thisptr.createClusterInfoArray(< cpp_bool > value)
     def set_cluster_hit_info_array_size(self, size):
         self.thisptr.setClusterHitInfoArraySize(< const unsigned int &> size)
+        self.cluster_hit_info_array = None
     def set_cluster_info_array_size(self, size):
         self.thisptr.setClusterInfoArraySize(< const unsigned int &> size)
+        self.cluster_info_array = None
+    def set_cluster_hit_info_array(self, cnp.ndarray[numpy_cluster_hit_info, ndim=1, mode="c"] cluster_hit_info_array):  # the cluster hits are written into the given array until it is full, then a larger array is allocated if the cluster array growth is active
+        self.thisptr.setClusterHitInfoArray(<ClusterHitInfo*&> cluster_hit_info_array.data, <const unsigned int&> cluster_hit_info_array.shape[0])
+        self.cluster_hit_info_array = cluster_hit_info_array
+    def set_cluster_info_array(self, cnp.ndarray[numpy_cluster_info, ndim=1, mode="c"] cluster_info_array):  # the clusters are written into the given array until it is full, then a larger array is allocated if the cluster array growth is active
+        self.thisptr.setClusterInfoArray(<ClusterInfo*&> cluster_info_array.data, <const unsigned int&> cluster_info_array.shape[0])
+        self.cluster_info_array = cluster_info_array
+    def set_cluster_arrays_growth(self, toggle=True):
+        self.thisptr.setClusterArraysGrowth(<cpp_bool> toggle)
+    def get_cluster_hit_info_array_size(self):
+        return <unsigned int> self.thisptr.getClusterHitInfoArraySize()
+    def get_cluster_info_array_size(self):
+        return <unsigned int> self.thisptr.getClusterInfoArraySize()
+    def set_streaming_mode(self, toggle=True):  # the hit arrays do not have to be aligned at events, the hits of the last event are clustered with the next hits or with store_event()
+        self.thisptr.setStreamingMode(<cpp_bool> toggle)
+    def store_event(self):
+        self.thisptr.storeEvent()
     def set_x_cluster_distance(self, value):
         self.thisptr.setXclusterDistance(< const unsigned int &> value)
     def set_y_cluster_distance(self, value):
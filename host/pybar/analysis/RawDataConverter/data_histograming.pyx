@@ -5,15 +5,16 @@ import numpy as np
 cimport numpy as cnp
 from libcpp cimport bool as cpp_bool  # to be able to use bool variables, as cpp_bool according to http://code.google.com/p/cefpython/source/browse/cefpython/cefpython.pyx?spec=svne037c69837fa39ae220806c2faa1bbb6ae4500b9&r=e037c69837fa39ae220806c2faa1bbb6ae4500b9
 from data_struct cimport numpy_hit_info, numpy_meta_data, numpy_meta_data_v2, numpy_par_info, numpy_cluster_info
-from libc.stdint cimport uint64_t
+from libc.stdint cimport uint64_t, int64_t
+from libcpp.string cimport string
 
 cnp.import_array()  # if array is used it has to be imported, otherwise possible runtime error
 
-cdef extern from "Basis.h":
+cdef extern from "Basis.h" nogil:
     cdef cppclass Basis:
         Basis()
 
-cdef extern from "Histogram.h":
+cdef extern from "Histogram.h" nogil:
     cdef cppclass HitInfo:
         HitInfo()
     cdef cppclass ParInfo:
@@ -35,7 +36,9 @@ cdef extern from "Histogram.h":
         void createTotPixelHist(cpp_bool CreateTotPixelHist)
         void setMaxTot(const unsigned int& rMaxTot)
 
-        void getOccupancy(unsigned int& rNparameterValues, unsigned int*& rOccupancy, cpp_bool copy)  # returns the occupancy histogram for all hits
+        cpp_bool getOccupancy(unsigned int*& rOccupancy) except +  # copies the occupancy histogram for all hits, returns false if the occupancy histogram is not allocated
+        cpp_bool getOccupancyParameter(const unsigned int& rParameterIndex, unsigned int*& rOccupancy) except +  # copies the occupancy histogram of one parameter, returns false if there are no hits for this parameter
+        double getOccupancyFillRatio()  # returns the fraction of allocated occupancy histogram blocks
         void getTotHist(unsigned int*& rTotHist, cpp_bool copy)  # returns the tot histogram for all hits
         void getTdcHist(unsigned int*& rTdcHist, cpp_bool copy)
         void getRelBcidHist(unsigned int*& rRelBcidHist, cpp_bool copy)  # returns the relative BCID histogram for all hits
@@ -43,6 +46,7 @@ cdef extern from "Histogram.h":
         void getTotPixelHist(unsigned short*& rTotPixelHist, cpp_bool copy)  # returns the tot pixel histogram for all hits
 
         void addHits(HitInfo*& rHitInfo, const unsigned int& rNhits) except +
+        void addHitsColumns(int64_t*& rEventNumber, unsigned char*& rRelativeBCID, unsigned char*& rColumn, unsigned short*& rRow, unsigned char*& rTot, const unsigned int& rNhits) except +
         void addClusterSeedHits(ClusterInfo*& rClusterInfo, const unsigned int& rNcluster) except +
         void addScanParameter(unsigned int*& rParInfo, const unsigned int& rNparInfoLength) except +
         void setNoScanParameter()
@@ -57,6 +61,10 @@ cdef extern from "Histogram.h":
         void reset() except +
         void test()
 
+        void add(const Histogram& rHistogram) except +
+        void getState(string& rState)
+        void setState(const string& rState) except +
+
 cdef data_to_numpy_array_uint16(cnp.uint16_t* ptr, cnp.npy_intp N):
     cdef cnp.ndarray[cnp.uint16_t, ndim=1] arr = cnp.PyArray_SimpleNewFromData(1, <cnp.npy_intp*> &N, cnp.NPY_UINT16, <cnp.uint16_t*> ptr)
     #PyArray_ENABLEFLAGS(arr, np.NPY_OWNDATA)
@@ -69,7 +77,6 @@ cdef data_to_numpy_array_uint32(cnp.uint32_t* ptr, cnp.npy_intp N):
 
 cdef cnp.uint16_t* data_16
 cdef cnp.uint32_t* data_32
-cdef unsigned int Nparameter = 0
 
 cdef class PyDataHistograming:
     cdef Histogram* thisptr  # hold a C++ instance which we're wrapping
@@ -99,11 +106,17 @@ cdef class PyDataHistograming:
         self.thisptr.createTotPixelHist(<cpp_bool> toggle)
     def set_max_tot(self, max_tot):
         self.thisptr.setMaxTot(<const unsigned int&> max_tot)
-    def get_occupancy(self):
-        self.thisptr.getOccupancy(Nparameter, <unsigned int*&> data_32, <cpp_bool> False)
-        if data_32 != NULL:
-            array = data_to_numpy_array_uint32(data_32, 80 * 336 * Nparameter)
-            return array.reshape((80, 336, Nparameter), order='F')  # make linear array to 3d array (col,row,parameter)
+    def get_occupancy(self):  # returns a new occupancy histogram (col, row, parameter) created from the occupancy blocks, None if there is no occupancy histogram
+        n_parameters = self.thisptr.getNparameters()
+        cdef cnp.ndarray[cnp.uint32_t, ndim=1] occupancy = np.empty(shape=(80 * 336 * n_parameters, ), dtype=np.uint32)
+        if self.thisptr.getOccupancy(<unsigned int*&> occupancy.data):
+            return occupancy.reshape((80, 336, n_parameters), order='F')  # make linear array to 3d array (col,row,parameter)
+    def get_occupancy_parameter(self, parameter_index):  # returns the occupancy histogram (col, row) of one parameter, None if there are no hits for this parameter
+        cdef cnp.ndarray[cnp.uint32_t, ndim=1] occupancy = np.empty(shape=(80 * 336, ), dtype=np.uint32)
+        if self.thisptr.getOccupancyParameter(<const unsigned int&> parameter_index, <unsigned int*&> occupancy.data):
+            return occupancy.reshape((80, 336), order='F')
+    def get_occupancy_fill_ratio(self):  # the occupancy histogram is stored in blocks, only the blocks with hits are allocated
+        return self.thisptr.getOccupancyFillRatio()
     def get_tot_hist(self):
         self.thisptr.getTotHist(<unsigned int*&> data_32, <cpp_bool> False)
         if data_32 != NULL:
@@ -126,21 +139,48 @@ cdef class PyDataHistograming:
         if data_16 != NULL:
             array = data_to_numpy_array_uint16(data_16, 80 * 336 * 4096)
             return array.reshape((80, 336, 4096), order='F')
-    def add_hits(self, cnp.ndarray[numpy_hit_info, ndim=1] hit_info):
-        self.thisptr.addHits(<HitInfo*&> hit_info.data, <const unsigned int&> hit_info.shape[0])
-    def add_cluster_seed_hits(self, cnp.ndarray[numpy_cluster_info, ndim=1] cluster_info, Ncluster):
-        self.thisptr.addClusterSeedHits(<ClusterInfo*&> cluster_info.data, <const unsigned int&> Ncluster)
-    def add_scan_parameter(self, cnp.ndarray[cnp.uint32_t, ndim=1] parameter_info):
-        self.thisptr.addScanParameter(<unsigned int*&> parameter_info.data, <const unsigned int&> parameter_info.shape[0])
+    def add_hits(self, cnp.ndarray[numpy_hit_info, ndim=1, mode="c"] hit_info):
+        with nogil:
+            self.thisptr.addHits(<HitInfo*&> hit_info.data, <const unsigned int&> hit_info.shape[0])
+    def add_hits_columns(self, cnp.ndarray[cnp.int64_t, ndim=1, mode="c"] event_number, cnp.ndarray[cnp.uint8_t, ndim=1, mode="c"] relative_BCID, cnp.ndarray[cnp.uint8_t, ndim=1, mode="c"] column, cnp.ndarray[cnp.uint16_t, ndim=1, mode="c"] row, cnp.ndarray[cnp.uint8_t, ndim=1, mode="c"] tot, event_status=None):  # hit columns as returned by PyDataInterpreter.get_hit_columns(), the event status is not needed
+        cdef unsigned int n_hits = event_number.shape[0]
+        if relative_BCID.shape[0] != n_hits or column.shape[0] != n_hits or row.shape[0] != n_hits or tot.shape[0] != n_hits:
+            raise ValueError('Hit columns have different lengths')
+        with nogil:
+            self.thisptr.addHitsColumns(<int64_t*&> event_number.data, <unsigned char*&> relative_BCID.data, <unsigned char*&> column.data, <unsigned short*&> row.data, <unsigned char*&> tot.data, n_hits)
+    def add_cluster_seed_hits(self, cnp.ndarray[numpy_cluster_info, ndim=1, mode="c"] cluster_info, unsigned int Ncluster):
+        with nogil:
+            self.thisptr.addClusterSeedHits(<ClusterInfo*&> cluster_info.data, <const unsigned int&> Ncluster)
+    def add_scan_parameter(self, cnp.ndarray[cnp.uint32_t, ndim=1, mode="c"] parameter_info):
+        with nogil:
+            self.thisptr.addScanParameter(<unsigned int*&> parameter_info.data, <const unsigned int&> parameter_info.shape[0])
     def set_no_scan_parameter(self):
         self.thisptr.setNoScanParameter()
-    def add_meta_event_index(self, cnp.ndarray[cnp.uint64_t, ndim=1] event_index, array_length):
-        self.thisptr.addMetaEventIndex(<uint64_t*&> event_index.data, <unsigned int&> array_length)
+    def add_meta_event_index(self, cnp.ndarray[cnp.uint64_t, ndim=1, mode="c"] event_index, unsigned int array_length):
+        with nogil:
+            self.thisptr.addMetaEventIndex(<uint64_t*&> event_index.data, <unsigned int&> array_length)
     def get_n_parameters(self):
         return <unsigned int> self.thisptr.getNparameters()
-    def calculate_threshold_scan_arrays(self, cnp.ndarray[cnp.float64_t, ndim=1] threshold, cnp.ndarray[cnp.float64_t, ndim=1] noise, n_injections, min_parameter, max_parameter):
-        self.thisptr.calculateThresholdScanArrays(<double*> threshold.data, <double*> noise.data, <const unsigned int&> n_injections, <const unsigned int&> min_parameter, <const unsigned int&> max_parameter)
+    def calculate_threshold_scan_arrays(self, cnp.ndarray[cnp.float64_t, ndim=1, mode="c"] threshold, cnp.ndarray[cnp.float64_t, ndim=1, mode="c"] noise, unsigned int n_injections, unsigned int min_parameter, unsigned int max_parameter):
+        with nogil:
+            self.thisptr.calculateThresholdScanArrays(<double*> threshold.data, <double*> noise.data, <const unsigned int&> n_injections, <const unsigned int&> min_parameter, <const unsigned int&> max_parameter)
     def reset(self):
         self.thisptr.reset()
+    def add(self, PyDataHistograming other):  # adds the histograms of another instance filled with other hits (e.g. by another thread or process), the same histograms have to be created and the number of parameters has to be the same; the threshold and noise arrays are calculated from the added occupancy histograms
+        with nogil:
+            self.thisptr.add(other.thisptr[0])
+    def __iadd__(self, PyDataHistograming other):
+        self.add(other)
+        return self
+    def get_state(self):  # returns the settings and histograms as binary data, the scan parameter and meta event index arrays are not part of the state and have to be set before hits are added to a restored instance
+        cdef string state
+        self.thisptr.getState(state)
+        return state
+    def set_state(self, state):  # restores the settings and histograms of get_state()
+        self.thisptr.setState(<string> state)
+    def __reduce__(self):  # instances are pickled with their state, e.g. to return the histograms of a worker process
+        return (self.__class__, (), self.get_state())
+    def __setstate__(self, state):
+        self.set_state(state)
     def test(self):
         self.thisptr.test()
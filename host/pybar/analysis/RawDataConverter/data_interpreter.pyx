@@ -4,19 +4,20 @@
 import numpy as np
 cimport numpy as cnp
 from numpy cimport ndarray
+from libcpp.string cimport string
 from libcpp cimport bool as cpp_bool  # to be able to use bool variables, as cpp_bool according to http://code.google.com/p/cefpython/source/browse/cefpython/cefpython.pyx?spec=svne037c69837fa39ae220806c2faa1bbb6ae4500b9&r=e037c69837fa39ae220806c2faa1bbb6ae4500b9
 from data_struct cimport numpy_hit_info, numpy_meta_data, numpy_meta_data_v2, numpy_meta_word_data
 from data_struct import MetaTable, MetaTableV2
 from tables import dtype_from_descr
-from libc.stdint cimport uint64_t
+from libc.stdint cimport uint64_t, int64_t
 
 cnp.import_array()  # if array is used it has to be imported, otherwise possible runtime error
 
-cdef extern from "Basis.h":
+cdef extern from "Basis.h" nogil:
     cdef cppclass Basis:
         Basis()
 
-cdef extern from "Interpret.h":
+cdef extern from "Interpret.h" nogil:
     cdef cppclass MetaInfo:
         MetaInfo()
     cdef cppclass MetaInfoV2:
@@ -33,13 +34,18 @@ cdef extern from "Interpret.h":
         void setInfoOutput(cpp_bool pToggle)
         void setDebugOutput(cpp_bool pToggle)
 
-        void setNbCIDs(const unsigned int& NbCIDs)
+        void setNbCIDs(const unsigned int& NbCIDs) except +
         void setMaxTot(const unsigned int& rMaxTot)
         void setFEI4B(cpp_bool setFEI4B)
         cpp_bool getFEI4B()
         cpp_bool getMetaTableV2()
 
         void setHitsArraySize(const unsigned int &rSize)
+        void setHitsArray(HitInfo*& rHitInfo, const unsigned int& rSize)
+        void setHitsArrayGrowth(const cpp_bool& rGrowHitsArray)
+        unsigned int getHitsArraySize()
+        void setNthreads(const unsigned int& rNthreads)
+        unsigned int getNthreads()
 
         void setMetaData(MetaInfo*& rMetaInfo, const unsigned int& tLength) except +
         void setMetaDataV2(MetaInfoV2*& rMetaInfo, const unsigned int& tLength) except +
@@ -50,6 +56,7 @@ cdef extern from "Interpret.h":
         void interpretRawData(unsigned int* pDataWords, const unsigned int& pNdataWords) except +
 #         void getMetaEventIndex(unsigned int& rEventNumberIndex, unsigned int*& rEventNumber)
         void getHits(HitInfo*& rHitInfo, unsigned int& rSize, cpp_bool copy)
+        void getHitColumns(int64_t*& rEventNumber, unsigned char*& rRelativeBCID, unsigned char*& rColumn, unsigned short*& rRow, unsigned char*& rTot, unsigned short*& rEventStatus, unsigned int& rSize)
 
         void getServiceRecordsCounters(unsigned int*& rServiceRecordsCounter, unsigned int& rNserviceRecords, cpp_bool copy)  # returns the total service record counter array
         void getErrorCounters(unsigned int*& rErrorCounter, unsigned int& rNerrorCounters, cpp_bool copy)  # returns the total errors counter array
@@ -58,14 +65,22 @@ cdef extern from "Interpret.h":
         unsigned int getNarrayHits()  # returns the maximum index filled with hits in the hit array
         unsigned int getNmetaDataEvent()  # returns the maximum index filled with event data infos
         unsigned int getNmetaDataWord()
+        uint64_t getNevents()  # returns the total number of events
+        void setEventBuilder(const unsigned int& rEventBuilder) except +
+        unsigned int getEventBuilder()
         void useTriggerNumber(cpp_bool useTriggerNumber)
         void useTdcWord(cpp_bool useTdcWord)
         void useTriggerTimeStamp(cpp_bool useTriggerTimeStamp)
         void useTdcTriggerTimeStamp(cpp_bool useTdcTriggerTimeStamp)
 
+        void getState(string& rState)
+        void setState(const string& rState) except +
+        unsigned int getDataWordIndex()
+
         void resetEventVariables()
         void resetCounters()
         void createMetaDataWordIndex(cpp_bool CreateMetaDataWordIndex)
+        void createHitColumns(cpp_bool CreateHitColumns)
 
         void printSummary()
         void debugEvents(const unsigned int& rStartEvent, const unsigned int& rStopEvent, const cpp_bool& debugEvents)
@@ -85,13 +100,24 @@ cdef data_to_numpy_array_uint32(cnp.uint32_t* ptr, cnp.npy_intp N):
     #PyArray_ENABLEFLAGS(arr, np.NPY_OWNDATA)
     return arr
 cdef hit_dt = cnp.dtype([('eventNumber', '<i8'), ('triggerNumber', '<u4'), ('relativeBCID', '<u1'), ('LVLID', '<u2'), ('column', '<u1'), ('row', '<u2'), ('tot', '<u1'), ('BCID', '<u2'), ('TDC', '<u2'), ('TDCtimeStamp', '<u1'), ('triggerStatus', '<u1'), ('serviceRecord', '<u4'), ('eventStatus', '<u2')])
-cdef hit_data_to_numpy_array(void* ptr, cnp.npy_intp N):
-    cdef cnp.ndarray[numpy_hit_info, ndim=1] arr = cnp.PyArray_SimpleNewFromData(1, <cnp.npy_intp*> &N, cnp.NPY_INT8, <void*> ptr).view(hit_dt)
+cdef hit_data_to_numpy_array(void* ptr, cnp.npy_intp N, owner):
+    cdef cnp.ndarray data = cnp.PyArray_SimpleNewFromData(1, <cnp.npy_intp*> &N, cnp.NPY_INT8, <void*> ptr)
+    cnp.set_array_base(data, owner)  # the interpreter that owns the hit data is not deleted before the array
+    cdef cnp.ndarray[numpy_hit_info, ndim=1] arr = data.view(hit_dt)
     arr.setflags(write=False)  # protect the hit data
     return arr
 
+cdef hit_column_array(void* ptr, cnp.npy_intp N, int type_num, owner):
+    cdef cnp.ndarray arr = cnp.PyArray_SimpleNewFromData(1, <cnp.npy_intp*> &N, type_num, ptr)
+    cnp.set_array_base(arr, owner)  # the interpreter that owns the hit data is not deleted before the array
+    arr.setflags(write=False)  # protect the hit data
+    return arr
+
+event_builders = ('bcid_window', 'trigger_number', 'tdc_word', 'stop_mode')  # event builder strategies of the interpreter, the index is the C++ event builder define (__EVENT_BUILDER_*)
+
 cdef class PyDataInterpreter:
     cdef Interpret* thisptr  # hold a C++ instance which we're wrapping
+    cdef object hits_array  # the hit array provided by the caller, referenced as long as it is filled
     def __cinit__(self):
         self.thisptr = new Interpret()
     def __dealloc__(self):
@@ -108,14 +134,37 @@ cdef class PyDataInterpreter:
         self.thisptr.setErrorOutput(<cpp_bool> toggle)
     def set_hits_array_size(self, size):
         self.thisptr.setHitsArraySize(<const unsigned int&> size)
-    def interpret_raw_data(self, cnp.ndarray[cnp.uint32_t, ndim=1] data):
-        self.thisptr.interpretRawData(<unsigned int*> data.data, <unsigned int> data.shape[0])
+        self.hits_array = None
+    def set_hits_array(self, cnp.ndarray[numpy_hit_info, ndim=1, mode="c"] hits_array):  # the hits are written into the given array until it is full, then a larger array is allocated if the hit array growth is active
+        self.thisptr.setHitsArray(<HitInfo*&> hits_array.data, <const unsigned int&> hits_array.shape[0])
+        self.hits_array = hits_array
+    def set_hits_array_growth(self, toggle=True):
+        self.thisptr.setHitsArrayGrowth(<cpp_bool> toggle)
+    def get_hits_array_size(self):
+        return <unsigned int> self.thisptr.getHitsArraySize()
+    def interpret_raw_data(self, cnp.ndarray[cnp.uint32_t, ndim=1, mode="c"] data):
+        with nogil:  # the raw data is interpreted without the GIL, for more than one thread (see set_n_threads) the raw data is interpreted in parallel
+            self.thisptr.interpretRawData(<unsigned int*> data.data, <unsigned int> data.shape[0])
         return data, data.shape[0]
-    def get_hits(self):
+    def get_hits(self, copy=False):  # returns a read-only view into the hit array, valid until the next interpret_raw_data() or set_hits_array_size() call (the hit array can be reallocated); use copy=True to keep the hits
         self.thisptr.getHits(<HitInfo*&> hits, <unsigned int&> n_entries, <cpp_bool> False)
         if hits != NULL:
-            array = hit_data_to_numpy_array(hits, sizeof(HitInfo) * n_entries)
-            return array
+            array = hit_data_to_numpy_array(hits, sizeof(HitInfo) * n_entries, self)
+            return array.copy() if copy else array
+    def get_hit_columns(self, copy=False):  # returns the event number, relative BCID, column, row, tot and event status arrays of the hits, filled instead of the hit array if create_hit_columns is set; views with the same lifetime as get_hits()
+        cdef int64_t* event_number = NULL
+        cdef unsigned char* relative_bcid = NULL
+        cdef unsigned char* column = NULL
+        cdef unsigned short* row = NULL
+        cdef unsigned char* tot = NULL
+        cdef unsigned short* event_status = NULL
+        cdef unsigned int size = 0
+        self.thisptr.getHitColumns(event_number, relative_bcid, column, row, tot, event_status, size)
+        if size == 0:
+            return tuple(np.empty(shape=(0, ), dtype=dtype) for dtype in (np.int64, np.uint8, np.uint8, np.uint16, np.uint8, np.uint16))
+        hit_columns = (hit_column_array(event_number, size, cnp.NPY_INT64, self), hit_column_array(relative_bcid, size, cnp.NPY_UINT8, self), hit_column_array(column, size, cnp.NPY_UINT8, self),
+                       hit_column_array(row, size, cnp.NPY_UINT16, self), hit_column_array(tot, size, cnp.NPY_UINT8, self), hit_column_array(event_status, size, cnp.NPY_UINT16, self))
+        return tuple(hit_column.copy() for hit_column in hit_columns) if copy else hit_columns
     def set_meta_data(self, ndarray meta_data):  # set_meta_data(self, cnp.ndarray[numpy_meta_data, ndim=1] meta_data)
         meta_data_dtype = meta_data.dtype
         if meta_data_dtype == dtype_from_descr(MetaTable):
@@ -152,6 +201,14 @@ cdef class PyDataInterpreter:
         return <unsigned int> self.thisptr.getNarrayHits()
     def get_n_meta_data_word(self):
         return <unsigned int> self.thisptr.getNmetaDataWord()
+    def get_n_events(self):
+        return <uint64_t> self.thisptr.getNevents()
+    def set_event_builder(self, event_builder):  # selects the event building strategy: 'bcid_window', 'trigger_number', 'tdc_word' or 'stop_mode'
+        if event_builder not in event_builders:
+            raise ValueError('Unknown event builder %s, possible values: %s' % (event_builder, ', '.join(event_builders)))
+        self.thisptr.setEventBuilder(<const unsigned int&> event_builders.index(event_builder))
+    def get_event_builder(self):
+        return event_builders[self.thisptr.getEventBuilder()]
     def use_trigger_number(self, use_trigger_number):
         self.thisptr.useTriggerNumber(<cpp_bool> use_trigger_number)
     def use_tdc_word(self, use_tdc_word):
@@ -166,14 +223,29 @@ cdef class PyDataInterpreter:
 #         cdef unsigned int NreadOuts = 0
 #         self.thisptr.getMetaEventIndex(NreadOuts, <unsigned int*&> event_index.data)
 #         return NreadOuts
+    def get_state(self):  # returns the interpretation state (settings, event in progress, counters, meta data correlation) to resume the interpretation later
+        cdef string state
+        self.thisptr.getState(state)
+        return state
+    def set_state(self, state):  # restores the interpretation state of get_state(), the meta data has to be set before, the interpretation resumes with raw data word get_data_word_index() of the actual raw data file
+        self.thisptr.setState(<string> state)
+    def get_data_word_index(self):
+        return <unsigned int> self.thisptr.getDataWordIndex()
     def reset_event_variables(self):
         self.thisptr.resetEventVariables()
     def reset_counters(self):
         self.thisptr.resetCounters()
     def create_meta_data_word_index(self, value = True):
         self.thisptr.createMetaDataWordIndex(<cpp_bool> value)
+    def create_hit_columns(self, value = True):
+        self.thisptr.createHitColumns(<cpp_bool> value)
     def set_hit_array_size(self, size):
         self.thisptr.setHitsArraySize(<const unsigned int&> size)
+        self.hits_array = None
+    def set_n_threads(self, n_threads):
+        self.thisptr.setNthreads(<const unsigned int&> n_threads)
+    def get_n_threads(self):
+        return <unsigned int> self.thisptr.getNthreads()
     def print_summary(self):
         self.thisptr.printSummary()
     def set_trig_count(self, trig_count):
@@ -90,6 +90,15 @@ class HitInfoTable(tb.IsDescription):
     event_status = tb.UInt16Col(pos=12)
 
 
+class HitColumnsTable(tb.IsDescription):  # reduced hit table with the hit columns of the interpreter (see PyDataInterpreter.get_hit_columns())
+    event_number = tb.Int64Col(pos=0)
+    relative_BCID = tb.UInt8Col(pos=1)
+    column = tb.UInt8Col(pos=2)
+    row = tb.UInt16Col(pos=3)
+    tot = tb.UInt8Col(pos=4)
+    event_status = tb.UInt16Col(pos=5)
+
+
 class MetaInfoEventTable(tb.IsDescription):
     event_number = tb.Int64Col(pos=0)
     time_stamp = tb.Float64Col(pos=1)
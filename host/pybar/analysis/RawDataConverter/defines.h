@@ -102,6 +102,15 @@ typedef struct MetaWordInfoOut{
 #define __MAXARRAYSIZE 2000000         //maximum buffer array size for the output hit array (has to be bigger than hits in one chunk)
 #define __MAXHITBUFFERSIZE 4000000     //maximum buffer array size for the hit buffer array (has to be bigger than hits in one event)
 #define __MAXTLUTRGNUMBER 32767       //maximum trigger logic unit trigger number (32-bit)
+#define __MINPARALLELWORDS 100000     //minimum number of raw data words per thread for the parallel raw data interpretation
+#define __INTERPRETERSTATEVERSION 2   //version of the interpreter state data format (see Interpret::getState())
+
+//event builder strategies (see Interpret::setEventBuilder() and EventBuilder.h)
+#define __EVENT_BUILDER_BCID_WINDOW 0      //events are built from the BCID window of one trigger, a BCID jump with a new LVL1ID starts a new event (default)
+#define __EVENT_BUILDER_TRIGGER_NUMBER 1   //events start with the trigger word, events with more data headers than the BCID window are truncated
+#define __EVENT_BUILDER_TDC_WORD 2         //events start with the TDC word if the event before is complete or has no TDC word
+#define __EVENT_BUILDER_STOP_MODE 3        //events start with the trigger word, the FE stop mode read out has one data header per read time slice (BCID window up to __MAXBCID)
+#define __N_EVENT_BUILDERS 4               //number of event builder strategies
 
 //event error codes
 #define __N_ERROR_CODES 16            //number of event error codes
@@ -239,6 +248,10 @@ typedef struct MetaWordInfoOut{
 #define SERVICE_RECORD_ETC_MACRO_FEI4B(X)	((SERVICE_RECORD_ETC_MASK_FEI4B & X) >> 4)
 #define SERVICE_RECORD_L1REQ_MACRO_FEI4B(X)	(SERVICE_RECORD_L1REQ_MASK_FEI4B & X)
 
+//Histogram definitions
+#define __OCCUPANCYBLOCKSIZE 1280	//number of pixels of one occupancy histogram block (16 rows, RAW_DATA_MAX_COLUMN * RAW_DATA_MAX_ROW has to be a multiple), only blocks with hits are allocated
+#define __HISTOGRAMSTATEVERSION 1	//version of the histogram state data format (see Histogram::getState())
+
 //Clusterizer definitions
 #define __MAXBCID 256			//maximum possible BCID window width, 16 for the FE, 256 in FE stop mode
 #define __MAXTOTBINS 128		//number of TOT bins for the cluster tot histogram (in TOT = [0:31])
@@ -9,6 +9,7 @@ import collections
 import numpy as np
 import progressbar
 import glob
+import yaml
 import tables as tb
 import numexpr as ne
 from operator import itemgetter
@@ -19,6 +20,7 @@ from tables import dtype_from_descr
 from pybar.analysis.plotting import plotting
 from pybar.analysis.RawDataConverter import analysis_functions
 from pybar.analysis.RawDataConverter import data_struct
+from pybar.daq.flat_raw_data import get_raw_data_words
 
 
 class AnalysisError(Exception):
@@ -296,7 +298,7 @@ def get_total_n_data_words(files_dict, precise=False):
             progress_bar.start()
         for index, file_name in enumerate(files_dict.iterkeys()):
             with tb.openFile(file_name, mode="r") as in_file_h5:  # open the actual file
-                n_words += in_file_h5.root.raw_data.shape[0]
+                n_words += get_n_raw_data_words(in_file_h5)
             if len(files_dict) > 10:
                 progress_bar.update(index)
         if len(files_dict) > 10:
@@ -304,12 +306,18 @@ def get_total_n_data_words(files_dict, precise=False):
         return n_words
     else:  # open just first an last file and take the mean to estimate the total numbe rof words
         with tb.openFile(files_dict.keys()[0], mode="r") as in_file_h5:  # open the actual file
-            n_words += in_file_h5.root.raw_data.shape[0]
+            n_words += get_n_raw_data_words(in_file_h5)
         with tb.openFile(files_dict.keys()[-1], mode="r") as in_file_h5:  # open the actual file
-            n_words += in_file_h5.root.raw_data.shape[0]
+            n_words += get_n_raw_data_words(in_file_h5)
         return n_words * len(files_dict) / 2
 
 
+def get_n_raw_data_words(in_file_h5):
+    '''Returns the number of raw data words of the opened raw data file. The raw data can be stored in the file or in the flat raw data format.
+    '''
+    return get_raw_data_words(in_file_h5).shape[0]
+
+
 def create_parameter_table(files_dict):
     if not check_parameter_similarity(files_dict):
         raise RuntimeError('Cannot create table from file with different scan parameters.')
@@ -392,7 +400,7 @@ def get_parameter_value_from_file_names(files, parameters=None, unique=False, so
 def get_data_file_names_from_scan_base(scan_base, filter_file_words=None, parameter=True):
     """
     Takes a list of scan base names and returns all file names that have this scan base within their name. File names that have a word of filter_file_words
-    in their name are excluded.
+    in their name are excluded. If a manifest file (<scan base>_manifest.yaml) exists, the file names are taken from the manifest in the order of data taking.
 
     Parameters
     ----------
@@ -410,7 +418,12 @@ def get_data_file_names_from_scan_base(scan_base, filter_file_words=None, parame
     if isinstance(scan_base, basestring):
         scan_base = (scan_base, )
     for scan_name in scan_base:
-        if parameter:
+        if os.path.isfile(scan_name + '_manifest.yaml'):
+            with open(scan_name + '_manifest.yaml', 'r') as f:
+                data_files = [os.path.join(os.path.dirname(scan_name), data_file) for data_file in yaml.safe_load(f)['files']]
+            if parameter:  # omit first file without parameter in file name
+                data_files = [data_file for data_file in data_files if os.path.splitext(os.path.basename(data_file))[0] != os.path.basename(scan_name)]
+        elif parameter:
             data_files = glob.glob(scan_name + '_*.h5')
         else:
             data_files = glob.glob(scan_name + '*.h5')
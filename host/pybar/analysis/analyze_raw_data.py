@@ -17,6 +17,8 @@ from pybar.analysis.plotting import plotting
 from pybar.analysis.RawDataConverter.data_interpreter import PyDataInterpreter
 from pybar.analysis.RawDataConverter.data_histograming import PyDataHistograming
 from pybar.analysis.RawDataConverter.data_clusterizer import PyDataClusterizer
+from pybar.daq.flat_raw_data import get_raw_data_words
+from pybar.daq.fei4_raw_data import open_configuration_group
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - [%(levelname)-8s] (%(threadName)-10s) %(message)s")
 
@@ -163,7 +165,9 @@ class AnalyzeRawData(object):
         '''Set all settings to their standard values.
         '''
         self.chunk_size = 3000000
+        self.n_threads = 1  # number of threads for the raw data interpretation, the raw data chunks are split at event boundaries, the result does not depend on the number of threads
         self.n_injections = 100
+        self._set_stop_mode = False  # the BCID window n_bcid depends on the stop mode, the stop mode is set below
         self.n_bcid = 16
         self.max_tot_value = 13
         self._filter_table = tb.Filters(complib='blosc', complevel=5, fletcher32=False)
@@ -171,6 +175,7 @@ class AnalyzeRawData(object):
         self.meta_event_index = None
         self.fei4b = False
         self.create_hit_table = False
+        self.create_hit_columns = False  # the interpreter stores only event number, relative BCID, column, row, tot and event status of the hits (15 instead of 31 bytes per hit), the Hits table has only these columns, no TDC histograms
         self.create_meta_event_index = True
         self.create_tot_hist = True
         self.create_tot_pixel_hist = True
@@ -195,7 +200,7 @@ class AnalyzeRawData(object):
         self.use_trigger_number = False  # use the trigger number to align the events
         self.use_trigger_time_stamp = False  # the trigger number is a time stamp
         self.use_tdc_trigger_time_stamp = False  # the tdc time stamp is the difference between trigger and tdc rising edge
-        self.set_stop_mode = False  # the FE is read out with stop mode, therefore the BCID plot is different
+        self.set_stop_mode = False  # the FE is read out with stop mode, therefore the stop mode event builder is used and the BCID plot is different
 
     def reset(self):
         '''Reset the c++ libraries for new analysis.
@@ -209,10 +214,32 @@ class AnalyzeRawData(object):
         return self._chunk_size
 
     @chunk_size.setter
-    def chunk_size(self, value):
-        self.interpreter.set_hit_array_size(2 * value)
+    def chunk_size(self, value):  # the hit array of the interpreter and the cluster arrays of the clusterizer grow with the hits of a chunk, thus the chunk size does not depend on the hit density
         self._chunk_size = value
 
+    @property
+    def occupancy(self):
+        """Get the occupancy histogram (col, row, parameter).
+
+        Every access creates a new dense array from the sparse occupancy histogram of the histogrammer (no cache).
+        Keep the returned array if it is needed more than once.
+        """
+        return self.histograming.get_occupancy()
+
+    @property
+    def occupancy_array(self):
+        """Get the occupancy histogram (row, col, parameter). Every access creates a new array, see occupancy."""
+        return np.swapaxes(self.occupancy, 0, 1)
+
+    @property
+    def n_threads(self):
+        return self._n_threads
+
+    @n_threads.setter
+    def n_threads(self, value):
+        self.interpreter.set_n_threads(value)
+        self._n_threads = value
+
     @property
     def create_hit_table(self):
         return self._create_hit_table
@@ -221,6 +248,15 @@ class AnalyzeRawData(object):
     def create_hit_table(self, value):
         self._create_hit_table = value
 
+    @property
+    def create_hit_columns(self):
+        return self._create_hit_columns
+
+    @create_hit_columns.setter
+    def create_hit_columns(self, value):
+        self._create_hit_columns = value
+        self.interpreter.create_hit_columns(value)
+
     @property
     def create_occupancy_hist(self):
         return self._create_occupancy_hist
@@ -390,8 +426,9 @@ class AnalyzeRawData(object):
 
     @n_bcid.setter
     def n_bcid(self, value):
-        """Set the numbers of BCIDs (usually 16) of one event."""
-        self._n_bcid = value if 0 < value < 16 else 16
+        """Set the numbers of BCIDs (usually 16) of one event. In stop mode the number of read time slices, up to 256."""
+        self._n_bcid_value = value  # the BCID window is set again if the stop mode changes
+        self._n_bcid = value if 0 < value < (257 if self.set_stop_mode else 16) else 16
         self.interpreter.set_trig_count(self._n_bcid)
 
     @property
@@ -414,7 +451,6 @@ class AnalyzeRawData(object):
     @create_cluster_hit_table.setter
     def create_cluster_hit_table(self, value):
         self._create_cluster_hit_table = value
-        self.clusterizer.set_cluster_hit_info_array_size(2 * self.chunk_size)
         self.clusterizer.create_cluster_hit_info_array(value)
         if value:
             self.create_cluster_table = value
@@ -426,7 +462,6 @@ class AnalyzeRawData(object):
     @create_cluster_table.setter
     def create_cluster_table(self, value):
         self._create_cluster_table = value
-        self.clusterizer.set_cluster_info_array_size(2 * self.chunk_size)
         self.clusterizer.create_cluster_info_array(value)
 
     @property
@@ -479,10 +514,29 @@ class AnalyzeRawData(object):
     @set_stop_mode.setter
     def set_stop_mode(self, value):
         self._set_stop_mode = value
+        if value:  # the stop mode event builder builds the events from the trigger words with the BCID window n_bcid (number of read time slices)
+            self.interpreter.set_event_builder('stop_mode')
+        elif self.interpreter.get_event_builder() == 'stop_mode':
+            self.interpreter.set_event_builder('trigger_number' if self._use_trigger_number else 'bcid_window')
+        self.n_bcid = self._n_bcid_value  # BCID windows larger than 16 are for stop mode only
+
+    @property
+    def event_builder(self):
+        return self.interpreter.get_event_builder()
+
+    @event_builder.setter
+    def event_builder(self, value):
+        self.interpreter.set_event_builder(value)
 
-    def interpret_word_table(self, analyzed_data_file=None, use_settings_from_file=True, fei4b=None):
+    def interpret_word_table(self, analyzed_data_file=None, use_settings_from_file=True, fei4b=None, checkpoint=False, resume=False):
         '''Interprets the raw data word table of all given raw data files with the c++ library.
-        Creates the h5 output file and PDF plots.
+        Creates the h5 output file and PDF plots. The raw data is interpreted with n_threads threads.
+
+        The interpretation of growing raw data files can be done in more than one run. With checkpoint the last event is
+        not stored and the interpretation state (interpreter, histograms, raw data file and word index) is saved to the
+        Checkpoint group of the output file. With resume the state is loaded from the output file, the interpretation
+        continues with the first raw data word not interpreted yet and the tables of the output file are appended.
+        The result of the last run (without checkpoint) is the same as the result of one run.
 
         Parameters
         ----------
@@ -493,11 +547,18 @@ class AnalyzeRawData(object):
             True if the raw data is from FE-I4B.
         use_settings_from_file : boolean
             True if the needed parameters should be extracted from the raw data file
+        checkpoint : boolean
+            True if the interpretation is resumed later.
+        resume : boolean
+            True if the interpretation is resumed from the checkpoint of the output file.
         '''
 
         if analyzed_data_file:
             self._analyzed_data_file = analyzed_data_file
 
+        if (checkpoint or resume) and self._analyzed_data_file is None:
+            raise analysis_utils.InvalidInputError('An output file is needed for checkpoints')
+
         if(self._create_meta_word_index):
             meta_word = np.empty((self._chunk_size,), dtype=dtype_from_descr(data_struct.MetaInfoWordTable))
             self.interpreter.set_meta_data_word_index(meta_word)
@@ -505,21 +566,40 @@ class AnalyzeRawData(object):
         self._filter_table = tb.Filters(complib='blosc', complevel=5, fletcher32=False)
 
         if(self._analyzed_data_file is not None):
-            self.out_file_h5 = tb.openFile(self._analyzed_data_file, mode="w", title="Interpreted FE-I4 raw data")
+            if resume:
+                self.out_file_h5 = tb.openFile(self._analyzed_data_file, mode="r+")
+                resume_state = self._load_checkpoint()
+            else:
+                self.out_file_h5 = tb.openFile(self._analyzed_data_file, mode="w", title="Interpreted FE-I4 raw data")
             if (self._create_hit_table is True):
-                description = data_struct.HitInfoTable().columns.copy()
-                if self.use_trigger_time_stamp:  # replace the column name if trigger gives you a time stamp
+                if self._create_hit_columns:
+                    description = data_struct.HitColumnsTable().columns.copy()
+                else:
+                    description = data_struct.HitInfoTable().columns.copy()
+                if self.use_trigger_time_stamp and not self._create_hit_columns:  # replace the column name if trigger gives you a time stamp
                     description['trigger_time_stamp'] = description.pop('trigger_number')
-                hit_table = self.out_file_h5.create_table(self.out_file_h5.root, name='Hits', description=description, title='hit_data', filters=self._filter_table, chunkshape=(self._chunk_size / 100,))
+                try:
+                    hit_table = self.out_file_h5.create_table(self.out_file_h5.root, name='Hits', description=description, title='hit_data', filters=self._filter_table, chunkshape=(self._chunk_size / 100,))
+                except tb.exceptions.NodeError:  # resumed interpretation
+                    hit_table = self.out_file_h5.root.Hits
             if (self._create_meta_word_index is True):
-                meta_word_index_table = self.out_file_h5.create_table(self.out_file_h5.root, name='EventMetaData', description=data_struct.MetaInfoWordTable, title='event_meta_data', filters=self._filter_table, chunkshape=(self._chunk_size / 10,))
+                try:
+                    meta_word_index_table = self.out_file_h5.create_table(self.out_file_h5.root, name='EventMetaData', description=data_struct.MetaInfoWordTable, title='event_meta_data', filters=self._filter_table, chunkshape=(self._chunk_size / 10,))
+                except tb.exceptions.NodeError:
+                    meta_word_index_table = self.out_file_h5.root.EventMetaData
             if(self._create_cluster_table):
-                cluster_table = self.out_file_h5.create_table(self.out_file_h5.root, name='Cluster', description=data_struct.ClusterInfoTable, title='cluster_hit_data', filters=self._filter_table, expectedrows=self._chunk_size)
+                try:
+                    cluster_table = self.out_file_h5.create_table(self.out_file_h5.root, name='Cluster', description=data_struct.ClusterInfoTable, title='cluster_hit_data', filters=self._filter_table, expectedrows=self._chunk_size)
+                except tb.exceptions.NodeError:
+                    cluster_table = self.out_file_h5.root.Cluster
             if(self._create_cluster_hit_table):
                 description = data_struct.ClusterHitInfoTable().columns.copy()
                 if self.use_trigger_time_stamp:  # replace the column name if trigger gives you a time stamp
                     description['trigger_time_stamp'] = description.pop('trigger_number')
-                cluster_hit_table = self.out_file_h5.create_table(self.out_file_h5.root, name='ClusterHits', description=description, title='cluster_hit_data', filters=self._filter_table, expectedrows=self._chunk_size)
+                try:
+                    cluster_hit_table = self.out_file_h5.create_table(self.out_file_h5.root, name='ClusterHits', description=description, title='cluster_hit_data', filters=self._filter_table, expectedrows=self._chunk_size)
+                except tb.exceptions.NodeError:
+                    cluster_hit_table = self.out_file_h5.root.ClusterHits
 
         logging.info('Interpreting raw data file(s): ' + (', ').join(self.files_dict.keys()))
 
@@ -532,6 +612,13 @@ class AnalyzeRawData(object):
             self.scan_parameter_index = analysis_utils.get_scan_parameters_index(self.scan_parameters)  # a array that labels unique scan parameter combinations
             self.histograming.add_scan_parameter(self.scan_parameter_index)  # just add an index for the different scan parameter combinations
 
+        if resume:  # the histograms are restored after the scan parameters are set, setting the scan parameters resets the occupancy histogram
+            self.histograming.set_state(resume_state['histogram_state'])
+            if resume_state['cluster_size_hist'] is not None:
+                self.clusterizer.get_cluster_size_hist()[:] = resume_state['cluster_size_hist']
+            if resume_state['cluster_tot_hist'] is not None:
+                self.clusterizer.get_cluster_tot_hist()[:] = resume_state['cluster_tot_hist']
+
         self.meta_data = analysis_utils.combine_meta_data(self.files_dict)
 
         if self.meta_data is None:
@@ -541,6 +628,12 @@ class AnalyzeRawData(object):
         meta_data_size = self.meta_data.shape[0]
         self.meta_event_index = np.zeros((meta_data_size,), dtype=[('metaEventIndex', np.uint64)])  # this array is filled by the interpreter and holds the event number per read out
         self.interpreter.set_meta_event_data(self.meta_event_index)  # tell the interpreter the data container to write the meta event index to
+        if resume:  # the meta data has to be set before the interpreter state
+            self.meta_event_index['metaEventIndex'][:resume_state['meta_event_index'].shape[0]] = resume_state['meta_event_index']
+            self.interpreter.set_state(resume_state['interpreter_state'])
+            resume_file_index = resume_state['raw_data_file_index']
+        else:
+            resume_file_index = None
 
         logging.info("Interpreting...")
         progress_bar = progressbar.ProgressBar(widgets=['', progressbar.Percentage(), ' ', progressbar.Bar(marker='*', left='|', right='|'), ' ', progressbar.AdaptiveETA()], maxval=analysis_utils.get_total_n_data_words(self.files_dict), term_width=80)
@@ -548,23 +641,33 @@ class AnalyzeRawData(object):
         total_words = 0
 
         for index, raw_data_file in enumerate(self.files_dict.keys()):  # loop over all raw data files
-            self.interpreter.reset_meta_data_counter()
+            if resume_file_index is not None and index < resume_file_index:  # already interpreted
+                continue
+            if index != resume_file_index:
+                self.interpreter.reset_meta_data_counter()
             with tb.openFile(raw_data_file, mode="r") as in_file_h5:
-                table_size = in_file_h5.root.raw_data.shape[0]
+                raw_data_words = get_raw_data_words(in_file_h5)  # flat raw data is memory mapped, no copy
+                table_size = raw_data_words.shape[0]
                 if use_settings_from_file:
                     self._deduce_settings_from_file(in_file_h5)
                 else:
                     self.fei4b = fei4b
-                for iWord in range(0, table_size, self._chunk_size):  # loop over all words in the actual raw data file
+                word_indices = range(self.interpreter.get_data_word_index() if index == resume_file_index else 0, table_size, self._chunk_size)
+                if not word_indices and index == len(self.files_dict.keys()) - 1:  # no new raw data words, the last event is stored with an empty chunk
+                    word_indices = [table_size]
+                for iWord in word_indices:  # loop over all words in the actual raw data file
                     try:
-                        raw_data = in_file_h5.root.raw_data.read(iWord, iWord + self._chunk_size)
+                        raw_data = raw_data_words[iWord:iWord + self._chunk_size]
                     except OverflowError, e:
                         logging.error('%s: 2^31 xrange() limitation in 32-bit Python' % e)
                     self.interpreter.interpret_raw_data(raw_data)  # interpret the raw data
-                    if(index == len(self.files_dict.keys()) - 1 and iWord == range(0, table_size, self._chunk_size)[-1]):  # store hits of the latest event of the last file
+                    if(not checkpoint and index == len(self.files_dict.keys()) - 1 and iWord == word_indices[-1]):  # store hits of the latest event of the last file, with checkpoint the event can continue in the next run
                         self.interpreter.store_event()  # all actual buffered events in the interpreter are stored
                     Nhits = self.interpreter.get_n_array_hits()  # get the number of hits of the actual interpreted raw data chunk
-                    hits = self.interpreter.get_hits()
+                    if self._create_hit_columns:
+                        hits = self.interpreter.get_hit_columns()  # tuple of hit columns
+                    else:
+                        hits = self.interpreter.get_hits()
                     if(self.scan_parameters is not None):
                         nEventIndex = self.interpreter.get_n_meta_data_event()
                         self.histograming.add_meta_event_index(self.meta_event_index, nEventIndex)
@@ -582,7 +685,13 @@ class AnalyzeRawData(object):
                             cluster_table.append(cluster)
 
                     if (self._analyzed_data_file is not None and self._create_hit_table is True):
-                        hit_table.append(hits)
+                        if self._create_hit_columns:
+                            hit_rows = np.empty(shape=(hits[0].shape[0],), dtype=hit_table.dtype)
+                            for name, hit_column in zip(hit_table.dtype.names, hits):
+                                hit_rows[name] = hit_column
+                            hit_table.append(hit_rows)
+                        else:
+                            hit_table.append(hits)
                     if (self._analyzed_data_file is not None and self._create_meta_word_index is True):
                         size = self.interpreter.get_n_meta_data_word()
                         meta_word_index_table.append(meta_word[:size])
@@ -593,10 +702,45 @@ class AnalyzeRawData(object):
                 if (self._analyzed_data_file is not None and self._create_hit_table is True):
                     hit_table.flush()
         progress_bar.finish()
+        if resume:  # the histograms and the meta data table are created again
+            for node in self.out_file_h5.list_nodes(self.out_file_h5.root):
+                if node._v_name not in ('Hits', 'EventMetaData', 'Cluster', 'ClusterHits'):
+                    self.out_file_h5.remove_node(node, recursive=True)
         self._create_additional_data()
+        if checkpoint:
+            self._save_checkpoint(len(self.files_dict.keys()) - 1)
         if(self._analyzed_data_file is not None):
             self.out_file_h5.close()
 
+    def _save_checkpoint(self, raw_data_file_index):
+        '''Saves the interpretation state to the Checkpoint group of the output file (see interpret_word_table).
+        '''
+        checkpoint = self.out_file_h5.create_group(self.out_file_h5.root, name='Checkpoint', title='Interpretation state')
+        checkpoint._v_attrs.raw_data_file_index = raw_data_file_index
+        self.out_file_h5.create_array(checkpoint, name='interpreter_state', obj=np.frombuffer(self.interpreter.get_state(), dtype=np.uint8))
+        self.out_file_h5.create_array(checkpoint, name='histogram_state', obj=np.frombuffer(self.histograming.get_state(), dtype=np.uint8))
+        self.out_file_h5.create_array(checkpoint, name='meta_event_index', obj=self.meta_event_index['metaEventIndex'][:self.interpreter.get_n_meta_data_event()])
+        if self.is_cluster_hits():  # the cluster histograms are not part of the histogram state
+            self.out_file_h5.create_array(checkpoint, name='cluster_size_hist', obj=self.clusterizer.get_cluster_size_hist())
+            self.out_file_h5.create_array(checkpoint, name='cluster_tot_hist', obj=self.clusterizer.get_cluster_tot_hist())
+
+    def _load_checkpoint(self):
+        '''Loads the interpretation state from the Checkpoint group of the output file (see interpret_word_table).
+        '''
+        try:
+            checkpoint = self.out_file_h5.root.Checkpoint
+        except tb.exceptions.NoSuchNodeError:
+            raise analysis_utils.IncompleteInputError('No checkpoint in %s' % self._analyzed_data_file)
+        state = {
+            'raw_data_file_index': int(checkpoint._v_attrs.raw_data_file_index),
+            'interpreter_state': checkpoint.interpreter_state[:].tostring(),
+            'histogram_state': checkpoint.histogram_state[:].tostring(),
+            'meta_event_index': checkpoint.meta_event_index[:],
+            'cluster_size_hist': checkpoint.cluster_size_hist[:] if 'cluster_size_hist' in checkpoint else None,
+            'cluster_tot_hist': checkpoint.cluster_tot_hist[:] if 'cluster_tot_hist' in checkpoint else None
+        }
+        return state
+
 
     def _create_additional_data(self):
         logging.info('Create selected event histograms')
@@ -690,11 +834,17 @@ class AnalyzeRawData(object):
                     rel_bcid_hist_table = self.out_file_h5.createCArray(self.out_file_h5.root, name='HistRelBcid', title='relative BCID Histogram', atom=tb.Atom.from_dtype(self.rel_bcid_hist.dtype), shape=self.rel_bcid_hist.shape, filters=self._filter_table)
                     rel_bcid_hist_table[:] = self.rel_bcid_hist
         if (self._create_occupancy_hist):
-            self.occupancy = self.histograming.get_occupancy()
-            self.occupancy_array = np.swapaxes(self.occupancy, 0, 1)
             if (self._analyzed_data_file is not None and safe_to_file):
-                occupancy_array_table = self.out_file_h5.createCArray(self.out_file_h5.root, name='HistOcc', title='Occupancy Histogram', atom=tb.Atom.from_dtype(self.occupancy.dtype), shape=(336, 80, self.histograming.get_n_parameters()), filters=self._filter_table)
-                occupancy_array_table[0:336, 0:80, 0:self.histograming.get_n_parameters()] = self.occupancy_array  # swap axis col,row,parameter --> row, col,parameter
+                n_parameters = self.histograming.get_n_parameters()
+                if n_parameters > 1 and self.histograming.get_occupancy_fill_ratio() < 0.5:  # sparse occupancy histogram, only the parameters with hits are written, chunks without hits are not stored in the file
+                    occupancy_array_table = self.out_file_h5.createCArray(self.out_file_h5.root, name='HistOcc', title='Occupancy Histogram', atom=tb.UInt32Atom(), shape=(336, 80, n_parameters), chunkshape=(336, 80, 1), filters=self._filter_table)
+                    for parameter_index in range(n_parameters):
+                        occupancy = self.histograming.get_occupancy_parameter(parameter_index)
+                        if occupancy is not None:
+                            occupancy_array_table[:, :, parameter_index] = occupancy.T  # swap axis col,row --> row, col
+                else:
+                    occupancy_array_table = self.out_file_h5.createCArray(self.out_file_h5.root, name='HistOcc', title='Occupancy Histogram', atom=tb.UInt32Atom(), shape=(336, 80, n_parameters), filters=self._filter_table)
+                    occupancy_array_table[0:336, 0:80, 0:n_parameters] = self.occupancy_array  # swap axis col,row,parameter --> row, col,parameter
         if (self._create_threshold_hists):
             threshold = np.zeros(80 * 336, dtype=np.float64)
             noise = np.zeros(80 * 336, dtype=np.float64)
@@ -813,6 +963,8 @@ class AnalyzeRawData(object):
 
         for hits, index in analysis_utils.data_aligned_at_events(in_file_h5.root.Hits, chunk_size=self._chunk_size):
             n_hits += hits.shape[0]
+            if hits.dtype.names == tb.dtype_from_descr(data_struct.HitColumnsTable).names:  # reduced hit table (see create_hit_columns)
+                hits = tuple(hits[name] for name in hits.dtype.names)
 
             if (self.is_cluster_hits()):
                 self.cluster_hits(hits)
@@ -843,7 +995,7 @@ class AnalyzeRawData(object):
         n_hits = hits.shape[0]
         logging.debug('Analyze %d hits' % n_hits)
 
-        if(self._create_cluster_table):
+        if(self._create_cluster_table):  # the clusterizer fills the given arrays, they do not grow since there are never more clusters (cluster hits) than hits
             cluster = np.zeros((n_hits,), dtype=dtype_from_descr(data_struct.ClusterInfoTable))
             self.clusterizer.set_cluster_info_array(cluster)
         else:
@@ -872,16 +1024,24 @@ class AnalyzeRawData(object):
             logging.debug('Histogram hits')
             self.histogram_hits(hits)
 
+        if cluster is not None:
+            cluster = cluster[:self.clusterizer.get_cluster().shape[0]]
+        if cluster_hits is not None:
+            cluster_hits = cluster_hits[:self.clusterizer.get_hit_cluster().shape[0]]
         return cluster, cluster_hits
 
     def cluster_hits(self, hits, start_index=0, stop_index=None):
-        if stop_index is not None:
+        if isinstance(hits, tuple):  # hit columns (see create_hit_columns)
+            self.clusterizer.add_hits_columns(*[np.ascontiguousarray(hit_column[start_index:stop_index]) for hit_column in hits])
+        elif stop_index is not None:
             self.clusterizer.add_hits(hits[start_index:stop_index])
         else:
             self.clusterizer.add_hits(hits[start_index:])
 
     def histogram_hits(self, hits, start_index=0, stop_index=None):
-        if stop_index is not None:
+        if isinstance(hits, tuple):  # hit columns (see create_hit_columns)
+            self.histograming.add_hits_columns(*[np.ascontiguousarray(hit_column[start_index:stop_index]) for hit_column in hits])
+        elif stop_index is not None:
             self.histograming.add_hits(hits[start_index:stop_index])
         else:
             self.histograming.add_hits(hits[start_index:])
@@ -949,10 +1109,11 @@ class AnalyzeRawData(object):
             plotting.plotThreeWay(hist=threshold_hist, title='Threshold (S-curve fit%s' % ((', masked %i pixel(s))' % mask_cnt) if self._create_fitted_threshold_mask else ')'), x_axis_title="threshold [PlsrDAC]", filename=output_pdf, bins=100, minimum=0, maximum=maximum)
             plotting.plotThreeWay(hist=noise_hist, title='Noise (S-curve fit%s' % ((', masked %i pixel(s))' % mask_cnt) if self._create_fitted_threshold_mask else ')'), x_axis_title="noise [PlsrDAC]", filename=output_pdf, bins=100, minimum=0, maximum=maximum)
         if (self._create_occupancy_hist):
+            occupancy_hist = out_file_h5.root.HistOcc[:, :, :] if out_file_h5 is not None else self.occupancy_array  # the occupancy array is created once
             if(self._create_threshold_hists):
-                plotting.plot_scurves(occupancy_hist=out_file_h5.root.HistOcc[:, :, :] if out_file_h5 is not None else self.occupancy_array[:, :, :], filename=output_pdf, scan_parameters=np.linspace(np.amin(self.scan_parameters['PlsrDAC']), np.amax(self.scan_parameters['PlsrDAC']), num=self.histograming.get_n_parameters(), endpoint=True))
+                plotting.plot_scurves(occupancy_hist=occupancy_hist, filename=output_pdf, scan_parameters=np.linspace(np.amin(self.scan_parameters['PlsrDAC']), np.amax(self.scan_parameters['PlsrDAC']), num=self.histograming.get_n_parameters(), endpoint=True))
             else:
-                hist = np.sum(out_file_h5.root.HistOcc[:], axis=2) if out_file_h5 is not None else np.sum(self.occupancy_array[:], axis=2)
+                hist = np.sum(occupancy_hist, axis=2)
                 occupancy_array_masked = np.ma.masked_equal(hist, 0)
                 if self._create_source_scan_hist:
                     plotting.plot_fancy_occupancy(hist=occupancy_array_masked, filename=output_pdf, z_max='median')
@@ -1000,14 +1161,14 @@ class AnalyzeRawData(object):
             output_pdf.close()
 
     def fit_scurves(self, hit_table_file=None, PlsrDAC=None):
-        occupancy_hist = hit_table_file.root.HistOcc[:, :, :] if hit_table_file is not None else self.occupancy_array[:, :, :]  # take data from RAM if no file was opened
+        occupancy_hist = hit_table_file.root.HistOcc[:, :, :] if hit_table_file is not None else self.occupancy_array  # take data from RAM if no file was opened
         occupancy_hist_shaped = occupancy_hist.reshape(occupancy_hist.shape[0] * occupancy_hist.shape[1], occupancy_hist.shape[2])
         result_array = np.array(fit_scurves_subset(occupancy_hist_shaped[:], PlsrDAC=PlsrDAC))
         return result_array.reshape(occupancy_hist.shape[0], occupancy_hist.shape[1], 2)
 
     def fit_scurves_multithread(self, hit_table_file=None, PlsrDAC=None):
         logging.info("Start S-curve fit on %d CPU core(s)" % mp.cpu_count())
-        occupancy_hist = hit_table_file.root.HistOcc[:, :, :] if hit_table_file is not None else self.occupancy_array[:, :, :]  # take data from RAM if no file is opened
+        occupancy_hist = hit_table_file.root.HistOcc[:, :, :] if hit_table_file is not None else self.occupancy_array  # take data from RAM if no file is opened
         occupancy_hist_shaped = occupancy_hist.reshape(occupancy_hist.shape[0] * occupancy_hist.shape[1], occupancy_hist.shape[2])
         partialfit_scurve = partial(fit_scurve, PlsrDAC=PlsrDAC)  # trick to give a function more than one parameter, needed for pool.map
         pool = mp.Pool(processes=mp.cpu_count())  # create as many workers as physical cores are available
@@ -1042,8 +1203,9 @@ class AnalyzeRawData(object):
         '''Tries to get the scan parameters needed for analysis from the raw data file
         '''
         try:  # take FE flavor info from raw data file, if this info is there
-            flavor = opened_raw_data_file.root.configuration.miscellaneous[:][np.where(opened_raw_data_file.root.configuration.miscellaneous[:]['name'] == 'Flavor')]['value'][0]
-            bcid = opened_raw_data_file.root.configuration.global_register[:][np.where(opened_raw_data_file.root.configuration.global_register[:]['name'] == 'Trig_Count')]['value'][0]
+            with open_configuration_group(opened_raw_data_file) as configuration_group:  # configuration can be stored in another file of the same run
+                flavor = configuration_group.miscellaneous[:][np.where(configuration_group.miscellaneous[:]['name'] == 'Flavor')]['value'][0]
+                bcid = configuration_group.global_register[:][np.where(configuration_group.global_register[:]['name'] == 'Trig_Count')]['value'][0]
             self.fei4b = False if str(flavor) == 'fei4a' else True
             self.n_bcid = int(bcid)
 #             logging.info('Use settings from raw data file: flavor: %s, consecutive triggers: %d' % ('fei4b' if self.fei4b else 'fei4a', self.n_bcid))
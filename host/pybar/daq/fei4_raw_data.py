@@ -1,12 +1,67 @@
 import logging
 from sys import maxint
 import glob
-from threading import RLock
+import sys
+from threading import RLock, Condition, Thread
+from collections import deque
+from contextlib import contextmanager
+from time import time
+import yaml
+import numpy as np
 import tables as tb
 import os.path
 from os import remove
 
 from pybar.analysis.RawDataConverter.data_struct import MetaTableV2 as MetaTable, generate_scan_parameter_description
+from pybar.daq.raw_data_journal import RawDataJournal
+from pybar.daq.flat_raw_data import FlatRawDataWriter
+
+
+# compression settings of the raw data array and the tables (meta data, scan parameters)
+storage_profiles = {
+    'default': {
+        'raw_data': dict(complib='blosc', complevel=5),
+        'tables': dict(complib='zlib', complevel=5)
+    },
+    'fast-ingest': {  # lowest CPU load during data taking
+        'raw_data': dict(complib='blosc:lz4', complevel=1, shuffle=True),
+        'tables': dict(complib='blosc:lz4', complevel=1, shuffle=True)
+    },
+    'archive': {  # smallest file size
+        'raw_data': dict(complib='blosc:zstd', complevel=7, shuffle=True),
+        'tables': dict(complib='blosc:zstd', complevel=7, shuffle=True)
+    }
+}
+
+
+def get_storage_profile(storage_profile):
+    '''Returns the compression filters of a storage profile.
+
+    Parameters
+    ----------
+    storage_profile : string, dict
+        Name of the storage profile (see storage_profiles) or dictionary with keys 'raw_data' and 'tables' containing the tables.Filters arguments.
+
+    Returns
+    -------
+    Tuple of tables.Filters for raw data and tables.
+    '''
+    if not isinstance(storage_profile, dict):
+        try:
+            storage_profile = storage_profiles[storage_profile]
+        except KeyError:
+            raise ValueError('Unknown storage profile: %s (available: %s)' % (storage_profile, ', '.join(sorted(storage_profiles.iterkeys()))))
+    return tb.Filters(fletcher32=False, **storage_profile['raw_data']), tb.Filters(fletcher32=False, **storage_profile['tables'])
+
+
+def get_chunkshape(words_per_readout):
+    '''Returns the chunk shape of the raw data array for the expected number of data words per readout.
+
+    The chunk size is the next power of two which is larger than the number of words per readout, limited to a range from 64kB to 1MB.
+    '''
+    if not words_per_readout:
+        return None
+    return (min(max(2 ** int(np.ceil(np.log2(words_per_readout))), 2 ** 14), 2 ** 18),)
 
 
 def open_raw_data_file(filename, mode="w", title="", scan_parameters=None, **kwargs):
@@ -23,11 +78,67 @@ def open_raw_data_file(filename, mode="w", title="", scan_parameters=None, **kwa
     return RawDataFile(filename=filename, mode=mode, title=title, scan_parameters=scan_parameters, **kwargs)
 
 
+@contextmanager
+def open_configuration_group(h5_file):
+    '''Returns the configuration group of a raw data file.
+
+    After a file change the configuration group is an external link to the group of the first file of the run.
+    The link is dereferenced and the linked file is closed when leaving the context. The data has to be copied out inside the context.
+
+    Examples:
+    with open_configuration_group(h5_file) as configuration_group:
+        run_conf = configuration_group.run_conf[:]
+    '''
+    configuration_group = h5_file.root.configuration
+    if isinstance(configuration_group, tb.link.ExternalLink):  # configuration is stored in another file of the same run
+        link = configuration_group
+        try:
+            yield link()
+        finally:
+            link.umount()
+    else:
+        yield configuration_group
+
+
 class RawDataFile(object):
     '''Raw data file object. Saving data queue to HDF5 file.
+
+    The meta data and scan parameter rows are buffered in numpy arrays and written with one Table.append() call.
+    The buffers are written if they are full, if the time since the last write exceeds flush_interval, on flush() and on close().
+    Set buffer_size to 0 to write the rows one by one.
+
+    If async_write is True, append_item() only puts the data into a queue and returns immediately. A writer thread does the compression and the file I/O.
+    The queue is limited to max_memory bytes, append_item() blocks if the limit is reached. Pending data is written on flush() and on close().
+    Exceptions in the writer thread are passed to errback (same signature as in FifoReadout) or logged if no errback is given.
+
+    The compression is selected by storage_profile (see storage_profiles). The chunk shape of the raw data array is derived from words_per_readout,
+    expected_words is the expected total number of data words of the file. If not given, PyTables defaults are used.
+
+    On a file change (new_file or file size limit) the configuration nodes are not copied, the new file contains external links to the
+    configuration nodes of the previous file(s). All files of a run are listed in the manifest file (<base filename>_manifest.yaml).
+
+    If journal is True, all data is additionally written to an append-only journal (<base filename>.journal, see pybar.daq.raw_data_journal),
+    which is written to disk every journal_fsync_interval seconds. The journal is deleted when the raw data file is closed successfully.
+    In append mode ('a', 'r+') the records are appended to an existing journal, every file of the run is recovered from the journal.
+
+    If raw_data_format is 'flat', the raw data words and the meta data are written uncompressed to flat files (see pybar.daq.flat_raw_data)
+    instead of the raw_data node. The meta data and scan parameter tables and the configuration are still written to the HDF5 file.
     '''
-    def __init__(self, filename, mode="w", title='', scan_parameters=None, **kwargs):  # mode="r+" to append data, raw_data_file_h5 must exist, "w" to overwrite raw_data_file_h5, "a" to append data, if raw_data_file_h5 does not exist it is created):
+    def __init__(self, filename, mode="w", title='', scan_parameters=None, buffer_size=1000, flush_interval=1.0, async_write=False, max_memory=256 * 1024 * 1024, errback=None, storage_profile='default', words_per_readout=None, expected_words=None, journal=False, journal_fsync_interval=1.0, raw_data_format='hdf5', **kwargs):  # mode="r+" to append data, raw_data_file_h5 must exist, "w" to overwrite raw_data_file_h5, "a" to append data, if raw_data_file_h5 does not exist it is created):
         self.lock = RLock()
+        if raw_data_format not in ('hdf5', 'flat'):
+            raise ValueError('Unknown raw data format: %s' % raw_data_format)
+        self.raw_data_format = raw_data_format
+        if raw_data_format == 'flat' and not buffer_size:
+            buffer_size = 1  # flat meta data is written from buffer
+        self.buffer_size = buffer_size  # number of buffered meta data rows
+        self.flush_interval = flush_interval  # maximum time in seconds between writing buffered meta data rows
+        self.async_write = async_write
+        self.max_memory = max_memory  # maximum size of the write queue in bytes
+        self.errback = errback
+        self.filter_raw_data, self.filter_tables = get_storage_profile(storage_profile)
+        self.chunkshape = get_chunkshape(words_per_readout)
+        self.expected_words = expected_words
         if os.path.splitext(filename)[1].strip().lower() != '.h5':
             self.base_filename = filename
         else:
@@ -42,8 +153,17 @@ class RawDataFile(object):
         self.meta_data_table = None
         self.scan_param_table = None
         self.h5_file = None
+        self._meta_data_buffer = None
+        self._scan_param_buffer = None
+        self._n_buffered_rows = 0
+        self._last_write_time = time()
+        self._write_queue = deque()
+        self._write_condition = Condition()
+        self._queued_bytes = 0
+        self._n_pending = 0  # items in queue or being written
+        self.writer_thread = None
         if mode and mode[0] == 'w':
-            h5_files = glob.glob(os.path.splitext(filename)[0] + '*.h5')
+            h5_files = glob.glob(os.path.splitext(filename)[0] + '*.h5') + glob.glob(os.path.splitext(filename)[0] + '*.raw') + glob.glob(os.path.splitext(filename)[0] + '*.meta') + glob.glob(os.path.splitext(filename)[0] + '_manifest.yaml')  # including stale flat raw data files
             if h5_files:
                 logging.info('Removing following file(s): %s' % ', '.join(h5_files))
             for h5_file in h5_files:
@@ -51,7 +171,17 @@ class RawDataFile(object):
         # list of filenames and index
         self.curr_filename = self.base_filename
         self.filenames = {self.curr_filename: 0}
+        self.manifest_filename = self.base_filename + '_manifest.yaml'
+        self.files = []  # all opened files in order of creation
+        if journal:
+            self.journal = RawDataJournal(self.base_filename + '.journal', mode=mode, scan_parameters=self.scan_parameters, fsync_interval=journal_fsync_interval)
+        else:
+            self.journal = None
         self.open(self.curr_filename, mode, title, **kwargs)
+        if self.async_write:
+            self.writer_thread = Thread(target=self.writer, name='RawDataFileWriterThread')
+            self.writer_thread.daemon = True
+            self.writer_thread.start()
 
     def __enter__(self):
         return self
@@ -68,13 +198,19 @@ class RawDataFile(object):
         else:
             logging.info('Opening new raw data file: %s' % filename)
 
-        filter_raw_data = tb.Filters(complib='blosc', complevel=5, fletcher32=False)
-        filter_tables = tb.Filters(complib='zlib', complevel=5, fletcher32=False)
+        filter_raw_data, filter_tables = self.filter_raw_data, self.filter_tables
         self.h5_file = tb.open_file(filename, mode=mode, title=title if title else filename, **kwargs)
-        try:
-            self.raw_data_earray = self.h5_file.createEArray(self.h5_file.root, name='raw_data', atom=tb.UIntAtom(), shape=(0,), title='raw_data', filters=filter_raw_data)  # expectedrows = ???
-        except tb.exceptions.NodeError:
-            self.raw_data_earray = self.h5_file.getNode(self.h5_file.root, name='raw_data')
+        if filename not in self.files:
+            self.files.append(filename)
+        if self.journal:
+            self.journal.new_file(filename)
+        if self.raw_data_format == 'flat':
+            self.raw_data_earray = FlatRawDataWriter(filename, mode=mode, scan_parameters=self.scan_parameters.keys())
+        else:
+            try:
+                self.raw_data_earray = self.h5_file.createEArray(self.h5_file.root, name='raw_data', atom=tb.UIntAtom(), shape=(0,), title='raw_data', filters=filter_raw_data, chunkshape=self.chunkshape, expectedrows=self.expected_words if self.expected_words else tb.parameters.EXPECTED_ROWS_EARRAY)
+            except tb.exceptions.NodeError:
+                self.raw_data_earray = self.h5_file.getNode(self.h5_file.root, name='raw_data')
         try:
             self.meta_data_table = self.h5_file.createTable(self.h5_file.root, name='meta_data', description=MetaTable, title='meta_data', filters=filter_tables)
         except tb.exceptions.NodeError:
@@ -85,14 +221,84 @@ class RawDataFile(object):
                 self.scan_param_table = self.h5_file.createTable(self.h5_file.root, name='scan_parameters', description=scan_param_descr, title='scan_parameters', filters=filter_tables)
             except tb.exceptions.NodeError:
                 self.scan_param_table = self.h5_file.getNode(self.h5_file.root, name='scan_parameters')
+        if self.buffer_size:
+            self._meta_data_buffer = np.empty(shape=(self.buffer_size,), dtype=self.meta_data_table.dtype)
+            if self.scan_parameters:
+                self._scan_param_buffer = np.empty(shape=(self.buffer_size,), dtype=self.scan_param_table.dtype)
+        self._n_buffered_rows = 0
+        self._last_write_time = time()
 
     def close(self):
+        if self.writer_thread is not None:
+            with self._write_condition:
+                self._write_queue.append(None)  # stop writer thread after writing all pending data
+                self._n_pending += 1
+                self._write_condition.notify_all()
+            self.writer_thread.join()
+            self.writer_thread = None
+        self._close()
+        if self.journal:
+            self.journal.close(remove=True)  # data safely stored
+
+    def _close(self):
         with self.lock:
-            self.flush()
+            self._flush()
             logging.info('Closing raw data file: %s' % self.h5_file.filename)
             self.h5_file.close()
+            if self.raw_data_format == 'flat':
+                self.raw_data_earray.close()
+
+    def writer(self):
+        '''Writer thread. Writing queued data to the file.
+        '''
+        logging.debug('Starting %s' % (self.writer_thread.name,))
+        while True:
+            with self._write_condition:
+                while not self._write_queue:
+                    self._write_condition.wait()
+                item = self._write_queue.popleft()
+            if item is None:
+                with self._write_condition:
+                    self._n_pending -= 1
+                    self._write_condition.notify_all()
+                break
+            data_tuple, scan_parameters, new_file, flush = item
+            try:
+                self._append_item(data_tuple, scan_parameters, new_file, flush)
+            except Exception:
+                if self.errback:
+                    self.errback(sys.exc_info())
+                else:
+                    logging.error('Error while writing raw data file', exc_info=True)
+            finally:
+                with self._write_condition:
+                    self._queued_bytes -= data_tuple[0].nbytes
+                    self._n_pending -= 1
+                    self._write_condition.notify_all()
+        logging.debug('Stopping %s' % (self.writer_thread.name,))
 
     def append_item(self, data_tuple, scan_parameters=None, new_file=False, flush=True):
+        if self.writer_thread is None:
+            self._append_item(data_tuple, scan_parameters, new_file, flush)
+            return
+        if scan_parameters:
+            # check for not existing keys
+            diff = set(scan_parameters).difference(set(self.scan_parameters))
+            if diff:
+                raise ValueError('Unknown scan parameter(s): %s' % ', '.join(diff))
+            scan_parameters = dict(scan_parameters)
+        data = data_tuple[0]
+        if data.base is not None:  # data might be a view into the readout buffer
+            data = data.copy()
+        with self._write_condition:
+            while self._queued_bytes and self._queued_bytes + data.nbytes > self.max_memory:
+                self._write_condition.wait()
+            self._write_queue.append(((data,) + tuple(data_tuple[1:]), scan_parameters, new_file, flush))
+            self._queued_bytes += data.nbytes
+            self._n_pending += 1
+            self._write_condition.notify_all()
+
+    def _append_item(self, data_tuple, scan_parameters=None, new_file=False, flush=True):
         with self.lock:
             if scan_parameters:
                 # check for not existing keys
@@ -110,13 +316,7 @@ class RawDataFile(object):
                         self.filenames[self.curr_filename] = 0  # add to dict
                     else:
                         filename = self.curr_filename + '_' + str(index) + '.h5'
-                    # copy nodes to new file
-                    nodes = self.h5_file.list_nodes('/', classname='Group')
-                    with tb.open_file(filename, mode='a', title=filename) as h5_file:  # append, since file can already exists when scan parameters are jumping back and forth
-                        for node in nodes:
-                            self.h5_file.copy_node(node, h5_file.root, overwrite=True, recursive=True)
-                    self.close()
-                    self.open(filename, 'a', filename)
+                    self._rollover(filename)
             total_words = self.raw_data_earray.nrows
             raw_data = data_tuple[0]
             len_raw_data = raw_data.shape[0]
@@ -124,39 +324,100 @@ class RawDataFile(object):
                     index = self.filenames.get(self.curr_filename, 0) + 1  # reached file size limit, increase index by one
                     self.filenames[self.curr_filename] = index  # update dict
                     filename = self.curr_filename + '_' + str(index) + '.h5'
-                    # copy nodes to new file
-                    nodes = self.h5_file.list_nodes('/', classname='Group')
-                    with tb.open_file(filename, mode='a', title=filename) as h5_file:  # append, since file can already exists when scan parameters are jumping back and forth
-                        for node in nodes:
-                            self.h5_file.copy_node(node, h5_file.root, overwrite=True, recursive=True)
-                    self.close()
-                    self.open(filename, 'a', filename)
+                    self._rollover(filename)
                     total_words = self.raw_data_earray.nrows  # in case of re-opening existing file
+            if self.journal:
+                self.journal.append(data_tuple, self.scan_parameters)
             self.raw_data_earray.append(raw_data)
-            self.meta_data_table.row['timestamp_start'] = data_tuple[1]
-            self.meta_data_table.row['timestamp_stop'] = data_tuple[2]
-            self.meta_data_table.row['error'] = data_tuple[3]
-            self.meta_data_table.row['data_length'] = len_raw_data
-            self.meta_data_table.row['index_start'] = total_words
-            total_words += len_raw_data
-            self.meta_data_table.row['index_stop'] = total_words
-            self.meta_data_table.row.append()
-            if self.scan_parameters:
-                for key in self.scan_parameters:
-                    self.scan_param_table.row[key] = self.scan_parameters[key]
-                self.scan_param_table.row.append()
+            if self.buffer_size:
+                index = self._n_buffered_rows
+                self._meta_data_buffer['timestamp_start'][index] = data_tuple[1]
+                self._meta_data_buffer['timestamp_stop'][index] = data_tuple[2]
+                self._meta_data_buffer['error'][index] = data_tuple[3]
+                self._meta_data_buffer['data_length'][index] = len_raw_data
+                self._meta_data_buffer['index_start'][index] = total_words
+                self._meta_data_buffer['index_stop'][index] = total_words + len_raw_data
+                if self.scan_parameters:
+                    for key in self.scan_parameters:
+                        self._scan_param_buffer[key][index] = self.scan_parameters[key]
+                self._n_buffered_rows += 1
+                if not flush and (self._n_buffered_rows == self.buffer_size or time() - self._last_write_time > self.flush_interval):
+                    self._write_buffers()
+            else:
+                self.meta_data_table.row['timestamp_start'] = data_tuple[1]
+                self.meta_data_table.row['timestamp_stop'] = data_tuple[2]
+                self.meta_data_table.row['error'] = data_tuple[3]
+                self.meta_data_table.row['data_length'] = len_raw_data
+                self.meta_data_table.row['index_start'] = total_words
+                total_words += len_raw_data
+                self.meta_data_table.row['index_stop'] = total_words
+                self.meta_data_table.row.append()
+                if self.scan_parameters:
+                    for key in self.scan_parameters:
+                        self.scan_param_table.row[key] = self.scan_parameters[key]
+                    self.scan_param_table.row.append()
             if flush:
-                self.flush()
+                self._flush()
+
+    def _rollover(self, filename):
+        '''Closing current file and opening new file. Configuration nodes (groups) are linked to the current file.
+        '''
+        links = []
+        for node in self.h5_file.list_nodes('/'):
+            if isinstance(node, tb.link.ExternalLink):
+                links.append((node._v_name, node.target))
+            elif isinstance(node, tb.group.Group):
+                links.append((node._v_name, os.path.basename(self.h5_file.filename) + ':' + node._v_pathname))
+        self._close()
+        self.open(filename, 'a', filename)  # append, since file can already exists when scan parameters are jumping back and forth
+        for name, target in links:
+            if name not in self.h5_file.root:
+                self.h5_file.create_external_link(self.h5_file.root, name, target)
+        self.write_manifest()
+
+    def write_manifest(self):
+        '''Writing list of files to manifest file.
+        '''
+        with open(self.manifest_filename, 'w') as f:
+            yaml.safe_dump({'files': [os.path.basename(filename) for filename in self.files]}, f, default_flow_style=False)
 
     def append(self, data_iterable, scan_parameters=None, flush=True):
+        if self.writer_thread is not None:  # do not hold the lock, writer thread needs it
+            for data_tuple in data_iterable:
+                self.append_item(data_tuple, scan_parameters, flush=False)
+            if flush:
+                self.flush()
+            return
         with self.lock:
             for data_tuple in data_iterable:
                 self.append_item(data_tuple, scan_parameters, flush=False)
             if flush:
                 self.flush()
 
+    def _write_buffers(self):
+        '''Writing buffered meta data and scan parameter rows to the tables.
+        '''
+        if self._n_buffered_rows:
+            self.meta_data_table.append(self._meta_data_buffer[:self._n_buffered_rows])
+            if self.scan_parameters:
+                self.scan_param_table.append(self._scan_param_buffer[:self._n_buffered_rows])
+            if self.raw_data_format == 'flat':
+                self.raw_data_earray.append_meta_data(self._meta_data_buffer[:self._n_buffered_rows], self._scan_param_buffer[:self._n_buffered_rows] if self.scan_parameters else None)
+            self._n_buffered_rows = 0
+        self._last_write_time = time()
+
     def flush(self):
+        '''Writing all pending data to the file. In asynchronous mode, waiting for the writer thread.
+        '''
+        if self.writer_thread is not None:
+            with self._write_condition:
+                while self._n_pending:
+                    self._write_condition.wait()
+        self._flush()
+
+    def _flush(self):
         with self.lock:
+            self._write_buffers()
             self.raw_data_earray.flush()
             self.meta_data_table.flush()
             if self.scan_parameters:
@@ -1,11 +1,13 @@
 import logging
 from time import sleep, time
-from threading import Thread, Event
-from collections import deque
+from threading import Thread, Event, Condition, Lock
+from collections import deque, OrderedDict
 from Queue import Queue, Empty
 import sys
+import numpy as np
 
 from pybar.utils.utils import get_float_time
+from pybar.daq.ring_buffer import RingBuffer, RingBufferOverrun
 
 
 data_iterable = ("data", "timestamp_start", "timestamp_stop", "error")
@@ -31,8 +33,121 @@ class StopTimeout(Exception):
     pass
 
 
+class DataConsumer(object):
+    '''Data consumer with its own worker thread and queue.
+
+    Every consumer receives the data tuples (data, timestamp_start, timestamp_stop, error) in order.
+    The policy defines what happens, if the queue is full (consumer falls behind):
+    'block': no data is discarded. Adding data waits until the consumer has taken data from the queue, the back-pressure goes to the dispatcher and thus to the readout buffer (ring buffer fill level) and the other consumers.
+    'drop-oldest': the oldest pending data tuple is discarded.
+    'sample': only every sample_interval-th new data tuple is queued (the oldest pending data tuple is discarded), the other data tuples are discarded.
+    '''
+    policies = ('block', 'drop-oldest', 'sample')
+
+    def __init__(self, callback, policy='block', max_queue_size=100, sample_interval=10, batch_callback=False):
+        '''
+        Parameters
+        ----------
+        callback : function
+            Function that is called for each data tuple.
+        policy : string
+            One of 'block', 'drop-oldest' and 'sample'.
+        max_queue_size : int
+            Maximum number of pending data tuples.
+        sample_interval : int
+            Sample interval for policy 'sample'.
+        batch_callback : bool
+            If True, the callback is called with a list of all pending data tuples.
+        '''
+        if policy not in self.policies:
+            raise ValueError('Unknown policy %s' % policy)
+        if max_queue_size < 1:
+            raise ValueError('Maximum queue size must be greater than 0')
+        self.name = None
+        self.callback = callback
+        self.policy = policy
+        self.max_queue_size = max_queue_size
+        self.sample_interval = sample_interval
+        self.batch_callback = batch_callback
+        self.thread = None
+        self._queue = deque()
+        self._condition = Condition()
+        self.reset()
+
+    def reset(self):
+        self._queue.clear()
+        self._n_behind = 0
+        self.n_data = 0
+        self.n_dropped = 0
+        self.high_water_mark = 0
+
+    def __len__(self):
+        return len(self._queue)
+
+    def put(self, index, data):
+        '''Adding data tuple to queue.
+
+        Returns
+        -------
+        List of indices of discarded data tuples.
+        '''
+        dropped = []
+        with self._condition:
+            if data is not None:
+                self.n_data += 1
+                if self.policy == 'block':
+                    while len(self._queue) >= self.max_queue_size:  # waiting for the consumer, get() notifies
+                        self._condition.wait()
+                elif len(self._queue) >= self.max_queue_size:
+                    self._n_behind += 1
+                    if self.policy == 'sample' and self._n_behind % self.sample_interval:
+                        dropped.append(index)
+                    else:
+                        dropped.append(self._queue.popleft()[0])
+                else:
+                    self._n_behind = 0
+            if not dropped or dropped[0] != index:
+                self._queue.append((index, data))
+                self._condition.notify()
+            if len(self._queue) > self.high_water_mark:
+                self.high_water_mark = len(self._queue)
+            self.n_dropped += len(dropped)
+        return dropped
+
+    def get(self):
+        '''Waiting for data and returning list of (index, data tuple).
+        '''
+        with self._condition:
+            while not self._queue:
+                self._condition.wait()
+            items = []
+            while self._queue:
+                items.append(self._queue.popleft())
+                if not self.batch_callback:
+                    break
+            self._condition.notify()  # put() may wait for free space
+        return items
+
+    def log_status(self):
+        logging.info('Data consumer %s: %d readout(s), %d discarded (policy %s), queue size %d, max. queue size %d' % (self.name, self.n_data, self.n_dropped, self.policy, len(self._queue), self.high_water_mark))
+
+
 class FifoReadout(object):
-    def __init__(self, dut):
+    def __init__(self, dut, ring_buffer_size=None, ring_buffer_max_chunks=2 ** 16, adaptive_readout_interval=False):
+        '''
+        Parameters
+        ----------
+        dut : basil.dut.Dut
+            DUT object.
+        ring_buffer_size : int
+            If given, a preallocated ring buffer of given size (in data words) is used instead of a collections.deque.
+            The data chunks are zero-copy views into the ring buffer and the memory is bounded.
+        ring_buffer_max_chunks : int
+            Maximum number of data chunks (readouts) in the ring buffer.
+        adaptive_readout_interval : bool
+            If True, the readout interval is adjusted to the data rate, keeping the SRAM FIFO fill level below sram_fill_target.
+            The interval is limited by readout_interval_min and readout_interval_max.
+        '''
         self.dut = dut
         self.callback = None
         self.errback = None
@@ -40,9 +155,26 @@ class FifoReadout(object):
         self.worker_thread = None
         self.watchdog_thread = None
         self.readout_interval = 0.05
+        self.adaptive_readout_interval = adaptive_readout_interval
+        self.readout_interval_min = 0.005
+        self.readout_interval_max = 0.5
+        self.sram_size = self.get_sram_size()  # SRAM FIFO size in bytes
+        self.sram_fill_target = 0.25  # target SRAM FIFO fill level (fraction of sram_size) for adaptive readout interval
+        self._default_readout_interval = self.readout_interval
+        self._words_per_second = None  # smoothed data rate
+        self._readout_interval_history = deque(maxlen=10000)
         self._moving_average_time_period = 10.0
-        self._data_deque = deque()
-        self._words_per_read = deque(maxlen=int(self._moving_average_time_period / self.readout_interval))
+        if ring_buffer_size:
+            self._data_deque = RingBuffer(size=ring_buffer_size, max_chunks=ring_buffer_max_chunks)
+        else:
+            self._data_deque = deque()
+        self._words_per_read = deque(maxlen=int(self._moving_average_time_period / self.readout_interval_min))
+        self._data_condition = Condition()  # notifying worker thread about new data
+        self.consumers = OrderedDict()
+        self._release_lock = Lock()
+        self._release_counts = deque()  # number of consumers still using the data, for each dispatched data tuple
+        self._release_index = 0  # index of the first element in self._release_counts
+        self._batch_callback = False
         self._result = Queue(maxsize=1)
         self._calculate = Event()
         self.stop_readout = Event()
@@ -68,6 +200,25 @@ class FifoReadout(object):
     def data(self):
         return self._data_deque
 
+    @property
+    def ring_buffer(self):
+        '''Ring buffer object (pybar.daq.ring_buffer.RingBuffer) or None if collections.deque is used.
+        '''
+        if isinstance(self._data_deque, RingBuffer):
+            return self._data_deque
+        else:
+            return None
+
+    @property
+    def readout_interval_history(self):
+        '''History of the readout interval.
+
+        Returns
+        -------
+        numpy.recarray with fields timestamp, readout_interval and sram_fill_level (fraction of SRAM FIFO size at the time of the readout).
+        '''
+        return np.rec.fromrecords(list(self._readout_interval_history), dtype=[('timestamp', np.float64), ('readout_interval', np.float64), ('sram_fill_level', np.float64)]) if self._readout_interval_history else np.recarray(shape=(0,), dtype=[('timestamp', np.float64), ('readout_interval', np.float64), ('sram_fill_level', np.float64)])
+
     def data_words_per_second(self):
         if self._result.full():
             self._result.get()
@@ -79,13 +230,41 @@ class FifoReadout(object):
             return None
         return result / float(self._moving_average_time_period)
 
-    def start(self, callback=None, errback=None, reset_rx=False, reset_sram_fifo=False, clear_buffer=False, no_data_timeout=None):
+    def start(self, callback=None, errback=None, reset_rx=False, reset_sram_fifo=False, clear_buffer=False, no_data_timeout=None, batch_callback=False, consumers=None):
+        '''Starting FIFO readout.
+
+        Parameters
+        ----------
+        callback : function
+            Function that is called from the worker thread for each data tuple (data, timestamp_start, timestamp_stop, error).
+            The worker thread is woken up immediately when new data is available.
+        errback : function
+            Function that is called with sys.exc_info() in case of an error.
+        batch_callback : bool
+            If True, the callback is called with a list of all pending data tuples instead of a single data tuple.
+        consumers : dict
+            Dictionary of named data consumers (name: DataConsumer object or function). Each consumer has its own thread and receives every data tuple.
+            Can be used instead of callback, e.g. {'file': DataConsumer(handle_data, policy='block'), 'network': DataConsumer(send_data, policy='drop-oldest')}.
+        '''
         if self._is_running:
             raise RuntimeError('Readout already running: use stop() before start()')
+        if callback and consumers:
+            raise ValueError('Use either callback or consumers')
         self._is_running = True
         logging.info('Starting FIFO readout...')
         self.callback = callback
         self.errback = errback
+        self._batch_callback = batch_callback
+        self.consumers = OrderedDict()
+        if consumers:
+            for name, consumer in consumers.items():
+                if not isinstance(consumer, DataConsumer):
+                    consumer = DataConsumer(consumer)
+                consumer.name = name
+                consumer.reset()
+                self.consumers[name] = consumer
+        self._release_counts.clear()
+        self._release_index = 0
         if reset_rx:
             self.reset_rx()
         if reset_sram_fifo:
@@ -95,6 +274,10 @@ class FifoReadout(object):
             if fifo_size != 0:
                 logging.warning('SRAM FIFO not empty when starting FIFO readout: size = %i' % fifo_size)
         self._words_per_read.clear()
+        if self.adaptive_readout_interval:
+            self.readout_interval = self._default_readout_interval
+            self._words_per_second = None
+            self._readout_interval_history.clear()
         if clear_buffer:
             self._data_deque.clear()
         self.stop_readout.clear()
@@ -107,6 +290,14 @@ class FifoReadout(object):
             self.worker_thread = Thread(target=self.worker, name='WorkerThread')
             self.worker_thread.daemon = True
             self.worker_thread.start()
+        elif self.consumers:
+            for consumer in self.consumers.values():
+                consumer.thread = Thread(target=self.consumer_worker, name='%sConsumerThread' % consumer.name.title().replace('-', '').replace('_', ''), args=(consumer,))
+                consumer.thread.daemon = True
+                consumer.thread.start()
+            self.worker_thread = Thread(target=self.dispatcher, name='DispatcherThread')
+            self.worker_thread.daemon = True
+            self.worker_thread.start()
         self.readout_thread = Thread(target=self.readout, name='ReadoutThread', kwargs={'no_data_timeout': no_data_timeout})
         self.readout_thread.daemon = True
         self.readout_thread.start()
@@ -133,8 +324,10 @@ class FifoReadout(object):
             self.readout_thread.join()
         if self.errback:
             self.watchdog_thread.join()
-        if self.callback:
+        if self.callback or self.consumers:
             self.worker_thread.join()
+        for consumer in self.consumers.values():
+            consumer.thread.join()
         self.callback = None
         self.errback = None
         logging.info('Stopped FIFO readout')
@@ -144,7 +337,14 @@ class FifoReadout(object):
         discard_count = self.get_rx_fifo_discard_count()
         error_count = self.get_rx_8b10b_error_count()
         logging.info('Data queue size: %d' % len(self._data_deque))
+        if self.ring_buffer is not None:
+            self.ring_buffer.log_status()
         logging.info('SRAM FIFO size: %d' % self.dut['sram']['FIFO_SIZE'])
+        for consumer in self.consumers.values():
+            consumer.log_status()
+        if self.adaptive_readout_interval and self._readout_interval_history:
+            history = self.readout_interval_history
+            logging.info('Readout interval: %.3fs (min %.3fs, max %.3fs), max. SRAM FIFO fill level: %.1f%%' % (self.readout_interval, np.min(history['readout_interval']), np.max(history['readout_interval']), 100.0 * np.max(history['sram_fill_level'])))
         logging.info('Channel:                     %s', " | ".join([('CH%d' % channel).rjust(3) for channel in range(1, len(sync_status) + 1, 1)]))
         logging.info('RX sync:                     %s', " | ".join(["YES".rjust(3) if status is True else "NO".rjust(3) for status in sync_status]))
         logging.info('RX FIFO discard counter:     %s', " | ".join([repr(count).rjust(3) for count in discard_count]))
@@ -155,11 +355,12 @@ class FifoReadout(object):
     def readout(self, no_data_timeout=None):
         '''Readout thread continuously reading SRAM.
 
-        Readout thread, which uses read_data() and appends data to self._data_deque (collection.deque).
+        Readout thread, which uses read_data() and appends data to self._data_deque (collection.deque or ring buffer).
         '''
         logging.debug('Starting %s' % (self.readout_thread.name,))
         curr_time = get_float_time()
         time_wait = 0.0
+        time_last_read = None
         while not self.force_stop.wait(time_wait if time_wait >= 0.0 else 0.0):
             try:
                 time_read = time()
@@ -179,41 +380,177 @@ class FifoReadout(object):
                 if data_words > 0:
                     last_time, curr_time = self.update_timestamp()
                     status = 0
-                    self._data_deque.append((data, last_time, curr_time, status))
-                    self._words_per_read.append(data_words)
+                    try:
+                        with self._data_condition:
+                            self._data_deque.append((data, last_time, curr_time, status))  # the ring buffer copies the data words of the USB read buffer into a slot (see read_data())
+                            self._data_condition.notify()
+                    except RingBufferOverrun:
+                        if self.errback:
+                            self.errback(sys.exc_info())
+                        else:
+                            raise
+                    self._words_per_read.append((time_read, data_words))
                 elif self.stop_readout.is_set():
                     break
                 else:
-                    self._words_per_read.append(0)
+                    self._words_per_read.append((time_read, 0))
+                if self.adaptive_readout_interval:
+                    self.update_readout_interval(data_words, time_read - time_last_read if time_last_read else None)
             finally:
+                time_last_read = time_read
                 time_wait = self.readout_interval - (time() - time_read)
             if self._calculate.is_set():
                 self._calculate.clear()
-                self._result.put(sum(self._words_per_read))
-        if self.callback:
-            self._data_deque.append(None)  # last item, will stop worker
+                self._result.put(sum([words for time_words, words in self._words_per_read if time_words > time_read - self._moving_average_time_period]))
+        if self.callback or self.consumers:
+            with self._data_condition:
+                self._data_deque.append(None)  # last item, will stop worker
+                self._data_condition.notify()
         logging.debug('Stopped %s' % (self.readout_thread.name,))
 
+    def get_sram_size(self):
+        '''Returns the SRAM FIFO size in bytes.
+
+        The size is taken from the key size of the SRAM FIFO in the DUT configuration.
+        If the key is not given, the 2 MB SRAM of the USBpix board is assumed.
+        '''
+        try:
+            return int(self.dut['sram']._conf['size'])
+        except (KeyError, AttributeError, TypeError, ValueError):
+            return 2 * 1024 * 1024
+
+    def update_readout_interval(self, data_words, time_elapsed):
+        '''Calculating the readout interval from the data rate.
+
+        The number of words that were read is the SRAM FIFO fill level at the time of the readout.
+        The new interval is chosen so that the expected fill level at the next readout reaches sram_fill_target.
+
+        Parameters
+        ----------
+        data_words : int
+            Number of data words of the last readout.
+        time_elapsed : float
+            Time since the previous readout in seconds.
+        '''
+        sram_fill_level = data_words * 4 / float(self.sram_size)
+        if time_elapsed:
+            words_per_second = data_words / time_elapsed
+            if self._words_per_second is None or words_per_second > self._words_per_second:
+                self._words_per_second = words_per_second  # react immediately to rising rates
+            else:
+                self._words_per_second = 0.5 * (self._words_per_second + words_per_second)
+            target_words = self.sram_fill_target * self.sram_size / 4.0
+            if self._words_per_second > 0:
+                readout_interval = target_words / self._words_per_second
+            else:
+                readout_interval = self.readout_interval_max
+            if sram_fill_level > self.sram_fill_target:
+                readout_interval = min(readout_interval, self.readout_interval / 2.0)
+            self.readout_interval = min(max(readout_interval, self.readout_interval_min), self.readout_interval_max)
+        self._readout_interval_history.append((get_float_time(), self.readout_interval, sram_fill_level))
+
     def worker(self):
         '''Worker thread continuously calling callback function when data is available.
+
+        The worker thread is waiting for a notification from the readout thread. In batch mode, all pending data is taken from the queue at once.
         '''
         logging.debug('Starting %s' % (self.worker_thread.name,))
         while True:
-            try:
-                data = self._data_deque.popleft()
-            except IndexError:
-                self.stop_readout.wait(self.readout_interval)  # sleep a little bit, reducing CPU usage
-            else:
-                if data is None:  # if None then exit
-                    break
-                else:
-                    try:
-                        self.callback(data)
-                    except Exception:
+            with self._data_condition:
+                while not self._data_deque:
+                    self._data_condition.wait()
+                data_list = []
+                while self._data_deque:
+                    data_list.append(self._data_deque.popleft())
+                    if not self._batch_callback:
+                        break
+            stop_worker = data_list[-1] is None  # if None then exit
+            if stop_worker:
+                data_list.pop()
+            if data_list:
+                try:
+                    if self._batch_callback:
+                        self.callback(data_list)
+                    else:
+                        self.callback(data_list[0])
+                except Exception:
+                    if self.errback:
                         self.errback(sys.exc_info())
+                    else:
+                        logging.exception('Error in callback')  # keep the worker thread alive, otherwise the readout cannot be stopped
+                finally:
+                    if self.ring_buffer is not None:
+                        self.ring_buffer.release(len(data_list))  # data not used anymore
+            if stop_worker:
+                if self.ring_buffer is not None:
+                    self.ring_buffer.release()
+                break
+        logging.debug('Stopped %s' % (self.worker_thread.name,))
 
+    def dispatcher(self):
+        '''Dispatcher thread distributing data to all consumers.
+
+        The dispatcher waits only for consumers with policy 'block' and a full queue. The data is released when all consumers are done with it.
+        '''
+        logging.debug('Starting %s' % (self.worker_thread.name,))
+        index = 0
+        while True:
+            with self._data_condition:
+                while not self._data_deque:
+                    self._data_condition.wait()
+                data = self._data_deque.popleft()
+            with self._release_lock:
+                self._release_counts.append(len(self.consumers) if data is not None else 0)
+            for consumer in self.consumers.values():
+                for dropped_index in consumer.put(index, data):
+                    self._release_data(dropped_index)
+            index += 1
+            if data is None:  # if None then exit
+                self._release_data()
+                break
         logging.debug('Stopped %s' % (self.worker_thread.name,))
 
+    def consumer_worker(self, consumer):
+        '''Consumer thread calling the consumer's callback function when data is available.
+        '''
+        logging.debug('Starting %s' % (consumer.thread.name,))
+        while True:
+            items = consumer.get()
+            stop_worker = items[-1][1] is None  # if None then exit
+            if stop_worker:
+                items.pop()
+            if items:
+                try:
+                    if consumer.batch_callback:
+                        consumer.callback([data for _, data in items])
+                    else:
+                        consumer.callback(items[0][1])
+                except Exception:
+                    if self.errback:
+                        self.errback(sys.exc_info())
+                    else:
+                        logging.exception('Error in data consumer %s' % consumer.name)  # keep the consumer thread alive, otherwise the dispatcher waits for a full queue
+                finally:
+                    for index, _ in items:
+                        self._release_data(index)
+            if stop_worker:
+                break
+        logging.debug('Stopped %s' % (consumer.thread.name,))
+
+    def _release_data(self, index=None):
+        '''Marking data as done for one consumer and releasing data, which is not used anymore, in order.
+        '''
+        n_release = 0
+        with self._release_lock:
+            if index is not None:
+                self._release_counts[index - self._release_index] -= 1
+            while self._release_counts and self._release_counts[0] == 0:
+                self._release_counts.popleft()
+                self._release_index += 1
+                n_release += 1
+        if n_release and self.ring_buffer is not None:
+            self.ring_buffer.release(n_release)
+
     def watchdog(self):
         logging.debug('Starting %s' % (self.watchdog_thread.name,))
         while True:
@@ -235,6 +572,9 @@ class FifoReadout(object):
 
         Can be used without threading.
 
+        The data words are the words of the USB read buffer of the SRAM FIFO driver. With the ring buffer they are copied once into the ring buffer
+        by the readout thread, the driver cannot read into a given array (ring buffer slot).
+
         Returns
         -------
         data : list
@@ -0,0 +1,188 @@
+''' Uncompressed flat raw data format. The raw data words are stored in a flat binary file (<base filename>.raw, little-endian uint32)
+and the meta data of each readout (see MetaTableV2) together with the scan parameters are stored as fixed-size records in an index file (<base filename>.meta).
+Both files can be accessed with numpy.memmap without decompression and copying.
+
+Usage to convert a raw data file:
+    python flat_raw_data.py <raw data file (.h5)>  # HDF5 to flat format
+    python flat_raw_data.py <flat raw data file (.raw)>  # flat format to HDF5
+'''
+import logging
+import os
+import sys
+import struct
+import yaml
+import numpy as np
+import tables as tb
+
+from pybar.analysis.RawDataConverter.data_struct import MetaTableV2, generate_scan_parameter_description
+
+
+flat_meta_data_magic = 'PYBARMET'
+flat_meta_data_version = 1
+
+
+def get_flat_raw_data_filenames(filename):
+    '''Returns the file names (raw data words, meta data index) of the flat raw data format for the given raw data file name (with or without extension).
+    '''
+    base_filename = os.path.splitext(filename)[0] if os.path.splitext(filename)[1].strip().lower() in ('.h5', '.raw', '.meta') else filename
+    return base_filename + '.raw', base_filename + '.meta'
+
+
+def get_flat_meta_data_dtype(scan_parameters=None):
+    '''Returns the meta data record type: meta data fields (MetaTableV2) followed by the scan parameters (uint32).
+    '''
+    meta_data_dtype = tb.dtype_from_descr(MetaTableV2)
+    if scan_parameters:
+        return np.dtype(meta_data_dtype.descr + generate_scan_parameter_description(scan_parameters).descr)
+    return meta_data_dtype
+
+
+class FlatRawDataWriter(object):
+    '''Writing raw data words and meta data records to the flat raw data files.
+
+    Provides the methods of the raw data tables.EArray used by RawDataFile (append(), flush(), nrows).
+    '''
+    def __init__(self, filename, mode='w', scan_parameters=None):
+        self.raw_data_filename, self.meta_data_filename = get_flat_raw_data_filenames(filename)
+        self.scan_parameters = list(scan_parameters) if scan_parameters else []
+        self.meta_data_dtype = get_flat_meta_data_dtype(self.scan_parameters)
+        if mode[0] != 'w' and os.path.isfile(self.meta_data_filename) and os.path.isfile(self.raw_data_filename):
+            logging.info('Opening existing flat raw data file: %s' % self.raw_data_filename)
+            _, meta_data_dtype, _ = _read_meta_data_header(self.meta_data_filename)
+            if meta_data_dtype != self.meta_data_dtype:
+                raise ValueError('Meta data format of %s does not match' % self.meta_data_filename)
+            self.raw_data_file = open(self.raw_data_filename, 'ab')
+            self.meta_data_file = open(self.meta_data_filename, 'ab')
+        else:
+            logging.info('Opening new flat raw data file: %s' % self.raw_data_filename)
+            self.raw_data_file = open(self.raw_data_filename, 'wb')
+            self.meta_data_file = open(self.meta_data_filename, 'wb')
+            header = yaml.safe_dump({'version': flat_meta_data_version, 'dtype': [list(field) for field in self.meta_data_dtype.descr], 'scan_parameters': self.scan_parameters})
+            self.meta_data_file.write(flat_meta_data_magic + struct.pack('<I', len(header)) + header)
+        self.nrows = os.path.getsize(self.raw_data_filename) / 4  # number of data words
+
+    def append(self, raw_data):
+        self.raw_data_file.write(np.ascontiguousarray(raw_data, dtype='<u4').tostring())
+        self.nrows += raw_data.shape[0]
+
+    def append_meta_data(self, meta_data, scan_parameters=None):
+        '''Writing meta data records.
+
+        Parameters
+        ----------
+        meta_data : numpy.ndarray
+            Meta data (fields of MetaTableV2).
+        scan_parameters : numpy.ndarray
+            Scan parameters with same length as meta_data.
+        '''
+        records = np.empty(shape=meta_data.shape, dtype=self.meta_data_dtype)
+        for name in meta_data.dtype.names:
+            records[name] = meta_data[name]
+        for name in self.scan_parameters:
+            records[name] = scan_parameters[name]
+        self.meta_data_file.write(records.tostring())
+
+    def flush(self):
+        self.raw_data_file.flush()
+        self.meta_data_file.flush()
+
+    def close(self):
+        self.raw_data_file.close()
+        self.meta_data_file.close()
+
+
+def _read_meta_data_header(meta_data_filename):
+    with open(meta_data_filename, 'rb') as meta_data_file:
+        if meta_data_file.read(len(flat_meta_data_magic)) != flat_meta_data_magic:
+            raise ValueError('%s is not a flat meta data file' % meta_data_filename)
+        header_length = struct.unpack('<I', meta_data_file.read(4))[0]
+        header = yaml.safe_load(meta_data_file.read(header_length))
+    return header, np.dtype([tuple(field) for field in header['dtype']]), len(flat_meta_data_magic) + 4 + header_length
+
+
+def is_flat_raw_data(filename):
+    '''Returns True if the flat raw data files exist for the given raw data file name.
+    '''
+    return all(os.path.isfile(flat_filename) for flat_filename in get_flat_raw_data_filenames(filename))
+
+
+def open_flat_raw_data(filename):
+    '''Opening flat raw data files with numpy.memmap (read only).
+
+    Returns
+    -------
+    Tuple of raw data (uint32 memmap) and meta data (structured memmap with meta data and scan parameter fields).
+    '''
+    raw_data_filename, meta_data_filename = get_flat_raw_data_filenames(filename)
+    _, meta_data_dtype, offset = _read_meta_data_header(meta_data_filename)
+    n_words = os.path.getsize(raw_data_filename) / 4
+    n_meta_data = (os.path.getsize(meta_data_filename) - offset) / meta_data_dtype.itemsize
+    # numpy.memmap does not support files of size 0
+    raw_data = np.memmap(raw_data_filename, dtype='<u4', mode='r', shape=(n_words,)) if n_words else np.empty(shape=(0,), dtype=np.uint32)
+    meta_data = np.memmap(meta_data_filename, dtype=meta_data_dtype, mode='r', offset=offset, shape=(n_meta_data,)) if n_meta_data else np.empty(shape=(0,), dtype=meta_data_dtype)
+    return raw_data, meta_data
+
+
+def get_raw_data_words(in_file_h5):
+    '''Returns the raw data words of the opened raw data file. The raw_data node is used if the file has one (e.g. after conversion),
+    otherwise the flat raw data words (memmap) are returned.
+    '''
+    if 'raw_data' in in_file_h5.root:
+        return in_file_h5.root.raw_data
+    return open_flat_raw_data(in_file_h5.filename)[0]
+
+
+def convert_raw_data_file_to_flat(filename, chunk_size=10000000):
+    '''Writing flat raw data files from HDF5 raw data file.
+    '''
+    logging.info('Converting %s to flat raw data format' % filename)
+    with tb.open_file(filename, mode='r') as in_file_h5:
+        meta_data = in_file_h5.root.meta_data[:]
+        scan_parameters = in_file_h5.root.scan_parameters[:] if 'scan_parameters' in in_file_h5.root else None
+        flat_raw_data_file = FlatRawDataWriter(filename, mode='w', scan_parameters=scan_parameters.dtype.names if scan_parameters is not None else None)
+        try:
+            for index in range(0, in_file_h5.root.raw_data.shape[0], chunk_size):
+                flat_raw_data_file.append(in_file_h5.root.raw_data.read(index, index + chunk_size))
+            flat_raw_data_file.append_meta_data(meta_data, scan_parameters)
+        finally:
+            flat_raw_data_file.close()
+
+
+def convert_flat_to_raw_data_file(filename, chunk_size=10000000):
+    '''Writing HDF5 raw data file (raw_data, meta_data, scan_parameters) from flat raw data files. Existing nodes of the HDF5 file are not changed.
+    '''
+    raw_data, meta_data = open_flat_raw_data(filename)
+    h5_filename = get_flat_raw_data_filenames(filename)[0][:-4] + '.h5'
+    logging.info('Converting flat raw data format to %s' % h5_filename)
+    scan_parameters = [name for name in meta_data.dtype.names if name not in MetaTableV2.columns]
+    filter_raw_data = tb.Filters(complib='blosc', complevel=5, fletcher32=False)
+    filter_tables = tb.Filters(complib='zlib', complevel=5, fletcher32=False)
+    with tb.open_file(h5_filename, mode='a') as out_file_h5:
+        if 'raw_data' not in out_file_h5.root:
+            raw_data_earray = out_file_h5.create_earray(out_file_h5.root, name='raw_data', atom=tb.UIntAtom(), shape=(0,), title='raw_data', filters=filter_raw_data, expectedrows=max(raw_data.shape[0], 1))
+            for index in range(0, raw_data.shape[0], chunk_size):
+                raw_data_earray.append(raw_data[index:index + chunk_size])
+        if 'meta_data' not in out_file_h5.root:
+            meta_data_table = out_file_h5.create_table(out_file_h5.root, name='meta_data', description=MetaTableV2, title='meta_data', filters=filter_tables)
+            meta_data_table.append(_select_fields(meta_data, meta_data_table.dtype))
+        if scan_parameters and 'scan_parameters' not in out_file_h5.root:
+            scan_param_table = out_file_h5.create_table(out_file_h5.root, name='scan_parameters', description=generate_scan_parameter_description(scan_parameters), title='scan_parameters', filters=filter_tables)
+            scan_param_table.append(_select_fields(meta_data, scan_param_table.dtype))
+
+
+def _select_fields(array, dtype):
+    selection = np.empty(shape=array.shape, dtype=dtype)
+    for name in dtype.names:
+        selection[name] = array[name]
+    return selection
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - [%(levelname)-8s] (%(threadName)-10s) %(message)s")
+    if len(sys.argv) < 2:
+        print 'Usage: python flat_raw_data.py <raw data file (.h5 or .raw)>'
+        sys.exit(1)
+    if os.path.splitext(sys.argv[1])[1].strip().lower() == '.h5':
+        convert_raw_data_file_to_flat(sys.argv[1])
+    else:
+        convert_flat_to_raw_data_file(sys.argv[1])
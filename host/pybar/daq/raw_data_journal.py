@@ -0,0 +1,237 @@
+''' Append-only raw data journal. The journal is written next to the raw data file and allows to recover the data if the HDF5 file is corrupted (e.g. after a crash).
+
+Usage to recover a raw data file:
+    python raw_data_journal.py <journal file> [<output file>]
+'''
+import logging
+import os
+import sys
+import struct
+import zlib
+from time import time
+import yaml
+import numpy as np
+
+
+journal_magic = 'PYBARJNL'
+journal_version = 2
+journal_record_header = struct.Struct('<IIddI')  # record marker, data length, timestamp start, timestamp stop, error
+journal_record_marker = 0x4A524543
+journal_file_record_header = struct.Struct('<II')  # file record marker, filename length
+journal_file_record_marker = 0x4A46494C
+journal_crc = struct.Struct('<I')
+
+
+class RawDataJournalError(Exception):
+    pass
+
+
+class RawDataJournal(object):
+    '''Raw data journal. Writing data and meta data records to a binary file.
+
+    Every record consists of a header (data length, timestamps, error), the scan parameter values (uint32), the raw data words (uint32)
+    and a CRC32 checksum. The data is written to disk (fsync) every fsync_interval seconds (0: after every record).
+    A file record (see new_file()) marks the raw data file the following records belong to.
+
+    If mode is 'a' or 'r+', the records are appended to an existing journal. An incomplete last record (e.g. after a crash) is removed.
+    '''
+    def __init__(self, filename, mode='w', scan_parameters=None, fsync_interval=1.0):
+        self.filename = filename
+        self.scan_parameters = list(scan_parameters) if scan_parameters else []
+        self.fsync_interval = fsync_interval
+        if mode in ('a', 'r+') and os.path.isfile(self.filename) and os.path.getsize(self.filename):
+            logging.info('Opening existing raw data journal: %s' % self.filename)
+            with open(self.filename, 'rb') as journal_file:
+                scan_parameters = _read_header(journal_file)['scan_parameters']
+                if set(scan_parameters) != set(self.scan_parameters):
+                    raise RawDataJournalError('Raw data journal %s has different scan parameters: %s' % (self.filename, ', '.join(scan_parameters)))
+                self.scan_parameters = scan_parameters  # keep the order of the existing records
+                position = journal_file.tell()
+                for _, position in _read_records(journal_file, scan_parameters):
+                    pass
+            self.journal_file = open(self.filename, 'ab')
+            self.journal_file.truncate(position)  # remove incomplete last record
+        else:
+            logging.info('Opening raw data journal: %s' % self.filename)
+            self.journal_file = open(self.filename, 'wb')
+            header = yaml.safe_dump({'version': journal_version, 'scan_parameters': self.scan_parameters})
+            self.journal_file.write(journal_magic + struct.pack('<I', len(header)) + header)
+        self.fsync()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False  # do not hide exceptions
+
+    def append(self, data_tuple, scan_parameters=None):
+        '''Writing record.
+
+        Parameters
+        ----------
+        data_tuple : tuple
+            Tuple (data, timestamp_start, timestamp_stop, error).
+        scan_parameters : dict
+            Scan parameter values.
+        '''
+        raw_data = np.ascontiguousarray(data_tuple[0], dtype=np.uint32)
+        record = journal_record_header.pack(journal_record_marker, raw_data.shape[0], data_tuple[1] if data_tuple[1] is not None else np.nan, data_tuple[2], data_tuple[3])
+        if self.scan_parameters:
+            record += np.array([scan_parameters[key] if scan_parameters and scan_parameters[key] is not None else 0 for key in self.scan_parameters], dtype=np.uint32).tostring()
+        raw_data = raw_data.tostring()
+        self.journal_file.write(record)
+        self.journal_file.write(raw_data)
+        self.journal_file.write(journal_crc.pack(zlib.crc32(raw_data, zlib.crc32(record)) & 0xffffffff))
+        if time() - self.last_fsync_time >= self.fsync_interval:
+            self.fsync()
+
+    def new_file(self, filename):
+        '''Writing file record. The following records belong to the raw data file filename.
+        '''
+        filename = os.path.basename(filename)
+        record = journal_file_record_header.pack(journal_file_record_marker, len(filename))
+        self.journal_file.write(record)
+        self.journal_file.write(filename)
+        self.journal_file.write(journal_crc.pack(zlib.crc32(filename, zlib.crc32(record)) & 0xffffffff))
+        self.fsync()
+
+    def fsync(self):
+        '''Writing journal to disk.
+        '''
+        self.journal_file.flush()
+        os.fsync(self.journal_file.fileno())
+        self.last_fsync_time = time()
+
+    def close(self, remove=False):
+        '''Closing journal.
+
+        Parameters
+        ----------
+        remove : bool
+            If True, the journal file is deleted (e.g. raw data file was successfully closed).
+        '''
+        if self.journal_file.closed:
+            return
+        self.fsync()
+        self.journal_file.close()
+        if remove:
+            logging.info('Removing raw data journal: %s' % self.filename)
+            os.remove(self.filename)
+        else:
+            logging.info('Closing raw data journal: %s' % self.filename)
+
+
+def _read_header(journal_file):
+    if journal_file.read(len(journal_magic)) != journal_magic:
+        raise RawDataJournalError('%s is not a raw data journal' % journal_file.name)
+    header_length = struct.unpack('<I', journal_file.read(4))[0]
+    return yaml.safe_load(journal_file.read(header_length))
+
+
+def _read_records(journal_file, scan_parameters):
+    '''Reading records from opened raw data journal, the header has to be read before. Reading stops at the first incomplete or corrupted record.
+
+    Returns
+    -------
+    Generator of tuples (record, position). The record is a filename (file record) or a tuple (data_tuple, scan_parameters) (data record),
+    position is the end of the record in bytes.
+    '''
+    n_scan_parameters = len(scan_parameters)
+    while True:
+        position = journal_file.tell()
+        marker = journal_file.read(4)
+        if len(marker) != 4:
+            break  # end of file
+        journal_file.seek(position)
+        marker = struct.unpack('<I', marker)[0]
+        if marker == journal_record_marker:
+            record = journal_file.read(journal_record_header.size + 4 * n_scan_parameters)
+            if len(record) != journal_record_header.size + 4 * n_scan_parameters:
+                break  # end of file
+            data_length = 4 * journal_record_header.unpack_from(record)[1]
+        elif marker == journal_file_record_marker:
+            record = journal_file.read(journal_file_record_header.size)
+            if len(record) != journal_file_record_header.size:
+                break  # end of file
+            data_length = journal_file_record_header.unpack(record)[1]
+        else:
+            logging.warning('Raw data journal %s: corrupted record at byte %d' % (journal_file.name, position))
+            break
+        data = journal_file.read(data_length)
+        crc = journal_file.read(journal_crc.size)
+        if len(data) != data_length or len(crc) != journal_crc.size:
+            logging.warning('Raw data journal %s: incomplete last record' % journal_file.name)
+            break
+        if journal_crc.unpack(crc)[0] != zlib.crc32(data, zlib.crc32(record)) & 0xffffffff:
+            logging.warning('Raw data journal %s: checksum error at byte %d' % (journal_file.name, position))
+            break
+        if marker == journal_file_record_marker:
+            yield data, journal_file.tell()
+        else:
+            _, _, timestamp_start, timestamp_stop, error = journal_record_header.unpack_from(record)
+            scan_parameter_values = np.frombuffer(record, dtype=np.uint32, offset=journal_record_header.size)
+            yield ((np.frombuffer(data, dtype=np.uint32), None if np.isnan(timestamp_start) else timestamp_start, timestamp_stop, error), dict(zip(scan_parameters, scan_parameter_values.tolist()))), journal_file.tell()
+
+
+def read_raw_data_journal(filename):
+    '''Reading records from raw data journal. Reading stops at the first incomplete or corrupted record.
+
+    Returns
+    -------
+    Generator of tuples (data_tuple, scan_parameters, filename). The filename of the raw data file is None if the journal has no file records.
+    '''
+    with open(filename, 'rb') as journal_file:
+        scan_parameters = _read_header(journal_file)['scan_parameters']
+        raw_data_filename = None
+        for record, _ in _read_records(journal_file, scan_parameters):
+            if isinstance(record, basestring):
+                raw_data_filename = record
+            else:
+                yield record + (raw_data_filename,)
+
+
+def recover_raw_data_file(journal_filename, output_filename=None):
+    '''Creating raw data file(s) (raw_data, meta_data and scan_parameters nodes) from raw data journal.
+
+    The records are written to the recovered file of the raw data file they belong to. If the run has more than one file
+    (new_file or file size limit), every file is recovered and the recovered files are listed in the manifest file (<output filename>_manifest.yaml).
+
+    Parameters
+    ----------
+    journal_filename : string
+        Filename of the raw data journal.
+    output_filename : string
+        Filename of the recovered raw data file. The filenames of the other files of the run are derived from it (e.g. <output filename>_gdac_100.h5).
+        If None, <journal filename>_recovered.h5 is used.
+
+    Returns
+    -------
+    Number of recovered records.
+    '''
+    from pybar.daq.fei4_raw_data import RawDataFile  # circular import
+    if output_filename is None:
+        output_filename = os.path.splitext(journal_filename)[0] + '_recovered.h5'
+    base_filename = os.path.splitext(os.path.basename(journal_filename))[0]  # filenames of the raw data files start with the base filename
+    output_base_filename = os.path.splitext(output_filename)[0]
+    with open(journal_filename, 'rb') as journal_file:
+        scan_parameters = _read_header(journal_file)['scan_parameters']
+    n_records = 0
+    with RawDataFile(output_filename, mode='w', scan_parameters=scan_parameters) as raw_data_file:
+        for data_tuple, scan_parameter_values, raw_data_filename in read_raw_data_journal(journal_filename):
+            if raw_data_filename is not None:
+                raw_data_filename = output_base_filename + os.path.splitext(raw_data_filename)[0][len(base_filename):] + '.h5'
+                if raw_data_filename != raw_data_file.h5_file.filename:
+                    raw_data_file._rollover(raw_data_filename)
+            raw_data_file.append_item(data_tuple, scan_parameters=scan_parameter_values, flush=False)
+            n_records += 1
+    logging.info('Recovered %d readouts from raw data journal %s: %s' % (n_records, journal_filename, output_filename))
+    return n_records
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - [%(levelname)-8s] (%(threadName)-10s) %(message)s")
+    if len(sys.argv) < 2:
+        print 'Usage: python raw_data_journal.py <journal file> [<output file>]'
+        sys.exit(1)
+    recover_raw_data_file(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else None)
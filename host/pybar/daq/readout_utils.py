@@ -1,6 +1,19 @@
 import logging
 import numpy as np
 
+from pybar.analysis.RawDataConverter import analysis_functions
+
+
+# word types of classify_raw_data()
+UNKNOWN_WORD = 0
+TRIGGER_WORD = 1
+TDC_WORD = 2
+DATA_HEADER = 3
+DATA_RECORD = 4
+ADDRESS_RECORD = 5
+VALUE_RECORD = 6
+SERVICE_RECORD = 7
+
 
 def convert_data_array(array, filter_func=None, converter_func=None):  # TODO: add copy parameter, otherwise in-place
     '''Filter and convert raw data numpy array (numpy.ndarray)
@@ -89,6 +102,8 @@ def is_data_from_channel(channel=4):  # function factory
     # 2
     filter_func = logical_and(is_data_record, is_data_from_channel(3))
     data_record_from_channel_3 = data_array[filter_func(data_array)]
+    # same selection in one pass, see is_word_type()
+    data_record_from_channel_3 = filter_raw_data(data_array, DATA_RECORD, channel=3)
     # 3
     is_raw_data_from_channel_3 = is_data_from_channel(3)(raw_data)
 
@@ -124,6 +139,9 @@ def logical_and(f1, f2):  # function factory
     --------
     filter_func=logical_and(is_data_record, is_data_from_channel(4))  # new filter function
     filter_func(array) # array that has Data Records from channel 4
+
+    For raw data word types and channels use is_word_type(), which selects all in one pass instead of one pass per function:
+    filter_func=is_word_type(DATA_RECORD, channel=4)
     '''
     def f(value):
         return np.logical_and(f1(value), f2(value))
@@ -185,6 +203,65 @@ def logical_xor(f1, f2):  # function factory
     return f
 
 
+def classify_raw_data(array):
+    '''Labels every raw data word with the word type and the channel in one pass (compiled).
+
+    Parameters
+    ----------
+    array : numpy.array
+        Raw data array.
+
+    Returns
+    -------
+    Tuple of arrays (uint8): word type (see UNKNOWN_WORD, TRIGGER_WORD, TDC_WORD, DATA_HEADER, DATA_RECORD, ADDRESS_RECORD, VALUE_RECORD, SERVICE_RECORD)
+    and channel (0 for trigger and TDC words).
+    '''
+    array = np.ascontiguousarray(array, dtype=np.uint32)
+    word_type = np.empty(shape=array.shape, dtype=np.uint8)
+    channel = np.empty(shape=array.shape, dtype=np.uint8)
+    analysis_functions.classify_raw_data(array, word_type, channel)
+    return word_type, channel
+
+
+def is_word_type(word_types, channel=None):  # function factory
+    '''Select words of given type(s) and channel. Uses the single-pass word classifier.
+
+    Parameters
+    ----------
+    word_types : int, list, tuple
+        Word type(s), e.g. DATA_RECORD or (DATA_HEADER, DATA_RECORD).
+    channel : int
+        Channel number. If None, words from all channels are selected.
+
+    Returns
+    -------
+    Function
+
+    Usage:
+    data_records_from_channel_4 = data_array[is_word_type(DATA_RECORD, channel=4)(data_array)]
+    '''
+    if isinstance(word_types, (int, long)):
+        word_types = (word_types,)
+    word_types = sorted(set(word_types))
+
+    def f(value):
+        word_type, word_channel = classify_raw_data(value)
+        selection = (word_type == word_types[0])  # comparing uint8 labels is much faster than a look-up table
+        for selected_word_type in word_types[1:]:
+            selection |= (word_type == selected_word_type)
+        if channel is not None:
+            selection &= (word_channel == channel)
+        return selection
+    f.__name__ = "is_word_type_" + "_".join([str(word_type) for word_type in word_types]) + ("" if channel is None else "_from_channel_" + str(channel))
+    return f
+
+
+def filter_raw_data(array, word_types, channel=None):
+    '''Returns words of given type(s) and channel from raw data array. See is_word_type().
+    '''
+    return array[is_word_type(word_types, channel)(array)]
+
+
 def is_trigger_word(value):
     return np.equal(np.bitwise_and(value, 0x80000000), 0x80000000)
 
@@ -235,41 +312,26 @@ def get_value_record(value):
     return np.bitwise_and(value, 0x0000FFFF)
 
 
-def get_col_row_tot_array_from_data_record_array(array):  # TODO: max ToT
-    '''Convert raw data array to column, row, and ToT array
+def get_col_row_tot_array_from_data_record_array(array, max_tot=13):
+    '''Convert raw data array to column, row, and ToT array (compiled, one pass). Words that are not data records are ignored.
 
     Parameters
     ----------
     array : numpy.array
         Raw data array.
+    max_tot : int
+        Hits with a ToT code above max_tot are omitted (15: no hit, 14: late hit (FE-I4A) or small hit (FE-I4B)).
 
     Returns
     -------
     Tuple of arrays.
     '''
-    def get_col_row_tot_1_array_from_data_record_array(value):
-        return np.right_shift(np.bitwise_and(value, 0x00FE0000), 17), np.right_shift(np.bitwise_and(value, 0x0001FF00), 8), np.right_shift(np.bitwise_and(value, 0x000000F0), 4)
-#         return (value & 0xFE0000)>>17, (value & 0x1FF00)>>8, (value & 0x0000F0)>>4 # numpy.vectorize()
-
-    def get_col_row_tot_2_array_from_data_record_array(value):
-        return np.right_shift(np.bitwise_and(value, 0x00FE0000), 17), np.add(np.right_shift(np.bitwise_and(value, 0x0001FF00), 8), 1), np.bitwise_and(value, 0x0000000F)
-#         return (value & 0xFE0000)>>17, ((value & 0x1FF00)>>8)+1, (value & 0x0000F) # numpy.vectorize()
-
-    col_row_tot_1_array = np.column_stack(get_col_row_tot_1_array_from_data_record_array(array))
-    col_row_tot_2_array = np.column_stack(get_col_row_tot_2_array_from_data_record_array(array))
-#     print col_row_tot_1_array, col_row_tot_1_array.shape, col_row_tot_1_array.dtype
-#     print col_row_tot_2_array, col_row_tot_2_array.shape, col_row_tot_2_array.dtype
-    # interweave array here
-    col_row_tot_array = np.vstack((col_row_tot_1_array.T, col_row_tot_2_array.T)).reshape((3, -1), order='F').T  # http://stackoverflow.com/questions/5347065/interweaving-two-numpy-arrays
-#     print col_row_tot_array, col_row_tot_array.shape, col_row_tot_array.dtype
-    # remove ToT > 14 (late hit, no hit) from array, remove row > 336 in case we saw hit in row 336 (no double hit possible)
-    try:
-        col_row_tot_array_filtered = col_row_tot_array[col_row_tot_array[:, 2] < 14]  # [np.logical_and(col_row_tot_array[:,2]<14, col_row_tot_array[:,1]<=336)]
-#         print col_row_tot_array_filtered, col_row_tot_array_filtered.shape, col_row_tot_array_filtered.dtype
-    except IndexError:
-        # logging.warning('Array is empty')
-        return np.array([], dtype=np.dtype('>u4')), np.array([], dtype=np.dtype('>u4')), np.array([], dtype=np.dtype('>u4'))
-    return col_row_tot_array_filtered[:, 0], col_row_tot_array_filtered[:, 1], col_row_tot_array_filtered[:, 2]  # column, row, ToT
+    array = np.ascontiguousarray(array, dtype=np.uint32)
+    col = np.empty(shape=(2 * array.shape[0],), dtype=np.uint32)  # up to two hits per data record
+    row = np.empty_like(col)
+    tot = np.empty_like(col)
+    n_hits = analysis_functions.decode_data_records(array, col, row, tot, max_tot)
+    return col[:n_hits], row[:n_hits], tot[:n_hits]  # column, row, ToT
 
 
 def get_col_row_array_from_data_record_array(array):
@@ -291,32 +353,79 @@ def get_occupancy_mask_from_data_record_array(array, occupancy):
     pass  # TODO:
 
 
-def get_col_row_iterator_from_data_records(array):  # generator
-    for item in np.nditer(array):  # , flags=['multi_index']):
-        yield np.right_shift(np.bitwise_and(item, 0x00FE0000), 17), np.right_shift(np.bitwise_and(item, 0x0001FF00), 8)
-        if np.not_equal(np.bitwise_and(item, 0x0000000F), 15):
-            yield np.right_shift(np.bitwise_and(item, 0x00FE0000), 17), np.add(np.right_shift(np.bitwise_and(item, 0x0001FF00), 8), 1)
+def get_occupancy_from_data_record_array(array, occupancy=None, max_tot=13):
+    '''Histogram the hits of the data records into an occupancy array without creating the hit arrays (compiled, one pass).
+    Words that are not data records are ignored, no filtering is needed.
+
+    Parameters
+    ----------
+    array : numpy.array
+        Raw data array.
+    occupancy : numpy.array
+        Occupancy array (shape (80, 336), int32, column index first) to which the hits are added. If None, a new array is created.
+    max_tot : int
+        Hits with a ToT code above max_tot are omitted.
+
+    Returns
+    -------
+    Occupancy array (signed, differences like occupancy - n_injections / 2 do not wrap around).
+    '''
+    if occupancy is None:
+        occupancy = np.zeros(shape=(80, 336), dtype=np.int32)
+    elif occupancy.shape != (80, 336) or occupancy.dtype != np.int32 or not occupancy.flags['C_CONTIGUOUS']:
+        raise ValueError('Occupancy array has to be a C-contiguous int32 array with shape (80, 336)')
+    analysis_functions.hist_data_records(np.ascontiguousarray(array, dtype=np.uint32), occupancy.reshape(-1), max_tot)
+    return occupancy
+
+
+def _get_col_row_tot_blocks_from_data_records(array, block_size):  # generator
+    '''Decoding data records block by block. The first hit of every data record is returned,
+    the second hit only if the ToT code is not 15 (no hit).
+    '''
+    for index in range(0, array.shape[0], block_size):
+        block = np.asarray(array[index:index + block_size])  # reads only one block from tables.EArray and memory maps
+        hits = np.empty(shape=(block.shape[0], 2), dtype=block.dtype)  # two hits per data record, selected by mask
+        selection = np.ones(shape=(block.shape[0], 2), dtype=np.bool)
+        np.not_equal(np.bitwise_and(block, 0x0000000F), 15, out=selection[:, 1])
+        selection = selection.ravel()
+        np.right_shift(np.bitwise_and(block, 0x00FE0000), 17, out=hits[:, 0])
+        hits[:, 1] = hits[:, 0]
+        col = hits.ravel()[selection]
+        np.right_shift(np.bitwise_and(block, 0x0001FF00), 8, out=hits[:, 0])
+        np.add(hits[:, 0], 1, out=hits[:, 1])
+        row = hits.ravel()[selection]
+        np.right_shift(np.bitwise_and(block, 0x000000F0), 4, out=hits[:, 0])
+        np.bitwise_and(block, 0x0000000F, out=hits[:, 1])
+        tot = hits.ravel()[selection]
+        yield col, row, tot
+
+
+def get_col_row_iterator_from_data_records(array, block_size=1000000):  # generator
+    '''Returns column and row arrays of the hits block by block (block_size data records per block).
+    '''
+    for col, row, _ in _get_col_row_tot_blocks_from_data_records(array, block_size):
+        yield col, row
 
 
-def get_row_col_iterator_from_data_records(array):  # generator
-    for item in np.nditer(array, flags=['multi_index']):
-        yield np.right_shift(np.bitwise_and(item, 0x0001FF00), 8), np.right_shift(np.bitwise_and(item, 0x00FE0000), 17)
-        if np.not_equal(np.bitwise_and(item, 0x0000000F), 15):
-            yield np.add(np.right_shift(np.bitwise_and(item, 0x0001FF00), 8), 1), np.right_shift(np.bitwise_and(item, 0x00FE0000), 17)
+def get_row_col_iterator_from_data_records(array, block_size=1000000):  # generator
+    '''Returns row and column arrays of the hits block by block (block_size data records per block).
+    '''
+    for col, row, _ in _get_col_row_tot_blocks_from_data_records(array, block_size):
+        yield row, col
 
 
-def get_col_row_tot_iterator_from_data_records(array):  # generator
-    for item in np.nditer(array, flags=['multi_index']):
-        yield np.right_shift(np.bitwise_and(item, 0x00FE0000), 17), np.right_shift(np.bitwise_and(item, 0x0001FF00), 8), np.right_shift(np.bitwise_and(item, 0x000000F0), 4)  # col, row, ToT1
-        if np.not_equal(np.bitwise_and(item, 0x0000000F), 15):
-            yield np.right_shift(np.bitwise_and(item, 0x00FE0000), 17), np.add(np.right_shift(np.bitwise_and(item, 0x0001FF00), 8), 1), np.bitwise_and(item, 0x0000000F)  # col, row+1, ToT2
+def get_col_row_tot_iterator_from_data_records(array, block_size=1000000):  # generator
+    '''Returns column, row and ToT arrays of the hits block by block (block_size data records per block).
+    '''
+    for col, row, tot in _get_col_row_tot_blocks_from_data_records(array, block_size):
+        yield col, row, tot
 
 
-def get_tot_iterator_from_data_records(array):  # generator
-    for item in np.nditer(array, flags=['multi_index']):
-        yield np.right_shift(np.bitwise_and(item, 0x000000F0), 4)  # ToT1
-        if np.not_equal(np.bitwise_and(item, 0x0000000F), 15):
-            yield np.bitwise_and(item, 0x0000000F)  # ToT2
+def get_tot_iterator_from_data_records(array, block_size=1000000):  # generator
+    '''Returns ToT arrays of the hits block by block (block_size data records per block).
+    '''
+    for _, _, tot in _get_col_row_tot_blocks_from_data_records(array, block_size):
+        yield tot
 
 
 def build_events_from_raw_data(array):
@@ -329,70 +438,71 @@ def build_events_from_raw_data(array):
 
 def interpret_pixel_data(data, dc, pixel_array, invert=True):
     '''Takes the pixel raw data and interprets them. This includes consistency checks and pixel/data matching.
-    The data has to come from one double column only but can have more than one pixel bit (e.g. TDAC = 5 bit)
+    The data of all double columns and all pixel bits (e.g. TDAC = 5 bit) are interpreted at once.
 
     Parameters
     ----------
-    data : numpy.ndarray
-        The raw data words
-    dc : int
-        The double column where the data is from.
+    data : numpy.ndarray, list
+        The raw data words. List of raw data arrays (one for each double column) if data from more than one double column is given.
+    dc : int, list
+        The double column(s) where the data is from.
     pixel_array : numpy.ma.ndarray
         The masked numpy.ndarrays to be filled. The masked is set to zero for pixels with valid data.
     invert : boolean
         Invert the read pixel data.
     '''
-
-    # data validity cut, VR has to follow an AR
-    index_value = np.where(is_address_record(data))[0] + 1  # assume value record follows address record
-    index_value = index_value[is_value_record(data[index_value])]  # delete all non value records
-    index_address = index_value - 1  # calculate address record indices that are followed by an value record
-
-    # create the pixel address/value arrays
-    address = get_address_record_address(data[index_address])
-    value = get_value_record(data[index_address + 1])
-
-    # split array for each bit in pixel data, split is done on decreasing address values
-    address_split = np.array_split(address, np.where(np.diff(address.astype(np.int32)) < 0)[0] + 1)
-    value_split = np.array_split(value, np.where(np.diff(address.astype(np.int32)) < 0)[0] + 1)
-
-    if len(address_split) > 5:
-        raise NotImplementedError('Only the data from one double column can be interpreted at once!')
-
-    mask = np.empty_like(pixel_array.data)  # BUG in numpy: pixel_array is de-masked if not .data is used
-    mask[:] = len(address_split)
-
-    for bit, (bit_address, bit_value) in enumerate(zip(address_split, value_split)):  # loop over all bits of the pixel data
-        # error output, pixel data is often corrupt for FE-I4A
-        if len(bit_address) == 0:
-            logging.warning('No pixel data')
+    if isinstance(dc, (int, long, np.integer)):
+        data, dc = [data], [dc]
+    address, value, block = [], [], []
+    for index, (dc_data, dc_no) in enumerate(zip(data, dc)):
+        # data validity cut, VR has to follow an AR
+        index_value = np.where(is_address_record(dc_data[:-1]))[0] + 1  # assume value record follows address record
+        index_value = index_value[is_value_record(dc_data[index_value])]  # delete all non value records
+        if index_value.shape[0] == 0:
+            logging.warning('No pixel data from DC %d' % dc_no)
             continue
-        if len(bit_address) != 42:
-            logging.warning('Some pixel data missing')
-        if (np.any(bit_address > 672)):
-            RuntimeError('Pixel data corrupt')
-        # set pixel that occurred in the data stream
-        pixel = []
-        for i in bit_address:
-            pixel.extend(range(i - 15, i + 1))
-        pixel = np.array(pixel)
-
-        # create bit set array
-        value_new = bit_value.view(np.uint8)  # interpret 32 bit numpy array as uint8 to be able to use bit unpacking; byte unpacking is not supported yet
-        if invert:
-            value_new = np.invert(value_new)  # read back values are inverted
-        value_new = np.insert(value_new[::4], np.arange(len(value_new[1::4])), value_new[1::4])  # delete 0 padding
-        value_bit = np.unpackbits(value_new, axis=0)
-
-        if len(address_split) == 5:  # detect TDAC data, here the bit order is flipped
-            bit_set = len(address_split) - bit - 1
-        else:
-            bit_set = bit
-
-        pixel_array.data[dc * 2, pixel[pixel >= 336] - 336] = np.bitwise_or(pixel_array.data[dc * 2, pixel[pixel >= 336] - 336], np.left_shift(value_bit[pixel >= 336], bit_set))
-        pixel_array.data[dc * 2 + 1, pixel[pixel < 336]] = np.bitwise_or(pixel_array.data[dc * 2 + 1, pixel[pixel < 336]], np.left_shift(value_bit[pixel < 336], bit_set)[::-1])
-
-        mask[dc * 2, pixel[pixel >= 336] - 336] = mask[dc * 2, pixel[pixel >= 336] - 336] - 1
-        mask[dc * 2 + 1, pixel[pixel < 336]] = mask[dc * 2 + 1, pixel[pixel < 336]] - 1
-
-    pixel_array.mask[np.equal(mask, 0)] = False
+        address.append(get_address_record_address(dc_data[index_value - 1]).astype(np.int32))
+        value.append(get_value_record(dc_data[index_value]).astype(np.uint32))
+        block.append(np.empty(shape=index_value.shape, dtype=np.int32))
+        block[-1].fill(index)
+    if not address:
+        return
+    address, value, block = np.concatenate(address), np.concatenate(value), np.concatenate(block)
+    dc = np.asarray(dc, dtype=np.int32)[block]
+
+    # split array for each double column and for each bit in pixel data, split is done on decreasing address values
+    segment_start = np.ones(shape=address.shape, dtype=np.bool)
+    segment_start[1:] = np.logical_or(np.diff(address) < 0, np.diff(block) != 0)
+    segment = np.cumsum(segment_start) - 1
+    segment_block = block[segment_start]
+    segment_first = np.searchsorted(segment_block, segment_block)  # first segment (bit 0) of the double column
+    n_bits = np.bincount(segment_block)[segment_block]  # number of bits of the double column
+    if np.any(n_bits > 5):
+        raise NotImplementedError('Only the data from one double column can be interpreted for every data array!')
+    bit = np.arange(segment_block.shape[0]) - segment_first
+    bit_set = np.where(n_bits == 5, n_bits - bit - 1, bit)[segment]  # detect TDAC data, here the bit order is flipped
+    n_bits = n_bits[segment]
+
+    # error output, pixel data is often corrupt for FE-I4A
+    if np.any(np.bincount(segment) != 42):
+        logging.warning('Some pixel data missing')
+    valid = np.logical_and(address >= 15, address < 672)
+    if not np.all(valid):
+        logging.warning('Pixel data corrupt')
+        address, value, dc, bit_set, n_bits = address[valid], value[valid], dc[valid], bit_set[valid], n_bits[valid]
+
+    # every value record has the bits of 16 pixel, MSB is the first pixel
+    pixel = address[:, np.newaxis] + np.arange(-15, 1)
+    if invert:
+        value = np.bitwise_xor(value, 0xFFFF)  # read back values are inverted
+    value_bit = np.bitwise_and(np.right_shift(value[:, np.newaxis], np.arange(15, -1, -1)), 1)
+    # pixel 0 to 335 are in the second column of the double column (from top to bottom), pixel 336 to 671 in the first column
+    column = np.where(pixel >= 336, dc[:, np.newaxis] * 2, dc[:, np.newaxis] * 2 + 1).ravel()
+    row = np.where(pixel >= 336, pixel - 336, 335 - pixel).ravel()
+    np.bitwise_or.at(pixel_array.data, (column, row), np.left_shift(value_bit, bit_set[:, np.newaxis]).ravel().astype(pixel_array.dtype))
+
+    # pixel with data from every bit are valid
+    n_bits_pixel = np.zeros(shape=pixel_array.shape, dtype=np.int32)
+    n_bits_pixel[column, row] = np.repeat(n_bits, 16)
+    n_seen_pixel = np.bincount(np.ravel_multi_index((column, row), pixel_array.shape), minlength=pixel_array.size).reshape(pixel_array.shape)
+    pixel_array.mask[np.logical_and(n_bits_pixel > 0, n_seen_pixel == n_bits_pixel)] = False
@@ -0,0 +1,198 @@
+import logging
+from threading import Lock
+import numpy as np
+
+
+ring_meta_data_dtype = np.dtype([('index_start', np.uint64), ('index_stop', np.uint64), ('data_length', np.uint32), ('timestamp_start', np.float64), ('timestamp_stop', np.float64), ('error', np.uint32)])
+
+
+class RingBufferOverrun(Exception):
+    pass
+
+
+class RingBuffer(object):
+    '''Preallocated, fixed-capacity ring buffer for raw data words.
+
+    Drop-in replacement for the collections.deque used by FifoReadout. Every item is a tuple (data, timestamp_start, timestamp_stop, error)
+    (see data_iterable in pybar.daq.fifo_readout). The raw data words are copied once into a preallocated uint32 array, the item properties
+    are stored in a parallel meta data ring. Each chunk is stored contiguously, so all data arrays handed out are zero-copy views into the buffer.
+
+    A chunk, which was handed out by popleft(), stays reserved until release() is called. The views are valid until then.
+    Iterating over the buffer does not remove items. A None item marks the end of the data stream (worker stop condition).
+
+    If a chunk does not fit into the buffer (consumer too slow), the chunk is discarded and RingBufferOverrun is raised.
+    '''
+    def __init__(self, size=2 ** 24, max_chunks=2 ** 16):
+        '''
+        Parameters
+        ----------
+        size : int
+            Capacity in data words (uint32).
+        max_chunks : int
+            Capacity of the meta data ring (maximum number of stored chunks).
+        '''
+        if size <= 0 or max_chunks <= 0:
+            raise ValueError('Ring buffer size must be greater than 0')
+        self.size = int(size)
+        self.max_chunks = int(max_chunks)
+        self._words = np.empty(shape=(self.size,), dtype=np.uint32)
+        self._meta_data = np.zeros(shape=(self.max_chunks + 1,), dtype=ring_meta_data_dtype)  # one additional slot for end of stream marker
+        self._lock = Lock()
+        self.clear()
+
+    def clear(self):
+        '''Removing all items and resetting statistics.
+        '''
+        with self._lock:
+            self._head = 0  # write position of the next chunk (word index)
+            self._wrapped = False  # write position is in front of the oldest reserved chunk
+            self._chunk_tail = 0  # oldest reserved chunk
+            self._chunk_read = 0  # next chunk handed out by popleft()
+            self._chunk_head = 0  # next chunk to be written
+            self._fill_level = 0
+            self.high_water_mark = 0
+            self.overruns = 0
+            self.lost_words = 0
+            self.total_words = 0
+
+    def __len__(self):
+        return self._chunk_head - self._chunk_read
+
+    def __nonzero__(self):
+        return self._chunk_head != self._chunk_read
+
+    def __iter__(self):
+        with self._lock:
+            chunk_read, chunk_head = self._chunk_read, self._chunk_head
+        for index in xrange(chunk_read, chunk_head):
+            yield self._get_item(index)
+
+    @property
+    def fill_level(self):
+        '''Number of reserved data words.
+        '''
+        return self._fill_level
+
+    @property
+    def fill_ratio(self):
+        return self._fill_level / float(self.size)
+
+    def get_statistics(self):
+        '''Back-pressure statistics.
+
+        Returns
+        -------
+        Dictionary with fill level, high-water mark, overrun counter and number of lost words.
+        '''
+        return dict(
+            size=self.size,
+            chunks=self._chunk_head - self._chunk_tail,
+            fill_level=self._fill_level,
+            fill_ratio=self.fill_ratio,
+            high_water_mark=self.high_water_mark,
+            overruns=self.overruns,
+            lost_words=self.lost_words,
+            total_words=self.total_words
+        )
+
+    def append(self, item):
+        '''Copying item into buffer.
+
+        Parameters
+        ----------
+        item : tuple, None
+            Tuple (data, timestamp_start, timestamp_stop, error) or None.
+        '''
+        if item is None:
+            data = None
+            data_length = 0
+        else:
+            data = item[0]
+            data_length = data.shape[0]
+        with self._lock:
+            if item is not None and self._chunk_head - self._chunk_tail >= self.max_chunks:
+                index_start = None
+            else:
+                index_start = self._find_free_space(data_length)
+            if index_start is None:
+                self.overruns += 1
+                self.lost_words += data_length
+                raise RingBufferOverrun('Ring buffer overrun: %d words discarded (fill level %d of %d words)' % (data_length, self._fill_level, self.size))
+            index_stop = index_start + data_length
+            meta_data = self._meta_data[self._chunk_head % self._meta_data.shape[0]]
+            meta_data['index_start'] = index_start
+            meta_data['index_stop'] = index_stop
+            meta_data['data_length'] = data_length
+            if item is None:
+                meta_data['timestamp_start'] = np.nan
+                meta_data['timestamp_stop'] = np.nan
+                meta_data['error'] = 0
+            else:
+                self._words[index_start:index_stop] = data
+                meta_data['timestamp_start'] = item[1] if item[1] is not None else np.nan
+                meta_data['timestamp_stop'] = item[2]
+                meta_data['error'] = item[3]
+            self._head = index_stop
+            self._chunk_head += 1
+            self._fill_level += data_length
+            self.total_words += data_length
+            if self._fill_level > self.high_water_mark:
+                self.high_water_mark = self._fill_level
+
+    def popleft(self):
+        '''Returning oldest item. The item stays reserved until release() is called.
+
+        Raises IndexError if buffer is empty (same behavior as collections.deque).
+        '''
+        with self._lock:
+            if self._chunk_read == self._chunk_head:
+                raise IndexError('pop from an empty ring buffer')
+            index = self._chunk_read
+            self._chunk_read += 1
+        return self._get_item(index)
+
+    def release(self, n_chunks=1):
+        '''Releasing the oldest chunk(s) handed out by popleft().
+        '''
+        with self._lock:
+            n_chunks = min(n_chunks, self._chunk_read - self._chunk_tail)
+            for _ in range(n_chunks):
+                meta_data = self._meta_data[self._chunk_tail % self._meta_data.shape[0]]
+                self._fill_level -= int(meta_data['data_length'])
+                index_start = meta_data['index_start']
+                self._chunk_tail += 1
+                if self._chunk_tail != self._chunk_head and self._meta_data[self._chunk_tail % self._meta_data.shape[0]]['index_start'] < index_start:
+                    self._wrapped = False  # tail moved to the beginning of the buffer
+            if self._chunk_tail == self._chunk_head:  # empty, start from the beginning
+                self._head = 0
+                self._wrapped = False
+
+    def _get_item(self, index):
+        meta_data = self._meta_data[index % self._meta_data.shape[0]]
+        if meta_data['data_length'] == 0:
+            return None
+        timestamp_start = meta_data['timestamp_start']
+        return (self._words[meta_data['index_start']:meta_data['index_stop']], None if np.isnan(timestamp_start) else float(timestamp_start), float(meta_data['timestamp_stop']), int(meta_data['error']))
+
+    def _find_free_space(self, data_length):
+        '''Returning start index of a contiguous region of given length or None if not enough space is left.
+        '''
+        if self._chunk_tail == self._chunk_head:  # empty
+            return 0 if data_length <= self.size else None
+        tail = int(self._meta_data[self._chunk_tail % self._meta_data.shape[0]]['index_start'])
+        if not self._wrapped:  # free space at the end and at the beginning
+            if self._head + data_length <= self.size:
+                return self._head
+            elif data_length <= tail:
+                self._wrapped = True
+                return 0
+            else:
+                return None
+        else:  # wrapped around: free space between head and tail
+            if self._head + data_length <= tail:
+                return self._head
+            else:
+                return None
+
+    def log_status(self):
+        logging.info('Ring buffer fill level: %d of %d words (%.1f%%), high-water mark: %d words, overruns: %d, lost words: %d' % (self._fill_level, self.size, 100.0 * self.fill_ratio, self.high_water_mark, self.overruns, self.lost_words))
@@ -15,6 +15,7 @@ from operator import itemgetter
 
 from pybar.analysis.RawDataConverter.data_struct import NameValue
 from pybar.utils.utils import string_is_binary, flatten_iterable, iterable
+from pybar.daq.fei4_raw_data import open_configuration_group
 
 
 def parse_pixel_mask_config(filename):
@@ -398,11 +399,10 @@ class FEI4Register(object):
         def load_conf():
             logging.info("Loading configuration: %s" % h5_file.filename)
             self.configuration_file = h5_file.filename
-            if node:
-                configuration_group = h5_file.root.configuration.node
-            else:
-                configuration_group = h5_file.root.configuration
+            with open_configuration_group(h5_file) as configuration_group:  # configuration can be stored in another file of the same run
+                load_conf_from_group(configuration_group._f_get_child(node) if node else configuration_group)
 
+        def load_conf_from_group(configuration_group):
             # miscellaneous
             for row in configuration_group.miscellaneous:
                 name = row['name']
@@ -452,7 +452,7 @@ class FEI4Register(object):
                 self.set_global_register_value(name, ast.literal_eval(value))
 
             # pixels
-            for pixel_reg in h5_file.iter_nodes(configuration_group, 'CArray'):  # ['Enable', 'TDAC', 'C_High', 'C_Low', 'Imon', 'FDAC', 'EnableDigInj']:
+            for pixel_reg in configuration_group._f_iter_nodes('CArray'):  # ['Enable', 'TDAC', 'C_High', 'C_Low', 'Imon', 'FDAC', 'EnableDigInj']:
                 if pixel_reg.name in self.pixel_registers:
                     self.set_pixel_register_value(pixel_reg.name, np.asarray(pixel_reg).T)  # np.asarray(h5_file.get_node(configuration_group, name=pixel_reg)).T
 
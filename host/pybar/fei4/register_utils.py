@@ -537,10 +537,11 @@ def read_pixel_register(self, pix_regs=["EnableDigInj", "Imon", "Enable", "C_Hig
 
     for pix_reg in pix_regs:
         pixel_data = np.ma.masked_array(np.zeros(shape=(80, 336), dtype=np.uint32), mask=True)  # the result pixel array, only pixel with data are not masked
+        data = []
         for dc in dcs:
             self.register_utils.send_commands(self.register.get_commands("RdFrontEnd", name=[pix_reg], dcs=[dc]))
-            data = self.fifo_readout.read_data()
-            interpret_pixel_data(data, dc, pixel_data, invert=False if pix_reg == "EnableDigInj" else True)
+            data.append(self.fifo_readout.read_data())
+        interpret_pixel_data(data, list(dcs), pixel_data, invert=False if pix_reg == "EnableDigInj" else True)  # interpret all double columns at once
         if overwrite_config:
             self.register.set_pixel_register(pix_reg, pixel_data.data)
         result.append(pixel_data)
@@ -18,7 +18,8 @@ from basil.dut import Dut
 from pybar.run_manager import RunBase, RunAborted
 from pybar.fei4.register import FEI4Register
 from pybar.fei4.register_utils import FEI4RegisterUtils, is_fe_ready
-from pybar.daq.fifo_readout import FifoReadout, RxSyncError, EightbTenbError, FifoError, NoDataTimeout, StopTimeout
+from pybar.daq.fifo_readout import FifoReadout, DataConsumer, RxSyncError, EightbTenbError, FifoError, NoDataTimeout, StopTimeout
+from pybar.daq.ring_buffer import RingBufferOverrun
 from pybar.daq.fei4_raw_data import open_raw_data_file
 from pybar.analysis.analysis_utils import AnalysisError
 from pybar.analysis.RawDataConverter.data_struct import NameValue
@@ -203,10 +204,10 @@ class Fei4RunBase(RunBase):
                 pass  # do nothing, already initialized
 
             if not self.fifo_readout:
-                self.fifo_readout = FifoReadout(self.dut)
+                self.fifo_readout = FifoReadout(self.dut, ring_buffer_size=self.conf['ring_buffer_size'] if 'ring_buffer_size' in self.conf else None, adaptive_readout_interval=True if 'adaptive_readout_interval' in self.conf and self.conf['adaptive_readout_interval'] else False)
             if not self.register_utils:
                 self.register_utils = FEI4RegisterUtils(self.dut, self.register)
-            with open_raw_data_file(filename=self.output_filename, mode='w', title=self.run_id, scan_parameters=self.scan_parameters._asdict()) as self.raw_data_file:
+            with open_raw_data_file(filename=self.output_filename, mode='w', title=self.run_id, scan_parameters=self.scan_parameters._asdict(), async_write=True if 'async_raw_data_file' in self.conf and self.conf['async_raw_data_file'] else False, errback=self.handle_err, storage_profile=self.conf['storage_profile'] if 'storage_profile' in self.conf and self.conf['storage_profile'] else 'default', words_per_readout=self.conf['words_per_readout'] if 'words_per_readout' in self.conf else None, journal=True if 'raw_data_journal' in self.conf and self.conf['raw_data_journal'] else False) as self.raw_data_file:
                 self.save_configuration_dict(self.raw_data_file.h5_file, 'conf', self.conf)
                 self.save_configuration_dict(self.raw_data_file.h5_file, 'run_conf', self.run_conf)
                 self.register_utils.global_reset()
@@ -252,13 +253,17 @@ class Fei4RunBase(RunBase):
                 logging.error('Cannot close USB device')
         if not self.err_queue.empty():
             exc = self.err_queue.get()
-            if isinstance(exc[1], (RxSyncError, EightbTenbError, FifoError, NoDataTimeout, StopTimeout)):
+            if isinstance(exc[1], (RxSyncError, EightbTenbError, FifoError, NoDataTimeout, StopTimeout, RingBufferOverrun)):
                 raise RunAborted(exc[1])
             else:
                 raise exc[0], exc[1], exc[2]
 
     def handle_data(self, data):
         self.raw_data_file.append_item(data, scan_parameters=self.scan_parameters._asdict(), flush=False)
+        if 'network' not in self.fifo_readout.consumers:  # otherwise data is sent by network consumer
+            send_data(self.socket, data, self.scan_parameters._asdict())
+
+    def handle_data_network(self, data):
         send_data(self.socket, data, self.scan_parameters._asdict())
 
     def handle_err(self, exc):
@@ -318,7 +323,10 @@ class Fei4RunBase(RunBase):
     def start_readout(self, *args, **kwargs):
         if args or kwargs:
             self.set_scan_parameters(*args, **kwargs)
-        self.fifo_readout.start(reset_sram_fifo=False, clear_buffer=True, callback=self.handle_data, errback=self.handle_err)
+        if self.socket:  # slow file I/O does not stall the online monitor and vice versa
+            self.fifo_readout.start(reset_sram_fifo=False, clear_buffer=True, errback=self.handle_err, consumers={'file': DataConsumer(self.handle_data, policy='block'), 'network': DataConsumer(self.handle_data_network, policy='drop-oldest')})
+        else:
+            self.fifo_readout.start(reset_sram_fifo=False, clear_buffer=True, callback=self.handle_data, errback=self.handle_err)
 
     def stop_readout(self):
         self.fifo_readout.stop()
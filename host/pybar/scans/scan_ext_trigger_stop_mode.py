@@ -147,10 +147,10 @@ class StopModeExtTriggerScan(Fei4RunBase):
     def analyze(self):
         with AnalyzeRawData(raw_data_file=self.output_filename, create_pdf=True) as analyze_raw_data:
             analyze_raw_data.create_hit_table = True
-            analyze_raw_data.n_bcid = self.bcid_window
+            analyze_raw_data.set_stop_mode = True
+            analyze_raw_data.n_bcid = self.bcid_window  # one data header per read time slice
             analyze_raw_data.create_source_scan_hist = True
             analyze_raw_data.use_trigger_time_stamp = True
-            analyze_raw_data.set_stop_mode = True
             analyze_raw_data.interpreter.use_trigger_number(True)
             analyze_raw_data.create_cluster_size_hist = True
             analyze_raw_data.interpreter.set_warning_output(False)
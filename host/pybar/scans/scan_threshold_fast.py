@@ -2,12 +2,11 @@ import logging
 import numpy as np
 
 from pybar.analysis.analyze_raw_data import AnalyzeRawData
-from pybar.analysis.analysis_utils import hist_2d_index
 from pybar.fei4.register_utils import invert_pixel_mask
 from pybar.fei4_run_base import Fei4RunBase
 from pybar.fei4.register_utils import scan_loop
 from pybar.run_manager import RunManager
-from pybar.daq.readout_utils import get_col_row_array_from_data_record_array, convert_data_array, is_data_record, data_array_from_data_iterable
+from pybar.daq.readout_utils import data_array_from_data_iterable, get_occupancy_from_data_record_array
 
 
 class FastThresholdScan(Fei4RunBase):
@@ -107,11 +106,8 @@ class FastThresholdScan(Fei4RunBase):
                 if not self.stop_condition_triggered and self.record_data:
                     logging.info('Testing for stop condition: %s %d' % ('PlsrDAC', self.scan_parameter_value))
 
-                col, row = convert_data_array(data_array_from_data_iterable(self.fifo_readout.data), filter_func=is_data_record, converter_func=get_col_row_array_from_data_record_array)
-                # using self written histogrammer in C++
-                occupancy_array = hist_2d_index(col - 1, row - 1, shape=(80, 336))
-                # using numpy
-#                 occupancy_array = np.histogram2d(col, row, bins=(80, 336), range=[[1, 80], [1, 336]])[0]
+                # histogramming the data records in C++ without creating hit arrays
+                occupancy_array = get_occupancy_from_data_record_array(data_array_from_data_iterable(self.fifo_readout.data))
 
                 self.scan_condition(occupancy_array)
 
@@ -13,7 +13,7 @@ import numpy as np
 from matplotlib.backends.backend_pdf import PdfPages
 
 from pybar.fei4_run_base import Fei4RunBase
-from pybar.daq.readout_utils import is_tdc_word
+from pybar.daq.readout_utils import filter_raw_data, TDC_WORD
 from pybar.analysis.plotting import plotting
 from pybar.run_manager import RunManager
 
@@ -78,13 +78,13 @@ class TdcTest(Fei4RunBase):
                     logging.info('Test TDC for a pulse with of %d' % pulse_width)
                     self.start_pulser(pulse_width, self.n_pulses)
                     time.sleep(self.n_pulses * pulse_width * 1e-9 + 0.1)
-                    data = self.fifo_readout.read_data()
-                    if data[is_tdc_word(data)].shape[0] != 0:
-                        tdc_values = np.bitwise_and(data[is_tdc_word(data)], 0x00000FFF)
-                        tdc_counter = np.bitwise_and(data[is_tdc_word(data)], 0x000FF000)
+                    tdc_words = filter_raw_data(self.fifo_readout.read_data(), TDC_WORD)
+                    if tdc_words.shape[0] != 0:
+                        tdc_values = np.bitwise_and(tdc_words, 0x00000FFF)
+                        tdc_counter = np.bitwise_and(tdc_words, 0x000FF000)
                         tdc_counter = np.right_shift(tdc_counter, 12)
-                        if len(is_tdc_word(data)) != self.n_pulses:
-                            logging.warning('%d TDC words instead of %d ' % (len(is_tdc_word(data)), self.n_pulses))
+                        if tdc_words.shape[0] != self.n_pulses:
+                            logging.warning('%d TDC words instead of %d ' % (tdc_words.shape[0], self.n_pulses))
                         try:
                             if np.any(np.logical_and(tdc_counter[np.gradient(tdc_counter) != 1] != 0, tdc_counter[np.gradient(tdc_counter) != 1] != 255)):
                                 logging.warning('The counter did not count correctly')
@@ -114,11 +114,11 @@ class TdcTest(Fei4RunBase):
                     for _ in range(10):
                         self.start_pulser(pulse_width=100, n_pulses=1, pulse_delay=pulse_delay)
                         time.sleep(0.1)
-                    data = self.fifo_readout.read_data()
-                    if data[is_tdc_word(data)].shape[0] != 0:
-                        if len(is_tdc_word(data)) != 10:
-                            logging.warning('%d TDC words instead of %d ' % (len(is_tdc_word(data)), 10))
-                        tdc_delay = np.bitwise_and(data[is_tdc_word(data)], 0x0FF00000)
+                    tdc_words = filter_raw_data(self.fifo_readout.read_data(), TDC_WORD)
+                    if tdc_words.shape[0] != 0:
+                        if tdc_words.shape[0] != 10:
+                            logging.warning('%d TDC words instead of %d ' % (tdc_words.shape[0], 10))
+                        tdc_delay = np.bitwise_and(tdc_words, 0x0FF00000)
                         tdc_delay = np.right_shift(tdc_delay, 20)
 
                         x.append(pulse_delay)
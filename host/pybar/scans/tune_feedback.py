@@ -5,7 +5,7 @@ from matplotlib.backends.backend_pdf import PdfPages
 from pybar.fei4_run_base import Fei4RunBase
 from pybar.fei4.register_utils import scan_loop
 from pybar.run_manager import RunManager
-from pybar.daq.readout_utils import convert_data_array, is_data_record, data_array_from_data_iterable, get_tot_array_from_data_record_array
+from pybar.daq.readout_utils import data_array_from_data_iterable, get_tot_array_from_data_record_array
 from pybar.analysis.plotting.plotting import plot_tot
 
 
@@ -87,7 +87,7 @@ class FeedbackTuning(Fei4RunBase):
 
             self.raw_data_file.append(self.fifo_readout.data, scan_parameters=self.scan_parameters._asdict())
 
-            tots = convert_data_array(data_array_from_data_iterable(self.fifo_readout.data), filter_func=is_data_record, converter_func=get_tot_array_from_data_record_array)
+            tots = get_tot_array_from_data_record_array(data_array_from_data_iterable(self.fifo_readout.data))
             mean_tot = np.mean(tots)
             if np.isnan(mean_tot):
                 logging.error("No hits, ToT calculation not possible, tuning will fail")
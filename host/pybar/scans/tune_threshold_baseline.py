@@ -8,7 +8,7 @@ from pybar.fei4.register_utils import make_box_pixel_mask_from_col_row, invert_p
 from pybar.fei4_run_base import Fei4RunBase
 from pybar.run_manager import RunManager
 from pybar.analysis.plotting.plotting import plot_occupancy, plot_fancy_occupancy, plotThreeWay
-from pybar.daq.readout_utils import get_col_row_array_from_data_record_array, convert_data_array, data_array_from_data_iterable, is_data_record
+from pybar.daq.readout_utils import data_array_from_data_iterable, get_occupancy_from_data_record_array
 
 
 class ThresholdBaselineTuning(Fei4RunBase):
@@ -124,8 +124,7 @@ class ThresholdBaselineTuning(Fei4RunBase):
                                 pass
 
                 self.raw_data_file.append(self.fifo_readout.data, scan_parameters=self.scan_parameters._asdict())
-                col_arr, row_arr = convert_data_array(data_array_from_data_iterable(self.fifo_readout.data), filter_func=is_data_record, converter_func=get_col_row_array_from_data_record_array)
-                occ_hist, _, _ = np.histogram2d(col_arr, row_arr, bins=(80, 336), range=[[1, 80], [1, 336]])
+                occ_hist = get_occupancy_from_data_record_array(data_array_from_data_iterable(self.fifo_readout.data))
                 occ_mask = np.zeros(shape=occ_hist.shape, dtype=np.dtype('>u1'))
                 # noisy pixels are set to 1
                 occ_mask[occ_hist > self.occupancy_limit * self.n_triggers * self.consecutive_lvl1] = 1
@@ -21,10 +21,35 @@ from distutils.command.build_ext import build_ext
 from Cython.Build import cythonize
 import numpy as np
 import os
+import shutil
+import tempfile
 
 
 copt = {'msvc': ['-Ipybar/analysis/RawDataConverter/external', '/EHsc']}  # set additional include path and EHsc exception handling for VS
 lopt = {}
+openmp_copt = {'msvc': ['/openmp'], 'unix': ['-fopenmp'], 'mingw32': ['-fopenmp']}  # OpenMP for the parallel raw data interpretation
+openmp_lopt = {'unix': ['-fopenmp'], 'mingw32': ['-fopenmp']}
+openmp_extensions = ['pybar.analysis.RawDataConverter.data_interpreter']
+
+
+def has_openmp(compiler):
+    '''Returns True if the compiler builds and links an OpenMP program (e.g. clang on OS X does not support OpenMP).
+    '''
+    c = compiler.compiler_type
+    if c not in openmp_copt:
+        return False
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        source = os.path.join(tmp_dir, 'openmp_test.c')
+        with open(source, 'w') as f:
+            f.write('#include <omp.h>\nint main(void){\n#pragma omp parallel\nomp_get_thread_num();\nreturn 0;}\n')
+        objects = compiler.compile([source], output_dir=tmp_dir, extra_postargs=openmp_copt[c])
+        compiler.link_executable(objects, os.path.join(tmp_dir, 'openmp_test'), extra_postargs=openmp_lopt.get(c, []))
+    except Exception:
+        return False
+    finally:
+        shutil.rmtree(tmp_dir)
+    return True
 
 
 class build_ext_opt(build_ext):
@@ -42,6 +67,13 @@ class build_ext_opt(build_ext):
         if c in lopt:
             for e in self.extensions:
                 e.extra_link_args = lopt[c]
+        if has_openmp(self.compiler):
+            for e in self.extensions:
+                if e.name in openmp_extensions:
+                    e.extra_compile_args = e.extra_compile_args + openmp_copt[c]
+                    e.extra_link_args = e.extra_link_args + openmp_lopt.get(c, [])
+        else:
+            print 'OpenMP not available, the raw data is interpreted with one thread'
         build_ext.build_extensions(self)
 
 
@@ -3,6 +3,7 @@
 
 import unittest
 import os
+import pickle
 import tables as tb
 import numpy as np
 import progressbar
@@ -134,6 +135,23 @@ class TestAnalysis(unittest.TestCase):
             analyze_raw_data.interpreter.set_debug_output(False)
             analyze_raw_data.histograming.set_warning_output(False)
             analyze_raw_data.interpret_word_table(use_settings_from_file=False, fei4b=False)  # the actual start conversion command
+        with AnalyzeRawData(raw_data_file=tests_data_folder + 'unit_test_data_1.h5', analyzed_data_file=tests_data_folder + 'unit_test_data_1_interpreted_parallel.h5') as analyze_raw_data:  # analyze the digital scan raw data with more than one thread
+            analyze_raw_data.chunk_size = 1000003
+            analyze_raw_data.n_threads = 4
+            analyze_raw_data.create_hit_table = True
+            analyze_raw_data.create_cluster_hit_table = True
+            analyze_raw_data.create_cluster_table = True
+            analyze_raw_data.create_trigger_error_hist = True
+            analyze_raw_data.create_cluster_size_hist = True
+            analyze_raw_data.create_cluster_tot_hist = True
+            analyze_raw_data.create_meta_word_index = True
+            analyze_raw_data.create_meta_event_index = True
+            analyze_raw_data.use_trigger_number = False
+            analyze_raw_data.interpreter.use_tdc_word(False)
+            analyze_raw_data.clusterizer.set_warning_output(False)
+            analyze_raw_data.interpreter.set_debug_output(False)
+            analyze_raw_data.histograming.set_warning_output(False)
+            analyze_raw_data.interpret_word_table(use_settings_from_file=False, fei4b=False)
         with AnalyzeRawData(raw_data_file=tests_data_folder + 'unit_test_data_2.h5', analyzed_data_file=tests_data_folder + 'unit_test_data_2_interpreted.h5') as analyze_raw_data:  # analyze the fast threshold scan raw data, do not show any feedback (no prints to console, no plots)
             analyze_raw_data.chunk_size = 3000017
             analyze_raw_data.interpreter.set_debug_output(False)
@@ -196,6 +214,7 @@ class TestAnalysis(unittest.TestCase):
         del cls.histogram
         del cls.clusterizer
         os.remove(tests_data_folder + 'unit_test_data_1_interpreted.h5')
+        os.remove(tests_data_folder + 'unit_test_data_1_interpreted_parallel.h5')
         os.remove(tests_data_folder + 'unit_test_data_1_analyzed.h5')
         os.remove(tests_data_folder + 'unit_test_data_2_interpreted.h5')
         os.remove(tests_data_folder + 'unit_test_data_2_analyzed.h5')
@@ -238,6 +257,353 @@ class TestAnalysis(unittest.TestCase):
         data_equal, error_msg = compare_h5_files(tests_data_folder + 'unit_test_data_1_result.h5', tests_data_folder + 'unit_test_data_1_interpreted.h5')
         self.assertTrue(data_equal, msg=error_msg)
 
+    def test_parallel_raw_data_analysis(self):  # test the interpretation with more than one thread against the stored one
+        data_equal, error_msg = compare_h5_files(tests_data_folder + 'unit_test_data_1_result.h5', tests_data_folder + 'unit_test_data_1_interpreted_parallel.h5')
+        self.assertTrue(data_equal, msg=error_msg)
+
+    def test_hit_array_growth(self):  # test the interpretation into a too small hit array that has to grow against the stored hits
+        interpreter = PyDataInterpreter()
+        interpreter.set_warning_output(False)
+        interpreter.set_hits_array_size(100)
+        with tb.open_file(tests_data_folder + 'unit_test_data_1.h5', 'r') as in_file_h5:
+            interpreter.interpret_raw_data(in_file_h5.root.raw_data[:])
+        interpreter.store_event()
+        hits = interpreter.get_hits()
+        self.assertGreater(interpreter.get_hits_array_size(), 100)
+        with tb.open_file(tests_data_folder + 'unit_test_data_1_result.h5', 'r') as result_h5:
+            self.assertEqual(result_h5.root.Hits[:].tostring(), hits.tostring())
+        interpreter.reset()  # a copy of the hits is still valid after the hit array was reallocated
+        interpreter.set_hits_array_size(100)
+        with tb.open_file(tests_data_folder + 'unit_test_data_1.h5', 'r') as in_file_h5:
+            interpreter.interpret_raw_data(in_file_h5.root.raw_data[:10000])
+            hits = interpreter.get_hits(copy=True)
+            self.assertTrue(hits.flags.owndata)
+            interpreter.interpret_raw_data(in_file_h5.root.raw_data[10000:])
+        interpreter.store_event()
+        with tb.open_file(tests_data_folder + 'unit_test_data_1_result.h5', 'r') as result_h5:
+            self.assertEqual(result_h5.root.Hits[:hits.shape[0]].tostring(), hits.tostring())
+        interpreter.reset()
+        interpreter.set_hits_array_size(100)
+        interpreter.set_hits_array_growth(False)
+        interpreter.set_error_output(False)
+        with tb.open_file(tests_data_folder + 'unit_test_data_1.h5', 'r') as in_file_h5:
+            self.assertRaises(IndexError, interpreter.interpret_raw_data, in_file_h5.root.raw_data[:])
+
+    def test_hit_columns(self):  # test the hit columns of the interpreter and the histogramming of the hit columns against the stored hits
+        interpreter = PyDataInterpreter()
+        histograming = PyDataHistograming()
+        interpreter.set_warning_output(False)
+        histograming.set_warning_output(False)
+        interpreter.create_hit_columns(True)
+        histograming.set_no_scan_parameter()
+        histograming.create_occupancy_hist(True)
+        with tb.open_file(tests_data_folder + 'unit_test_data_1.h5', 'r') as in_file_h5:
+            interpreter.interpret_raw_data(in_file_h5.root.raw_data[:])
+        interpreter.store_event()
+        hit_columns = interpreter.get_hit_columns()
+        self.assertEqual(interpreter.get_n_array_hits(), hit_columns[0].shape[0])
+        histograming.add_hits_columns(*hit_columns)
+        with tb.open_file(tests_data_folder + 'unit_test_data_1_result.h5', 'r') as result_h5:
+            hits = result_h5.root.Hits[:]
+            for hit_column, name in zip(hit_columns, ('event_number', 'relative_BCID', 'column', 'row', 'tot', 'event_status')):
+                self.assertTrue(np.all(hits[name] == hit_column), msg=name)
+            occupancy = histograming.get_occupancy().copy()
+            histograming.reset()
+            histograming.add_hits(hits)
+            self.assertTrue(np.all(occupancy == histograming.get_occupancy()))
+
+    def test_hit_columns_analysis(self):  # test the analysis with hit columns (reduced Hits table) and the analysis of the reduced Hits table against the stored results
+        try:
+            with AnalyzeRawData(raw_data_file=tests_data_folder + 'unit_test_data_1.h5', analyzed_data_file=tests_data_folder + 'unit_test_data_1_hit_columns.h5') as analyze_raw_data:
+                analyze_raw_data.chunk_size = 1000003
+                analyze_raw_data.create_hit_table = True
+                analyze_raw_data.create_hit_columns = True
+                analyze_raw_data.create_cluster_table = True
+                analyze_raw_data.create_cluster_size_hist = True
+                analyze_raw_data.interpreter.set_warning_output(False)
+                analyze_raw_data.clusterizer.set_warning_output(False)
+                analyze_raw_data.histograming.set_warning_output(False)
+                analyze_raw_data.interpret_word_table(use_settings_from_file=False, fei4b=False)
+            with AnalyzeRawData(raw_data_file=None, analyzed_data_file=tests_data_folder + 'unit_test_data_1_hit_columns.h5') as analyze_raw_data:
+                analyze_raw_data.create_cluster_table = True
+                analyze_raw_data.create_cluster_size_hist = True
+                analyze_raw_data.clusterizer.set_warning_output(False)
+                analyze_raw_data.histograming.set_warning_output(False)
+                analyze_raw_data.analyze_hit_table(analyzed_data_out_file=tests_data_folder + 'unit_test_data_1_hit_columns_analyzed.h5')
+            with tb.open_file(tests_data_folder + 'unit_test_data_1_result.h5', 'r') as result_h5:
+                hits = result_h5.root.Hits[:]
+                for filename in ('unit_test_data_1_hit_columns.h5', 'unit_test_data_1_hit_columns_analyzed.h5'):
+                    with tb.open_file(tests_data_folder + filename, 'r') as in_file_h5:
+                        self.assertTrue(np.all(result_h5.root.HistOcc[:] == in_file_h5.root.HistOcc[:]), msg=filename)
+                        self.assertTrue(np.all(result_h5.root.HistClusterSize[:] == in_file_h5.root.HistClusterSize[:]), msg=filename)
+                        self.assertEqual(result_h5.root.Cluster[:].tostring(), in_file_h5.root.Cluster[:].tostring(), msg=filename)
+                        if filename == 'unit_test_data_1_hit_columns.h5':
+                            self.assertTupleEqual(in_file_h5.root.Hits.dtype.names, ('event_number', 'relative_BCID', 'column', 'row', 'tot', 'event_status'))
+                            for name in in_file_h5.root.Hits.dtype.names:
+                                self.assertTrue(np.all(hits[name] == in_file_h5.root.Hits[:][name]), msg=name)
+        finally:
+            for filename in ('unit_test_data_1_hit_columns.h5', 'unit_test_data_1_hit_columns_analyzed.h5'):
+                if os.path.isfile(tests_data_folder + filename):
+                    os.remove(tests_data_folder + filename)
+
+    def test_resumed_raw_data_analysis(self):  # test the interpretation of a growing raw data file in two runs (checkpoint and resume) against the interpretation in one run
+        def analyze(analyzed_data_file, **kwargs):
+            with AnalyzeRawData(raw_data_file=tests_data_folder + 'unit_test_data_1_growing.h5', analyzed_data_file=analyzed_data_file) as analyze_raw_data:
+                analyze_raw_data.chunk_size = 100003
+                analyze_raw_data.create_hit_table = True
+                analyze_raw_data.create_cluster_table = True
+                analyze_raw_data.create_cluster_size_hist = True
+                analyze_raw_data.interpreter.set_warning_output(False)
+                analyze_raw_data.clusterizer.set_warning_output(False)
+                analyze_raw_data.histograming.set_warning_output(False)
+                analyze_raw_data.interpret_word_table(use_settings_from_file=False, fei4b=False, **kwargs)
+
+        try:
+            with tb.open_file(tests_data_folder + 'unit_test_data_1.h5', 'r') as in_file_h5:
+                raw_data = in_file_h5.root.raw_data[:]
+                meta_data = in_file_h5.root.meta_data[:]
+            n_readouts = 10  # the first run interprets the first readouts only
+            with tb.open_file(tests_data_folder + 'unit_test_data_1_growing.h5', 'w') as out_file_h5:
+                raw_data_earray = out_file_h5.create_earray(out_file_h5.root, name='raw_data', atom=tb.UIntAtom(), shape=(0,))
+                raw_data_earray.append(raw_data[:meta_data[n_readouts - 1]['index_stop']])
+                meta_data_table = out_file_h5.create_table(out_file_h5.root, name='meta_data', description=meta_data.dtype)
+                meta_data_table.append(meta_data[:n_readouts])
+            analyze(tests_data_folder + 'unit_test_data_1_resumed.h5', checkpoint=True)
+            with tb.open_file(tests_data_folder + 'unit_test_data_1_resumed.h5', 'r') as in_file_h5:
+                self.assertTrue('Checkpoint' in in_file_h5.root)
+            with tb.open_file(tests_data_folder + 'unit_test_data_1_growing.h5', 'a') as out_file_h5:
+                out_file_h5.root.raw_data.append(raw_data[meta_data[n_readouts - 1]['index_stop']:])
+                out_file_h5.root.meta_data.append(meta_data[n_readouts:])
+            analyze(tests_data_folder + 'unit_test_data_1_resumed.h5', resume=True)
+            analyze(tests_data_folder + 'unit_test_data_1_single.h5')
+            data_equal, error_msg = compare_h5_files(tests_data_folder + 'unit_test_data_1_single.h5', tests_data_folder + 'unit_test_data_1_resumed.h5')
+            self.assertTrue(data_equal, msg=error_msg)
+        finally:
+            for filename in ('unit_test_data_1_growing.h5', 'unit_test_data_1_resumed.h5', 'unit_test_data_1_single.h5'):
+                if os.path.isfile(tests_data_folder + filename):
+                    os.remove(tests_data_folder + filename)
+
+    def test_interpreter_state(self):  # test the interpretation resumed from a saved interpreter state with a new interpreter against the stored hits
+        with tb.open_file(tests_data_folder + 'unit_test_data_1.h5', 'r') as in_file_h5:
+            raw_data = in_file_h5.root.raw_data[:]
+            meta_data = in_file_h5.root.meta_data[:]
+        meta_event_index = np.zeros((meta_data.shape[0],), dtype=[('metaEventIndex', np.uint64)])
+        interpreter = PyDataInterpreter()
+        interpreter.set_warning_output(False)
+        interpreter.set_meta_data(meta_data)
+        interpreter.set_meta_event_data(meta_event_index)
+        interpreter.interpret_raw_data(raw_data[:1000003])
+        hits = [interpreter.get_hits().copy()]
+        state = interpreter.get_state()
+        error_counters = interpreter.get_error_counters().copy()
+        del interpreter
+        interpreter = PyDataInterpreter()  # resume with a new interpreter
+        interpreter.set_warning_output(False)
+        interpreter.set_meta_data(meta_data)
+        interpreter.set_meta_event_data(meta_event_index)
+        interpreter.set_state(state)
+        self.assertTrue(np.all(interpreter.get_error_counters() == error_counters))
+        self.assertEqual(interpreter.get_data_word_index(), 1000003)
+        interpreter.interpret_raw_data(raw_data[interpreter.get_data_word_index():])
+        interpreter.store_event()
+        hits.append(interpreter.get_hits())
+        with tb.open_file(tests_data_folder + 'unit_test_data_1_result.h5', 'r') as result_h5:
+            self.assertEqual(result_h5.root.Hits[:].tostring(), np.concatenate(hits).tostring())
+            self.assertTrue(np.all(result_h5.root.meta_data[:]['event_number'] == meta_event_index['metaEventIndex']))
+        self.assertRaises(ValueError, interpreter.set_state, state[:-1])
+
+    def test_event_builder(self):  # test the event builder selection and the interpretation with the BCID window event builder against the stored hits
+        interpreter = PyDataInterpreter()
+        interpreter.set_warning_output(False)
+        self.assertEqual(interpreter.get_event_builder(), 'bcid_window')
+        interpreter.use_trigger_number(True)
+        self.assertEqual(interpreter.get_event_builder(), 'trigger_number')
+        interpreter.use_tdc_word(True)
+        self.assertEqual(interpreter.get_event_builder(), 'tdc_word')
+        interpreter.use_tdc_word(False)
+        self.assertEqual(interpreter.get_event_builder(), 'bcid_window')
+        interpreter.set_event_builder('stop_mode')
+        interpreter.use_trigger_number(True)  # the stop mode event builder uses the trigger number already
+        self.assertEqual(interpreter.get_event_builder(), 'stop_mode')
+        self.assertRaises(ValueError, interpreter.set_event_builder, 'trigger_word')
+        interpreter.set_event_builder('bcid_window')
+        with tb.open_file(tests_data_folder + 'unit_test_data_1.h5', 'r') as in_file_h5:
+            interpreter.interpret_raw_data(in_file_h5.root.raw_data[:])
+        interpreter.store_event()
+        with tb.open_file(tests_data_folder + 'unit_test_data_1_result.h5', 'r') as result_h5:
+            self.assertEqual(result_h5.root.Hits[:].tostring(), interpreter.get_hits().tostring())
+
+    def test_stop_mode_event_builder(self):  # test the BCID window (number of read time slices) of the stop mode event builder
+        with tb.open_file(tests_data_folder + 'unit_test_data_1.h5', 'r') as in_file_h5:
+            raw_data = in_file_h5.root.raw_data[:]
+        n_events = []
+        for n_bcid in (16, 4):
+            interpreter = PyDataInterpreter()
+            interpreter.set_warning_output(False)
+            interpreter.set_event_builder('stop_mode')
+            interpreter.set_trig_count(n_bcid)
+            interpreter.interpret_raw_data(raw_data)
+            interpreter.store_event()
+            n_events.append(interpreter.get_n_events())
+        self.assertEqual(n_events[0] * 4, n_events[1])  # the raw data has 16 data headers per trigger
+        self.assertRaises(ValueError, interpreter.set_trig_count, 257)
+        with AnalyzeRawData(raw_data_file=None, analyzed_data_file=tests_data_folder + 'unit_test_data_1_stop_mode.h5') as analyze_raw_data:  # no file is created
+            analyze_raw_data.n_bcid = 100
+            self.assertEqual(analyze_raw_data.n_bcid, 16)
+            analyze_raw_data.set_stop_mode = True
+            analyze_raw_data.n_bcid = 100
+            self.assertEqual(analyze_raw_data.n_bcid, 100)
+            analyze_raw_data.set_stop_mode = False
+            self.assertEqual(analyze_raw_data.n_bcid, 16)
+            analyze_raw_data.set_stop_mode = True  # the order of set_stop_mode and n_bcid does not matter
+            self.assertEqual(analyze_raw_data.n_bcid, 100)
+
+    def test_scan_parameter_histograming(self):  # test the scan parameter lookup of the histogramming for hits that are not sorted by event number
+        with tb.open_file(tests_data_folder + 'unit_test_data_1_result.h5', 'r') as result_h5:
+            hits = result_h5.root.Hits[:]
+        meta_event_index = np.ascontiguousarray(np.linspace(0, hits['event_number'].max(), 100).astype(np.uint64))  # first event number of each read out
+        parameter_index = np.ascontiguousarray(np.arange(100, dtype=np.uint32) / 10)  # scan parameter index of each read out
+        occupancies = []
+        for hit_array in (hits, np.ascontiguousarray(hits[::-1])):
+            histograming = PyDataHistograming()
+            histograming.set_warning_output(False)
+            histograming.create_occupancy_hist(True)
+            histograming.add_meta_event_index(meta_event_index, array_length=meta_event_index.shape[0])
+            histograming.add_scan_parameter(parameter_index)
+            histograming.add_hits(hit_array)
+            occupancies.append(histograming.get_occupancy().copy())
+        selection = hits['tot'] <= 13
+        expected = np.bincount(parameter_index[np.searchsorted(meta_event_index, hits['event_number'][selection], side='right') - 1], minlength=10)
+        self.assertTrue(np.all(occupancies[0].sum(axis=(0, 1)) == expected))
+        self.assertTrue(np.all(occupancies[0] == occupancies[1]))
+
+    def test_sparse_occupancy(self):  # test the occupancy histogram blocks of the histogramming against the dense occupancy histogram
+        with tb.open_file(tests_data_folder + 'unit_test_data_1_result.h5', 'r') as result_h5:
+            hits = result_h5.root.Hits[:]
+        hits = hits[hits['row'] <= 32]  # hits in the first two occupancy histogram blocks only
+        meta_event_index = np.ascontiguousarray(np.linspace(0, hits['event_number'].max(), 1000).astype(np.uint64))
+        parameter_index = np.ascontiguousarray(np.arange(1000, dtype=np.uint32))  # one parameter per read out
+        histograming = PyDataHistograming()
+        histograming.set_warning_output(False)
+        histograming.create_occupancy_hist(True)
+        histograming.add_meta_event_index(meta_event_index, array_length=meta_event_index.shape[0])
+        histograming.add_scan_parameter(parameter_index)
+        histograming.add_hits(hits)
+        self.assertTrue(0 < histograming.get_occupancy_fill_ratio() <= 2. / 21)
+        occupancy = histograming.get_occupancy()
+        self.assertEqual(occupancy.shape, (80, 336, 1000))
+        self.assertEqual(np.sum(occupancy), np.count_nonzero(hits['tot'] <= 13))
+        for parameter_index in range(1000):
+            occupancy_parameter = histograming.get_occupancy_parameter(parameter_index)
+            if occupancy_parameter is None:
+                self.assertFalse(np.any(occupancy[:, :, parameter_index]))
+            else:
+                self.assertTrue(np.all(occupancy_parameter == occupancy[:, :, parameter_index]))
+        self.assertRaises(IndexError, histograming.get_occupancy_parameter, 1000)
+        histograming.reset()
+        self.assertEqual(histograming.get_occupancy_fill_ratio(), 0)
+        self.assertFalse(np.any(histograming.get_occupancy()))
+        self.assertEqual(np.sum(occupancy), np.count_nonzero(hits['tot'] <= 13))  # the returned occupancy histogram is a new array owned by the caller
+
+    def test_histogram_merging(self):  # test the histograms of hit chunks added together (one pickled) against the histograms of all hits
+        with tb.open_file(tests_data_folder + 'unit_test_data_1_result.h5', 'r') as result_h5:
+            hits = result_h5.root.Hits[:]
+        meta_event_index = np.ascontiguousarray(np.linspace(0, hits['event_number'].max(), 100).astype(np.uint64))
+        parameter_index = np.ascontiguousarray(np.arange(100, dtype=np.uint32) / 10)  # 10 parameters
+
+        def create_histograming():
+            histograming = PyDataHistograming()
+            histograming.set_warning_output(False)
+            histograming.create_occupancy_hist(True)
+            histograming.create_tot_hist(True)
+            histograming.create_rel_bcid_hist(True)
+            histograming.create_tdc_hist(True)
+            histograming.create_tot_pixel_hist(True)
+            histograming.add_meta_event_index(meta_event_index, array_length=meta_event_index.shape[0])
+            histograming.add_scan_parameter(parameter_index)
+            return histograming
+
+        histograming = create_histograming()
+        histograming.add_hits(hits)
+        histograming_merged = create_histograming()
+        for hits_chunk in np.array_split(hits, 3):
+            histograming_chunk = create_histograming()
+            histograming_chunk.add_hits(hits_chunk)
+            histograming_merged += pickle.loads(pickle.dumps(histograming_chunk, pickle.HIGHEST_PROTOCOL))
+        self.assertEqual(histograming_merged.get_n_parameters(), 10)
+        self.assertEqual(histograming_merged.get_occupancy_fill_ratio(), histograming.get_occupancy_fill_ratio())
+        self.assertTrue(np.all(histograming_merged.get_occupancy() == histograming.get_occupancy()))
+        self.assertTrue(np.all(histograming_merged.get_tot_hist() == histograming.get_tot_hist()))
+        self.assertTrue(np.all(histograming_merged.get_rel_bcid_hist() == histograming.get_rel_bcid_hist()))
+        self.assertTrue(np.all(histograming_merged.get_tdc_hist() == histograming.get_tdc_hist()))
+        self.assertTrue(np.all(histograming_merged.get_tot_pixel_hist() == histograming.get_tot_pixel_hist()))
+        threshold, noise, threshold_merged, noise_merged = (np.zeros(80 * 336, dtype=np.float64) for _ in range(4))
+        histograming.calculate_threshold_scan_arrays(threshold, noise, 100, 0, 9)
+        histograming_merged.calculate_threshold_scan_arrays(threshold_merged, noise_merged, 100, 0, 9)
+        self.assertTrue(np.all(threshold_merged == threshold) and np.all(noise_merged == noise))
+        # histograms with different settings cannot be added
+        histograming_merged.create_tdc_hist(False)
+        self.assertRaises(ValueError, histograming.add, histograming_merged)
+        self.assertRaises(ValueError, histograming.set_state, histograming.get_state()[:-1])
+
+    def test_clusterizer(self):  # test the clustering of scattered hits in a large BCID window
+        hits = np.zeros(shape=(7, ), dtype=tb.dtype_from_descr(data_struct.HitInfoTable))
+        hits['event_number'] = [1, 1, 1, 1, 2, 2, 2]  # column, row, relative BCID, ToT of each hit:
+        hits['column'] = [1, 1, 2, 80, 10, 10, 40]  # event 1: one cluster over 3 BCIDs and one hit at the opposite corner
+        hits['row'] = [1, 2, 3, 336, 10, 11, 100]  # event 2: two hits in one cluster and one hit with a too large ToT
+        hits['relative_BCID'] = [0, 1, 2, 200, 0, 0, 200]
+        hits['tot'] = [5, 7, 7, 3, 2, 4, 14]
+        clusterizer = PyDataClusterizer()
+        clusterizer.set_warning_output(False)
+        clusterizer.create_cluster_hit_info_array(True)
+        clusterizer.set_cluster_hit_info_array_size(hits.shape[0])
+        clusterizer.add_hits(hits)
+        cluster = clusterizer.get_cluster()
+        self.assertTrue(np.all(cluster['eventNumber'] == [1, 1, 2]))
+        self.assertTrue(np.all(cluster['ID'] == [0, 1, 0]))
+        self.assertTrue(np.all(cluster['size'] == [3, 1, 2]))
+        self.assertTrue(np.all(cluster['tot'] == [19, 3, 6]))
+        self.assertTrue(np.all(cluster['charge'] == [22, 4, 8]))  # the charge is ToT + 1 without charge calibration
+        self.assertTrue(np.all(cluster['seed_column'] == [2, 80, 10]))  # the seed is the last hit with the highest ToT
+        self.assertTrue(np.all(cluster['seed_row'] == [3, 336, 11]))
+        cluster_hits = clusterizer.get_hit_cluster()  # the hit with the too large ToT is not a cluster hit
+        self.assertTrue(np.all(cluster_hits['clusterID'] == [0, 0, 0, 1, 0, 0]))
+        self.assertTrue(np.all(cluster_hits['isSeed'] == [0, 0, 1, 1, 0, 1]))
+        self.assertTrue(np.all(cluster_hits['clusterSize'] == [3, 3, 3, 1, 2, 2]))
+        self.assertTrue(np.all(cluster_hits['nCluster'] == [2, 2, 2, 2, 1, 1]))
+        self.assertTrue(np.all(clusterizer.get_cluster_size_hist()[:4] == [0, 1, 1, 1]))
+
+    def test_streaming_clusterizer(self):  # test the clustering of hit chunks not aligned at events into too small cluster arrays against the clustering of all hits
+        with tb.open_file(tests_data_folder + 'unit_test_data_1_result.h5', 'r') as in_file_h5:
+            hits = in_file_h5.root.Hits[:]
+        clusterizer = PyDataClusterizer()
+        clusterizer.set_warning_output(False)
+        clusterizer.create_cluster_hit_info_array(True)
+        clusterizer.add_hits(hits)
+        cluster, cluster_hits = clusterizer.get_cluster().copy(), clusterizer.get_hit_cluster().copy()
+        cluster_size_hist = clusterizer.get_cluster_size_hist().copy()
+        clusterizer.reset()
+        clusterizer.set_streaming_mode(True)
+        clusterizer.set_cluster_info_array(np.zeros(shape=(100, ), dtype=tb.dtype_from_descr(data_struct.ClusterInfoTable)))
+        clusterizer.set_cluster_hit_info_array(np.zeros(shape=(100, ), dtype=tb.dtype_from_descr(data_struct.ClusterHitInfoTable)))
+        hits_chunks = np.array_split(hits, 7)
+        cluster_chunks, cluster_hits_chunks = [], []
+        for index, hits_chunk in enumerate(hits_chunks):
+            clusterizer.add_hits(np.ascontiguousarray(hits_chunk))
+            if index == len(hits_chunks) - 1:
+                clusterizer.store_event()  # the clusters of the last event are added to the clusters of the last chunk
+            cluster_chunks.append(clusterizer.get_cluster().copy())
+            cluster_hits_chunks.append(clusterizer.get_hit_cluster().copy())
+        self.assertGreater(clusterizer.get_cluster_info_array_size(), 100)
+        self.assertGreater(clusterizer.get_cluster_hit_info_array_size(), 100)
+        self.assertEqual(cluster.tostring(), np.concatenate(cluster_chunks).tostring())
+        self.assertEqual(cluster_hits.tostring(), np.concatenate(cluster_hits_chunks).tostring())
+        self.assertTrue(np.all(cluster_size_hist == clusterizer.get_cluster_size_hist()))
+        clusterizer.reset()
+        clusterizer.set_cluster_info_array_size(100)
+        clusterizer.set_cluster_arrays_growth(False)
+        self.assertRaises(IndexError, clusterizer.add_hits, hits)
+
     def test_threshold_analysis(self):  # test the created interpretation file of the threshold data against the stored one
         data_equal, error_msg = compare_h5_files(tests_data_folder + 'unit_test_data_2_result.h5', tests_data_folder + 'unit_test_data_2_interpreted.h5')
         self.assertTrue(data_equal, msg=error_msg)
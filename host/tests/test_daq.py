@@ -0,0 +1,336 @@
+''' Script to check the data acquisition helpers that do not need any hardware.
+'''
+
+import unittest
+import os
+import tempfile
+import shutil
+from threading import Thread
+from time import sleep
+import numpy as np
+import tables as tb
+
+from pybar.daq.ring_buffer import RingBuffer, RingBufferOverrun
+from pybar.daq.readout_utils import data_array_from_data_iterable, interpret_pixel_data, get_col_row_tot_array_from_data_record_array, get_col_row_tot_iterator_from_data_records, get_occupancy_from_data_record_array, classify_raw_data, is_word_type, filter_raw_data, is_trigger_word, is_tdc_word, is_data_header, is_data_record, is_address_record, is_value_record, is_service_record, is_data_from_channel, TRIGGER_WORD, TDC_WORD, DATA_HEADER, DATA_RECORD, ADDRESS_RECORD, VALUE_RECORD, SERVICE_RECORD
+from pybar.daq.fifo_readout import DataConsumer, FifoReadout
+from pybar.daq.fei4_raw_data import RawDataFile, open_configuration_group
+from pybar.daq.raw_data_journal import RawDataJournal, recover_raw_data_file
+from pybar.daq.flat_raw_data import open_flat_raw_data, is_flat_raw_data, get_raw_data_words, convert_flat_to_raw_data_file, convert_raw_data_file_to_flat
+from pybar.analysis.analysis_utils import get_data_file_names_from_scan_base
+
+
+class TestDaq(unittest.TestCase):
+
+    def test_ring_buffer_fifo(self):  # items are returned in order as zero-copy views
+        ring_buffer = RingBuffer(size=100, max_chunks=10)
+        ring_buffer.append((np.arange(10, dtype=np.uint32), 0.0, 1.0, 0))
+        ring_buffer.append((np.arange(10, 30, dtype=np.uint32), 1.0, 2.0, 1))
+        self.assertEqual(len(ring_buffer), 2)
+        self.assertListEqual(data_array_from_data_iterable(ring_buffer).tolist(), range(30))
+        data, timestamp_start, timestamp_stop, error = ring_buffer.popleft()
+        self.assertListEqual(data.tolist(), range(10))
+        self.assertEqual((timestamp_start, timestamp_stop, error), (0.0, 1.0, 0))
+        self.assertFalse(data.flags['OWNDATA'])
+        self.assertEqual(ring_buffer.fill_level, 30)
+        ring_buffer.release()
+        self.assertEqual(ring_buffer.fill_level, 20)
+        self.assertEqual(ring_buffer.high_water_mark, 30)
+
+    def test_ring_buffer_wrap_around(self):  # chunks are always contiguous, data is never overwritten
+        ring_buffer = RingBuffer(size=100, max_chunks=10)
+        words = 0
+        for _ in range(50):
+            ring_buffer.append((np.arange(words, words + 30, dtype=np.uint32), 0.0, 1.0, 0))
+            data = ring_buffer.popleft()[0]
+            self.assertListEqual(data.tolist(), range(words, words + 30))
+            ring_buffer.release()
+            words += 30
+        ring_buffer.append((np.arange(60, dtype=np.uint32), 0.0, 1.0, 0))
+        ring_buffer.append((np.arange(30, dtype=np.uint32), 0.0, 1.0, 0))
+        self.assertRaises(RingBufferOverrun, ring_buffer.append, (np.arange(30, dtype=np.uint32), 0.0, 1.0, 0))
+        self.assertEqual(ring_buffer.overruns, 1)
+        self.assertEqual(ring_buffer.lost_words, 30)
+        self.assertListEqual(ring_buffer.popleft()[0].tolist(), range(60))
+        ring_buffer.release()
+        ring_buffer.append((np.arange(30, dtype=np.uint32), 0.0, 1.0, 0))  # fits into the beginning
+        ring_buffer.append(None)  # end marker always fits
+        self.assertListEqual([item[0].tolist() if item else item for item in ring_buffer], [range(30), range(30), None])
+
+    def test_data_consumer_policies(self):  # check discarded data when consumer falls behind
+        data = (np.arange(10, dtype=np.uint32), 0.0, 1.0, 0)
+        for policy, expected_dropped, expected_queue in [('drop-oldest', range(7), range(7, 10)), ('sample', [0, 3, 4, 5, 7, 8, 9], [1, 2, 6])]:
+            consumer = DataConsumer(callback=None, policy=policy, max_queue_size=3, sample_interval=4)
+            dropped = []
+            for index in range(10):
+                dropped.extend(consumer.put(index, data))
+            self.assertListEqual(sorted(dropped), expected_dropped)
+            self.assertListEqual([index for index, _ in consumer._queue], expected_queue)
+            self.assertEqual(consumer.n_dropped, len(expected_dropped))
+        self.assertListEqual(consumer.put(10, None), [])  # end marker is never discarded
+        self.assertTrue(consumer._queue[-1][1] is None)
+
+    def test_data_consumer_block_policy(self):  # adding data waits for a slow consumer, no data is discarded
+        data = (np.arange(10, dtype=np.uint32), 0.0, 1.0, 0)
+        consumer = DataConsumer(callback=None, policy='block', max_queue_size=3)
+        dropped = []
+        producer = Thread(target=lambda: [dropped.extend(consumer.put(index, data)) for index in range(10)])
+        producer.daemon = True
+        producer.start()
+        producer.join(0.5)
+        self.assertTrue(producer.is_alive())  # producer waits for the consumer
+        self.assertEqual(len(consumer), 3)
+        received = []
+        while len(received) < 10:
+            received.extend(index for index, _ in consumer.get())
+            sleep(0.01)  # slow consumer
+        producer.join(1.0)
+        self.assertFalse(producer.is_alive())
+        self.assertListEqual(received, range(10))
+        self.assertListEqual(dropped, [])
+        self.assertEqual(consumer.high_water_mark, 3)
+
+    def test_fifo_readout_sram_size(self):  # SRAM FIFO size from the DUT configuration, 2 MB if not given
+        class Sram(object):
+            def __init__(self, conf):
+                self._conf = conf
+        fifo_readout = FifoReadout.__new__(FifoReadout)  # the constructor needs the hardware
+        fifo_readout.dut = {'sram': Sram({'size': 1024})}
+        self.assertEqual(fifo_readout.get_sram_size(), 1024)
+        fifo_readout.dut = {'sram': Sram({})}
+        self.assertEqual(fifo_readout.get_sram_size(), 2 * 1024 * 1024)
+
+    def test_fifo_readout_callback_error(self):  # exceptions in callbacks without errback are logged, the threads keep running and stop() returns
+        class Sram(object):
+            _conf = {}
+
+        class TestFifoReadout(FifoReadout):  # no hardware, every readout gives 10 data words until the readout is stopped
+            def reset_rx(self, channels=None):
+                pass
+
+            def reset_sram_fifo(self):
+                pass
+
+            def read_data(self):
+                return np.arange(10 if not self.stop_readout.is_set() else 0, dtype=np.uint32)
+
+        def raise_error(data):
+            raise ValueError('Callback error')
+
+        for ring_buffer_size in (None, 1000):
+            fifo_readout = TestFifoReadout(dut={'sram': Sram()}, ring_buffer_size=ring_buffer_size)
+            fifo_readout.readout_interval = 0.001
+            for kwargs in ({'callback': raise_error}, {'consumers': {'file': DataConsumer(raise_error, policy='block', max_queue_size=1)}}):
+                fifo_readout.start(reset_sram_fifo=True, clear_buffer=True, **kwargs)
+                sleep(0.05)
+                stop_thread = Thread(target=fifo_readout.stop)
+                stop_thread.daemon = True  # do not block the tests if stop() does not return
+                stop_thread.start()
+                stop_thread.join(timeout=5.0)
+                self.assertFalse(stop_thread.is_alive())
+                for consumer in fifo_readout.consumers.values():
+                    self.assertTrue(consumer.n_data > 0)
+
+    def test_decode_data_records(self):  # compiled decoder, words that are no data records and hits with ToT code > max ToT are ignored
+        raw_data = np.array([0x00E9FFFF, 0x00020512, 0x000205EF, 0x0003FF45, 0x80000003, 0x00A1500F, 0x000201FF, 0x00A150D3], dtype=np.uint32)
+        col, row, tot = get_col_row_tot_array_from_data_record_array(raw_data)
+        self.assertListEqual(zip(col.tolist(), row.tolist(), tot.tolist()), [(1, 5, 1), (1, 6, 2), (80, 336, 0), (80, 336, 13)])  # no second hit in row 337
+        self.assertListEqual(zip(*[array.tolist() for array in get_col_row_tot_array_from_data_record_array(raw_data, max_tot=14)]), [(1, 5, 1), (1, 6, 2), (1, 5, 14), (80, 336, 0), (80, 336, 13)])
+        occupancy = get_occupancy_from_data_record_array(raw_data)
+        self.assertEqual(occupancy.shape, (80, 336))
+        self.assertEqual(occupancy[0, 4], 1)
+        self.assertEqual(occupancy[0, 5], 1)
+        self.assertEqual(occupancy[79, 335], 2)
+        self.assertEqual(occupancy.sum(), 4)
+        self.assertEqual(get_occupancy_from_data_record_array(raw_data, occupancy).sum(), 8)
+
+    def test_occupancy_below_half_injections(self):  # occupancy is signed, distance to n_injections / 2 of a pixel below threshold does not wrap around
+        n_injections = 100
+        raw_data = np.array([0x00020512] * 10 + [0x00A150D3] * 60, dtype=np.uint32)  # pixel (1, 5) below threshold, pixel (80, 336) above threshold
+        occupancy = get_occupancy_from_data_record_array(raw_data)
+        self.assertEqual(abs(occupancy[0, 4] - n_injections / 2), 40)
+        self.assertEqual(abs(occupancy[79, 335] - n_injections / 2), 10)
+        self.assertEqual(abs(occupancy[1, 0] - n_injections / 2), 50)  # pixel without hits
+        self.assertListEqual((occupancy > n_injections / 2).nonzero()[0].tolist(), [79])
+
+    def test_data_record_block_iterator(self):  # blocks of hits, second hit only if ToT code is not 15
+        raw_data = np.array([0x00020512, 0x000205EF, 0x00A150D3, 0x000201FF, 0x0004031F], dtype=np.uint32)
+        blocks = list(get_col_row_tot_iterator_from_data_records(raw_data, block_size=2))
+        self.assertEqual(len(blocks), 3)
+        hits = [hit for col, row, tot in blocks for hit in zip(col.tolist(), row.tolist(), tot.tolist())]
+        self.assertListEqual(hits, [(1, 5, 1), (1, 6, 2), (1, 5, 14), (80, 336, 13), (80, 337, 3), (1, 1, 15), (2, 3, 1)])
+
+    def test_interpret_pixel_data(self):  # pixel register readback of all double columns and bits at once
+        tdac = np.random.RandomState(0).randint(0, 32, size=(80, 336)).astype(np.uint32)
+        data = []
+        for dc in range(40):
+            pixel = np.concatenate((tdac[2 * dc + 1, ::-1], tdac[2 * dc]))  # pixel 0 to 671 of the double column
+            words = []
+            for bit_set in range(4, -1, -1):  # MSB first for TDAC
+                value_bits = np.invert(np.bitwise_and(np.right_shift(pixel, bit_set), 1).astype(np.bool))  # read back values are inverted
+                for address, value in zip(range(15, 672, 16), np.packbits(value_bits).view('>u2')):
+                    words.extend([0x00EA0000 | address, 0x00EC0000 | value])
+            data.append(np.array(words, dtype=np.uint32))
+        data[5] = data[5][2:]  # missing data of bit 4 of first 16 pixel
+        pixel_data = np.ma.masked_array(np.zeros(shape=(80, 336), dtype=np.uint32), mask=True)
+        interpret_pixel_data(data, range(40), pixel_data)
+        self.assertListEqual(np.where(pixel_data.mask)[0].tolist(), [11] * 16)
+        self.assertListEqual(np.where(pixel_data.mask)[1].tolist(), range(320, 336))
+        self.assertTrue(np.array_equal(pixel_data.data[~pixel_data.mask], tdac[~pixel_data.mask]))
+        pixel_data_dc = np.ma.masked_array(np.zeros(shape=(80, 336), dtype=np.uint32), mask=True)
+        interpret_pixel_data(data[7], 7, pixel_data_dc)  # single double column
+        self.assertEqual(np.count_nonzero(~pixel_data_dc.mask), 672)
+        self.assertTrue(np.array_equal(pixel_data_dc.data[14:16], tdac[14:16]))
+
+    def test_classify_raw_data(self):  # word types and channels have to be identical to the predicates
+        raw_data = np.random.RandomState(0).randint(0, 2 ** 32, size=100000).astype(np.uint32)
+        with tb.open_file(os.path.join(os.path.dirname(__file__), 'test_analysis/unit_test_data_1.h5'), 'r') as in_file_h5:
+            raw_data = np.concatenate((raw_data, in_file_h5.root.raw_data[:100000]))
+        word_type, channel = classify_raw_data(raw_data)
+        fe_word = np.logical_not(np.logical_or(is_trigger_word(raw_data), is_tdc_word(raw_data)))
+        self.assertTrue(np.array_equal(word_type == TRIGGER_WORD, is_trigger_word(raw_data)))
+        self.assertTrue(np.array_equal(word_type == TDC_WORD, is_tdc_word(raw_data)))
+        for selected_word_type, predicate in ((DATA_HEADER, is_data_header), (DATA_RECORD, is_data_record), (ADDRESS_RECORD, is_address_record), (VALUE_RECORD, is_value_record), (SERVICE_RECORD, is_service_record)):
+            self.assertTrue(np.array_equal(word_type == selected_word_type, np.logical_and(fe_word, predicate(raw_data))))
+        for selected_channel in range(1, 5):
+            self.assertTrue(np.array_equal(np.logical_and(fe_word, channel == selected_channel), np.logical_and(fe_word, is_data_from_channel(selected_channel)(raw_data))))
+        self.assertListEqual(filter_raw_data(raw_data, (DATA_HEADER, DATA_RECORD), channel=4).tolist(), raw_data[np.logical_and(np.logical_or(word_type == DATA_HEADER, word_type == DATA_RECORD), channel == 4)].tolist())
+        self.assertEqual(is_word_type(DATA_RECORD).__name__, 'is_word_type_4')
+
+    def test_raw_data_file_buffered_meta_data(self):  # buffered meta data has to be identical to unbuffered meta data
+        folder = tempfile.mkdtemp()
+        try:
+            meta_data = []
+            for buffer_size, async_write in ((0, False), (3, False), (3, True)):
+                filename = os.path.join(folder, 'raw_data_%d_%d.h5' % (buffer_size, async_write))
+                with RawDataFile(filename, scan_parameters={'PlsrDAC': 0}, buffer_size=buffer_size, async_write=async_write, max_memory=16) as raw_data_file:
+                    for index in range(10):
+                        raw_data_file.append_item((np.arange(index, dtype=np.uint32), float(index), float(index) + 0.5, index % 2), scan_parameters={'PlsrDAC': index // 4}, flush=False)
+                with tb.open_file(filename, 'r') as in_file_h5:
+                    meta_data.append((in_file_h5.root.raw_data[:], in_file_h5.root.meta_data[:], in_file_h5.root.scan_parameters[:]))
+            for unbuffered, buffered, async_written in zip(*meta_data):
+                self.assertEqual(unbuffered.dtype, buffered.dtype)
+                self.assertListEqual(unbuffered.tolist(), buffered.tolist())
+                self.assertListEqual(unbuffered.tolist(), async_written.tolist())
+        finally:
+            shutil.rmtree(folder)
+
+    def test_raw_data_file_async_error(self):  # exceptions in the writer thread are passed to errback
+        folder = tempfile.mkdtemp()
+        try:
+            errors = []
+            with RawDataFile(os.path.join(folder, 'raw_data.h5'), async_write=True, errback=errors.append) as raw_data_file:
+                raw_data_file.append_item((np.zeros((5, 2), dtype=np.uint32), 0.0, 1.0, 0))  # wrong shape
+                raw_data_file.append_item((np.arange(10, dtype=np.uint32), 1.0, 2.0, 0))
+            self.assertEqual(len(errors), 1)
+            with tb.open_file(os.path.join(folder, 'raw_data.h5'), 'r') as in_file_h5:
+                self.assertEqual(in_file_h5.root.meta_data.nrows, 1)
+        finally:
+            shutil.rmtree(folder)
+
+    def test_raw_data_file_rollover(self):  # configuration nodes are linked, files are listed in manifest
+        folder = tempfile.mkdtemp()
+        cwd = os.getcwd()
+        os.chdir(folder)  # file names of new files are lower case
+        try:
+            scan_base = 'scan'
+            with RawDataFile(scan_base, scan_parameters={'GDAC': 0}) as raw_data_file:
+                configuration_group = raw_data_file.h5_file.create_group(raw_data_file.h5_file.root, 'configuration')
+                raw_data_file.h5_file.create_array(configuration_group, 'conf', np.arange(3))
+                raw_data_file.append_item((np.arange(10, dtype=np.uint32), 0.0, 1.0, 0))
+                for gdac in (100, 200, 100):
+                    raw_data_file.append_item((np.arange(gdac, gdac + 10, dtype=np.uint32), 1.0, 2.0, 0), scan_parameters={'GDAC': gdac}, new_file=True)
+            data_files = get_data_file_names_from_scan_base(scan_base, parameter=False)
+            self.assertListEqual([os.path.basename(data_file) for data_file in data_files], ['scan.h5', 'scan_GDAC_100.h5', 'scan_GDAC_200.h5'])
+            self.assertListEqual(get_data_file_names_from_scan_base(scan_base, parameter=True), data_files[1:])
+            for data_file, raw_data in zip(data_files, [range(10), range(100, 110) * 2, range(200, 210)]):
+                with tb.open_file(data_file, 'r') as in_file_h5:
+                    self.assertListEqual(in_file_h5.root.raw_data[:].tolist(), raw_data)
+                    self.assertListEqual(in_file_h5.get_node('/configuration/conf')[:].tolist(), range(3))
+                    with open_configuration_group(in_file_h5) as configuration_group:
+                        self.assertListEqual(configuration_group.conf[:].tolist(), range(3))
+                        configuration_file = configuration_group._v_file
+                    self.assertTrue(configuration_file is in_file_h5 or not configuration_file.isopen)  # linked file is closed
+        finally:
+            os.chdir(cwd)
+            shutil.rmtree(folder)
+
+    def test_raw_data_journal_recovery(self):  # raw data file is recovered from journal, incomplete last record is ignored
+        folder = tempfile.mkdtemp()
+        try:
+            journal_filename = os.path.join(folder, 'raw_data.journal')
+            with RawDataJournal(journal_filename, scan_parameters=['PlsrDAC'], fsync_interval=0) as journal:
+                for index in range(5):
+                    journal.append((np.arange(index, index + 10, dtype=np.uint32), float(index), float(index) + 0.5, index % 2), {'PlsrDAC': index * 10})
+            with open(journal_filename, 'r+b') as journal_file:  # simulate crash
+                journal_file.truncate(os.path.getsize(journal_filename) - 8)
+            self.assertEqual(recover_raw_data_file(journal_filename), 4)
+            with tb.open_file(os.path.join(folder, 'raw_data_recovered.h5'), 'r') as in_file_h5:
+                self.assertListEqual(in_file_h5.root.raw_data[:].tolist(), range(10) + range(1, 11) + range(2, 12) + range(3, 13))
+                self.assertListEqual(in_file_h5.root.meta_data[:]['index_stop'].tolist(), [10, 20, 30, 40])
+                self.assertListEqual(in_file_h5.root.meta_data[:]['error'].tolist(), [0, 1, 0, 1])
+                self.assertListEqual(in_file_h5.root.scan_parameters[:]['PlsrDAC'].tolist(), [0, 10, 20, 30])
+        finally:
+            shutil.rmtree(folder)
+
+    def test_raw_data_journal_append(self):  # journal is appended after reopening the raw data file, every file of the run is recovered
+        folder = tempfile.mkdtemp()
+        cwd = os.getcwd()
+        os.chdir(folder)  # file names of new files are lower case
+        try:
+            for mode, gdacs in (('w', (0, 100)), ('a', (0,))):
+                raw_data_file = RawDataFile('scan', mode=mode, scan_parameters={'GDAC': 0}, journal=True, journal_fsync_interval=0)
+                for gdac in gdacs:
+                    raw_data_file.append_item((np.arange(gdac, gdac + 10, dtype=np.uint32), 1.0, 2.0, 0), scan_parameters={'GDAC': gdac}, new_file=True)
+                raw_data_file.journal.close()  # simulate crash, journal is not removed
+                raw_data_file.journal = None
+                raw_data_file.close()
+            with open('scan.journal', 'ab') as journal_file:  # incomplete last record is removed when appending
+                journal_file.write('\x00' * 10)
+            raw_data_file = RawDataFile('scan', mode='a', scan_parameters={'GDAC': 0}, journal=True, journal_fsync_interval=0)
+            raw_data_file.append_item((np.arange(200, 210, dtype=np.uint32), 1.0, 2.0, 0), scan_parameters={'GDAC': 200}, new_file=True)
+            raw_data_file.journal.close()
+            raw_data_file.journal = None
+            raw_data_file.close()
+            self.assertEqual(recover_raw_data_file('scan.journal'), 4)
+            data_files = get_data_file_names_from_scan_base('scan_recovered', parameter=False)
+            self.assertListEqual([os.path.basename(data_file) for data_file in data_files], ['scan_recovered.h5', 'scan_recovered_GDAC_100.h5', 'scan_recovered_GDAC_200.h5'])
+            for data_file, raw_data in zip(data_files, [range(10) * 2, range(100, 110), range(200, 210)]):
+                with tb.open_file(data_file, 'r') as in_file_h5:
+                    self.assertListEqual(in_file_h5.root.raw_data[:].tolist(), raw_data)
+        finally:
+            os.chdir(cwd)
+            shutil.rmtree(folder)
+
+    def test_flat_raw_data(self):  # flat raw data format and conversion to and from HDF5
+        folder = tempfile.mkdtemp()
+        try:
+            for raw_data_format in ('hdf5', 'flat'):
+                with RawDataFile(os.path.join(folder, raw_data_format), scan_parameters={'PlsrDAC': 0}, raw_data_format=raw_data_format) as raw_data_file:
+                    for index in range(10):
+                        raw_data_file.append_item((np.arange(index, dtype=np.uint32), float(index), float(index) + 0.5, index % 2), scan_parameters={'PlsrDAC': index // 4}, flush=False)
+            raw_data, meta_data = open_flat_raw_data(os.path.join(folder, 'flat.h5'))
+            self.assertEqual(raw_data.dtype, np.uint32)
+            with tb.open_file(os.path.join(folder, 'hdf5.h5'), 'r') as in_file_h5:
+                self.assertListEqual(raw_data.tolist(), in_file_h5.root.raw_data[:].tolist())
+                for name in in_file_h5.root.meta_data.dtype.names:
+                    self.assertListEqual(meta_data[name].tolist(), in_file_h5.root.meta_data[:][name].tolist())
+                self.assertListEqual(meta_data['PlsrDAC'].tolist(), in_file_h5.root.scan_parameters[:]['PlsrDAC'].tolist())
+            convert_flat_to_raw_data_file(os.path.join(folder, 'flat.raw'))  # adds raw data node
+            convert_raw_data_file_to_flat(os.path.join(folder, 'hdf5.h5'))
+            for filename in ('flat.h5', 'hdf5.h5'):
+                with tb.open_file(os.path.join(folder, filename), 'r') as in_file_h5:
+                    self.assertListEqual(in_file_h5.root.raw_data[:].tolist(), raw_data.tolist())
+                self.assertListEqual(open_flat_raw_data(os.path.join(folder, filename))[1].tolist(), meta_data.tolist())
+            with tb.open_file(os.path.join(folder, 'flat.h5'), 'r') as in_file_h5:  # raw data node is used before flat raw data
+                self.assertIs(get_raw_data_words(in_file_h5), in_file_h5.root.raw_data)
+            del raw_data, meta_data  # close memory map
+            with RawDataFile(os.path.join(folder, 'flat'), scan_parameters={'PlsrDAC': 0}):  # stale flat raw data files are removed
+                pass
+            self.assertFalse(is_flat_raw_data(os.path.join(folder, 'flat.h5')))
+        finally:
+            shutil.rmtree(folder)
+
+
+if __name__ == '__main__':
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestDaq)
+    unittest.TextTestRunner(verbosity=2).run(suite)